@@ -0,0 +1,322 @@
+import math
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+from typing import Optional, Sequence
+
+from simulate import DEFAULT_ENEMY, DEFAULT_PLAYER, simulate
+"""
+balance.py
+
+Balance tuning: searches enemy stats (attack power, defense, health) for a target win rate and battle length,
+ex: the default player should win 70% of the time in 4 to 6 turns.
+
+Every candidate stat tuple is evaluated by simulating battles (simulate.py) in batches, until the Wilson confidence
+interval of its win rate is narrower than the requested precision, or clearly misses the target (no point in
+pinning down the win rate of a hopeless candidate), or the battle budget is spent. All candidates play the same
+battle seeds, so they are compared on the same dice rolls.
+
+The search is coarse to fine: a grid over the whole stat space, then a finer grid around the best candidate, and
+so on down to steps of 1. Each grid is evaluated in parallel (one process per candidate) and evaluations are cached
+by stat tuple, so the points the grids share are only simulated once. The search stops early when a candidate is
+confidently on target.
+
+    optimizer = BalanceOptimizer(Target(win_rate=0.7, turns=(4, 6)))
+    result = optimizer.optimize()
+    result.best.stats # {"attack_power": 7, "defense": 2, "health": 34}
+
+Or from the command line: python balance.py --win-rate 0.7 --turns 4 6
+"""
+
+STATS: tuple = ("attack_power", "defense", "health") # The tuned stats, in the order of stat tuples
+DEFAULT_BOUNDS: dict = {"attack_power": (1, 30), "defense": (0, 15), "health": (10, 150)}
+
+# The default combatants under the standard ruleset: with the classic one, damage has no randomness and defense does
+# nothing, so every win rate is 0 or 1
+BALANCE_PLAYER: dict = {**DEFAULT_PLAYER, "ruleset": "standard"}
+BALANCE_ENEMY: dict = {**DEFAULT_ENEMY, "ruleset": "standard"}
+
+Z_95 = 1.959964 # Normal quantile of a 95% confidence interval
+
+
+def wilson_interval(successes: int, trials: int, z: float = Z_95) -> tuple:
+    """
+    Wilson score interval of a success rate, which behaves well for small samples and rates close to 0 or 1.
+
+    Args:
+        successes (int): Number of successes
+        trials (int): Number of trials
+        z (float, optional): Normal quantile of the confidence level
+
+    Returns:
+        tuple: (low, high), (0.0, 1.0) if there were no trials
+    """
+    if not trials:
+        return 0.0, 1.0
+    rate = successes / trials
+    denominator = 1 + z * z / trials
+    center = (rate + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+@dataclass(frozen=True, slots=True)
+class Target:
+    """
+    What the tuned enemy should achieve against the player.
+
+    Args:
+        win_rate (float): The player's win rate
+        turns (tuple): Inclusive (min, max) mean battle length, in turns
+        tolerance (float): How far off the win rate may be and still count as on target
+    """
+    win_rate: float = 0.7
+    turns: tuple = (4, 6)
+    tolerance: float = 0.05
+
+    def score(self, win_rate: float, mean_turns: float) -> float:
+        """
+        Distance from the target, 0 is a perfect match. One tolerance of win rate error counts as much as one
+        turn outside the range.
+        """
+        low, high = self.turns
+        return abs(win_rate - self.win_rate) / self.tolerance + max(0.0, low - mean_turns, mean_turns - high)
+
+
+@dataclass(slots=True)
+class Evaluation:
+    """
+    The simulated outcome of one stat tuple.
+
+    Args:
+        stats (tuple): (attack_power, defense, health) of the enemy
+        battles (int): Battles simulated
+        wins (int): Battles the player won
+        mean_turns (float): Average battle length
+        interval (tuple): Wilson interval of the win rate
+        score (float): Distance from the target (see Target.score)
+    """
+    stats: tuple
+    battles: int
+    wins: int
+    mean_turns: float
+    interval: tuple
+    score: float
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.battles if self.battles else 0.0
+
+    def on_target(self, target: Target) -> bool:
+        """True if the whole win rate interval is within tolerance and the battle length is in range"""
+        low, high = self.interval
+        return (target.win_rate - target.tolerance <= low and high <= target.win_rate + target.tolerance
+                and target.turns[0] <= self.mean_turns <= target.turns[1])
+
+    def as_template(self) -> dict:
+        """The evaluated stats as keyword arguments for Enemy (health and max_health alike)"""
+        attack_power, defense, health = self.stats
+        return {"attack_power": attack_power, "defense": defense, "health": health, "max_health": health}
+
+
+@dataclass(slots=True)
+class BalanceResult:
+    """
+    Outcome of a search.
+
+    Args:
+        best (Evaluation): The candidate closest to the target
+        rounds (int): Grids evaluated, coarsest first
+        evaluations (int): Stat tuples simulated
+        cache_hits (int): Probes answered from the cache
+        battles (int): Battles simulated in total
+        history (list): Best evaluation after each round
+    """
+    best: Evaluation
+    rounds: int
+    evaluations: int
+    cache_hits: int
+    battles: int
+    history: list = field(default_factory=list)
+
+    @property
+    def stats(self) -> dict:
+        """The best stats, {stat: value}"""
+        return dict(zip(STATS, self.best.stats))
+
+
+def _evaluate(args: tuple) -> Evaluation:
+    """
+    Worker entry point. Simulates batches of battles for one stat tuple until its win rate is known well enough.
+    """
+    stats, target, player, enemy, policies, seed, batch, max_battles, precision = args
+    enemy = {**enemy, **dict(zip(STATS, stats)), "max_health": stats[2]}
+    battles = wins = 0
+    turns = 0.0
+    while battles < max_battles:
+        size = min(batch, max_battles - battles)
+        summary = simulate(player, enemy, size, policies, workers=1, seed=seed, first=battles)
+        battles += size
+        wins += summary.wins
+        turns += summary.mean_turns * size
+        low, high = wilson_interval(wins, battles)
+        if high - low <= 2 * precision: # Tight enough
+            break
+        if high < target.win_rate - 2 * target.tolerance or low > target.win_rate + 2 * target.tolerance:
+            break # Confidently far off, its exact win rate doesn't matter
+    mean_turns = turns / battles
+    return Evaluation(stats, battles, wins, mean_turns, (low, high), target.score(wins / battles, mean_turns))
+
+
+def _grid(low: int, high: int, points: int) -> list:
+    """Up to 'points' evenly spread integers from low to high, both included"""
+    if points < 2 or high <= low:
+        return [low]
+    return sorted({round(low + (high - low) * index / (points - 1)) for index in range(points)})
+
+
+class BalanceOptimizer:
+    """
+    Searches enemy stats for a target win rate and battle length.
+
+    Args:
+        target (Target): What to aim for
+        bounds (dict, optional): {stat: (min, max)} for every stat in STATS. Defaults to DEFAULT_BOUNDS
+        player (dict, optional): Player template (see simulate.py). Defaults to BALANCE_PLAYER
+        enemy (dict, optional): Enemy template the tuned stats are applied to. Defaults to BALANCE_ENEMY
+        policies (sequence, optional): (player policy, enemy policy), names from engine.POLICIES or picklable callables
+        workers (int, optional): Processes evaluating candidates. Defaults to the number of CPUs, 1 runs in-process
+        seed (int, optional): Base seed of the simulated battles, shared by every candidate
+        batch (int, optional): Battles simulated at a time for a candidate
+        max_battles (int, optional): Battle budget of one candidate
+        precision (float, optional): Stop simulating a candidate once its win rate interval is +/- this wide
+
+    Raises:
+        ValueError: If a stat has no bounds or empty bounds
+    """
+
+    def __init__(self, target: Target, bounds: Optional[dict] = None, player: Optional[dict] = None,
+                 enemy: Optional[dict] = None, policies: Sequence = ("attack", "random"), workers: Optional[int] = None,
+                 seed: int = 0, batch: int = 200, max_battles: int = 2000, precision: float = 0.03):
+        """Validates the bounds, nothing is simulated yet"""
+        bounds = {**DEFAULT_BOUNDS, **(bounds or {})}
+        for stat in STATS:
+            low, high = bounds[stat]
+            if high < low:
+                raise ValueError(f"Empty bounds for {stat}: {bounds[stat]}")
+        self.target = target
+        self.bounds = bounds
+        self.player = player if player is not None else BALANCE_PLAYER
+        self.enemy = enemy if enemy is not None else BALANCE_ENEMY
+        self.policies = tuple(policies)
+        self.workers = workers
+        self.seed = seed
+        self.batch = batch
+        self.max_battles = max_battles
+        self.precision = precision
+        self.cache: dict = {} # {stat tuple: Evaluation}
+        self.cache_hits = 0
+
+    def _task(self, stats: tuple) -> tuple:
+        return (stats, self.target, self.player, self.enemy, self.policies, self.seed, self.batch, self.max_battles,
+                self.precision)
+
+    def evaluate(self, stats: Sequence[int]) -> Evaluation:
+        """
+        Evaluates one stat tuple in-process (or returns its cached evaluation).
+
+        Args:
+            stats (sequence): (attack_power, defense, health)
+
+        Returns:
+            Evaluation: How close it gets to the target
+        """
+        return self.evaluate_many([tuple(stats)])[0]
+
+    def evaluate_many(self, candidates: Sequence[tuple], pool: Optional[Pool] = None) -> list:
+        """
+        Evaluates stat tuples, simulating only the ones that aren't cached.
+
+        Args:
+            candidates (sequence): Stat tuples
+            pool (Pool, optional): Processes to simulate them in, in-process if not given
+
+        Returns:
+            list: Their evaluations, in the same order
+        """
+        missing = list(dict.fromkeys(stats for stats in candidates if stats not in self.cache))
+        self.cache_hits += len(candidates) - len(missing)
+        tasks = [self._task(stats) for stats in missing]
+        evaluations = pool.map(_evaluate, tasks) if pool is not None and len(tasks) > 1 else map(_evaluate, tasks)
+        for evaluation in evaluations:
+            self.cache[evaluation.stats] = evaluation
+        return [self.cache[stats] for stats in candidates]
+
+    def optimize(self, points: int = 5, rounds: int = 6) -> BalanceResult:
+        """
+        Runs the coarse-to-fine search.
+
+        Args:
+            points (int, optional): Grid points per stat in each round
+            rounds (int, optional): Maximum number of grids
+
+        Returns:
+            BalanceResult: The best stats found and what it took
+        """
+        bounds = {stat: self.bounds[stat] for stat in STATS}
+        pool = Pool(self.workers) if self.workers != 1 else None
+        best: Optional[Evaluation] = None
+        history = []
+        try:
+            for _ in range(rounds):
+                grids = [_grid(*bounds[stat], points) for stat in STATS]
+                candidates = [(attack, defense, health) for attack in grids[0] for defense in grids[1]
+                              for health in grids[2]]
+                for evaluation in self.evaluate_many(candidates, pool):
+                    if best is None or evaluation.score < best.score:
+                        best = evaluation
+                history.append(best)
+                if best.on_target(self.target):
+                    break
+
+                # Zoom in around the best candidate, one coarse step on either side
+                steps = [max(grid[index + 1] - grid[index] for index in range(len(grid) - 1)) if len(grid) > 1 else 0
+                         for grid in grids]
+                if max(steps) <= 1:
+                    break # Already down to every integer
+                for stat, value, step in zip(STATS, best.stats, steps):
+                    low, high = self.bounds[stat]
+                    bounds[stat] = (max(low, value - step), min(high, value + step))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        return BalanceResult(best, len(history), len(self.cache), self.cache_hits,
+                             sum(evaluation.battles for evaluation in self.cache.values()), history)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Command line entry point: python balance.py --win-rate 0.7 --turns 4 6"""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Search enemy stats for a target win rate and battle length.")
+    parser.add_argument("--win-rate", type=float, default=0.7, help="target win rate of the player")
+    parser.add_argument("--turns", type=int, nargs=2, default=(4, 6), help="target range of the mean battle length")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="acceptable win rate error")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--seed", type=int, default=0, help="base seed")
+    args = parser.parse_args(argv)
+
+    optimizer = BalanceOptimizer(Target(args.win_rate, tuple(args.turns), args.tolerance), workers=args.workers,
+                                 seed=args.seed)
+    result = optimizer.optimize()
+    best = result.best
+    print(json.dumps({"stats": result.stats, "win_rate": best.win_rate, "interval": best.interval,
+                      "mean_turns": best.mean_turns, "on_target": best.on_target(optimizer.target),
+                      "rounds": result.rounds, "evaluations": result.evaluations, "cache_hits": result.cache_hits,
+                      "battles": result.battles}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,100 +1,72 @@
 from player import Player
 from enemy import Enemy
 import random
-from typing import Sequence
+from typing import Optional
+from engine import ATTACK, HEAL, BattleResult, random_enemy_move, run_battle
+from events import CONSOLE, EventSink
 """
 battle.py 
 
-This module handles the main turn-based battle logic between a human player and an AI-controlled enemy. 
-It supports player choices (attack or heal), random enemy actions, victory/defeat conditions and loot collection after enemy defeat 
+This module is the interactive command line front end for a turn-based battle between a human player and an AI-controlled enemy. 
+It supports player choices (attack or heal), random enemy actions, victory/defeat conditions and loot collection after enemy defeat.
+The battle rules themselves live in engine.py and everything is printed through the console event sink (events.py).
 """
 
-def battle(player: Player, enemy: Enemy) -> None:
+def prompt_player_move(player: Player, enemy: Enemy, rng: random.Random) -> str:
     """
-    Runs a full turn-based battle between a Player and an Enemy
-
-    The player can choose to attack or heal each turn.
-    The enemy performs random actions (currently only attack)
-    The battle ends when either combatant is defeated.
-    Loot is collected from Enemy if the Player wins
+    Player policy that asks the human at the keyboard for their next move.
+    Keeps asking until a valid choice is entered.
 
     Args:
-        player (Player): The human-controlled player instance.
-        enemy(Enemy): The AI-controlled enemy instance
+        player (Player): The human-controlled player instance
+        enemy (Enemy): The enemy being fought
+        rng (random.Random): The battle's random stream (unused, a human picks the move)
 
+    Returns:
+        str: The chosen action (ATTACK or HEAL)
     """
+    while True: # Loop until valid input
 
-    print("-------------------------")
-    print(f"Initiating battle...")
-    print(f"{player.name}'s Health: {player.health} \n{enemy.name}'s Health: {enemy.health}") # Show initial full health of both combatants
-    print("--- Battle Begins! ---")
-
-    first_turn = True # Flag to control when to show "NEW TURN" divider
-
-    # Loop continues until one combatant is defeated
-    while not player.is_defeated() and not enemy.is_defeated():
-
-        if not first_turn: # Show divider after first turn
-            print("--- NEW TURN ---")
-
-        while True: # Loop until valid input
-
-            player_battle_choice = input("Choose your next move:\n1. Attack\n2. Heal\n")
+        player_battle_choice = input("Choose your next move:\n1. Attack\n2. Heal\n")
 
-            if player_battle_choice == "1":
-                player.attacks(enemy)
-                break
-            elif player_battle_choice == "2":
-                print(f"{player.name} used Potion to heal.")
-                player.heal(10)
-                print(f"{player.name}'s health Increased to {player.health}")
-                break
-            else:
-                print("Invalid input. Please enter 1 or 2.")
+        if player_battle_choice == "1":
+            return ATTACK
+        elif player_battle_choice == "2":
+            return HEAL
+        else:
+            print("Invalid input. Please enter 1 or 2.")
 
-        # Check if enemy was defeated after player's action
-        if enemy.is_defeated():
-            print("--- VICTORY! ---")
-            print(f"{player.name} has defeated {enemy.name}!")
 
-            player.collect_loot(enemy)
-            break
-
-        # Enemy randomly chooses and executes an action (currently just "attack")
-        list_of_enemy_moves: Sequence[str] = ["attack"]
-        enemy_attack_choice = random.choice(list_of_enemy_moves)
-        print(f"{enemy.name} chose to {enemy_attack_choice} {player.name}")
+def battle(player: Player, enemy: Enemy, rng: Optional[random.Random] = None, sink: EventSink = CONSOLE,
+           seed: Optional[int] = None, recorder=None, saves=None, profile: Optional[str] = None) -> BattleResult:
+    """
+    Runs a full turn-based battle between a Player and an Enemy
 
-        if enemy_attack_choice == "attack":
-            enemy.attacks(player)
+    The player can choose to attack or heal each turn.
+    The enemy performs random actions (currently only attack)
+    The battle ends when either combatant is defeated.
+    Loot is collected from Enemy if the Player wins
 
-        # Show updated health of both combatants after their choice of action onto one another
-        print(f"***** {player.name}: {player.health}HP | {enemy.name}: {enemy.health}HP *****\n")
+    Args:
+        player (Player): The human-controlled player instance.
+        enemy(Enemy): The AI-controlled enemy instance
+        rng (random.Random, optional): Random stream used for the enemy's choices
+        sink (EventSink, optional): Where the battle's turn events are shown. Defaults to the console
+        seed (int, optional): Seed of the random stream when 'rng' isn't given (a fresh one is drawn otherwise)
+        recorder (ReplayRecorder, optional): Records the battle so it can be replayed later (see replay.py)
+        saves (SaveStore, optional): Where the player's state is saved once the battle is over (see saves.py)
+        profile (str, optional): Key of the player's profile in 'saves', defaults to the player's name
 
-        if player.is_defeated():
-            print("--- YOU DIED, GAME OVER! ---")
-            break
+    Returns:
+        BattleResult: The structured outcome of the battle
 
-        first_turn = False
+    """
+    result = run_battle(player, enemy, prompt_player_move, random_enemy_move, rng=rng, sink=sink, seed=seed, recorder=recorder)
+    if saves is not None:
+        saves.save(profile or player.name, player) # Only what changed during the battle is written
+    return result
 
 if __name__ == "__main__":
+    from content import create
 
-    test_player = Player(
-        name="Kramptj",
-        attack_name="Punch",
-        attack_power=10,
-        defense=5,
-        inventory={"Potion": 2}
-    )
-
-    test_enemy = Enemy(
-        name="Goblin",
-        health=30,
-        max_health=30,
-        attack_name="Bite",
-        attack_power=6,
-        defense=3,
-        inventory={"Gold Coin": 1}
-    )
-
-    battle(test_player, test_enemy)
\ No newline at end of file
+    battle(create("kramptj"), create("goblin"))
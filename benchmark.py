@@ -0,0 +1,420 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+from typing import Optional, Sequence
+
+from player import Player
+from enemy import Enemy
+from engine import run_battle
+from events import NULL_SINK
+"""
+benchmark.py
+
+Reproducible benchmark suite for the battle hot paths. Everything runs headless (NULL_SINK, no output) with fixed seeds.
+
+Covers:
+- micro: cost of single calls (Player.attacks, Enemy.take_damage, Player.collect_loot, one full battle)
+- throughput: battles/sec and turns/sec of the headless engine
+- memory: bytes per combatant for Enemy, SlottedEnemy and CombatantPool (see compact.py)
+- scaling: simulate() battles/sec for increasing worker counts
+- catalog: opening a compiled catalog of thousands of archetypes, lookups and creating enemies from its rows
+- telemetry: events per second aggregated by the streaming telemetry pipeline
+- world: spawning enemies on the overworld map and ticking it with a player walking among them
+- ticks: cost per move of resolving many battles' moves together once per tick
+- loot: rolling a loot table for one kill, and sampling the aggregated loot of a million kills at once
+- progression: awarding the experience of a kill, and scaling an enemy to a level
+- startup: time to import the game modules in a fresh interpreter, with an empty and a large content catalog
+
+Results are written as JSON. Pass --baseline to compare against a saved run: every metric that got worse by more
+than --threshold (default 10%) is reported as a regression and the exit code is 1.
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json
+"""
+
+SEED = 1234
+DEFAULT_THRESHOLD = 0.10
+GAME_MODULES = ("battle", "content", "engine", "simulate", "server")
+
+# Run in a fresh interpreter: imports the game modules, registers 'catalog' archetypes and prints the elapsed time
+_COLD_START = """
+import sys, time
+start = time.perf_counter()
+{imports}
+import content
+for index in range({catalog}):
+    content.register(f"enemy_{{index}}", content.ENEMY, name="Enemy", health=30, max_health=30, attack_name="Bite",
+                     attack_power=6, defense=3, inventory={{"Gold Coin": 1}})
+elapsed = time.perf_counter() - start
+assert content.REGISTRY.built == 0, "importing built archetypes"
+print(elapsed)
+"""
+
+
+def _metric(value: float, unit: str, better: str) -> dict:
+    """Builds one metric entry ('better' is "higher" or "lower")"""
+    return {"value": value, "unit": unit, "better": better}
+
+
+def _per_call_ns(statement, setup=None, number: int = 10_000, repeat: int = 5) -> float:
+    """Best-of-'repeat' nanoseconds per call of 'statement' (a callable). 'setup' runs before every repeat"""
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        elapsed = timeit.timeit(statement, number=number)
+        best = min(best, elapsed)
+    return best / number * 1e9
+
+
+def _new_player() -> Player:
+    return Player("Kramptj", "Punch", 10, 5, {"Potion": 2}, sink=NULL_SINK)
+
+
+def _new_enemy(health: int = 30) -> Enemy:
+    return Enemy("Goblin", health, health, "Bite", 6, 3, {"Gold Coin": 1}, sink=NULL_SINK)
+
+
+def bench_micro(number: int) -> dict:
+    """Nanoseconds per call of the hot-path methods"""
+    player = _new_player()
+    target = _new_enemy(health=10 ** 9) # Never dies during the benchmark
+
+    def reset_target():
+        target._health = 10 ** 9
+
+    results = {
+        "Player.attacks": _per_call_ns(lambda: player.attacks(target), reset_target, number),
+        "Enemy.take_damage": _per_call_ns(lambda: target.take_damage(1), reset_target, number),
+    }
+
+    # collect_loot needs a freshly defeated enemy every call
+    defeated = [_new_enemy() for _ in range(number)]
+    for enemy in defeated:
+        enemy.take_damage(enemy.health)
+    enemies = iter(defeated)
+    start = time.perf_counter()
+    for _ in range(number):
+        player.collect_loot(next(enemies))
+    results["Player.collect_loot"] = (time.perf_counter() - start) / number * 1e9
+
+    battles = max(number // 10, 1)
+    start = time.perf_counter()
+    for index in range(battles):
+        run_battle(_new_player(), _new_enemy(), seed=SEED + index)
+    results["battle"] = (time.perf_counter() - start) / battles * 1e9
+
+    return {f"micro.{name}": _metric(value, "ns/call", "lower") for name, value in results.items()}
+
+
+def bench_throughput(battles: int) -> dict:
+    """Battles and turns per second of the headless engine"""
+    turns = 0
+    start = time.perf_counter()
+    for index in range(battles):
+        turns += run_battle(_new_player(), _new_enemy(health=120), seed=SEED + index).turns
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput.battles_per_sec": _metric(battles / elapsed, "battles/s", "higher"),
+        "throughput.turns_per_sec": _metric(turns / elapsed, "turns/s", "higher"),
+    }
+
+
+def bench_memory(count: int) -> dict:
+    """Bytes per combatant of each representation"""
+    from compact import benchmark as compact_benchmark
+
+    return {f"memory.{label}": _metric(stats["bytes_per_combatant"], "bytes", "lower")
+            for label, stats in compact_benchmark(count).items()}
+
+
+def bench_scaling(battles: int, max_workers: Optional[int] = None) -> dict:
+    """simulate() throughput for 1, 2, 4, ... workers (up to the number of CPUs)"""
+    from simulate import simulate
+
+    max_workers = max_workers or os.cpu_count() or 1
+    results = {}
+    workers = 1
+    while workers <= max_workers:
+        start = time.perf_counter()
+        simulate(n=battles, workers=workers, seed=SEED)
+        results[f"scaling.workers_{workers}"] = _metric(battles / (time.perf_counter() - start), "battles/s", "higher")
+        workers *= 2
+    return results
+
+
+def bench_catalog(count: int, number: int) -> dict:
+    """Cost of the compiled archetype catalog (see catalog.py) with 'count' enemies"""
+    import tempfile
+    from catalog import compile_catalog, open_catalog
+
+    with tempfile.TemporaryDirectory() as source:
+        enemies = [{"key": f"enemy_{index}", "name": "Goblin", "health": 30, "max_health": 30, "attack_name": "Bite",
+                    "attack_power": 6, "defense": 3, "inventory": {"Gold Coin": 1}} for index in range(count)]
+        with open(os.path.join(source, "enemies.json"), "w", encoding="utf-8") as file:
+            json.dump({"enemies": enemies}, file)
+        compile_catalog(source)
+
+        start = time.perf_counter()
+        catalog = open_catalog(source) # Up to date, so only the fingerprint check and the mmap
+        opened = time.perf_counter() - start
+        keys = [f"enemy_{index}" for index in range(0, count, max(count // number, 1))]
+        keys = (keys * (number // len(keys) + 1))[:number]
+        lookup = _per_call_ns(lambda: [catalog.id_of(key) for key in keys], number=1) / number
+        create = _per_call_ns(lambda: [catalog.create(key, sink=NULL_SINK) for key in keys], number=1) / number
+        catalog.close()
+
+    return {
+        "catalog.open": _metric(opened * 1e6, "us", "lower"),
+        "catalog.id_of": _metric(lookup, "ns/call", "lower"),
+        "catalog.create": _metric(create, "ns/call", "lower"),
+    }
+
+
+def bench_saves(profiles: int) -> dict:
+    """Cost of saving 'profiles' player profiles after a battle each, and of loading one back (see saves.py)"""
+    import tempfile
+    from saves import SaveStore
+
+    with tempfile.TemporaryDirectory() as directory:
+        players = [_new_player() for _ in range(profiles)]
+        with SaveStore(directory) as store:
+            for index, player in enumerate(players):
+                store.save(f"player_{index}", player)
+            for player in players:
+                player.take_damage(SEED % 50)
+            start = time.perf_counter()
+            written = sum(store.save(f"player_{index}", player) for index, player in enumerate(players))
+            delta = (time.perf_counter() - start) / profiles
+        with SaveStore(directory) as store:
+            start = time.perf_counter()
+            store.load(f"player_{profiles // 2}")
+            load = time.perf_counter() - start
+
+    return {
+        "saves.delta": _metric(delta * 1e9, "ns/call", "lower"),
+        "saves.delta_bytes": _metric(written / profiles, "bytes", "lower"),
+        "saves.load": _metric(load * 1e6, "us", "lower"),
+    }
+
+
+def bench_loot(rolls: int, kills: int) -> dict:
+    """Cost of rolling a loot table one kill at a time, and of sampling the loot of 'kills' kills at once (see loot.py)"""
+    import random
+    from loot import GOBLIN
+
+    rng = random.Random(SEED)
+    start = time.perf_counter()
+    for _ in range(rolls):
+        GOBLIN.roll(rng)
+    roll = (time.perf_counter() - start) / rolls
+    start = time.perf_counter()
+    GOBLIN.sample_counts(kills, SEED)
+    batch = time.perf_counter() - start
+
+    return {
+        "loot.roll": _metric(roll * 1e9, "ns/call", "lower"),
+        "loot.batch": _metric(batch * 1000, "ms", "lower"),
+    }
+
+
+def bench_progression(awards: int) -> dict:
+    """Cost of awarding the experience of a kill (level-ups included) and of scaling enemy stats (see progression.py)"""
+    from content import template
+    from progression import default_progression
+
+    progression = default_progression()
+    player, enemy, stats = _new_player(), _new_enemy(), template("goblin")
+    award_kill, scale_enemy = progression.award_kill, progression.scale_enemy
+    start = time.perf_counter()
+    for _ in range(awards):
+        award_kill(player, enemy)
+    award = (time.perf_counter() - start) / awards
+    start = time.perf_counter()
+    for level in range(awards):
+        scale_enemy(stats, level % progression.max_level + 1)
+    scale = (time.perf_counter() - start) / awards
+
+    return {
+        "progression.award": _metric(award * 1e9, "ns/call", "lower"),
+        "progression.scale": _metric(scale * 1e9, "ns/call", "lower"),
+    }
+
+
+def bench_telemetry(battles: int, repeat: int) -> dict:
+    """Events per second a Telemetry aggregates, from the recorded events of 'battles' battles fed 'repeat' times"""
+    from events import BufferedSink
+    from telemetry import Telemetry
+
+    buffer = BufferedSink()
+    for index in range(battles):
+        player, enemy = _new_player(), _new_enemy()
+        player.sink = enemy.sink = buffer
+        run_battle(player, enemy, seed=SEED + index, sink=buffer)
+    events = buffer.events * repeat
+    telemetry = Telemetry()
+    start = time.perf_counter()
+    telemetry.feed(events)
+    elapsed = time.perf_counter() - start
+
+    return {"telemetry.events_per_sec": _metric(len(events) / elapsed, "events/s", "higher")}
+
+
+def bench_world(entities: int, ticks: int) -> dict:
+    """Cost of spawning 'entities' enemies on a map and of world ticks with a player walking through them"""
+    from world import World
+
+    world = World(seed=SEED)
+    start = time.perf_counter()
+    world.populate(entities, ("goblin",), seed=SEED)
+    spawn = (time.perf_counter() - start) / entities
+    player = world.add_player(_new_player(), world.width / 2, world.height / 2)
+    start = time.perf_counter()
+    for step in range(ticks):
+        world.move(player, world.width / 2 + step * 0.5, world.height / 2)
+        world.tick()
+    tick = (time.perf_counter() - start) / ticks
+
+    return {
+        "world.spawn": _metric(spawn * 1e9, "ns/call", "lower"),
+        "world.tick": _metric(tick * 1e6, "us", "lower"),
+    }
+
+
+def bench_ticks(sessions: int) -> dict:
+    """Cost per move of resolving the moves of 'sessions' battles together each tick (see ticks.py)"""
+    from engine import ATTACK, Battle
+    from ticks import TickResolver
+
+    ticks = TickResolver(broadcast=lambda deltas: None)
+    for session in range(sessions):
+        ticks.open(session, Battle(_new_player(), _new_enemy(health=10 ** 9), seed=SEED + session))
+    moves = 0
+    start = time.perf_counter()
+    for _ in range(10):
+        for session in range(sessions):
+            ticks.submit(session, ATTACK)
+        moves += len(ticks.resolve())
+    elapsed = time.perf_counter() - start
+
+    return {"ticks.move": _metric(elapsed / moves * 1e9, "ns/call", "lower")}
+
+
+def import_seconds(catalog: int = 0, modules: Sequence[str] = GAME_MODULES) -> float:
+    """
+    Measures a cold start: a fresh interpreter importing the game modules and registering 'catalog' extra archetypes.
+
+    Args:
+        catalog (int, optional): Number of archetypes to register on top of the built-in ones
+        modules (sequence, optional): Modules to import
+
+    Returns:
+        float: Seconds spent (the interpreter's own startup is not included)
+    """
+    code = _COLD_START.format(imports="\n".join(f"import {module}" for module in modules), catalog=catalog)
+    output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True).stdout
+    return float(output)
+
+
+def bench_startup(catalog: int, repeat: int = 3) -> dict:
+    """Best-of-'repeat' milliseconds to import the game modules, with no extra content and with 'catalog' archetypes"""
+    return {
+        f"startup.import{suffix}": _metric(min(import_seconds(size) for _ in range(repeat)) * 1000, "ms", "lower")
+        for suffix, size in (("", 0), (f"_catalog_{catalog}", catalog))
+    }
+
+
+def run_suite(quick: bool = False, max_workers: Optional[int] = None) -> dict:
+    """
+    Runs every benchmark.
+
+    Args:
+        quick (bool, optional): Use much smaller iteration counts (for smoke tests)
+        max_workers (int, optional): Highest worker count of the scaling benchmark
+
+    Returns:
+        dict: {"meta": {...}, "metrics": {name: {"value", "unit", "better"}}}
+    """
+    scale = 1 if not quick else 0.01
+    metrics = {}
+    metrics.update(bench_micro(int(20_000 * scale) or 10))
+    metrics.update(bench_throughput(int(5_000 * scale) or 10))
+    metrics.update(bench_memory(int(50_000 * scale) or 10))
+    metrics.update(bench_scaling(int(20_000 * scale) or 10, max_workers))
+    metrics.update(bench_catalog(int(10_000 * scale) or 10, int(20_000 * scale) or 10))
+    metrics.update(bench_saves(int(10_000 * scale) or 10))
+    metrics.update(bench_telemetry(int(1_000 * scale) or 10, 100))
+    metrics.update(bench_world(int(100_000 * scale) or 10, 1000))
+    metrics.update(bench_ticks(int(10_000 * scale) or 10))
+    metrics.update(bench_loot(int(100_000 * scale) or 10, int(1_000_000 * scale) or 10))
+    metrics.update(bench_progression(int(1_000_000 * scale) or 10))
+    metrics.update(bench_startup(int(10_000 * scale) or 10))
+
+    meta = {"python": sys.version.split()[0], "platform": platform.platform(), "cpus": os.cpu_count(),
+            "seed": SEED, "quick": quick}
+    return {"meta": meta, "metrics": metrics}
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Compares two benchmark results.
+
+    Args:
+        current (dict): The new results (from run_suite)
+        baseline (dict): The saved results to compare against
+        threshold (float, optional): Relative change that counts as a regression (0.10 = 10% worse)
+
+    Returns:
+        list: One message per regressed metric (empty if nothing regressed)
+    """
+    regressions = []
+    for name, metric in current["metrics"].items():
+        previous = baseline["metrics"].get(name)
+        if previous is None or not previous["value"]:
+            continue
+
+        change = (metric["value"] - previous["value"]) / previous["value"]
+        if metric["better"] == "higher":
+            change = -change # A drop in a higher-is-better metric is a regression
+
+        if change > threshold:
+            regressions.append(f"{name}: {previous['value']:.1f} -> {metric['value']:.1f} {metric['unit']} "
+                               f"({change:.0%} worse)")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point, returns the exit code"""
+    parser = argparse.ArgumentParser(description="Benchmark the battle hot paths.")
+    parser.add_argument("--output", help="write the JSON results to this file (default: print them)")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="regression threshold (0.10 = 10%%)")
+    parser.add_argument("--quick", action="store_true", help="tiny iteration counts, for smoke tests")
+    parser.add_argument("--max-workers", type=int, default=None, help="highest worker count for the scaling benchmark")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.quick, args.max_workers)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,393 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import NamedTuple, Optional, Union
+
+from combatant import DEFAULT_SPEED
+from content import CLASSES, ENEMY, PLAYER, REQUIRED
+from damage import NEUTRAL, RULESETS
+
+try:
+    import tomllib
+except ImportError: # Python < 3.11, only .toml sources need it
+    tomllib = None
+"""
+catalog.py
+
+Data-driven archetype catalog. Players and enemies are defined in JSON or TOML files and compiled into a binary
+catalog file that is memory-mapped, so opening it is instant and every process shares the same pages.
+
+Source files hold lists of archetypes under "players" and/or "enemies", each with a unique "key":
+
+    {"enemies": [{"key": "goblin", "name": "Goblin", "health": 30, "max_health": 30, "attack_name": "Bite",
+                  "attack_power": 6, "defense": 3, "inventory": {"Gold Coin": 1}, "loot_table": "goblin"}]}
+
+Any field the catalog can't hold is rejected when the sources are read, so nothing is dropped silently.
+
+Compiled layout (little-endian):
+- header: magic, version, source fingerprint, record count, index size and the offset of every section
+- records: fixed-size rows, a row's ID is its position, so lookup by ID is a single offset computation
+- inventories: (item name, quantity) entries referenced by the rows
+- index: open-addressing hash table (crc32 of the key, linear probing) mapping a key to its row, O(1) by name
+- strings: UTF-8 text referenced by (offset, length)
+
+The catalog is recompiled only when the fingerprint of the source files (names, sizes, modification times) changes.
+"""
+
+MAGIC = b"RPGC"
+VERSION = 3
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CACHE_NAME = ".catalog.rpgc" # Compiled catalog, written next to the source files
+SOURCE_SUFFIXES = (".json", ".toml")
+
+KIND_CODES: dict = {PLAYER: 0, ENEMY: 1}
+KINDS = {code: kind for kind, code in KIND_CODES.items()}
+SECTIONS = {"players": PLAYER, "enemies": ENEMY}
+# Fields an archetype of a kind may have on top of its REQUIRED stats
+OPTIONAL: dict = {
+    PLAYER: ("inventory", "element", "ruleset", "speed"),
+    ENEMY: ("inventory", "element", "ruleset", "speed", "loot_table"),
+}
+
+_HEADER = struct.Struct("<4sHxx32sIIIIII") # magic, version, fingerprint, count, slots, then 4 section offsets
+# kind, (offset, length) of key / name / attack_name / element / ruleset / loot_table (empty for none), health,
+# max_health, attack_power, defense, speed, first inventory entry, inventory entries
+_RECORD = struct.Struct("<BIHIHIHIHIHIHiiiiiIH")
+_ITEM = struct.Struct("<IHi") # (offset, length) of the item name, quantity
+_SLOT = struct.Struct("<I") # Row ID + 1, 0 marks an empty slot
+
+
+class CatalogError(Exception):
+    """Raised for invalid source files or a corrupt compiled catalog"""
+
+
+class CatalogRow(NamedTuple):
+    """One decoded catalog record"""
+    id: int
+    kind: str
+    key: str
+    name: str
+    attack_name: str
+    element: str
+    ruleset: str
+    health: int
+    max_health: int
+    attack_power: int
+    defense: int
+    speed: int
+    inventory: tuple # ((item name, quantity), ...)
+    loot_table: str # Name of a loot.TABLES entry, empty if the archetype has none
+
+
+def _key_hash(key: bytes) -> int:
+    return zlib.crc32(key) # Stable across processes, unlike hash()
+
+
+def source_files(source: str) -> list:
+    """Returns the sorted paths of every JSON / TOML file in the source directory"""
+    return sorted(os.path.join(source, name) for name in os.listdir(source) if name.endswith(SOURCE_SUFFIXES))
+
+
+def fingerprint(source: str) -> bytes:
+    """Hashes the names, sizes and modification times of the source files (cheap, no file is read)"""
+    digest = hashlib.sha256(VERSION.to_bytes(2, "little"))
+    for path in source_files(source):
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+    return digest.digest()
+
+
+def _load_source(path: str) -> dict:
+    """Parses one JSON or TOML source file"""
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise CatalogError(f"{path}: TOML sources need Python 3.11+ (tomllib)")
+        with open(path, "rb") as file:
+            return tomllib.load(file)
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def read_sources(source: str) -> list:
+    """
+    Reads every archetype of a source directory, in file order (sorted by file name).
+
+    Returns:
+        list: (kind, entry dict) pairs
+
+    Raises:
+        CatalogError: If an entry is missing a stat, has a field the catalog can't hold or a key is defined twice
+    """
+    entries = []
+    seen: dict = {}
+    for path in source_files(source):
+        data = _load_source(path)
+        for section, kind in SECTIONS.items():
+            for entry in data.get(section, ()):
+                key = entry.get("key")
+                missing = [stat for stat in ("key",) + REQUIRED[kind] if stat not in entry]
+                if missing:
+                    raise CatalogError(f"{path}: archetype {key!r} is missing {', '.join(missing)}")
+                unknown = [field for field in entry if field != "key" and field not in REQUIRED[kind]
+                           and field not in OPTIONAL[kind]]
+                if unknown:
+                    raise CatalogError(f"{path}: archetype {key!r} has unknown fields {', '.join(unknown)}")
+                if key in seen:
+                    raise CatalogError(f"{path}: archetype {key!r} is already defined in {seen[key]}")
+                seen[key] = path
+                entries.append((kind, entry))
+    return entries
+
+
+def compile_entries(entries: list, source_fingerprint: bytes = bytes(32)) -> bytes:
+    """
+    Compiles archetypes into the binary catalog format.
+
+    Args:
+        entries (list): (kind, entry dict) pairs, as returned by read_sources
+        source_fingerprint (bytes, optional): Fingerprint stored in the header
+
+    Returns:
+        bytes: The compiled catalog
+    """
+    strings = bytearray()
+    interned: dict = {}
+
+    def text(value: str) -> tuple:
+        encoded = value.encode("utf-8")
+        offset = interned.get(encoded)
+        if offset is None:
+            offset = interned[encoded] = len(strings)
+            strings.extend(encoded)
+        return offset, len(encoded)
+
+    records = bytearray()
+    items = bytearray()
+    item_count = 0
+    for kind, entry in entries:
+        inventory = entry.get("inventory", {})
+        health = entry.get("health", 100)
+        records += _RECORD.pack(
+            KIND_CODES[kind], *text(entry["key"]), *text(entry["name"]), *text(entry["attack_name"]),
+            *text(entry.get("element", NEUTRAL)), *text(entry.get("ruleset", "classic")),
+            *text(entry.get("loot_table", "")),
+            health, entry.get("max_health", health), entry["attack_power"], entry["defense"],
+            entry.get("speed", DEFAULT_SPEED), item_count, len(inventory))
+        for item, quantity in inventory.items():
+            items += _ITEM.pack(*text(item), quantity)
+            item_count += 1
+
+    # Index at most half full, so probe chains stay short
+    slots = 1
+    while slots < 2 * len(entries):
+        slots *= 2
+    index = [0] * slots
+    for row_id, (_, entry) in enumerate(entries):
+        slot = _key_hash(entry["key"].encode("utf-8")) & (slots - 1)
+        while index[slot]:
+            slot = (slot + 1) & (slots - 1)
+        index[slot] = row_id + 1
+
+    records_offset = _HEADER.size
+    items_offset = records_offset + len(records)
+    index_offset = items_offset + len(items)
+    strings_offset = index_offset + slots * _SLOT.size
+    header = _HEADER.pack(MAGIC, VERSION, source_fingerprint, len(entries), slots,
+                          records_offset, items_offset, index_offset, strings_offset)
+    return b"".join((header, records, items, struct.pack(f"<{slots}I", *index), strings))
+
+
+def compile_catalog(source: str, cache_path: Optional[str] = None) -> str:
+    """
+    Compiles a source directory and writes the catalog file (atomically, so readers never see a partial file).
+
+    Returns:
+        str: The path of the compiled catalog
+    """
+    cache_path = cache_path or os.path.join(source, CACHE_NAME)
+    stamp = fingerprint(source) # Taken before reading, so a file edited meanwhile triggers another rebuild
+    data = compile_entries(read_sources(source), stamp)
+    temporary = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+    os.replace(temporary, cache_path)
+    return cache_path
+
+
+def _cached_fingerprint(cache_path: str) -> Optional[bytes]:
+    """Returns the fingerprint stored in a compiled catalog, None if it's missing or not a catalog"""
+    try:
+        with open(cache_path, "rb") as file:
+            header = file.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(header) < _HEADER.size:
+        return None
+    magic, version, stored, *_ = _HEADER.unpack(header)
+    return stored if magic == MAGIC and version == VERSION else None
+
+
+class Catalog:
+    """
+    Read-only view over a compiled catalog (a memory-mapped file or any bytes-like buffer).
+    Rows are decoded on access, straight from the buffer.
+
+    Args:
+        buffer (bytes | mmap): The compiled catalog
+    """
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]):
+        """Checks the header and reads the section offsets"""
+        if len(buffer) < _HEADER.size:
+            raise CatalogError("Not a compiled catalog (too short)")
+        magic, version, self.fingerprint, self._count, self._slots, self._records, self._items, self._index, \
+            self._strings = _HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise CatalogError(f"Not a compiled catalog (magic {magic!r}, version {version})")
+        self._buffer = buffer
+        self._decoded: dict = {} # {string offset: str}, strings are shared between rows so each is decoded once
+
+    @classmethod
+    def open(cls, path: str) -> "Catalog":
+        """Memory-maps a compiled catalog file"""
+        with open(path, "rb") as file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def close(self) -> None:
+        """Unmaps the file (no-op for in-memory catalogs)"""
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def __enter__(self) -> "Catalog":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, key: str) -> bool:
+        return self.id_of(key) is not None
+
+    def _text(self, offset: int, length: int) -> str:
+        if not length: # Empty strings share their offset with the next string
+            return ""
+        text = self._decoded.get(offset)
+        if text is None:
+            start = self._strings + offset
+            text = self._decoded[offset] = str(self._buffer[start:start + length], "utf-8")
+        return text
+
+    def id_of(self, key: str) -> Optional[int]:
+        """Returns the row ID of a key in O(1) (one hash and a short probe), None if the key isn't in the catalog"""
+        encoded = key.encode("utf-8")
+        mask = self._slots - 1
+        slot = _key_hash(encoded) & mask
+        buffer = self._buffer
+        while True:
+            row_id = _SLOT.unpack_from(buffer, self._index + slot * _SLOT.size)[0] - 1
+            if row_id < 0:
+                return None
+            _, key_offset, key_length = _RECORD.unpack_from(buffer, self._records + row_id * _RECORD.size)[:3]
+            start = self._strings + key_offset
+            if key_length == len(encoded) and buffer[start:start + key_length] == encoded:
+                return row_id
+            slot = (slot + 1) & mask
+
+    def row(self, key: Union[str, int]) -> CatalogRow:
+        """
+        Decodes one row, by key or by row ID.
+
+        Raises:
+            KeyError: If there's no such key or ID
+        """
+        row_id = self.id_of(key) if isinstance(key, str) else key
+        if row_id is None or not 0 <= row_id < self._count:
+            raise KeyError(f"Unknown archetype: {key!r}")
+
+        (kind, key_offset, key_length, name_offset, name_length, attack_offset, attack_length, element_offset,
+         element_length, ruleset_offset, ruleset_length, loot_offset, loot_length, health, max_health, attack_power,
+         defense, speed, item_start, item_count) = _RECORD.unpack_from(self._buffer, self._records + row_id * _RECORD.size)
+        text = self._text
+        inventory = []
+        for index in range(item_start, item_start + item_count):
+            offset, length, quantity = _ITEM.unpack_from(self._buffer, self._items + index * _ITEM.size)
+            inventory.append((text(offset, length), quantity))
+        return CatalogRow(row_id, KINDS[kind], text(key_offset, key_length), text(name_offset, name_length),
+                          text(attack_offset, attack_length), text(element_offset, element_length),
+                          text(ruleset_offset, ruleset_length), health, max_health, attack_power, defense, speed,
+                          tuple(inventory), text(loot_offset, loot_length))
+
+    def stats(self, key: Union[str, int]) -> tuple:
+        """
+        Returns (kind, keyword arguments for the Player / Enemy class) of a row.
+        The ruleset and the loot table (only present if the row has one) are given by name.
+        """
+        row = self.row(key)
+        stats = {"name": row.name, "attack_name": row.attack_name, "attack_power": row.attack_power,
+                 "defense": row.defense, "inventory": dict(row.inventory), "element": row.element,
+                 "ruleset": row.ruleset, "speed": row.speed}
+        if row.kind == ENEMY:
+            stats["health"] = row.health
+            stats["max_health"] = row.max_health
+        if row.loot_table:
+            stats["loot_table"] = row.loot_table
+        return row.kind, stats
+
+    def create(self, key: Union[str, int], **overrides):
+        """
+        Builds a new combatant from a row.
+
+        Args:
+            key (str | int): The archetype's key or row ID
+            **overrides: Keyword arguments that replace the row's, ex: sink=NULL_SINK
+
+        Returns:
+            Player | Enemy: A fresh combatant
+        """
+        kind, stats = self.stats(key)
+        kwargs = {**stats, **overrides}
+        if isinstance(kwargs.get("ruleset"), str):
+            kwargs["ruleset"] = RULESETS[kwargs["ruleset"]]
+        if isinstance(kwargs.get("loot_table"), str):
+            from loot import TABLES # Imported on first use, loot.py pulls in NumPy
+
+            kwargs["loot_table"] = TABLES[kwargs["loot_table"]]
+        return CLASSES[kind](**kwargs)
+
+
+def open_catalog(source: str = DATA_DIR, cache_path: Optional[str] = None, rebuild: bool = False) -> Catalog:
+    """
+    Opens the compiled catalog of a source directory, compiling it first if the sources changed since the last build.
+    If the cache can't be written (read-only directory), the catalog is compiled in memory instead.
+
+    Args:
+        source (str, optional): Directory of JSON / TOML files. Defaults to DATA_DIR
+        cache_path (str, optional): Where the compiled catalog is stored. Defaults to CACHE_NAME inside 'source'
+        rebuild (bool, optional): Recompile even if the cache is up to date
+
+    Returns:
+        Catalog: The memory-mapped catalog
+    """
+    cache_path = cache_path or os.path.join(source, CACHE_NAME)
+    if rebuild or _cached_fingerprint(cache_path) != fingerprint(source):
+        try:
+            compile_catalog(source, cache_path)
+        except OSError:
+            return Catalog(compile_entries(read_sources(source), fingerprint(source)))
+    return Catalog.open(cache_path)
+
+
+_default: Optional[Catalog] = None
+
+
+def default_catalog() -> Catalog:
+    """Returns the catalog of DATA_DIR, opened on first use and shared afterwards"""
+    global _default
+    if _default is None:
+        _default = open_catalog()
+    return _default
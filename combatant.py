@@ -1,4 +1,7 @@
-from typing import Protocol
+import random
+from typing import Optional, Protocol
+
+DEFAULT_SPEED = 10 # Speed of combatants that don't set one (see encounter.py)
 
 class Combatant(Protocol):
     """
@@ -7,18 +10,22 @@ class Combatant(Protocol):
 
     Any class that implements this interface must provide:
     - A 'name' attribute
+    - 'attack_power' and 'defense' attributes (used by the damage rulesets in damage.py)
     - An "attacks()" method to engage in combat with another combatant (Player or Enemy)
     - A "take_damage()" method to receive damage from a combatant
 
     """
     name: str # Name of the combatant
+    attack_power: int # Power of the combatant's attack
+    defense: int # The combatant's defense
 
-    def attacks(self, target: "Combatant") -> None:
+    def attacks(self, target: "Combatant", rng: Optional[random.Random] = None) -> None:
         """
         Method that executes an attack on to another combatant.
 
         Args:
             target (Combatant): The opponent (combatant) being attacked
+            rng (random.Random, optional): Random stream used to resolve the damage
 
         """
         ...
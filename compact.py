@@ -0,0 +1,369 @@
+import random
+import time
+import tracemalloc
+from array import array
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Optional
+
+from combatant import DEFAULT_SPEED, Combatant
+from damage import CLASSIC, NEUTRAL, Ruleset
+from player import Player
+from enemy import Enemy
+from events import (NULL_SINK, AttackMade, DamageDealt, EventSink, Healed, ItemAdded, LootCollected, LootDropped,
+                    TargetAlreadyDefeated)
+"""
+compact.py
+
+Memory-friendly representations of combatants, for when hundreds of thousands of NPCs are alive at once.
+
+- SlottedPlayer / SlottedEnemy behave exactly like Player / Enemy (they share the very same methods)
+  but store their attributes in __slots__ instead of a per-instance __dict__.
+- CombatantPool stores the stats of many enemies in parallel typed arrays (struct-of-arrays) and hands out
+  PooledCombatant handles. A handle is just (pool, index) and still satisfies the Combatant protocol.
+
+Run this module directly for a memory and throughput comparison against the regular classes.
+"""
+
+PLAYER_SLOTS = ("name", "sink", "_max_health", "_health", "_attack_name", "_attack_power", "_defense", "_inventory",
+                "ruleset", "element", "speed", "level", "xp")
+ENEMY_SLOTS = ("name", "sink", "_health", "_max_health", "_attack_name", "_attack_power", "_defense", "_inventory",
+               "ruleset", "element", "speed", "loot_table")
+
+
+def _slotted_variant(cls: type, slots: tuple) -> type:
+    """
+    Builds a copy of 'cls' that keeps its attributes in __slots__.
+
+    The methods and properties are the same function objects as on 'cls', so the behaviour can't drift apart.
+    'slots' must list every attribute that the methods of 'cls' assign.
+
+    Args:
+        cls (type): The class to copy (Player or Enemy)
+        slots (tuple): The attribute names to store in slots
+
+    Returns:
+        type: The new class
+    """
+    namespace = {
+        attribute: value for attribute, value in vars(cls).items()
+        if (callable(value) or isinstance(value, property)) and (attribute == "__init__" or not attribute.startswith("_"))
+    }
+    namespace["__slots__"] = slots
+    namespace["__doc__"] = f"{cls.__name__} stored in __slots__ (see compact.py)."
+    namespace["__module__"] = __name__
+    return type(f"Slotted{cls.__name__}", (), namespace)
+
+
+SlottedPlayer = _slotted_variant(Player, PLAYER_SLOTS)
+SlottedEnemy = _slotted_variant(Enemy, ENEMY_SLOTS)
+
+
+class CombatantPool:
+    """
+    Stores the stats of many enemies in parallel typed arrays.
+
+    Inventories are only kept for the entries that actually carry items, so empty-handed NPCs cost no dict at all.
+    Released slots are reused by the next add().
+
+    Args:
+        sink (EventSink, optional): Where the events of every pooled combatant are sent. Defaults to discarding them
+        ruleset (Ruleset, optional): The damage formula used by every pooled combatant. Defaults to CLASSIC
+        element (str, optional): The element of every pooled combatant
+        speed (int, optional): The speed of every pooled combatant (see encounter.py)
+    """
+
+    def __init__(self, sink: EventSink = NULL_SINK, ruleset: Ruleset = CLASSIC, element: str = NEUTRAL,
+                 speed: int = DEFAULT_SPEED):
+        """Initializes an empty pool"""
+        self.sink = sink
+        self.ruleset = ruleset
+        self.element = element
+        self.speed = speed
+        self.names: list = []
+        self.attack_names: list = []
+        self.health = array("i")
+        self.max_health = array("i")
+        self.attack_power = array("i")
+        self.defense = array("i")
+        self.inventories: dict = {} # index -> inventory dict, only for entries that have items
+        self._free: list = [] # Released indexes waiting to be reused
+
+    def __len__(self) -> int:
+        """Number of live entries in the pool"""
+        return len(self.names) - len(self._free)
+
+    def add(self, name: str, health: int, max_health: int, attack_name: str, attack_power: int, defense: int,
+            inventory: Optional[dict] = None) -> "PooledCombatant":
+        """
+        Adds a combatant to the pool. Takes the same stats as Enemy.
+
+        Returns:
+            PooledCombatant: A handle to the new entry
+        """
+        if self._free:
+            index = self._free.pop()
+            self.names[index] = name
+            self.attack_names[index] = attack_name.upper()
+            self.health[index] = health
+            self.max_health[index] = max_health
+            self.attack_power[index] = attack_power
+            self.defense[index] = defense
+        else:
+            index = len(self.names)
+            self.names.append(name)
+            self.attack_names.append(attack_name.upper())
+            self.health.append(health)
+            self.max_health.append(max_health)
+            self.attack_power.append(attack_power)
+            self.defense.append(defense)
+
+        if inventory:
+            self.inventories[index] = dict(inventory) # Own copy, items are used up in place (see effects.use_item)
+        return PooledCombatant(self, index)
+
+    def release(self, combatant: "PooledCombatant") -> None:
+        """
+        Frees the slot of a combatant so it can be reused. The handle must not be used afterwards.
+
+        Args:
+            combatant (PooledCombatant): The handle to release
+        """
+        self.inventories.pop(combatant.index, None)
+        self._free.append(combatant.index)
+
+    def handle(self, index: int) -> "PooledCombatant":
+        """
+        Returns:
+            PooledCombatant: A handle to the entry at 'index'
+        """
+        return PooledCombatant(self, index)
+
+
+class PooledCombatant:
+    """
+    A lightweight handle to one entry of a CombatantPool. Satisfies the Combatant protocol (and behaves like an Enemy).
+
+    Args:
+        pool (CombatantPool): The pool holding the stats
+        index (int): The entry's position in the pool
+    """
+    __slots__ = ("pool", "index")
+
+    def __init__(self, pool: CombatantPool, index: int):
+        """Initializes the handle"""
+        self.pool = pool
+        self.index = index
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PooledCombatant) and self.pool is other.pool and self.index == other.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.pool), self.index))
+
+    @property
+    def name(self) -> str:
+        return self.pool.names[self.index]
+
+    @property
+    def attack_name(self) -> str:
+        return self.pool.attack_names[self.index]
+
+    @property
+    def ruleset(self) -> Ruleset:
+        return self.pool.ruleset
+
+    @property
+    def element(self) -> str:
+        return self.pool.element
+
+    @property
+    def speed(self) -> int:
+        return self.pool.speed
+
+    @property
+    def health(self) -> int:
+        return self.pool.health[self.index]
+
+    @property
+    def max_health(self) -> int:
+        return self.pool.max_health[self.index]
+
+    @property
+    def attack_power(self) -> int:
+        return self.pool.attack_power[self.index]
+
+    @property
+    def defense(self) -> int:
+        return self.pool.defense[self.index]
+
+    @attack_power.setter
+    def attack_power(self, value: int) -> None:
+        self.pool.attack_power[self.index] = value
+
+    @defense.setter
+    def defense(self, value: int) -> None:
+        self.pool.defense[self.index] = value
+
+    @property
+    def inventory(self) -> Mapping:
+        """A live, read-only view of the entry's inventory ({item name: quantity})"""
+        return MappingProxyType(self.pool.inventories.get(self.index, {}))
+
+    def consume_item(self, item: str) -> int:
+        """
+        Takes one 'item' out of the entry's inventory (see effects.use_item).
+
+        Returns:
+            int: How many are left, -1 if the entry had none (nothing is taken then)
+        """
+        inventory = self.pool.inventories.get(self.index)
+        remaining = inventory.get(item, 0) - 1 if inventory else -1
+        if remaining > 0:
+            inventory[item] = remaining
+        elif remaining == 0:
+            del inventory[item]
+        return remaining
+
+    def attacks(self, target: Combatant, rng: Optional[random.Random] = None) -> None:
+        """
+        Attacks 'target', with the damage resolved by the pool's ruleset.
+
+        Args:
+            target (Combatant): The combatant receiving the damage
+            rng (random.Random, optional): Random stream for crits and variance
+        """
+        pool = self.pool
+        if target.is_defeated():
+            if pool.sink.enabled:
+                pool.sink.emit(TargetAlreadyDefeated("enemy", self.name, target.name))
+            return
+
+        if pool.sink.enabled:
+            pool.sink.emit(AttackMade("enemy", self.name, target.name, pool.attack_names[self.index]))
+        target.take_damage(pool.ruleset.damage(self, target, rng))
+
+    def take_damage(self, amount: int) -> None:
+        """
+        Lowers the entry's health by 'amount' (never below 0).
+
+        Args:
+            amount (int): The amount of health to be lowered
+        """
+        pool, index = self.pool, self.index
+        health = pool.health[index] - amount
+        pool.health[index] = health if health > 0 else 0
+
+        if pool.sink.enabled:
+            pool.sink.emit(DamageDealt("enemy", pool.names[index], amount, pool.health[index]))
+
+    def heal(self, amount: int) -> None:
+        """
+        Restores health by 'amount', up to the entry's maximum health.
+
+        Args:
+            amount (int): The amount of health to restore
+        """
+        pool, index = self.pool, self.index
+        pool.health[index] = min(pool.health[index] + amount, pool.max_health[index])
+
+        if pool.sink.enabled:
+            pool.sink.emit(Healed(pool.names[index], amount, pool.health[index]))
+
+    def is_defeated(self) -> bool:
+        """
+        Returns:
+            bool: True if the entry's health has reached 0
+        """
+        return self.pool.health[self.index] <= 0
+
+    def drop_loot(self, rng=None) -> dict:
+        """
+        Drops (and clears) the entry's inventory once it is defeated.
+
+        Args:
+            rng (random.Random, optional): Unused, pooled entries have no loot table
+
+        Returns:
+            dict: The dropped items, empty if the entry is still alive or had nothing
+        """
+        pool = self.pool
+        if not self.is_defeated():
+            if pool.sink.enabled:
+                pool.sink.emit(LootDropped(self.name, {}, defeated=False))
+            return {}
+
+        dropped_items = pool.inventories.pop(self.index, {})
+        if pool.sink.enabled:
+            pool.sink.emit(LootDropped(self.name, dropped_items))
+        return dropped_items
+
+    def collect_loot(self, enemy: Combatant, rng: Optional[random.Random] = None) -> Mapping:
+        """
+        Adds the loot of a defeated enemy to the entry's inventory (pooled inventories have no stack limits).
+
+        Returns:
+            Mapping: The items that were collected, {item name: quantity}
+        """
+        pool = self.pool
+        dropped_loot = enemy.drop_loot(rng)
+        if pool.sink.enabled:
+            pool.sink.emit(LootCollected(self.name, enemy.name, found_loot=bool(dropped_loot)))
+        if not dropped_loot:
+            return {}
+        inventory = pool.inventories.setdefault(self.index, {})
+        for item, quantity in dropped_loot.items():
+            inventory[item] = inventory.get(item, 0) + quantity
+            if pool.sink.enabled:
+                pool.sink.emit(ItemAdded(self.name, item, quantity))
+        return dropped_loot
+
+
+def benchmark(count: int = 100_000) -> dict:
+    """
+    Compares memory use and take_damage() throughput of Enemy, SlottedEnemy and CombatantPool handles.
+
+    Args:
+        count (int, optional): Number of combatants to create for each representation
+
+    Returns:
+        dict: For each representation, bytes per combatant and take_damage() calls per second
+    """
+    def make_enemies():
+        return [Enemy("Goblin", 50, 50, "Bite", 6, 3, {}, sink=NULL_SINK) for _ in range(count)]
+
+    def make_slotted():
+        return [SlottedEnemy("Goblin", 50, 50, "Bite", 6, 3, {}, sink=NULL_SINK) for _ in range(count)]
+
+    def make_pooled():
+        pool = CombatantPool()
+        for _ in range(count):
+            pool.add("Goblin", 50, 50, "Bite", 6, 3)
+        return pool
+
+    results = {}
+    for label, factory in (("Enemy", make_enemies), ("SlottedEnemy", make_slotted), ("CombatantPool", make_pooled)):
+        tracemalloc.start()
+        combatants = factory()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        if isinstance(combatants, CombatantPool): # Handles are created on demand instead of being kept around
+            combatants = map(combatants.handle, range(count))
+
+        start = time.perf_counter()
+        for combatant in combatants:
+            combatant.take_damage(1)
+            combatant.is_defeated()
+        elapsed = time.perf_counter() - start
+
+        results[label] = {"bytes_per_combatant": memory / count, "calls_per_second": count / elapsed}
+        del combatants
+
+    return results
+
+
+if __name__ == "__main__":
+    for label, stats in benchmark().items():
+        print(f"{label:>14}: {stats['bytes_per_combatant']:7.1f} bytes/combatant, "
+              f"{stats['calls_per_second']:12,.0f} take_damage() calls/s")
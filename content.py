@@ -0,0 +1,154 @@
+from types import MappingProxyType
+from typing import Callable, Mapping, Optional
+
+from player import Player
+from enemy import Enemy
+from damage import RULESETS
+"""
+content.py
+
+Registry of named archetypes (the game's players and enemies), built lazily.
+
+Registering an archetype only stores its raw stats, nothing is validated or built at import time. The first
+template(key) validates the stats and caches a read-only template, and create(key) builds a fresh Player or
+Enemy from it every time, so no two callers ever share a combatant (or its inventory).
+
+Keys that weren't registered in code are looked up in the data-driven catalog (data/*.json and data/*.toml, see
+catalog.py), which is only opened the first time such a key is needed.
+
+    from content import create
+    goblin = create("goblin")
+    hero = create("kramptj", sink=NULL_SINK)
+"""
+
+PLAYER = "player"
+ENEMY = "enemy"
+
+CLASSES: dict = {PLAYER: Player, ENEMY: Enemy}
+
+# Stats every archetype of a kind must have
+REQUIRED: dict = {
+    PLAYER: ("name", "attack_name", "attack_power", "defense"),
+    ENEMY: ("name", "health", "max_health", "attack_name", "attack_power", "defense"),
+}
+
+
+class ContentRegistry:
+    """
+    Named archetypes, stored raw and turned into templates on first access.
+
+    Args:
+        catalog (callable, optional): Returns the catalog.Catalog to fall back on for unregistered keys,
+            only called the first time it's needed
+    """
+
+    def __init__(self, catalog: Optional[Callable] = None):
+        """Initializes an empty registry"""
+        self._specs: dict = {} # {key: (kind, raw stats)}
+        self._templates: dict = {} # {key: (kind, template)}, filled on first access
+        self._catalog = catalog
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._specs or (self._catalog is not None and key in self._catalog())
+
+    @property
+    def built(self) -> int:
+        """Number of archetypes whose template has been built so far"""
+        return len(self._templates)
+
+    def register(self, key: str, kind: str, **stats) -> None:
+        """
+        Adds (or replaces) an archetype. Only stores the stats, validation happens on first access.
+
+        Args:
+            key (str): The archetype's name in the registry, ex: "goblin"
+            kind (str): PLAYER or ENEMY
+            **stats: Keyword arguments for the Player / Enemy class (inventory is optional)
+        """
+        if kind not in CLASSES:
+            raise ValueError(f"Unknown archetype kind: {kind!r}")
+        self._specs[key] = (kind, stats)
+        self._templates.pop(key, None) # A replaced archetype is rebuilt on next access
+
+    def kind(self, key: str) -> str:
+        """Returns PLAYER or ENEMY for a registered archetype"""
+        return self._lookup(key)[0]
+
+    def template(self, key: str) -> Mapping:
+        """
+        Returns the validated, read-only stats of an archetype, building them on first access.
+
+        Raises:
+            KeyError: If no archetype has this key
+            ValueError: If the archetype is missing a required stat or names an unknown ruleset or loot table
+        """
+        built = self._templates.get(key)
+        if built is None:
+            built = self._templates[key] = self._build(key)
+        return built[1]
+
+    def create(self, key: str, **overrides):
+        """
+        Builds a new combatant from an archetype.
+
+        Args:
+            key (str): The archetype's name in the registry
+            **overrides: Keyword arguments that replace the template's, ex: sink=NULL_SINK, health=80
+
+        Returns:
+            Player | Enemy: A fresh combatant with its own inventory
+        """
+        template = self.template(key)
+        kwargs = {**template, "inventory": dict(template["inventory"]), **overrides}
+        if isinstance(kwargs.get("ruleset"), str):
+            kwargs["ruleset"] = RULESETS[kwargs["ruleset"]]
+        if isinstance(kwargs.get("loot_table"), str):
+            kwargs["loot_table"] = _loot_tables()[kwargs["loot_table"]]
+        return CLASSES[self._templates[key][0]](**kwargs)
+
+    def _lookup(self, key: str) -> tuple:
+        spec = self._specs.get(key)
+        if spec is None:
+            try:
+                if self._catalog is None:
+                    raise KeyError(key)
+                spec = self._specs[key] = self._catalog().stats(key)
+            except KeyError:
+                raise KeyError(f"Unknown archetype: {key!r}") from None
+        return spec
+
+    def _build(self, key: str) -> tuple:
+        """Validates the raw stats of an archetype and freezes them into a template"""
+        kind, stats = self._lookup(key)
+        missing = [stat for stat in REQUIRED[kind] if stat not in stats]
+        if missing:
+            raise ValueError(f"Archetype {key!r} is missing {', '.join(missing)}")
+        ruleset = stats.get("ruleset")
+        if isinstance(ruleset, str) and ruleset not in RULESETS:
+            raise ValueError(f"Archetype {key!r} uses an unknown ruleset: {ruleset!r}")
+        loot_table = stats.get("loot_table")
+        if isinstance(loot_table, str) and loot_table not in _loot_tables():
+            raise ValueError(f"Archetype {key!r} uses an unknown loot table: {loot_table!r}")
+
+        template = {**stats, "inventory": MappingProxyType(dict(stats.get("inventory", {})))}
+        return kind, MappingProxyType(template)
+
+
+def _loot_tables() -> dict:
+    from loot import TABLES # Imported on first use, loot.py pulls in NumPy
+
+    return TABLES
+
+
+def _default_catalog():
+    from catalog import default_catalog # Imported on first use, catalog.py imports this module
+
+    return default_catalog()
+
+
+REGISTRY = ContentRegistry(catalog=_default_catalog)
+
+# Module level shortcuts to the default registry
+register = REGISTRY.register
+template = REGISTRY.template
+create = REGISTRY.create
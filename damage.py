@@ -0,0 +1,168 @@
+import random
+from collections import OrderedDict
+from typing import Optional
+"""
+damage.py
+
+Damage formulas ("rulesets") and the precomputed damage tables used to resolve attacks.
+
+A ruleset decides how much damage an attack deals: defense mitigation, critical hits, random variance and
+elemental multipliers. Instead of doing that arithmetic (and several random draws) on every attack, a ruleset
+precomputes a table of TABLE_SIZE equally likely outcomes for each (attack power, attacker element, defense,
+defender element) combination. Resolving an attack is then one random draw and a table index.
+
+Tables are cached by the stats they were built from, so when a combatant's stats change the next attack simply
+uses (or builds) the table for the new stats: stale tables are never used. The cache is an LRU of at most
+'cache_size' tables, so ever-changing stats (buffs, level-ups, balance searches) don't grow it without bound.
+
+Rulesets:
+- CLASSIC: damage = attack power (defense is ignored), the rules the game has always had
+- STANDARD: defense is subtracted (at least 1 damage), 10% crits for double damage, +/-10% variance, elements
+"""
+
+TABLE_BITS = 6
+TABLE_SIZE = 1 << TABLE_BITS # Outcomes per damage table (one random draw of TABLE_BITS bits picks one)
+NEUTRAL = "none" # Element of combatants that don't have one
+DEFAULT_CACHE_SIZE = 1024 # Damage tables a ruleset keeps
+
+# Multiplier for (attacker element, defender element). Missing pairs are 1.0
+ELEMENT_CHART: dict = {
+    ("fire", "ice"): 1.5, ("ice", "fire"): 0.5,
+    ("ice", "earth"): 1.5, ("earth", "ice"): 0.5,
+    ("earth", "lightning"): 1.5, ("lightning", "earth"): 0.5,
+    ("lightning", "water"): 1.5, ("water", "lightning"): 0.5,
+    ("water", "fire"): 1.5, ("fire", "water"): 0.5,
+}
+
+
+def _no_mitigation(damage: float, defense: int) -> float:
+    return damage
+
+
+def _subtract_defense(damage: float, defense: int) -> float:
+    return damage - defense
+
+
+def _defense_ratio(damage: float, defense: int) -> float:
+    return damage * 100 / (100 + max(defense, 0))
+
+
+MITIGATIONS: dict = {
+    "none": _no_mitigation,
+    "subtract": _subtract_defense,
+    "ratio": _defense_ratio,
+}
+
+
+class Ruleset:
+    """
+    A damage formula together with the cache of damage tables built from it.
+
+    Args:
+        name (str): The ruleset's name
+        mitigation (str, optional): How defense reduces damage: "none", "subtract" or "ratio"
+        crit_chance (float, optional): Chance (0-1) of a critical hit, rounded to a multiple of 1 / TABLE_SIZE
+        crit_multiplier (float, optional): Damage multiplier of a critical hit
+        variance (float, optional): Damage varies uniformly within +/- this fraction
+        element_chart (dict, optional): {(attacker element, defender element): multiplier}
+        min_damage (int, optional): Least damage an attack deals (only applied when defense mitigates damage)
+        cache_size (int, optional): Damage tables kept in the LRU cache (0 disables caching)
+    """
+
+    def __init__(self, name: str, mitigation: str = "none", crit_chance: float = 0.0, crit_multiplier: float = 2.0,
+                 variance: float = 0.0, element_chart: Optional[dict] = None, min_damage: int = 1,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        """Initializes the ruleset with an empty table cache"""
+        if mitigation not in MITIGATIONS:
+            raise ValueError(f"Unknown mitigation: {mitigation!r}")
+        self.name = name
+        self.mitigation = mitigation
+        self.crit_chance = crit_chance
+        self.crit_multiplier = crit_multiplier
+        self.variance = variance
+        self.element_chart = element_chart or {}
+        self.min_damage = min_damage
+        self.cache_size = cache_size
+        self._tables: OrderedDict = OrderedDict() # {stats: outcomes}, least recently used first
+
+    @property
+    def deterministic(self) -> bool:
+        """True if every attack with the same stats deals the same damage (no random draw needed)"""
+        return self.crit_chance <= 0 and self.variance <= 0
+
+    @property
+    def cached_tables(self) -> int:
+        """Number of damage tables currently cached (at most 'cache_size')"""
+        return len(self._tables)
+
+    def _build_table(self, attack_power: int, attack_element: str, defense: int, defense_element: str) -> tuple:
+        """Computes the TABLE_SIZE equally likely damage outcomes for one combination of stats"""
+        mitigate = MITIGATIONS[self.mitigation]
+        base = attack_power * self.element_chart.get((attack_element, defense_element), 1.0)
+
+        if self.deterministic:
+            damage = round(mitigate(base, defense))
+            if self.mitigation != "none":
+                damage = max(damage, self.min_damage)
+            return (max(damage, 0),)
+
+        crit_slots = round(self.crit_chance * TABLE_SIZE)
+        outcomes = []
+        for slot in range(TABLE_SIZE):
+            factor = 1 - self.variance + 2 * self.variance * (slot + 0.5) / TABLE_SIZE # Evenly spread over the variance
+            if (slot * 37) % TABLE_SIZE < crit_slots: # 37 is coprime with TABLE_SIZE, so crits are spread over all factors
+                factor *= self.crit_multiplier
+            damage = round(mitigate(base * factor, defense))
+            if self.mitigation != "none":
+                damage = max(damage, self.min_damage)
+            outcomes.append(max(damage, 0))
+        return tuple(outcomes)
+
+    def table(self, attack_power: int, defense: int, attack_element: str = NEUTRAL, defense_element: str = NEUTRAL) -> tuple:
+        """
+        Returns the damage table for a combination of stats, building and caching it on first use.
+
+        Returns:
+            tuple: Equally likely damage outcomes (a single entry when the ruleset is deterministic)
+        """
+        key = (attack_power, attack_element, defense, defense_element)
+        tables = self._tables
+        outcomes = tables.get(key)
+        if outcomes is not None:
+            tables.move_to_end(key)
+            return outcomes
+        outcomes = self._build_table(attack_power, attack_element, defense, defense_element)
+        if self.cache_size > 0:
+            tables[key] = outcomes
+            if len(tables) > self.cache_size:
+                tables.popitem(last=False)
+        return outcomes
+
+    def damage(self, attacker, defender, rng: Optional[random.Random] = None) -> int:
+        """
+        Resolves the damage of one attack.
+
+        Args:
+            attacker: The attacking combatant (needs attack_power, optionally element)
+            defender: The defending combatant (needs defense, optionally element)
+            rng (random.Random, optional): Random stream for crits and variance. Defaults to the random module
+
+        Returns:
+            int: The damage dealt
+        """
+        outcomes = self.table(attacker.attack_power, defender.defense,
+                              getattr(attacker, "element", NEUTRAL), getattr(defender, "element", NEUTRAL))
+        if len(outcomes) == 1:
+            return outcomes[0]
+        return outcomes[(rng or random).getrandbits(TABLE_BITS)]
+
+    def clear_cache(self) -> None:
+        """Forgets every cached damage table"""
+        self._tables.clear()
+
+
+CLASSIC = Ruleset("classic")
+STANDARD = Ruleset("standard", mitigation="subtract", crit_chance=0.1, crit_multiplier=2.0, variance=0.1,
+                   element_chart=ELEMENT_CHART)
+
+RULESETS: dict = {ruleset.name: ruleset for ruleset in (CLASSIC, STANDARD)}
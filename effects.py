@@ -0,0 +1,191 @@
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from items import REGISTRY, InventoryView, ItemKey, ItemRegistry
+from events import NULL_SINK, ItemUnavailable, ItemUsed
+from status import ATTACK_UP, DEFENSE_UP, POISON, REGEN, STUN, StatusEffects
+"""
+effects.py
+
+Usable items. Every usable item maps to an effect with an amount, ex: a Potion heals 10. Effects are instant
+(heal, buff, damage) or put a status on a combatant for some turns (poison, regen, stun, attack_up, defense_up,
+see status.py), which needs the battle's StatusEffects.
+
+Effects are kept in a dispatch table indexed by item ID (see items.py), with the effect's handler resolved once when
+the item is registered, so using an item is a list lookup, a check-and-decrement of the stock and a call; there is
+no branching on item or effect names. Stock is validated and consumed in one step (Inventory.consume) before the
+effect applies: an item that isn't held does nothing, and an item is never applied without being used up.
+
+    use_item(player, "Potion")          # Heals the player, one Potion less
+    use_item(player, "Bomb", enemy)     # Damage effects need a target
+    use_item(player, "Venom Flask", enemy, statuses=battle.statuses)
+
+The engine's heal action is a Potion (engine.HEAL), so heals are limited by the Potions a combatant carries.
+"""
+
+HEAL = "heal" # Restores health to the user
+BUFF = "buff" # Raises the user's attack power for good
+DAMAGE = "damage" # Deals damage to the target (ignores defense)
+
+POTION_HEAL = 10 # Health restored by one Potion
+
+
+def _heal(user, target, effect: "Effect", statuses: Optional[StatusEffects]) -> None:
+    user.heal(effect.amount)
+
+
+def _buff(user, target, effect: "Effect", statuses: Optional[StatusEffects]) -> None:
+    user.attack_power += effect.amount
+
+
+def _damage(user, target, effect: "Effect", statuses: Optional[StatusEffects]) -> None:
+    target.take_damage(effect.amount)
+
+
+def _status(user, target, effect: "Effect", statuses: Optional[StatusEffects]) -> None:
+    statuses.apply(target if effect.kind in TARGETED else user, effect.kind, effect.turns, effect.amount)
+
+
+# Effect kind -> handler(user, target, effect, statuses)
+HANDLERS: dict = {HEAL: _heal, BUFF: _buff, DAMAGE: _damage,
+                  POISON: _status, REGEN: _status, STUN: _status, ATTACK_UP: _status, DEFENSE_UP: _status}
+TARGETED: frozenset = frozenset({DAMAGE, POISON, STUN}) # Effect kinds that need a target
+TIMED: frozenset = frozenset({POISON, REGEN, STUN, ATTACK_UP, DEFENSE_UP}) # Effect kinds that put a status
+
+
+@dataclass(frozen=True, slots=True)
+class Effect:
+    """
+    What using an item does.
+
+    Args:
+        item (str): The item's name
+        kind (str): A key of HANDLERS
+        amount (int): Health restored, attack power gained or damage dealt (per turn for statuses)
+        handler (callable): Applies the effect, handler(user, target, effect, statuses)
+        turns (int): How long the status lasts, 0 for instant effects
+    """
+    item: str
+    kind: str
+    amount: int
+    handler: Callable
+    turns: int = 0
+
+    @property
+    def targeted(self) -> bool:
+        """True if the effect needs a target"""
+        return self.kind in TARGETED
+
+
+class EffectTable:
+    """
+    The dispatch table of usable items.
+
+    Args:
+        registry (ItemRegistry, optional): Registry the item IDs come from. Defaults to the shared REGISTRY
+    """
+
+    def __init__(self, registry: ItemRegistry = REGISTRY):
+        """Initializes an empty table"""
+        self.registry = registry
+        self._effects: list = [] # Item ID -> Effect, None for items without an effect
+
+    def register(self, item: str, kind: str, amount: int, turns: int = 0) -> Effect:
+        """
+        Makes an item usable (or replaces its effect).
+
+        Args:
+            item (str): The item's name, registered with the item registry if it's new
+            kind (str): A key of HANDLERS
+            amount (int): Size of the effect
+            turns (int, optional): How long the status lasts, required by the kinds in TIMED
+
+        Returns:
+            Effect: The item's effect
+
+        Raises:
+            ValueError: If the effect kind is unknown, or a status has no duration
+        """
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown effect: {kind!r} (expected one of {', '.join(HANDLERS)})")
+        if kind in TIMED and turns < 1:
+            raise ValueError(f"A {kind} effect has to last at least one turn")
+        item_id = self.registry.id_of(item)
+        if item_id >= len(self._effects):
+            self._effects.extend([None] * (item_id + 1 - len(self._effects)))
+        effect = self._effects[item_id] = Effect(self.registry.name_of(item_id), kind, amount, HANDLERS[kind], turns)
+        return effect
+
+    def effect(self, item: ItemKey) -> Optional[Effect]:
+        """
+        Returns:
+            Effect | None: The effect of an item, None if it can't be used
+        """
+        item_id = item if isinstance(item, int) else self.registry.find(item)
+        if item_id is None or item_id >= len(self._effects):
+            return None
+        return self._effects[item_id]
+
+    def use(self, user, item: ItemKey, target=None, statuses: Optional[StatusEffects] = None) -> bool:
+        """
+        Uses one of an item from the user's inventory.
+
+        Args:
+            user (Player | Enemy): The combatant using the item
+            item (int | str): The item's ID or name
+            target (Player | Enemy, optional): Who the item is used on, required by the kinds in TARGETED
+            statuses (StatusEffects, optional): The battle's statuses, required by the kinds in TIMED
+
+        Returns:
+            bool: True if the item was used, False if the user had none (nothing happens then)
+
+        Raises:
+            ValueError: If the item has no effect, or misses its target or statuses
+        """
+        effect = self.effect(item)
+        if effect is None:
+            raise ValueError(f"{item!r} can't be used")
+        if target is None and effect.kind in TARGETED:
+            raise ValueError(f"{effect.item} needs a target")
+        if statuses is None and effect.kind in TIMED:
+            raise ValueError(f"{effect.item} puts a status, it needs the battle's statuses")
+
+        sink = getattr(user, "sink", NULL_SINK)
+        inventory = user.inventory
+        if isinstance(inventory, InventoryView):
+            stock = inventory.source
+            item_id = item if isinstance(item, int) else self.registry.find(item)
+            if not stock.consume(item_id):
+                if sink.enabled:
+                    sink.emit(ItemUnavailable(user.name, effect.item))
+                return False
+            remaining = stock.counts.get(item_id, 0)
+        else: # Plain dict inventories behind a read-only view (compact.PooledCombatant)
+            remaining = user.consume_item(effect.item)
+            if remaining < 0:
+                if sink.enabled:
+                    sink.emit(ItemUnavailable(user.name, effect.item))
+                return False
+
+        if sink.enabled:
+            sink.emit(ItemUsed(user.name, effect.item, remaining))
+        effect.handler(user, target, effect, statuses)
+        return True
+
+
+# The table shared by the game, with the built-in usable items
+EFFECTS = EffectTable()
+EFFECTS.register("Potion", HEAL, POTION_HEAL)
+EFFECTS.register("Elixir", HEAL, 3 * POTION_HEAL)
+EFFECTS.register("Whetstone", BUFF, 2)
+EFFECTS.register("Bomb", DAMAGE, 15)
+EFFECTS.register("Venom Flask", POISON, 4, turns=3)
+EFFECTS.register("Regen Draught", REGEN, 5, turns=4)
+EFFECTS.register("Flashbang", STUN, 0, turns=1)
+EFFECTS.register("Battle Tonic", ATTACK_UP, 4, turns=3)
+EFFECTS.register("Iron Skin", DEFENSE_UP, 4, turns=3)
+
+
+def use_item(user, item: ItemKey, target=None, statuses: Optional[StatusEffects] = None) -> bool:
+    """Uses one of an item from the user's inventory with the shared EFFECTS table (see EffectTable.use)"""
+    return EFFECTS.use(user, item, target, statuses)
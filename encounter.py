@@ -0,0 +1,432 @@
+import random
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+from combatant import DEFAULT_SPEED
+from items import POTION
+from effects import use_item
+from engine import (ATTACK, DEFEND, DEFEND_BONUS, FLEE, FLEE_CHANCE, HEAL, MAX_TURNS, SPECIAL, Policy, always_attack,
+                    new_seed, random_enemy_move, resolve_policy, special_attack)
+from events import (NULL_SINK, ActionChosen, CombatantDefeated, Defended, EncounterEnded, EventSink, FleeAttempted,
+                    SpecialMissed)
+"""
+encounter.py
+
+N-vs-M encounters: a party of players against a pack of enemies (any combatants work on either side).
+
+Instead of strict alternation, an initiative scheduler decides who acts next. Every combatant acts once every
+ACTION_COST / speed time units, so a combatant with speed 20 acts twice as often as one with speed 10. Ties are
+broken by an initiative roll made when the encounter starts.
+
+Each action costs O(log n) whatever the number of participants:
+- the scheduler is a heap of "next action time", popping the next actor and rescheduling it is O(log n)
+- each side has a targeting index (a heap ordered by the targeting strategy), picking a target is O(1) and
+  updating it after damage or a heal is O(log n)
+- a defeated combatant is removed from the scheduler and from its side's targeting index right away, O(log n)
+
+Actions follow engine.py: attack, heal, defend (until the combatant acts again), special and flee (a combatant
+that escapes leaves the encounter like a defeated one, but isn't looted).
+"""
+
+PARTY = "party"
+PACK = "pack"
+OPPONENTS = {PARTY: PACK, PACK: PARTY}
+EVENT_SIDES = {PARTY: "player", PACK: "enemy"} # Side names used by the combat events
+
+ACTION_COST = 720720 # Time between two actions at speed 1, divisible by every speed from 1 to 16
+
+# Targeting strategies: the target with the lowest value is picked (ties go to the combatant listed first)
+TARGETING: dict = {
+    "lowest_health": lambda combatant: combatant.health, # Focus fire on the weakest
+    "highest_attack": lambda combatant: -combatant.attack_power, # Take out the biggest threat
+    "first": lambda combatant: 0, # In the order the combatants were given
+}
+
+
+class IndexedHeap:
+    """
+    Binary min-heap of keys that knows where every key is, so any key can be re-prioritized or removed in O(log n).
+    Priorities must never compare equal for two different keys (add the key itself as a tie breaker).
+    """
+
+    def __init__(self):
+        """Initializes an empty heap"""
+        self._heap: list = [] # (priority, key) pairs
+        self._position: dict = {} # {key: index in _heap}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, key) -> bool:
+        return key in self._position
+
+    def push(self, key, priority) -> None:
+        """Adds a key, or changes its priority if it's already in the heap"""
+        index = self._position.get(key)
+        if index is not None:
+            old = self._heap[index][0]
+            self._heap[index] = (priority, key)
+            if priority < old:
+                self._sift_up(index)
+            else:
+                self._sift_down(index)
+            return
+        self._heap.append((priority, key))
+        self._position[key] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def peek(self):
+        """Returns the key with the lowest priority without removing it (None if the heap is empty)"""
+        return self._heap[0][1] if self._heap else None
+
+    def priority(self, key):
+        """Returns the current priority of a key"""
+        return self._heap[self._position[key]][0]
+
+    def pop(self) -> tuple:
+        """Removes and returns the (priority, key) pair with the lowest priority"""
+        entry = self._heap[0]
+        self.remove(entry[1])
+        return entry
+
+    def remove(self, key) -> None:
+        """Removes a key (no-op if it isn't in the heap)"""
+        index = self._position.pop(key, None)
+        if index is None:
+            return
+        last = self._heap.pop()
+        if index == len(self._heap): # The removed key was the last entry
+            return
+        self._heap[index] = last
+        self._position[last[1]] = index
+        self._sift_up(index)
+        self._sift_down(self._position[last[1]])
+
+    def _sift_up(self, index: int) -> None:
+        heap, position = self._heap, self._position
+        entry = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if heap[parent][0] <= entry[0]:
+                break
+            heap[index] = heap[parent]
+            position[heap[index][1]] = index
+            index = parent
+        heap[index] = entry
+        position[entry[1]] = index
+
+    def _sift_down(self, index: int) -> None:
+        heap, position = self._heap, self._position
+        size = len(heap)
+        entry = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if entry[0] <= heap[child][0]:
+                break
+            heap[index] = heap[child]
+            position[heap[index][1]] = index
+            index = child
+        heap[index] = entry
+        position[entry[1]] = index
+
+
+class InitiativeScheduler:
+    """
+    Decides who acts next. Combatants are identified by an integer ID.
+    """
+
+    def __init__(self):
+        """Initializes an empty scheduler at time 0"""
+        self.time = 0
+        self._queue = IndexedHeap()
+        self._intervals: dict = {} # {combatant ID: time between two of its actions}
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, uid: int) -> bool:
+        return uid in self._queue
+
+    def add(self, uid: int, speed: int = DEFAULT_SPEED, initiative: int = 0) -> None:
+        """
+        Schedules a combatant's first action one interval from now.
+
+        Args:
+            uid (int): The combatant's ID
+            speed (int, optional): Higher is more frequent
+            initiative (int, optional): Combatants acting at the same time go in order of highest initiative
+        """
+        interval = ACTION_COST // max(speed, 1)
+        self._intervals[uid] = interval
+        self._queue.push(uid, (self.time + interval, -initiative, uid))
+
+    def remove(self, uid: int) -> None:
+        """Takes a combatant out of the turn order"""
+        self._queue.remove(uid)
+        self._intervals.pop(uid, None)
+
+    def next(self) -> int:
+        """Returns the ID of the combatant acting next and schedules its following action"""
+        uid = self._queue.peek()
+        time, initiative, _ = self._queue.priority(uid)
+        self.time = time
+        self._queue.push(uid, (time + self._intervals[uid], initiative, uid))
+        return uid
+
+
+class TargetIndex:
+    """
+    The combatants of one side that can still be targeted, ordered by a targeting strategy.
+
+    Args:
+        strategy (str, optional): A key of TARGETING
+    """
+
+    def __init__(self, strategy: str = "lowest_health"):
+        """Initializes an empty index"""
+        if strategy not in TARGETING:
+            raise ValueError(f"Unknown targeting strategy: {strategy!r}")
+        self._value = TARGETING[strategy]
+        self._heap = IndexedHeap()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, uid: int) -> bool:
+        return uid in self._heap
+
+    def update(self, uid: int, combatant) -> None:
+        """Adds a combatant, or re-sorts it after its stats changed"""
+        self._heap.push(uid, (self._value(combatant), uid))
+
+    def remove(self, uid: int) -> None:
+        self._heap.remove(uid)
+
+    def pick(self) -> Optional[int]:
+        """Returns the ID of the preferred target, None if there's nobody left"""
+        return self._heap.peek()
+
+
+@dataclass(slots=True)
+class ActionRecord:
+    """
+    One action taken during an encounter.
+
+    Args:
+        number (int): Actions taken so far, including this one
+        side (str): PARTY or PACK
+        actor (str): Name of the combatant that acted
+        action (str): One of engine.ACTIONS
+        target (str): Name of the targeted opponent
+        target_health (int): The target's health after the action
+    """
+    number: int
+    side: str
+    actor: str
+    action: str
+    target: str
+    target_health: int
+
+
+@dataclass(slots=True)
+class EncounterResult:
+    """
+    Outcome of an encounter.
+
+    Args:
+        winner (str | None): PARTY, PACK or None if the action cap was reached
+        actions (int): Number of actions taken
+        survivors (dict): {side: names of the combatants still standing}
+        defeated (list): Names of the defeated combatants, in the order they fell
+        loot (list): (collector, source, items) for every enemy looted
+        fled (list): Names of the combatants that escaped
+    """
+    winner: Optional[str]
+    actions: int
+    survivors: dict = field(default_factory=dict)
+    defeated: list = field(default_factory=list)
+    loot: list = field(default_factory=list)
+    fled: list = field(default_factory=list)
+
+
+class Encounter:
+    """
+    A party vs pack encounter that is advanced one action at a time.
+
+    Args:
+        party (sequence): The player side's combatants
+        pack (sequence): The enemy side's combatants
+        party_policy (Policy, optional): Picks the action of each party member (called with its current target)
+        pack_policy (Policy, optional): Picks the action of each pack member
+        targeting (str, optional): Targeting strategy of both sides, a key of TARGETING
+        rng (random.Random, optional): Random stream for initiative and the policies. If not given, one is created from 'seed'
+        seed (int, optional): Seed of the random stream when 'rng' isn't given (a fresh one is drawn if neither is given)
+        max_actions (int, optional): The encounter ends without a winner after this many actions.
+            Defaults to MAX_TURNS actions per combatant
+        sink (EventSink, optional): Receives the encounter's events. Defaults to discarding them
+    """
+
+    def __init__(self, party: Sequence, pack: Sequence, party_policy: Policy = always_attack,
+                 pack_policy: Policy = random_enemy_move, targeting: str = "lowest_health",
+                 rng: Optional[random.Random] = None, seed: Optional[int] = None,
+                 max_actions: Optional[int] = None, sink: EventSink = NULL_SINK):
+        """Initializes the turn order and the targeting indexes"""
+        if not party or not pack:
+            raise ValueError("Both sides need at least one combatant")
+        if rng is None:
+            seed = seed if seed is not None else new_seed()
+            rng = random.Random(seed)
+        self.seed = seed
+        self.rng = rng
+        self.combat_rng = random.Random(rng.getrandbits(64)) # Damage rolls use their own stream, as in engine.Battle
+        self.combatants = list(party) + list(pack)
+        self.sides = [PARTY] * len(party) + [PACK] * len(pack)
+        self.policies = {PARTY: resolve_policy(party_policy), PACK: resolve_policy(pack_policy)}
+        self.max_actions = max_actions if max_actions is not None else MAX_TURNS * len(self.combatants)
+        self.sink = sink
+
+        self.scheduler = InitiativeScheduler()
+        self.targets = {PARTY: TargetIndex(targeting), PACK: TargetIndex(targeting)} # Who can be targeted, per side
+        for uid, (combatant, side) in enumerate(zip(self.combatants, self.sides)):
+            self.scheduler.add(uid, getattr(combatant, "speed", DEFAULT_SPEED), rng.getrandbits(16))
+            self.targets[side].update(uid, combatant)
+
+        self.actions = 0
+        self.winner: Optional[str] = None
+        self.defeated: list = [] # IDs, in the order they fell
+        self.fled: list = [] # IDs of the combatants that escaped
+        self.loot: list = []
+        self._guards: dict = {} # {combatant ID: defense bonus} of the combatants that defended and haven't acted since
+
+    @property
+    def finished(self) -> bool:
+        """True once a side has been wiped out or the action cap has been reached"""
+        return self.winner is not None or self.actions >= self.max_actions
+
+    def step(self) -> ActionRecord:
+        """
+        Lets the next combatant in the turn order act against the target picked by the targeting strategy.
+
+        Returns:
+            ActionRecord: What happened
+
+        Raises:
+            RuntimeError: If the encounter is already finished
+            ValueError: If a policy returns an unknown action
+        """
+        if self.finished:
+            raise RuntimeError("The encounter is already finished.")
+
+        uid = self.scheduler.next()
+        actor, side = self.combatants[uid], self.sides[uid]
+        opponents = self.targets[OPPONENTS[side]]
+        target_uid = opponents.pick()
+        target = self.combatants[target_uid]
+
+        action = self.policies[side](actor, target, self.rng)
+        if self.sink.enabled:
+            self.sink.emit(ActionChosen(EVENT_SIDES[side], actor.name, target.name, action))
+
+        bonus = self._guards.pop(uid, 0) # A defend lasts until the combatant acts again
+        if bonus:
+            actor.defense -= bonus
+
+        if action == ATTACK or action == SPECIAL:
+            if action == ATTACK:
+                actor.attacks(target, self.combat_rng)
+            elif not special_attack(actor, target, self.combat_rng) and self.sink.enabled:
+                self.sink.emit(SpecialMissed(actor.name, target.name))
+            if target.is_defeated():
+                self.remove(target_uid, defeated_by=actor)
+            else:
+                opponents.update(target_uid, target)
+        elif action == HEAL:
+            use_item(actor, POTION)
+            self.targets[side].update(uid, actor)
+        elif action == DEFEND:
+            actor.defense += DEFEND_BONUS
+            self._guards[uid] = DEFEND_BONUS
+            if self.sink.enabled:
+                self.sink.emit(Defended(actor.name, actor.defense))
+        elif action == FLEE:
+            escaped = self.combat_rng.random() < FLEE_CHANCE
+            if self.sink.enabled:
+                self.sink.emit(FleeAttempted(actor.name, escaped))
+            if escaped:
+                self.remove(uid, fled=True)
+        else:
+            raise ValueError(f"Unknown action: {action!r}")
+
+        self.actions += 1
+        if not opponents:
+            self.winner = side
+        elif not self.targets[side]: # The actor's whole side fled
+            self.winner = OPPONENTS[side]
+        if self.finished:
+            for guarded, bonus in self._guards.items():
+                self.combatants[guarded].defense -= bonus
+            self._guards.clear()
+        if self.finished and self.sink.enabled:
+            self.sink.emit(EncounterEnded(self.winner, tuple(self.survivors(self.winner or PARTY)), self.actions))
+        return ActionRecord(self.actions, side, actor.name, action, target.name, target.health)
+
+    def remove(self, uid: int, defeated_by=None, fled: bool = False) -> None:
+        """
+        Takes a defeated (or escaped) combatant out of the turn order and the targeting indexes.
+        If it was defeated by a combatant that collects loot (a Player), the loot is collected.
+
+        Args:
+            uid (int): The combatant's ID (its position in party + pack)
+            defeated_by (optional): The combatant that defeated it
+            fled (bool, optional): The combatant escaped instead of being defeated
+        """
+        combatant, side = self.combatants[uid], self.sides[uid]
+        self.scheduler.remove(uid)
+        self.targets[side].remove(uid)
+        bonus = self._guards.pop(uid, 0)
+        if bonus:
+            combatant.defense -= bonus
+        if fled:
+            self.fled.append(uid)
+            return
+        self.defeated.append(uid)
+        if self.sink.enabled:
+            self.sink.emit(CombatantDefeated(side, combatant.name))
+        if hasattr(defeated_by, "collect_loot") and hasattr(combatant, "drop_loot"):
+            self.loot.append((defeated_by.name, combatant.name, dict(defeated_by.collect_loot(combatant, self.combat_rng))))
+
+    def survivors(self, side: str) -> list:
+        """Returns the names of the combatants of 'side' that are still standing, in the order they were given"""
+        return [combatant.name for uid, (combatant, combatant_side) in enumerate(zip(self.combatants, self.sides))
+                if combatant_side == side and uid in self.scheduler]
+
+    def result(self) -> EncounterResult:
+        """
+        Returns:
+            EncounterResult: The outcome of the encounter so far
+        """
+        return EncounterResult(self.winner, self.actions, {side: self.survivors(side) for side in (PARTY, PACK)},
+                               [self.combatants[uid].name for uid in self.defeated], self.loot,
+                               [self.combatants[uid].name for uid in self.fled])
+
+
+def run_encounter(party: Sequence, pack: Sequence, **kwargs) -> EncounterResult:
+    """
+    Runs an encounter to completion.
+
+    Args:
+        party (sequence): The player side's combatants
+        pack (sequence): The enemy side's combatants
+        **kwargs: Passed on to Encounter (policies, targeting, seed, ...)
+
+    Returns:
+        EncounterResult: Winner, action count, survivors, defeated combatants and loot
+    """
+    encounter = Encounter(party, pack, **kwargs)
+    while not encounter.finished:
+        encounter.step()
+    return encounter.result()
@@ -1,4 +1,10 @@
-from combatant import Combatant
+from collections.abc import Mapping
+import random
+from typing import Optional
+from combatant import DEFAULT_SPEED, Combatant
+from damage import CLASSIC, NEUTRAL, Ruleset
+from items import Inventory, InventoryView
+from events import CONSOLE, AttackMade, DamageDealt, EventSink, Healed, LootDropped, TargetAlreadyDefeated
 
 class Enemy(Combatant):
     """
@@ -12,21 +18,32 @@ class Enemy(Combatant):
         attack_power(int): The power of the enemy's attack
         defense (int): The value of the enemy's defense 
         inventory (dict): The enemy's inventory (The Item that is dropped upon the enemy's defeat)
+        sink (EventSink, optional): Where the enemy's combat events are sent. Defaults to printing them to the console
+        ruleset (Ruleset, optional): The damage formula used by the enemy's attacks. Defaults to CLASSIC (damage = attack power)
+        element (str, optional): The enemy's element, used by rulesets with elemental multipliers
+        speed (int, optional): How often the enemy acts in multi-combatant encounters (see encounter.py)
+        loot_table (LootTable, optional): Rolled once when the enemy drops its loot, on top of its inventory (see loot.py)
     """
-    def __init__(self, name: str, health: int, max_health: int, attack_name: str, attack_power: int, defense: int, inventory: dict):
+    def __init__(self, name: str, health: int, max_health: int, attack_name: str, attack_power: int, defense: int, inventory: dict, sink: EventSink = CONSOLE,
+                 ruleset: Ruleset = CLASSIC, element: str = NEUTRAL, speed: int = DEFAULT_SPEED, loot_table=None):
         """Initializes a new Enemy instance with protected attributes"""
         self.name = name
+        self.sink = sink
         self._health = health
         self._max_health = max_health
         self._attack_name = attack_name.upper()
         self._attack_power = attack_power
         self._defense = defense
-        self._inventory = inventory
+        self._inventory = Inventory(inventory)
+        self.ruleset = ruleset
+        self.element = element
+        self.speed = speed
+        self.loot_table = loot_table
 
     # Getter methods
     @property
-    def inventory(self) -> dict:
-        return self._inventory
+    def inventory(self) -> InventoryView:
+        return self._inventory.view()
 
     @property
     def health(self) -> int:
@@ -36,21 +53,44 @@ class Enemy(Combatant):
     def max_health(self) -> int:
         return self._max_health
 
+    @property
+    def attack_name(self) -> str:
+        return self._attack_name
+
+    @property
+    def attack_power(self) -> int:
+        return self._attack_power
+
+    @property
+    def defense(self) -> int:
+        return self._defense
+
+    @attack_power.setter
+    def attack_power(self, value: int) -> None:
+        self._attack_power = value
+
+    @defense.setter
+    def defense(self, value: int) -> None:
+        self._defense = value
+
     # Enemy attack back to player
-    def attacks(self, target: Combatant) -> None:
+    def attacks(self, target: Combatant, rng: Optional[random.Random] = None) -> None:
         """
         Outputs the attack scenario by mentioning the attack name, who the attack is being used against 
-        and calls the take_damage method to lower the opponents max health.
+        and calls the take_damage method to lower the opponents max health. The damage is resolved by the enemy's ruleset.
 
         Args:
             target (Combatant): The combatant (Player) who is receiving the damage from the enemy
+            rng (random.Random, optional): Random stream for crits and variance (only used by random rulesets)
         """
         if target.is_defeated():
-            print(f"{target.name} is already defeated!")
+            if self.sink.enabled:
+                self.sink.emit(TargetAlreadyDefeated("enemy", self.name, target.name))
             return
 
-        print(f"--- {self.name} attacks back with {self._attack_name} to {target.name}! ---\n")
-        target.take_damage(self._attack_power)
+        if self.sink.enabled:
+            self.sink.emit(AttackMade("enemy", self.name, target.name, self._attack_name))
+        target.take_damage(self.ruleset.damage(self, target, rng))
     
     
     # Players health gets reduced by enemy 
@@ -70,8 +110,21 @@ class Enemy(Combatant):
         if self._health < 0: # Check if enemy health dropped below 0 after taking damage. If yes, health = 0
             self._health = 0
             
-        print(f"--- {self.name} TOOK DAMAGE! ---")
-        print(f"{self.name}'s new health: {self._health}\n")
+        if self.sink.enabled:
+            self.sink.emit(DamageDealt("enemy", self.name, amount, self._health))
+
+
+    # Restore health
+    def heal(self, amount: int) -> None:
+        """
+        Heals the enemy's health by 'amount', up to its maximum health.
+
+        Args:
+            amount (int): The amount of health restored
+        """
+        self._health = min(self._health + amount, self._max_health)
+        if self.sink.enabled:
+            self.sink.emit(Healed(self.name, amount, self._health))
 
 
     # Predicate method (Method to check a condition, returns a bool value)
@@ -85,47 +138,59 @@ class Enemy(Combatant):
         """
         return self._health <= 0
 
-    def drop_loot(self) -> dict:
+    def drop_loot(self, rng: Optional[random.Random] = None) -> Mapping:
         """
         Enemy drops loot once they are defeated by a player and Enemy's inventory is emptied once loot has been dropped.
+        An enemy with a loot table also drops what the table rolls (only the first time, the table is used up).
+
+        Args:
+            rng (random.Random, optional): Random stream for the loot table roll, defaults to the random module's
 
         Returns:
-            dict: If enemy has been successfully defeated, the player receives the dropped items
+            Mapping: If enemy has been successfully defeated, the player receives the dropped items ({item name: quantity})
         """
         if self.is_defeated():
-            print(f"--- {self.name} DEFEATED! ---")
-            print(f"Dropped Items: {self._inventory}\n")
-
-            dropped_items = self._inventory.copy() # Copy the items to another variable
-            self._inventory = {} # Clear out enemy inventory after loot drop
+            dropped = self._inventory.take_all() # Hand the items over and clear out enemy inventory (no copy)
+            dropped_items = dropped.view()
+            if self.loot_table is not None:
+                overflow = dropped.add_many(self.loot_table.roll(rng))
+                self.loot_table = None
+                if overflow: # Past a stack limit, the whole drop goes out as a plain dict, nothing is lost
+                    dropped_items = dict(dropped_items)
+                    for item_id, quantity in overflow.items():
+                        dropped_items[dropped.registry.name_of(item_id)] += quantity
+
+            if self.sink.enabled:
+                self.sink.emit(LootDropped(self.name, dict(dropped_items)))
             return dropped_items
         else:
-            print(f"{self.name} is still alive! No loot to drop.\n")
+            if self.sink.enabled:
+                self.sink.emit(LootDropped(self.name, {}, defeated=False))
             return {}
             
     
-# Object Creation using keyword arguments 
-goblin = Enemy(
-    name="Goblin",
-    health=50,
-    max_health=50,
-    attack_name="Rusty Shiv",
-    attack_power=5,
-    defense=5,
-    inventory={ "Gold Coin": 1 }
-)
-
-testPlayer = Enemy(
-    name="Beep",
-    health=50,
-    max_health=50,
-    attack_name="Shove",
-    attack_power=6,
-    defense=8,
-    inventory={ "Potion": 2 }
-)
-    
 if __name__ == "__main__":
+
+    # Demo combatants are only built when the module is run directly, importing it has no side effects
+    goblin = Enemy(
+        name="Goblin",
+        health=50,
+        max_health=50,
+        attack_name="Rusty Shiv",
+        attack_power=5,
+        defense=5,
+        inventory={ "Gold Coin": 1 }
+    )
+
+    testPlayer = Enemy(
+        name="Beep",
+        health=50,
+        max_health=50,
+        attack_name="Shove",
+        attack_power=6,
+        defense=8,
+        inventory={ "Potion": 2 }
+    )
    
     # Test attack method
     goblin.attacks(testPlayer)
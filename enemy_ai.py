@@ -0,0 +1,190 @@
+import math
+import random
+from bisect import bisect
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from damage import NEUTRAL
+from engine import ATTACK, DEFEND, DEFEND_BONUS, FLEE, HEAL, HEAL_AMOUNT, SPECIAL, SPECIAL_HIT_CHANCE, SPECIAL_MULTIPLIER
+"""
+enemy_ai.py
+
+Utility-based enemy AI. Every action the engine knows (attack, heal, defend, flee, special) gets a score from the
+current battle state, and the action is drawn at random with probabilities proportional to the scores:
+- attack: always an option, much better when a hit can finish the opponent
+- special: double damage half of the time, worth it when a big hit can finish the opponent
+- heal: when the enemy is in danger, carries a Potion and a heal outweighs the damage it takes per turn
+- defend: when the enemy is in danger and the ruleset lets defense reduce damage (never under CLASSIC)
+- flee: when the enemy is about to die and can't win first
+
+Scores come from the damage tables of the combatants' rulesets (damage.py), which makes scoring the expensive part.
+Decisions are memoized in an LRU cache keyed on a quantized battle state (health rounded to HP_QUANTUM, stats,
+rulesets and elements), so the repeated states of large simulations skip scoring entirely. cache_info() reports
+the hit rate.
+
+    run_battle(player, enemy, enemy_policy=UtilityAI())
+    simulate(policies=("attack", "utility"))
+"""
+
+HP_QUANTUM = 5 # Health is rounded down to a multiple of this in the cache key
+DEFAULT_CACHE_SIZE = 4096 # Decisions kept in the cache
+
+# How much each action's score counts
+DEFAULT_WEIGHTS: dict = {ATTACK: 1.0, SPECIAL: 0.6, HEAL: 1.2, DEFEND: 0.8, FLEE: 1.0}
+
+
+@dataclass(slots=True)
+class CacheStats:
+    """
+    Decision cache statistics.
+
+    Args:
+        hits (int): Decisions served from the cache
+        misses (int): Decisions that had to be scored
+        evictions (int): Cached decisions dropped to make room
+        size (int): Decisions currently cached
+        capacity (int): Most decisions the cache keeps
+    """
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    capacity: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of decisions served from the cache"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def _mean(outcomes: tuple) -> float:
+    return sum(outcomes) / len(outcomes)
+
+
+def _kill_chance(outcomes: tuple, health: int) -> float:
+    """Chance that one hit from a damage table takes away at least 'health'"""
+    return sum(1 for damage in outcomes if damage >= health) / len(outcomes)
+
+
+def _can_heal(actor) -> bool:
+    """True if the actor can heal, which takes a Potion (see effects.py)"""
+    return hasattr(actor, "heal") and actor.inventory.get("Potion", 0) > 0
+
+
+class UtilityAI:
+    """
+    Enemy policy that scores every action and picks one with probability proportional to its score.
+
+    Args:
+        cache_size (int, optional): Decisions kept in the LRU cache (0 disables caching)
+        weights (dict, optional): Multiplier of each action's score, defaults to DEFAULT_WEIGHTS.
+            Actions missing from the dict are never picked
+        hp_quantum (int, optional): Health granularity of the cache key
+    """
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE, weights: Optional[dict] = None, hp_quantum: int = HP_QUANTUM):
+        """Initializes the AI with an empty decision cache"""
+        self.weights = dict(weights if weights is not None else DEFAULT_WEIGHTS)
+        self.hp_quantum = hp_quantum
+        self.capacity = cache_size
+        self._cache: OrderedDict = OrderedDict() # {state key: (actions, cumulative scores)}, least recent first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, actor, opponent, rng: random.Random) -> str:
+        key = self.state_key(actor, opponent)
+        cache = self._cache
+        choices = cache.get(key)
+        if choices is not None:
+            self.hits += 1
+            cache.move_to_end(key)
+        else:
+            self.misses += 1
+            choices = self.score(actor, opponent, *self._representative_health(key))
+            if self.capacity > 0:
+                cache[key] = choices
+                if len(cache) > self.capacity:
+                    cache.popitem(last=False)
+                    self.evictions += 1
+
+        actions, cumulative = choices
+        if len(actions) == 1:
+            return actions[0]
+        return actions[bisect(cumulative, rng.random() * cumulative[-1])]
+
+    def state_key(self, actor, opponent) -> tuple:
+        """The quantized battle state decisions are cached under"""
+        quantum = self.hp_quantum
+        return (actor.health // quantum, actor.max_health, opponent.health // quantum,
+                actor.attack_power, actor.defense, opponent.attack_power, opponent.defense,
+                actor.ruleset, opponent.ruleset, getattr(actor, "element", NEUTRAL), getattr(opponent, "element", NEUTRAL),
+                _can_heal(actor))
+
+    def _representative_health(self, key: tuple) -> tuple:
+        """Health values scored for a cache key: the middle of each quantized bucket"""
+        quantum = self.hp_quantum
+        actor_health = min(max(key[0] * quantum + quantum // 2, 1), key[1])
+        opponent_health = max(key[2] * quantum + quantum // 2, 1)
+        return actor_health, opponent_health
+
+    def score(self, actor, opponent, actor_health: int, opponent_health: int) -> tuple:
+        """
+        Scores every action for a battle state.
+
+        Args:
+            actor: The enemy choosing an action
+            opponent: The combatant it fights
+            actor_health (int): The enemy's health to score with
+            opponent_health (int): The opponent's health to score with
+
+        Returns:
+            tuple: (actions with a positive score, cumulative scores), ready for a weighted draw
+        """
+        weights = self.weights
+        actor_element = getattr(actor, "element", NEUTRAL)
+        opponent_element = getattr(opponent, "element", NEUTRAL)
+
+        dealt = actor.ruleset.table(actor.attack_power, opponent.defense, actor_element, opponent_element)
+        special = actor.ruleset.table(round(actor.attack_power * SPECIAL_MULTIPLIER), opponent.defense,
+                                      actor_element, opponent_element)
+        taken = _mean(opponent.ruleset.table(opponent.attack_power, actor.defense, opponent_element, actor_element))
+        guarded = _mean(opponent.ruleset.table(opponent.attack_power, actor.defense + DEFEND_BONUS,
+                                               opponent_element, actor_element))
+
+        turns_to_die = math.ceil(actor_health / taken) if taken > 0 else math.inf
+        kill = _kill_chance(dealt, opponent_health)
+        danger = 2.0 if turns_to_die <= 2 else 0.5 if turns_to_die <= 4 else 0.0
+
+        scores = {
+            ATTACK: 1.0 + 2.0 * kill,
+            SPECIAL: (SPECIAL_HIT_CHANCE * _mean(special) / _mean(dealt) if _mean(dealt) else 0.0)
+                     * (1.0 + 2.0 * SPECIAL_HIT_CHANCE * _kill_chance(special, opponent_health)),
+            DEFEND: ((taken - guarded) / taken if taken else 0.0) * danger,
+            FLEE: 1.0 if turns_to_die <= 1 and kill < 0.5 else 0.0,
+        }
+        if _can_heal(actor):
+            restored = min(HEAL_AMOUNT, actor.max_health - actor_health)
+            scores[HEAL] = max(0.0, (restored - taken) / HEAL_AMOUNT) * danger # Pointless if the next hit undoes it
+
+        actions, cumulative, total = [], [], 0.0
+        for action, value in scores.items():
+            value *= weights.get(action, 0.0)
+            if value > 0:
+                total += value
+                actions.append(action)
+                cumulative.append(total)
+        if not actions:
+            return (ATTACK,), (1.0,)
+        return tuple(actions), tuple(cumulative)
+
+    def cache_info(self) -> CacheStats:
+        """Returns the decision cache statistics"""
+        return CacheStats(self.hits, self.misses, self.evictions, len(self._cache), self.capacity)
+
+    def clear_cache(self) -> None:
+        """Forgets every cached decision and resets the statistics"""
+        self._cache.clear()
+        self.hits = self.misses = self.evictions = 0
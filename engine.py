@@ -0,0 +1,401 @@
+import importlib
+import random
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from player import Player
+from enemy import Enemy
+from items import POTION
+from effects import POTION_HEAL, use_item
+from status import StatusEffects
+from events import (NULL_SINK, ActionChosen, BattleEnded, BattleStarted, Defended, EventSink, FleeAttempted, SpecialMissed,
+                    Stunned, TurnEnded, TurnStarted)
+"""
+engine.py
+
+Headless battle engine. It resolves a Player vs Enemy fight without any input() or print() of its own,
+everything that happens is reported as events to an EventSink (see events.py).
+Both sides pick their moves through policies (plain callables), so the same rules can be driven by a
+human at the keyboard (see battle.py), by a fixed strategy for balance runs, or by a server.
+"""
+
+# Action names understood by the engine
+ATTACK = "attack"
+HEAL = "heal" # Use a Potion (see effects.py), does nothing when the combatant has none left
+DEFEND = "defend" # Raise defense by DEFEND_BONUS until the combatant acts again
+FLEE = "flee" # Try to leave the battle, works with FLEE_CHANCE
+SPECIAL = "special" # Attack with SPECIAL_MULTIPLIER times the attack power, hits with SPECIAL_HIT_CHANCE
+ACTIONS: tuple[str, ...] = (ATTACK, HEAL, DEFEND, FLEE, SPECIAL)
+
+HEAL_AMOUNT = POTION_HEAL # Amount of health restored by a single heal (one Potion)
+MAX_TURNS = 1000 # Safety cap so two combatants that can't hurt each other don't loop forever
+DEFEND_BONUS = 5
+FLEE_CHANCE = 0.5
+SPECIAL_MULTIPLIER = 2.0
+SPECIAL_HIT_CHANCE = 0.5
+
+ENEMY_MOVES: tuple[str, ...] = (ATTACK,) # Moves random_enemy_move picks from (just "attack", see enemy_ai.py for more)
+
+# A policy receives the acting combatant, its opponent and the battle's random stream and returns an action name
+Policy = Callable[..., str]
+
+
+@dataclass(slots=True)
+class TurnRecord:
+    """
+    What happened during a single turn.
+
+    Args:
+        turn (int): The turn number (starting at 1)
+        player_action (str): The action the player chose (not taken if the player was stunned or succumbed to a status)
+        enemy_action (str | None): The action the enemy took, None if the enemy was defeated before acting
+        player_health (int): The player's health at the end of the turn
+        enemy_health (int): The enemy's health at the end of the turn
+    """
+    turn: int
+    player_action: str
+    enemy_action: Optional[str]
+    player_health: int
+    enemy_health: int
+
+
+@dataclass(slots=True)
+class BattleResult:
+    """
+    The structured outcome of a finished battle.
+
+    Args:
+        winner (str | None): "player", "enemy" or None if the turn cap was reached or a side fled
+        turns (int): Number of turns played
+        hp_per_turn (list): (player_health, enemy_health) at the end of every turn
+        loot (Mapping): Items collected by the player, {item name: quantity} (empty unless the player won)
+        fled (str | None): "player" or "enemy" if that side fled the battle
+    """
+    winner: Optional[str]
+    turns: int
+    hp_per_turn: list = field(default_factory=list)
+    loot: Mapping = field(default_factory=dict)
+    fled: Optional[str] = None
+
+
+# ----- Built-in policies -----
+
+def always_attack(actor, opponent, rng: random.Random) -> str:
+    """Player policy that attacks every turn."""
+    return ATTACK
+
+
+class HealBelow:
+    """
+    Player policy that heals whenever the player's health is at or below 'threshold' and it still has a Potion,
+    otherwise attacks.
+    (A class rather than a closure so it can be sent to worker processes.)
+
+    Args:
+        threshold (int): Health value at (or below) which the player heals
+    """
+
+    def __init__(self, threshold: int):
+        """Initializes the policy with its healing threshold"""
+        self.threshold = threshold
+
+    def __call__(self, actor, opponent, rng: random.Random) -> str:
+        return HEAL if actor.health <= self.threshold and actor.inventory.get("Potion") else ATTACK
+
+
+def random_enemy_move(actor, opponent, rng: random.Random) -> str:
+    """Enemy policy that randomly picks one of ENEMY_MOVES (the behaviour battle() has always had)."""
+    return rng.choice(ENEMY_MOVES)
+
+
+# Policies that can be referred to by name, ex: "attack" or "heal_below:40" (name:argument).
+# "module:attribute" strings are imported on first use
+POLICIES: dict = {
+    "attack": always_attack,
+    "heal_below": HealBelow,
+    "random": random_enemy_move,
+    "utility": "enemy_ai:UtilityAI",
+}
+
+
+def resolve_policy(spec) -> Policy:
+    """
+    Turns a policy name from POLICIES into the policy itself. Callables are returned unchanged.
+
+    Args:
+        spec (str | Policy): A policy name, optionally with an argument after a colon ("heal_below:40"), or a policy
+
+    Returns:
+        Policy: The policy callable
+
+    Raises:
+        ValueError: If the name isn't in POLICIES
+    """
+    if callable(spec):
+        return spec
+
+    name, _, argument = spec.partition(":")
+    if name not in POLICIES:
+        raise ValueError(f"Unknown policy: {name!r}")
+    policy = POLICIES[name]
+    if isinstance(policy, str):
+        module, _, attribute = policy.partition(":")
+        policy = getattr(importlib.import_module(module), attribute)
+    if argument:
+        return policy(int(argument))
+    if isinstance(policy, type): # Policy classes get a fresh instance
+        return policy()
+    return policy
+
+
+def special_attack(actor, target, rng: random.Random) -> bool:
+    """
+    Resolves a SPECIAL action: with SPECIAL_HIT_CHANCE, 'actor' attacks with its attack power multiplied by
+    SPECIAL_MULTIPLIER (the attack power is restored afterwards).
+
+    Returns:
+        bool: True if the special attack hit
+    """
+    if rng.random() >= SPECIAL_HIT_CHANCE:
+        return False
+    attack_power = actor.attack_power
+    actor.attack_power = round(attack_power * SPECIAL_MULTIPLIER)
+    try:
+        actor.attacks(target, rng)
+    finally:
+        actor.attack_power = attack_power
+    return True
+
+
+def new_seed() -> int:
+    """
+    Returns:
+        int: A fresh 63-bit seed taken from the operating system's entropy
+    """
+    return random.SystemRandom().getrandbits(63)
+
+
+class Battle:
+    """
+    A single Player vs Enemy battle that is advanced one turn at a time.
+
+    Use this directly when the player's moves arrive from outside (a socket, a UI), otherwise use run_battle().
+
+    Args:
+        player (Player): The player taking part in the battle
+        enemy (Enemy): The enemy taking part in the battle
+        enemy_policy (Policy): Picks the enemy's action each turn
+        rng (random.Random, optional): Random stream handed to the policies. If not given, one is created from 'seed'
+        max_turns (int, optional): The battle ends without a winner after this many turns
+        sink (EventSink, optional): Receives the battle's turn events. Defaults to discarding them
+        seed (int, optional): Seed of the battle's random stream when 'rng' isn't given. A fresh seed is drawn
+            if neither is given, so every battle can be reproduced from its 'seed' attribute
+        recorder (optional): Receives the starting state and every chosen action (see replay.ReplayRecorder).
+            Recordings don't cover statuses, so battles that use them don't replay
+        statuses (StatusEffects, optional): Statuses of the combatants, ticked at the start of every turn.
+            Defaults to a fresh, empty one (see status.py)
+        progression (optional): Awards the player experience for defeating the enemy, after the loot is collected
+            (see progression.Progression). None for no experience
+    """
+
+    def __init__(self, player: Player, enemy: Enemy, enemy_policy: Policy = random_enemy_move,
+                 rng: Optional[random.Random] = None, max_turns: int = MAX_TURNS, sink: EventSink = NULL_SINK,
+                 seed: Optional[int] = None, recorder=None, statuses: Optional[StatusEffects] = None,
+                 progression=None):
+        """Initializes a new Battle that hasn't played any turns yet and announces it to the sink"""
+        self.player = player
+        self.enemy = enemy
+        self.enemy_policy = enemy_policy
+        if rng is None:
+            seed = seed if seed is not None else new_seed()
+            rng = random.Random(seed)
+        self.seed = seed # None when the caller supplied their own random stream
+        self.rng = rng
+        # Damage rolls use their own stream, split off the main one before any policy draws from it.
+        # That way a replay (which doesn't run the policies) still rolls exactly the same damage
+        self.combat_rng = random.Random(rng.getrandbits(64))
+        self.max_turns = max_turns
+        self.sink = sink
+        self.recorder = recorder
+        self.progression = progression
+        self.turn = 0
+        self.winner: Optional[str] = None
+        self.fled: Optional[str] = None
+        self.hp_per_turn: list = []
+        self.loot: Mapping = {}
+        self._guards: dict = {} # {side: defense bonus} of the combatants that defended and haven't acted since
+        self._statuses = statuses # Created on first use, so battles without statuses don't pay for them
+
+        if sink.enabled:
+            sink.emit(BattleStarted(player.name, enemy.name, player.health, enemy.health))
+        if recorder is not None:
+            recorder.start(self)
+
+    @property
+    def statuses(self) -> StatusEffects:
+        """The statuses of both combatants, ticked at the start of every turn"""
+        if self._statuses is None:
+            self._statuses = StatusEffects(self.sink, self.turn)
+        return self._statuses
+
+    @property
+    def finished(self) -> bool:
+        """True once either combatant is defeated or has fled, or the turn cap has been reached"""
+        return self.winner is not None or self.fled is not None or self.turn >= self.max_turns
+
+    def play_turn(self, player_action: str) -> TurnRecord:
+        """
+        Plays one full turn: the statuses due this turn (see status.py), the player's action, then (if still alive)
+        the enemy's action. A stunned combatant loses its action. Loot is collected when the enemy is defeated.
+
+        Args:
+            player_action (str): One of ACTIONS
+
+        Returns:
+            TurnRecord: A summary of the turn
+
+        Raises:
+            RuntimeError: If the battle is already finished
+            ValueError: If an action is not known to the engine
+        """
+        if self.finished:
+            raise RuntimeError("The battle is already finished.")
+
+        player, enemy, sink, recorder, statuses = self.player, self.enemy, self.sink, self.recorder, self._statuses
+
+        self.turn += 1
+        if sink.enabled:
+            sink.emit(TurnStarted(self.turn))
+        if statuses is not None:
+            statuses.advance(self.turn) # Poison and regeneration ticks, buffs wearing off
+
+        if player.is_defeated(): # Succumbed to a status before acting, even if the enemy succumbed too
+            self.winner = "enemy"
+        elif not enemy.is_defeated():
+            if statuses is not None and statuses.skips_action(player):
+                if sink.enabled:
+                    sink.emit(Stunned(player.name))
+            else:
+                if sink.enabled:
+                    sink.emit(ActionChosen("player", player.name, enemy.name, player_action))
+                if recorder is not None:
+                    recorder.action(player_action)
+                self._apply("player", player, enemy, player_action)
+        enemy_action = None
+
+        if enemy.is_defeated() and self.winner is None:
+            self.winner = "player"
+            if sink.enabled:
+                sink.emit(TurnEnded(self.turn, player.name, player.health, enemy.name, enemy.health))
+                sink.emit(BattleEnded(self.winner, player.name, enemy.name, self.turn))
+            self.loot = player.collect_loot(enemy, self.combat_rng)
+            if self.progression is not None:
+                self.progression.award_kill(player, enemy)
+        else:
+            if self.fled is None and self.winner is None:
+                if statuses is not None and statuses.skips_action(enemy):
+                    if sink.enabled:
+                        sink.emit(Stunned(enemy.name))
+                else:
+                    enemy_action = self.enemy_policy(enemy, player, self.rng)
+                    if sink.enabled:
+                        sink.emit(ActionChosen("enemy", enemy.name, player.name, enemy_action))
+                    if recorder is not None:
+                        recorder.action(enemy_action)
+                    self._apply("enemy", enemy, player, enemy_action)
+
+                if player.is_defeated():
+                    self.winner = "enemy"
+
+            if sink.enabled:
+                sink.emit(TurnEnded(self.turn, player.name, player.health, enemy.name, enemy.health))
+                if self.finished:
+                    sink.emit(BattleEnded(self.winner, player.name, enemy.name, self.turn))
+
+        self.hp_per_turn.append((player.health, enemy.health))
+        if self.finished:
+            self._drop_guard("player", player)
+            self._drop_guard("enemy", enemy)
+            if self._statuses is not None: # Buffs don't outlast the battle
+                self._statuses.clear(player)
+                self._statuses.clear(enemy)
+            if recorder is not None:
+                recorder.finish(self.result())
+        return TurnRecord(self.turn, player_action, enemy_action, player.health, enemy.health)
+
+    def result(self) -> BattleResult:
+        """
+        Returns:
+            BattleResult: The outcome of the battle so far
+        """
+        return BattleResult(self.winner, self.turn, self.hp_per_turn, self.loot, self.fled)
+
+    def _apply(self, side: str, actor, target, action: str) -> None:
+        """Executes 'action' for 'actor' (on 'side') against 'target'"""
+        self._drop_guard(side, actor) # A defend lasts until the combatant acts again
+
+        if action == ATTACK:
+            actor.attacks(target, self.combat_rng)
+        elif action == HEAL:
+            use_item(actor, POTION)
+        elif action == DEFEND:
+            actor.defense += DEFEND_BONUS
+            self._guards[side] = DEFEND_BONUS
+            if self.sink.enabled:
+                self.sink.emit(Defended(actor.name, actor.defense))
+        elif action == SPECIAL:
+            if not special_attack(actor, target, self.combat_rng) and self.sink.enabled:
+                self.sink.emit(SpecialMissed(actor.name, target.name))
+        elif action == FLEE:
+            escaped = self.combat_rng.random() < FLEE_CHANCE
+            if escaped:
+                self.fled = side
+            if self.sink.enabled:
+                self.sink.emit(FleeAttempted(actor.name, escaped))
+        else:
+            raise ValueError(f"Unknown action: {action!r}")
+
+    def _drop_guard(self, side: str, actor) -> None:
+        """Takes back the defense bonus of a previous defend"""
+        bonus = self._guards.pop(side, 0)
+        if bonus:
+            actor.defense -= bonus
+
+
+def run_battle(player: Player, enemy: Enemy, player_policy: Policy = always_attack,
+               enemy_policy: Policy = random_enemy_move, rng: Optional[random.Random] = None,
+               max_turns: int = MAX_TURNS, sink: EventSink = NULL_SINK,
+               on_turn_end: Optional[Callable[[TurnRecord], None]] = None,
+               seed: Optional[int] = None, recorder=None, statuses: Optional[StatusEffects] = None,
+               progression=None) -> BattleResult:
+    """
+    Runs a full battle to completion using a policy for each side.
+
+    The engine itself performs no I/O. Combatants created with sink=NULL_SINK keep the whole run silent.
+
+    Args:
+        player (Player): The player taking part in the battle
+        enemy (Enemy): The enemy taking part in the battle
+        player_policy (Policy, optional): Picks the player's action each turn
+        enemy_policy (Policy, optional): Picks the enemy's action each turn
+        rng (random.Random, optional): Random stream handed to both policies. If not given, one is created from 'seed'
+        max_turns (int, optional): The battle ends without a winner after this many turns
+        sink (EventSink, optional): Receives the battle's turn events. Defaults to discarding them
+        on_turn_end (callable, optional): Called with the TurnRecord after every turn
+        seed (int, optional): Seed of the battle's random stream when 'rng' isn't given
+        recorder (optional): Records the battle for replays (see replay.ReplayRecorder)
+        statuses (StatusEffects, optional): Statuses of the combatants (see status.py)
+        progression (optional): Awards the player experience for a win (see progression.Progression)
+
+    Returns:
+        BattleResult: Winner, turn count, per-turn health and loot
+    """
+    fight = Battle(player, enemy, enemy_policy, rng, max_turns, sink, seed, recorder, statuses, progression)
+
+    while not fight.finished:
+        record = fight.play_turn(player_policy(player, enemy, fight.rng))
+        if on_turn_end is not None:
+            on_turn_end(record)
+
+    return fight.result()
@@ -0,0 +1,521 @@
+import json
+from dataclasses import dataclass, fields
+from typing import IO, Callable, Optional, Protocol, Union
+"""
+events.py
+
+Structured combat events and the sinks that consume them.
+
+Player, Enemy and the battle engine describe what happens as typed events instead of printing.
+Where the events go is decided by a sink:
+- ConsoleSink renders the same text the game has always printed
+- NullSink is disabled, so events aren't even created (no formatting at all)
+- BufferedSink keeps the events in memory
+- JsonLinesSink writes them to a file as JSON lines, in batches
+
+Emitters always check 'sink.enabled' before building an event, so a disabled sink costs one attribute lookup.
+"""
+
+# ----- Events -----
+
+@dataclass(frozen=True, slots=True)
+class BattleStarted:
+    """A battle between 'player' and 'enemy' is starting"""
+    player: str
+    enemy: str
+    player_health: int
+    enemy_health: int
+
+
+@dataclass(frozen=True, slots=True)
+class TurnStarted:
+    """A new turn is starting"""
+    turn: int
+
+
+@dataclass(frozen=True, slots=True)
+class ActionChosen:
+    """'actor' ('side' is "player" or "enemy") chose 'action' against 'target'"""
+    side: str
+    actor: str
+    target: str
+    action: str
+
+
+@dataclass(frozen=True, slots=True)
+class AttackMade:
+    """'attacker' used 'attack_name' on 'target'"""
+    side: str
+    attacker: str
+    target: str
+    attack_name: str
+
+
+@dataclass(frozen=True, slots=True)
+class TargetAlreadyDefeated:
+    """'attacker' tried to attack a 'target' that is already defeated"""
+    side: str
+    attacker: str
+    target: str
+
+
+@dataclass(frozen=True, slots=True)
+class DamageDealt:
+    """'target' took 'amount' damage and is now at 'health'"""
+    side: str
+    target: str
+    amount: int
+    health: int
+
+
+@dataclass(frozen=True, slots=True)
+class Healed:
+    """'target' was healed by 'amount' and is now at 'health'"""
+    target: str
+    amount: int
+    health: int
+
+
+@dataclass(frozen=True, slots=True)
+class LootDropped:
+    """'source' was defeated and dropped 'items' (empty dict if it was still alive and dropped nothing)"""
+    source: str
+    items: dict
+    defeated: bool = True
+
+
+@dataclass(frozen=True, slots=True)
+class LootCollected:
+    """'collector' picked up the loot of 'source' (no loot if 'source' dropped nothing)"""
+    collector: str
+    source: str
+    found_loot: bool = True
+
+
+@dataclass(frozen=True, slots=True)
+class ItemAdded:
+    """'quantity' of 'item' was added to the inventory of 'owner'"""
+    owner: str
+    item: str
+    quantity: int
+
+
+@dataclass(frozen=True, slots=True)
+class LootOverflow:
+    """'collector' had no room for 'items' of the loot of 'source' (stack limits), they were left behind"""
+    collector: str
+    source: str
+    items: dict
+
+
+@dataclass(frozen=True, slots=True)
+class ExperienceGained:
+    """'actor' gained 'amount' experience and now has 'xp' in total"""
+    actor: str
+    amount: int
+    xp: int
+
+
+@dataclass(frozen=True, slots=True)
+class LevelUp:
+    """'actor' reached 'level' and now has 'max_health' maximum health"""
+    actor: str
+    level: int
+    max_health: int
+
+
+@dataclass(frozen=True, slots=True)
+class TurnEnded:
+    """End of a turn with the health of both combatants"""
+    turn: int
+    player: str
+    player_health: int
+    enemy: str
+    enemy_health: int
+
+
+@dataclass(frozen=True, slots=True)
+class BattleEnded:
+    """The battle is over. 'winner' is "player", "enemy" or None if the turn cap was reached"""
+    winner: Optional[str]
+    player: str
+    enemy: str
+    turns: int
+
+
+@dataclass(frozen=True, slots=True)
+class Defended:
+    """'actor' is bracing itself, its defense is raised to 'defense' until it acts again"""
+    actor: str
+    defense: int
+
+
+@dataclass(frozen=True, slots=True)
+class SpecialMissed:
+    """'actor' used its special attack on 'target' and missed"""
+    actor: str
+    target: str
+
+
+@dataclass(frozen=True, slots=True)
+class FleeAttempted:
+    """'actor' tried to run away from the battle, 'escaped' tells whether it worked"""
+    actor: str
+    escaped: bool
+
+
+@dataclass(frozen=True, slots=True)
+class CombatantDefeated:
+    """'name' on 'side' was defeated during a multi-combatant encounter and no longer acts or can be targeted"""
+    side: str
+    name: str
+
+
+@dataclass(frozen=True, slots=True)
+class EncounterEnded:
+    """A multi-combatant encounter is over. 'winner' is the side left standing, None if the action cap was reached"""
+    winner: Optional[str]
+    survivors: tuple
+    actions: int
+
+
+@dataclass(frozen=True, slots=True)
+class ItemUsed:
+    """'actor' used one 'item' (see effects.py), 'remaining' are left in its inventory"""
+    actor: str
+    item: str
+    remaining: int
+
+
+@dataclass(frozen=True, slots=True)
+class ItemUnavailable:
+    """'actor' tried to use 'item' but has none left, nothing happened"""
+    actor: str
+    item: str
+
+
+@dataclass(frozen=True, slots=True)
+class StatusApplied:
+    """'target' got a 'status' (see status.py) for 'turns' turns ('amount' per tick, or the stat change of a buff)"""
+    target: str
+    status: str
+    turns: int
+    amount: int
+
+
+@dataclass(frozen=True, slots=True)
+class StatusExpired:
+    """A 'status' of 'target' wore off"""
+    target: str
+    status: str
+
+
+@dataclass(frozen=True, slots=True)
+class Stunned:
+    """'actor' is stunned and loses its action"""
+    actor: str
+
+
+CombatEvent = Union[BattleStarted, TurnStarted, ActionChosen, AttackMade, TargetAlreadyDefeated, DamageDealt,
+                    Healed, LootDropped, LootCollected, ItemAdded, LootOverflow, ExperienceGained, LevelUp, TurnEnded, BattleEnded,
+                    Defended, SpecialMissed, FleeAttempted, CombatantDefeated, EncounterEnded, ItemUsed,
+                    ItemUnavailable, StatusApplied, StatusExpired, Stunned]
+
+
+def event_to_dict(event: CombatEvent) -> dict:
+    """
+    Converts an event into a plain dict, with the event's type name under the "event" key.
+
+    Args:
+        event (CombatEvent): The event to convert
+
+    Returns:
+        dict: The event's fields
+    """
+    data = {"event": type(event).__name__}
+    for event_field in fields(event):
+        data[event_field.name] = getattr(event, event_field.name)
+    return data
+
+
+# ----- Sinks -----
+
+class EventSink(Protocol):
+    """
+    A Protocol for anything that consumes combat events.
+
+    Any class that implements this interface must provide:
+    - An 'enabled' attribute. Emitters skip building events when it is False
+    - An "emit()" method that receives a single event
+    """
+    enabled: bool
+
+    def emit(self, event: CombatEvent) -> None:
+        """
+        Receives a single combat event.
+
+        Args:
+            event (CombatEvent): The event that happened
+        """
+        ...
+
+
+class NullSink:
+    """A sink that ignores everything. Because it is disabled, emitters never build events for it."""
+    enabled = False
+
+    def emit(self, event: CombatEvent) -> None:
+        pass
+
+
+class BufferedSink:
+    """
+    A sink that collects events in memory (useful for tests and for post-processing a battle).
+    """
+    enabled = True
+
+    def __init__(self):
+        """Initializes an empty buffer"""
+        self.events: list = []
+
+    def emit(self, event: CombatEvent) -> None:
+        self.events.append(event)
+
+    def clear(self) -> None:
+        """Empties the buffer"""
+        self.events.clear()
+
+
+class JsonLinesSink:
+    """
+    A sink that writes events to a file as JSON lines.
+    Events are buffered and written 'batch_size' at a time to keep the number of writes low.
+
+    Args:
+        target (str | file): The path of the file to write, or an already opened text file
+        batch_size (int, optional): How many events are buffered before they are written
+    """
+    enabled = True
+
+    def __init__(self, target: Union[str, IO[str]], batch_size: int = 1000):
+        """Initializes the sink and opens the target file if a path was given"""
+        if isinstance(target, str):
+            self._file = open(target, "w", encoding="utf-8")
+            self._owns_file = True
+        else:
+            self._file = target
+            self._owns_file = False
+        self.batch_size = batch_size
+        self._pending: list = []
+
+    def emit(self, event: CombatEvent) -> None:
+        self._pending.append(event)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes every buffered event to the file"""
+        if self._pending:
+            self._file.write("".join(json.dumps(event_to_dict(event)) + "\n" for event in self._pending))
+            self._pending.clear()
+        self._file.flush()
+
+    def close(self) -> None:
+        """Flushes the remaining events and closes the file (if the sink opened it)"""
+        self.flush()
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self) -> "JsonLinesSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# Renderers that turn each event into the text the game has always printed
+def _render_battle_started(event: BattleStarted) -> str:
+    return (f"-------------------------\nInitiating battle...\n"
+            f"{event.player}'s Health: {event.player_health} \n{event.enemy}'s Health: {event.enemy_health}\n"
+            f"--- Battle Begins! ---")
+
+
+def _render_action_chosen(event: ActionChosen) -> Optional[str]:
+    if event.side == "enemy":
+        if event.action in ("attack", "special"):
+            return f"{event.actor} chose to {event.action} {event.target}"
+        return f"{event.actor} chose to {event.action}"
+    if event.action == "heal":
+        return f"{event.actor} used Potion to heal."
+    return None
+
+
+def _render_attack_made(event: AttackMade) -> str:
+    if event.side == "player":
+        return f"{event.attacker} used {event.attack_name} on {event.target}\n"
+    return f"--- {event.attacker} attacks back with {event.attack_name} to {event.target}! ---\n"
+
+
+def _render_target_already_defeated(event: TargetAlreadyDefeated) -> str:
+    if event.side == "player":
+        return f"--- Stop it {event.target} is already dead! ---\n"
+    return f"{event.target} is already defeated!"
+
+
+def _render_damage_dealt(event: DamageDealt) -> str:
+    if event.side == "player":
+        return f"--- {event.target} TOOK DAMAGE! ---\n{event.target}'s health is now: {event.health}\n"
+    return f"--- {event.target} TOOK DAMAGE! ---\n{event.target}'s new health: {event.health}\n"
+
+
+def _render_healed(event: Healed) -> str:
+    return f"--- {event.target} HEALED ---\n{event.target} health: {event.health} \n"
+
+
+def _render_loot_dropped(event: LootDropped) -> str:
+    if not event.defeated:
+        return f"{event.source} is still alive! No loot to drop.\n"
+    return f"--- {event.source} DEFEATED! ---\nDropped Items: {event.items}\n"
+
+
+def _render_loot_collected(event: LootCollected) -> str:
+    if not event.found_loot:
+        return "No dropped loot to collect."
+    return f"{event.collector} collected loot from {event.source}.\n"
+
+
+def _render_item_added(event: ItemAdded) -> str:
+    return f"{event.item} x{event.quantity} added to {event.owner}'s inventory.\n"
+
+
+def _render_loot_overflow(event: LootOverflow) -> str:
+    return f"{event.collector} can't carry any more, left behind: {event.items}\n"
+
+
+def _render_experience_gained(event: ExperienceGained) -> str:
+    return f"{event.actor} gained {event.amount} XP."
+
+
+def _render_level_up(event: LevelUp) -> str:
+    return f"{event.actor} reached level {event.level}! ({event.max_health} max HP)\n"
+
+
+def _render_turn_ended(event: TurnEnded) -> Optional[str]:
+    if event.enemy_health <= 0: # The enemy didn't act, the victory message follows instead
+        return None
+    text = f"***** {event.player}: {event.player_health}HP | {event.enemy}: {event.enemy_health}HP *****\n"
+    if event.player_health > 0: # Divider before the next turn (shown here so it comes before the player's prompt)
+        text += "\n--- NEW TURN ---"
+    return text
+
+
+def _render_battle_ended(event: BattleEnded) -> Optional[str]:
+    if event.winner == "player":
+        return f"--- VICTORY! ---\n{event.player} has defeated {event.enemy}!"
+    if event.winner == "enemy":
+        return "--- YOU DIED, GAME OVER! ---"
+    return None
+
+
+def _render_defended(event: Defended) -> str:
+    return f"--- {event.actor} BRACES ITSELF! ---\n{event.actor}'s defense is now: {event.defense}\n"
+
+
+def _render_special_missed(event: SpecialMissed) -> str:
+    return f"--- {event.actor}'s special attack missed {event.target}! ---\n"
+
+
+def _render_flee_attempted(event: FleeAttempted) -> str:
+    if event.escaped:
+        return f"--- {event.actor} FLED THE BATTLE! ---"
+    return f"{event.actor} tried to flee but couldn't escape!\n"
+
+
+def _render_combatant_defeated(event: CombatantDefeated) -> str:
+    return f"{event.name} has fallen!"
+
+
+def _render_encounter_ended(event: EncounterEnded) -> Optional[str]:
+    if event.winner == "party":
+        return f"--- VICTORY! ---\nStill standing: {', '.join(event.survivors)}"
+    if event.winner == "pack":
+        return "--- YOUR PARTY WAS DEFEATED, GAME OVER! ---"
+    return None
+
+
+def _render_item_unavailable(event: ItemUnavailable) -> str:
+    return f"{event.actor} has no {event.item} left!\n"
+
+
+_STATUS_TEXT: dict = {"poison": "is POISONED", "regen": "is REGENERATING", "stun": "is STUNNED",
+                      "attack_up": "feels STRONGER", "defense_up": "feels TOUGHER"}
+
+
+def _render_status_applied(event: StatusApplied) -> str:
+    if event.status in ("attack_up", "defense_up") and event.amount < 0:
+        text = "feels WEAKER" if event.status == "attack_up" else "feels EXPOSED"
+    else:
+        text = _STATUS_TEXT.get(event.status, f"is affected by {event.status}")
+    unit = "action" if event.status == "stun" else "turn"
+    return f"--- {event.target} {text}! ({event.turns} {unit}{'s' if event.turns != 1 else ''}) ---"
+
+
+def _render_status_expired(event: StatusExpired) -> str:
+    return f"{event.target}'s {event.status.replace('_', ' ')} wore off."
+
+
+def _render_stunned(event: Stunned) -> str:
+    return f"--- {event.actor} is stunned and can't act! ---\n"
+
+
+_RENDERERS: dict = {
+    BattleStarted: _render_battle_started,
+    TurnStarted: lambda event: None,
+    ActionChosen: _render_action_chosen,
+    AttackMade: _render_attack_made,
+    TargetAlreadyDefeated: _render_target_already_defeated,
+    DamageDealt: _render_damage_dealt,
+    Healed: _render_healed,
+    LootDropped: _render_loot_dropped,
+    LootCollected: _render_loot_collected,
+    ItemAdded: _render_item_added,
+    LootOverflow: _render_loot_overflow,
+    ExperienceGained: _render_experience_gained,
+    LevelUp: _render_level_up,
+    TurnEnded: _render_turn_ended,
+    BattleEnded: _render_battle_ended,
+    Defended: _render_defended,
+    SpecialMissed: _render_special_missed,
+    FleeAttempted: _render_flee_attempted,
+    CombatantDefeated: _render_combatant_defeated,
+    EncounterEnded: _render_encounter_ended,
+    ItemUsed: lambda event: None, # The chosen action or the item's effect already tells the story
+    ItemUnavailable: _render_item_unavailable,
+    StatusApplied: _render_status_applied,
+    StatusExpired: _render_status_expired,
+    Stunned: _render_stunned,
+}
+
+
+class ConsoleSink:
+    """
+    A sink that prints every event as the text the game has always shown.
+
+    Args:
+        write (callable, optional): Function used to output each rendered line. Defaults to print
+    """
+    enabled = True
+
+    def __init__(self, write: Callable[[str], None] = print):
+        """Initializes the sink with the function used to output text"""
+        self._write = write
+
+    def emit(self, event: CombatEvent) -> None:
+        text = _RENDERERS[type(event)](event)
+        if text is not None:
+            self._write(text)
+
+
+# Shared default sinks
+CONSOLE = ConsoleSink()
+NULL_SINK = NullSink()
@@ -0,0 +1,270 @@
+import functools
+import importlib
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional, Union
+"""
+instrument.py
+
+Opt-in instrumentation of the battle hot paths: call counters, latency histograms and a flame graph.
+
+Nothing is instrumented until enable() is called. It replaces the instrumented methods on their classes with timing
+wrappers, and disable() puts the originals back, so while instrumentation is off the game runs the exact same code
+as without this module (no flag is checked on every call).
+
+Two kinds of things are timed:
+- operations: Player.attacks, Enemy.attacks, take_damage, heal and Enemy.drop_loot
+- phases of a battle: the whole turn, the player's action, the enemy's action and the loot resolution (collect_loot)
+
+Each gets a counter, total/max time and a log2 histogram of its latencies (bucket n holds calls that took
+[2^(n-1), 2^n) nanoseconds). Calls are also tracked as a stack, so the time spent in each call chain can be exported
+in the folded format read by flamegraph.pl and speedscope ("turn;player_action;Player.attacks 1234").
+
+    with instrumented() as stats:
+        run_battle(player, enemy)
+    print(stats.report())
+    stats.write_folded("battle.folded")
+
+Or from the command line: python instrument.py --battles 1000 --folded battle.folded
+"""
+
+OPERATION = "operation"
+PHASE = "phase"
+BUCKETS = 64 # Histogram buckets, enough for any latency in nanoseconds
+
+# What gets instrumented: (module, class, method, kind, name). A callable name picks the name from the call's arguments
+TARGETS: tuple = (
+    ("player", "Player", "attacks", OPERATION, "Player.attacks"),
+    ("player", "Player", "take_damage", OPERATION, "Player.take_damage"),
+    ("player", "Player", "heal", OPERATION, "Player.heal"),
+    ("player", "Player", "collect_loot", PHASE, "loot"),
+    ("enemy", "Enemy", "attacks", OPERATION, "Enemy.attacks"),
+    ("enemy", "Enemy", "take_damage", OPERATION, "Enemy.take_damage"),
+    ("enemy", "Enemy", "heal", OPERATION, "Enemy.heal"),
+    ("enemy", "Enemy", "drop_loot", OPERATION, "Enemy.drop_loot"),
+    ("engine", "Battle", "play_turn", PHASE, "turn"),
+    ("engine", "Battle", "_apply", PHASE, lambda args: f"{args[1]}_action"), # _apply(self, side, ...)
+)
+
+
+@dataclass(slots=True)
+class Timing:
+    """
+    Latency statistics of one operation or phase.
+
+    Args:
+        name (str): What was timed
+        calls (int): How many times it ran
+        total_ns (int): Time spent in it, nested calls included
+        self_ns (int): Time spent in it, minus the instrumented calls it made
+        max_ns (int): Slowest call
+        histogram (list): Calls per log2 latency bucket
+    """
+    name: str
+    calls: int = 0
+    total_ns: int = 0
+    self_ns: int = 0
+    max_ns: int = 0
+    histogram: list = field(default_factory=lambda: [0] * BUCKETS)
+
+    @property
+    def mean_ns(self) -> float:
+        """Mean latency"""
+        return self.total_ns / self.calls if self.calls else 0.0
+
+    def quantile(self, q: float) -> int:
+        """
+        Approximate latency quantile from the histogram.
+
+        Args:
+            q (float): The quantile, between 0 and 1
+
+        Returns:
+            int: Upper bound of the bucket holding the quantile, in nanoseconds (0 if nothing was timed)
+        """
+        if not self.calls:
+            return 0
+        rank = q * self.calls
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= rank:
+                return min(1 << bucket, self.max_ns)
+        return self.max_ns
+
+
+class Instrumentation:
+    """Collects the timings of the instrumented calls"""
+
+    def __init__(self):
+        """Initializes empty statistics"""
+        self.timings: dict = {OPERATION: {}, PHASE: {}} # {kind: {name: Timing}}
+        self.stacks: Counter = Counter() # {call chain (tuple of names): self time in ns}
+        self._names: list = [] # Names of the instrumented calls in progress, outermost first
+        self._children: list = [] # Time spent in nested instrumented calls, one slot per call in progress
+
+    def reset(self) -> None:
+        """Forgets everything recorded so far (the wrappers keep recording into this instance)"""
+        for timings in self.timings.values():
+            timings.clear()
+        self.stacks.clear()
+
+    def _record(self, kind: str, name: str, elapsed: int, own: int) -> None:
+        timing = self.timings[kind].get(name)
+        if timing is None:
+            timing = self.timings[kind][name] = Timing(name)
+        timing.calls += 1
+        timing.total_ns += elapsed
+        timing.self_ns += own
+        if elapsed > timing.max_ns:
+            timing.max_ns = elapsed
+        timing.histogram[min(elapsed.bit_length(), BUCKETS - 1)] += 1
+        self.stacks[tuple(self._names)] += own
+
+    def timed(self, kind: str, name: Union[str, Callable], function: Callable) -> Callable:
+        """
+        Wraps a function so its calls are recorded.
+
+        Args:
+            kind (str): OPERATION or PHASE
+            name (str | callable): The name it's recorded under, or a function of the call's arguments returning it
+            function (callable): The function to time
+
+        Returns:
+            callable: The timing wrapper
+        """
+        names, children, record, clock = self._names, self._children, self._record, time.perf_counter_ns
+        fixed = name if isinstance(name, str) else None
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            names.append(fixed or name(args))
+            children.append(0)
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                own = elapsed - children.pop()
+                record(kind, names[-1], elapsed, own)
+                names.pop()
+                if children:
+                    children[-1] += elapsed
+        return wrapper
+
+    # ----- Output -----
+
+    def report(self) -> str:
+        """
+        Returns:
+            str: A table of every phase and operation (calls, total, mean, p50, p99 and max latency)
+        """
+        lines = []
+        for kind, title in ((PHASE, "Phases"), (OPERATION, "Operations")):
+            timings = sorted(self.timings[kind].values(), key=lambda timing: timing.total_ns, reverse=True)
+            if not timings:
+                continue
+            lines.append(f"{title:<20} {'calls':>9} {'total ms':>10} {'mean us':>9} {'p50 us':>9} "
+                         f"{'p99 us':>9} {'max us':>9}")
+            for timing in timings:
+                lines.append(f"{timing.name:<20} {timing.calls:>9} {timing.total_ns / 1e6:>10.2f} "
+                             f"{timing.mean_ns / 1e3:>9.2f} {timing.quantile(0.5) / 1e3:>9.2f} "
+                             f"{timing.quantile(0.99) / 1e3:>9.2f} {timing.max_ns / 1e3:>9.2f}")
+            lines.append("")
+        return "\n".join(lines) if lines else "Nothing was recorded."
+
+    def folded(self) -> Iterator[str]:
+        """
+        Yields the recorded call chains in the folded stack format (flamegraph.pl, speedscope, inferno),
+        weighted by their self time in nanoseconds.
+        """
+        for stack, nanoseconds in sorted(self.stacks.items()):
+            yield f"{';'.join(stack)} {nanoseconds}"
+
+    def write_folded(self, path: str) -> None:
+        """Writes the folded stacks to a file"""
+        with open(path, "w", encoding="utf-8") as file:
+            for line in self.folded():
+                file.write(line + "\n")
+
+
+_originals: dict = {} # {(class, method name): original function} while instrumentation is on
+_active: Optional[Instrumentation] = None
+
+
+def enabled() -> bool:
+    """True while instrumentation is on"""
+    return _active is not None
+
+
+def enable(instrumentation: Optional[Instrumentation] = None) -> Instrumentation:
+    """
+    Turns instrumentation on by wrapping every target in TARGETS.
+
+    Args:
+        instrumentation (Instrumentation, optional): Where the timings go, a fresh one by default
+
+    Returns:
+        Instrumentation: The instrumentation in use
+
+    Raises:
+        RuntimeError: If instrumentation is already on
+    """
+    global _active
+    if _active is not None:
+        raise RuntimeError("Instrumentation is already enabled.")
+    _active = instrumentation if instrumentation is not None else Instrumentation()
+    for module, class_name, method, kind, name in TARGETS:
+        cls = getattr(importlib.import_module(module), class_name)
+        original = cls.__dict__[method]
+        _originals[cls, method] = original
+        setattr(cls, method, _active.timed(kind, name, original))
+    return _active
+
+
+def disable() -> Optional[Instrumentation]:
+    """
+    Turns instrumentation off, putting the original methods back.
+
+    Returns:
+        Instrumentation | None: The instrumentation that was in use (None if it was off)
+    """
+    global _active
+    for (cls, method), original in _originals.items():
+        setattr(cls, method, original)
+    _originals.clear()
+    active, _active = _active, None
+    return active
+
+
+@contextmanager
+def instrumented(instrumentation: Optional[Instrumentation] = None) -> Iterator[Instrumentation]:
+    """Context manager that turns instrumentation on for the duration of a block"""
+    active = enable(instrumentation)
+    try:
+        yield active
+    finally:
+        disable()
+
+
+if __name__ == "__main__":
+    import argparse
+    from engine import HealBelow, run_battle
+    from player import Player
+    from enemy import Enemy
+    from simulate import DEFAULT_ENEMY, DEFAULT_PLAYER, build_combatant
+
+    parser = argparse.ArgumentParser(description="Profile the battle hot paths.")
+    parser.add_argument("--battles", type=int, default=1000, help="battles to run")
+    parser.add_argument("--folded", help="write the folded stacks (for a flame graph) to this file")
+    args = parser.parse_args()
+
+    with instrumented() as stats:
+        for seed in range(args.battles):
+            run_battle(build_combatant(Player, DEFAULT_PLAYER), build_combatant(Enemy, DEFAULT_ENEMY), HealBelow(30),
+                       seed=seed)
+    print(stats.report())
+    if args.folded:
+        stats.write_folded(args.folded)
@@ -0,0 +1,311 @@
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Iterator, Optional, Union
+"""
+items.py
+
+The item registry and the inventory used by Player and Enemy.
+
+Every item name is interned once into a small integer ID with metadata (stack limit, weight, value).
+Inventories count items by ID, and hand out read-only views (InventoryView) instead of copies.
+Views still behave like a dict of display names to quantities, ex: player.inventory["Potion"].
+"""
+
+DEFAULT_STACK_LIMIT = 999
+
+
+@dataclass(frozen=True, slots=True)
+class ItemInfo:
+    """
+    Metadata of a registered item.
+
+    Args:
+        id (int): The item's interned ID
+        name (str): The item's display name
+        stack_limit (int): Maximum quantity of the item a single inventory can hold
+        weight (float): Weight of one item
+        value (int): Value of one item in gold
+    """
+    id: int
+    name: str
+    stack_limit: int = DEFAULT_STACK_LIMIT
+    weight: float = 0.0
+    value: int = 0
+
+
+class ItemRegistry:
+    """
+    Maps item names to interned integer IDs and their metadata.
+    Unknown names are registered on first use with default metadata, so any name can go into an inventory.
+    """
+
+    def __init__(self):
+        """Initializes an empty registry"""
+        self._items: list = [] # ID -> ItemInfo
+        self._ids: dict = {} # name -> ID
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def register(self, name: str, stack_limit: int = DEFAULT_STACK_LIMIT, weight: float = 0.0, value: int = 0) -> ItemInfo:
+        """
+        Registers an item (or replaces the metadata of an already registered one, keeping its ID).
+
+        Args:
+            name (str): The item's display name
+            stack_limit (int, optional): Maximum quantity per inventory
+            weight (float, optional): Weight of one item
+            value (int, optional): Value of one item
+
+        Returns:
+            ItemInfo: The item's metadata
+        """
+        item_id = self._ids.get(name)
+        if item_id is None:
+            item_id = len(self._items)
+            name = sys.intern(name)
+            self._ids[name] = item_id
+            self._items.append(None)
+
+        info = ItemInfo(item_id, name, stack_limit, weight, value)
+        self._items[item_id] = info
+        return info
+
+    def id_of(self, name: str) -> int:
+        """
+        Returns:
+            int: The ID of item 'name', registering it first if needed
+        """
+        item_id = self._ids.get(name)
+        if item_id is None:
+            item_id = self.register(name).id
+        return item_id
+
+    def find(self, name: str) -> Optional[int]:
+        """
+        Returns:
+            int | None: The ID of item 'name', or None if it was never registered
+        """
+        return self._ids.get(name)
+
+    def info(self, item_id: int) -> ItemInfo:
+        """
+        Returns:
+            ItemInfo: The metadata of item 'item_id'
+        """
+        return self._items[item_id]
+
+    def name_of(self, item_id: int) -> str:
+        """
+        Returns:
+            str: The display name of item 'item_id'
+        """
+        return self._items[item_id].name
+
+
+# The registry shared by every inventory
+REGISTRY = ItemRegistry()
+POTION = REGISTRY.register("Potion", stack_limit=99, weight=0.5, value=25).id
+GOLD_COIN = REGISTRY.register("Gold Coin", stack_limit=999_999, weight=0.01, value=1).id
+
+ItemKey = Union[int, str] # An item can be referred to by ID or by name
+
+
+class InventoryView(Mapping):
+    """
+    A live, read-only view of an Inventory as {item name: quantity}. Nothing is copied when it is created.
+    """
+    __slots__ = ("_inventory",)
+
+    def __init__(self, inventory: "Inventory"):
+        """Initializes the view"""
+        self._inventory = inventory
+
+    def __getitem__(self, name: str) -> int:
+        item_id = self._inventory.registry.find(name)
+        if item_id is None or item_id not in self._inventory.counts:
+            raise KeyError(name)
+        return self._inventory.counts[item_id]
+
+    def __iter__(self) -> Iterator[str]:
+        name_of = self._inventory.registry.name_of
+        return (name_of(item_id) for item_id in self._inventory.counts)
+
+    def __len__(self) -> int:
+        return len(self._inventory.counts)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    @property
+    def source(self) -> "Inventory":
+        """The inventory this view looks at"""
+        return self._inventory
+
+
+class Inventory:
+    """
+    A compact item counter keyed by item ID.
+
+    Args:
+        items (mapping, optional): Initial contents, {item name or ID: quantity}
+        registry (ItemRegistry, optional): Registry used to resolve names. Defaults to the shared REGISTRY
+    """
+    __slots__ = ("counts", "registry", "_view")
+
+    def __init__(self, items: Optional[Mapping] = None, registry: ItemRegistry = REGISTRY):
+        """Initializes the inventory with its starting items"""
+        self.counts: dict = {}
+        self.registry = registry
+        self._view: Optional[InventoryView] = None
+        if items:
+            self.add_many(items)
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _id(self, item: ItemKey) -> int:
+        return item if isinstance(item, int) else self.registry.id_of(item)
+
+    def view(self) -> InventoryView:
+        """
+        Returns:
+            InventoryView: A live read-only {name: quantity} view of this inventory
+        """
+        if self._view is None:
+            self._view = InventoryView(self)
+        return self._view
+
+    def count(self, item: ItemKey) -> int:
+        """
+        Returns:
+            int: How many of 'item' the inventory holds
+        """
+        return self.counts.get(self._id(item), 0)
+
+    def add(self, item: ItemKey, quantity: int = 1) -> int:
+        """
+        Adds 'quantity' of an item, up to the item's stack limit.
+
+        Args:
+            item (int | str): The item's ID or name
+            quantity (int, optional): How many to add
+
+        Returns:
+            int: How many were actually added (less than 'quantity' if the stack limit was reached)
+        """
+        item_id = self._id(item)
+        current = self.counts.get(item_id, 0)
+        added = min(quantity, self.registry.info(item_id).stack_limit - current)
+        if added > 0:
+            self.counts[item_id] = current + added
+        return max(added, 0)
+
+    def remove(self, item: ItemKey, quantity: int = 1) -> None:
+        """
+        Removes 'quantity' of an item.
+
+        Raises:
+            ValueError: If the quantity isn't positive, or the inventory doesn't hold enough of the item (nothing is
+                removed)
+        """
+        if quantity < 1:
+            raise ValueError(f"Can't remove {quantity} of an item")
+        item_id = self._id(item)
+        current = self.counts.get(item_id, 0)
+        if current < quantity:
+            raise ValueError(f"Not enough {self.registry.name_of(item_id)}: have {current}, need {quantity}")
+
+        if current == quantity:
+            del self.counts[item_id]
+        else:
+            self.counts[item_id] = current - quantity
+
+    def consume(self, item_id: int, quantity: int = 1) -> bool:
+        """
+        Takes 'quantity' of an item if the inventory holds enough, in a single check-and-decrement.
+
+        Args:
+            item_id (int): The item's ID
+            quantity (int, optional): How many to take
+
+        Returns:
+            bool: True if they were taken, False if there weren't enough (nothing is taken)
+        """
+        counts = self.counts
+        current = counts.get(item_id, 0)
+        if current < quantity:
+            return False
+        if current == quantity:
+            del counts[item_id]
+        else:
+            counts[item_id] = current - quantity
+        return True
+
+    def add_many(self, items: Mapping) -> dict:
+        """
+        Merges many items at once. Views of other inventories are merged straight from their ID counters.
+
+        Args:
+            items (mapping): {item name or ID: quantity}, or an InventoryView
+
+        Returns:
+            dict: {item ID: quantity} of whatever didn't fit because of stack limits (usually empty)
+        """
+        if isinstance(items, InventoryView) and items.source.registry is self.registry:
+            items = items.source.counts # Already keyed by ID, no name lookups needed
+
+        overflow = {}
+        for item, quantity in items.items():
+            added = self.add(item, quantity)
+            if added < quantity:
+                overflow[self._id(item)] = quantity - added
+        return overflow
+
+    def remove_many(self, items: Mapping) -> None:
+        """
+        Removes many items at once. Either everything is removed or nothing is.
+
+        Args:
+            items (mapping): {item name or ID: quantity}
+
+        Raises:
+            ValueError: If any quantity isn't positive or any item isn't held in the requested quantity
+        """
+        wanted = {self._id(item): quantity for item, quantity in items.items()}
+        for item_id, quantity in wanted.items():
+            if quantity < 1:
+                raise ValueError(f"Can't remove {quantity} of an item")
+            if self.counts.get(item_id, 0) < quantity:
+                raise ValueError(f"Not enough {self.registry.name_of(item_id)}: "
+                                 f"have {self.counts.get(item_id, 0)}, need {quantity}")
+        for item_id, quantity in wanted.items():
+            self.remove(item_id, quantity)
+
+    def take_all(self) -> "Inventory":
+        """
+        Empties this inventory and returns its former contents, without copying anything.
+
+        Returns:
+            Inventory: A new inventory holding everything this one had
+        """
+        taken = Inventory(registry=self.registry)
+        taken.counts, self.counts = self.counts, {}
+        return taken
+
+    def total_weight(self) -> float:
+        """
+        Returns:
+            float: The combined weight of every item
+        """
+        info = self.registry.info
+        return sum(info(item_id).weight * quantity for item_id, quantity in self.counts.items())
+
+    def total_value(self) -> int:
+        """
+        Returns:
+            int: The combined value of every item
+        """
+        info = self.registry.info
+        return sum(info(item_id).value * quantity for item_id, quantity in self.counts.items())
@@ -0,0 +1,255 @@
+import random
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional, it only speeds up batch sampling
+    np = None
+"""
+loot.py
+
+Loot tables: weighted drops with rarity tiers, nested tables and guaranteed drops.
+
+A table is a list of entries, each an item (with a quantity range) or another table, plus an empty "nothing" entry
+if the weights say so. Every roll picks one entry in O(1), whatever the size of the table, with a Walker alias table
+built once when the table is created (Vose's construction): the entries are spread over n equally likely columns,
+each holding at most two entries, so a roll is one random number, one column and one comparison.
+
+    goblin_loot = LootTable("goblin", [
+        Drop("Gold Coin", quantity=(1, 5)),                 # common
+        Drop("Potion", rarity="uncommon"),
+        Drop(table=GEMS, rarity="rare"),                    # nested table
+        Drop(None, weight=50),                              # nothing
+    ], guaranteed={"Goblin Ear": 1})
+    goblin_loot.roll(rng)                       # {"Goblin Ear": 1, "Gold Coin": 3}
+    goblin_loot.sample_counts(1_000_000)        # Aggregated items of a million kills
+
+Enemies roll their table when they drop their loot (Enemy(..., loot_table=...)). Tables registered with register()
+can be named in archetypes (content.py), ex: loot_table="goblin".
+"""
+
+# Weight of each rarity tier, for entries that don't give their own weight
+RARITIES: dict = {"common": 100, "uncommon": 40, "rare": 10, "epic": 3, "legendary": 1}
+
+_BATCH_CHUNK = 1_000_000 # Draws per chunk when summing quantities in batch sampling
+
+
+class AliasTable:
+    """
+    Walker alias table for O(1) sampling from a fixed discrete distribution.
+
+    Args:
+        weights (sequence): Non-negative weight of each outcome, at least one of them positive
+
+    Raises:
+        ValueError: If there are no weights, a negative one, or they are all zero
+    """
+
+    def __init__(self, weights: Sequence[float]):
+        """Builds the table with Vose's algorithm, O(n)"""
+        count = len(weights)
+        total = float(sum(weights))
+        if not count or total <= 0 or min(weights) < 0:
+            raise ValueError("An alias table needs non-negative weights with a positive total")
+
+        scaled = [weight * count / total for weight in weights]
+        self.probability = [1.0] * count # Chance of keeping column i's own outcome
+        self.alias = list(range(count)) # The other outcome of column i
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1.0 up to rounding errors, those columns keep their own outcome
+        self.weights = tuple(weights)
+
+    def __len__(self) -> int:
+        return len(self.probability)
+
+    def sample(self, rng: random.Random) -> int:
+        """Draws an outcome index with one random number"""
+        position = rng.random() * len(self.probability)
+        column = int(position)
+        return column if position - column < self.probability[column] else self.alias[column]
+
+
+@dataclass(frozen=True, slots=True)
+class Drop:
+    """
+    One entry of a loot table.
+
+    Args:
+        item (str | None): The dropped item, None for a "nothing" entry (or when 'table' is given)
+        weight (float, optional): Relative chance of the entry, defaults to the weight of its rarity tier
+        rarity (str, optional): A key of RARITIES
+        quantity (int | tuple, optional): How many are dropped, or an inclusive (min, max) range
+        table (LootTable, optional): A nested table rolled when this entry is picked
+    """
+    item: Optional[str] = None
+    weight: Optional[float] = None
+    rarity: str = "common"
+    quantity: Union[int, tuple] = 1
+    table: Optional["LootTable"] = None
+
+    @property
+    def chance_weight(self) -> float:
+        """The entry's weight, from its rarity tier when it doesn't give one"""
+        return self.weight if self.weight is not None else RARITIES[self.rarity]
+
+    @property
+    def quantity_range(self) -> tuple:
+        """(min, max) dropped, inclusive"""
+        return self.quantity if isinstance(self.quantity, tuple) else (self.quantity, self.quantity)
+
+
+class LootTable:
+    """
+    A weighted loot table.
+
+    Args:
+        name (str): The table's name
+        entries (sequence): The Drop entries, one of them is picked per roll
+        rolls (int, optional): Entries picked per kill
+        guaranteed (dict, optional): {item: quantity} dropped on every kill
+
+    Raises:
+        ValueError: If an entry has an unknown rarity, a bad quantity range, the weights don't add up to anything,
+            or 'rolls' is negative
+    """
+
+    def __init__(self, name: str, entries: Sequence[Drop], rolls: int = 1, guaranteed: Optional[dict] = None):
+        """Validates the entries and builds the alias table"""
+        if rolls < 0:
+            raise ValueError(f"Loot table {name!r} can't roll {rolls} times")
+        for entry in entries:
+            if entry.weight is None and entry.rarity not in RARITIES:
+                raise ValueError(f"Unknown rarity in loot table {name!r}: {entry.rarity!r}")
+            low, high = entry.quantity_range
+            if low < 0 or high < low:
+                raise ValueError(f"Bad quantity in loot table {name!r}: {entry.quantity!r}")
+        self.name = name
+        self.entries = tuple(entries)
+        self.rolls = rolls
+        self.guaranteed = dict(guaranteed or {})
+        self.alias = AliasTable([entry.chance_weight for entry in self.entries])
+
+    def __repr__(self) -> str:
+        return f"LootTable({self.name!r}, {len(self.entries)} entries)"
+
+    def chances(self) -> dict:
+        """
+        Returns:
+            dict: {entry index: chance of being picked by one roll}
+        """
+        total = sum(self.alias.weights)
+        return {index: weight / total for index, weight in enumerate(self.alias.weights)}
+
+    def roll(self, rng: Optional[random.Random] = None, into: Optional[Counter] = None) -> Counter:
+        """
+        Rolls the loot of one kill.
+
+        Args:
+            rng (random.Random, optional): Random stream, defaults to the random module's
+            into (Counter, optional): Adds the loot to this counter instead of a new one
+
+        Returns:
+            Counter: {item: quantity} dropped
+        """
+        rng = rng if rng is not None else random
+        loot = into if into is not None else Counter()
+        for item, quantity in self.guaranteed.items():
+            loot[item] += quantity
+        entries, sample = self.entries, self.alias.sample
+        for _ in range(self.rolls):
+            entry = entries[sample(rng)]
+            if entry.table is not None:
+                entry.table.roll(rng, loot)
+            elif entry.item is not None:
+                low, high = entry.quantity_range
+                loot[entry.item] += low if low == high else rng.randint(low, high)
+        return loot
+
+    def sample_counts(self, kills: int, seed: Optional[int] = None) -> Counter:
+        """
+        Rolls the loot of many kills at once and adds it all up, for economy simulations.
+
+        With NumPy, the number of times each entry is picked over all the kills is drawn in one go (a multinomial
+        draw, the same distribution as rolling every kill) and only the quantities are drawn per pick, so a
+        million kills take milliseconds. Without NumPy every kill is rolled through the alias table.
+
+        Args:
+            kills (int): Number of kills
+            seed (int, optional): Seed of the random stream
+
+        Returns:
+            Counter: {item: total quantity dropped}
+        """
+        if np is None:
+            rng = random.Random(seed)
+            loot: Counter = Counter()
+            for _ in range(kills):
+                self.roll(rng, loot)
+            return loot
+        return self._sample_counts(kills, np.random.default_rng(seed))
+
+    def _sample_counts(self, kills: int, generator) -> Counter:
+        loot: Counter = Counter()
+        for item, quantity in self.guaranteed.items():
+            loot[item] += quantity * kills
+        total = sum(self.alias.weights)
+        picks = generator.multinomial(kills * self.rolls, [weight / total for weight in self.alias.weights])
+        for entry, count in zip(self.entries, picks.tolist()):
+            if not count:
+                continue
+            if entry.table is not None:
+                loot.update(entry.table._sample_counts(count, generator))
+            elif entry.item is not None:
+                low, high = entry.quantity_range
+                if low == high:
+                    loot[entry.item] += low * count
+                else:
+                    dropped = 0
+                    for start in range(0, count, _BATCH_CHUNK):
+                        dropped += int(generator.integers(low, high + 1, size=min(_BATCH_CHUNK, count - start)).sum())
+                    loot[entry.item] += dropped
+        return loot
+
+
+TABLES: dict = {} # {name: LootTable} of the tables archetypes can name
+
+
+def register(table: LootTable) -> LootTable:
+    """Makes a table available by name (see content.py), returns it"""
+    TABLES[table.name] = table
+    return table
+
+
+def table(name: str) -> LootTable:
+    """
+    Returns:
+        LootTable: The registered table called 'name'
+
+    Raises:
+        KeyError: If there is no such table
+    """
+    return TABLES[name]
+
+
+# Built-in tables
+GEMS = register(LootTable("gems", [
+    Drop("Ruby", rarity="rare"),
+    Drop("Sapphire", rarity="rare"),
+    Drop("Emerald", rarity="epic"),
+    Drop("Diamond", rarity="legendary"),
+]))
+GOBLIN = register(LootTable("goblin", [
+    Drop("Gold Coin", quantity=(1, 5)),
+    Drop("Potion", rarity="uncommon"),
+    Drop(table=GEMS, rarity="rare"),
+    Drop(None, weight=50),
+]))
@@ -1,4 +1,11 @@
-from combatant import Combatant
+from collections.abc import Mapping
+import random
+from typing import Optional
+from combatant import DEFAULT_SPEED, Combatant
+from damage import CLASSIC, NEUTRAL, Ruleset
+from items import Inventory, InventoryView
+from events import (CONSOLE, AttackMade, DamageDealt, EventSink, Healed, ItemAdded, LevelUp, LootCollected,
+                    LootOverflow, TargetAlreadyDefeated)
 
 class Player(Combatant):
     """
@@ -9,40 +16,57 @@ class Player(Combatant):
         attack_name (str): The name of the attack the player uses
         attack_power (int): The power value of the player's attack
         defense (int): The value of the player's defense
-        inventory (dict): The player's inventory 
+        inventory (dict): The player's inventory ({item name: quantity})
+        sink (EventSink, optional): Where the player's combat events are sent. Defaults to printing them to the console
+        ruleset (Ruleset, optional): The damage formula used by the player's attacks. Defaults to CLASSIC (damage = attack power)
+        element (str, optional): The player's element, used by rulesets with elemental multipliers
+        speed (int, optional): How often the player acts in multi-combatant encounters (see encounter.py)
+
+    A player starts at level 1 with 0 experience ('level' and 'xp', see progression.py).
     """
     
-    def __init__(self, name: str, attack_name: str ,attack_power: int, defense: int, inventory: dict):
+    def __init__(self, name: str, attack_name: str ,attack_power: int, defense: int, inventory: dict, sink: EventSink = CONSOLE,
+                 ruleset: Ruleset = CLASSIC, element: str = NEUTRAL, speed: int = DEFAULT_SPEED):
         """Initializes a new Player instance with protected attributes"""
         self.name = name
+        self.sink = sink
         self._max_health = 100
         self._health = self._max_health
         self._attack_name = attack_name.upper()
         self._attack_power = attack_power 
         self._defense = defense
-        self._inventory = inventory
+        self._inventory = Inventory(inventory)
+        self.ruleset = ruleset
+        self.element = element
+        self.speed = speed
+        self.level = 1
+        self.xp = 0
     
     
     # Player attacks an enemy
-    def attacks(self, enemy: Combatant) -> None:
+    def attacks(self, enemy: Combatant, rng: Optional[random.Random] = None) -> None:
         """
         Outputs the attack scenario by mentioning the attack name and who the attack is being used against 
+        The damage is resolved by the player's ruleset.
         
         Args:
             enemy (Combatant): The enemy player who is receiving the attack (attack_name)
+            rng (random.Random, optional): Random stream for crits and variance (only used by random rulesets)
         """
         if enemy.is_defeated(): # Prevents attacking an already dead combatant
-            print(f"--- Stop it {enemy.name} is already dead! ---\n")
+            if self.sink.enabled:
+                self.sink.emit(TargetAlreadyDefeated("player", self.name, enemy.name))
             return
 
-        print(f"{self.name} used {self._attack_name} on {enemy.name}\n")
-        enemy.take_damage(self._attack_power)
+        if self.sink.enabled:
+            self.sink.emit(AttackMade("player", self.name, enemy.name, self._attack_name))
+        enemy.take_damage(self.ruleset.damage(self, enemy, rng))
     
     
     # Health gets reduced when attacked
     def take_damage(self, amount: int) -> None:
         """
-        Outputs a message to communicate that a player has taken damage & Outputs the updated DECREASED health
+        Reduces the player's health & reports the damage taken along with the updated DECREASED health
 
         Args:
             amount (int): Integer amount of the value of the damage that is going to be done
@@ -52,8 +76,8 @@ class Player(Combatant):
         if self._health <= 0:
             self._health = 0
 
-        print(f"--- {self.name} TOOK DAMAGE! ---")
-        print(f"{self.name}'s health is now: {self._health}\n")
+        if self.sink.enabled:
+            self.sink.emit(DamageDealt("player", self.name, amount, self._health))
         
     
     # Restore health 
@@ -67,8 +91,8 @@ class Player(Combatant):
             amount (int): The amount of health that is going to be restored to the player's health
         """
         self._health = min(self._health + amount, self._max_health)
-        print(f"--- {self.name} HEALED ---")
-        print(f"{self.name} health: {self._health} \n")
+        if self.sink.enabled:
+            self.sink.emit(Healed(self.name, amount, self._health))
 
 
     # Predicate method (Method to check a condition, returns a bool value)
@@ -83,15 +107,15 @@ class Player(Combatant):
         return self._health <= 0
 
     @property # Getter Method
-    def inventory(self) -> dict:
+    def inventory(self) -> InventoryView:
         """
-        Gets a copy of the player's current inventory
+        Gets a read-only view of the player's current inventory (nothing is copied)
 
         Returns:
-            dict: A copy of the inventory with item names and their quantity
+            InventoryView: The inventory as item names and their quantity
 
         """
-        return self._inventory.copy()
+        return self._inventory.view()
 
     @property
     def health(self) -> int:
@@ -114,7 +138,71 @@ class Player(Combatant):
         """
         return self._max_health
 
-    def add_to_inventory(self, new_item: str, quantity_of_item: int = 1) -> None:
+    @property
+    def attack_name(self) -> str:
+        """
+        Gets the name of the player's attack
+
+        Returns:
+            str: The attack name (in upper case)
+        """
+        return self._attack_name
+
+    @property
+    def attack_power(self) -> int:
+        """
+        Gets the power of the player's attack
+
+        Returns:
+            int: The attack power value of the player
+        """
+        return self._attack_power
+
+    @property
+    def defense(self) -> int:
+        """
+        Gets the defense of the player
+
+        Returns:
+            int: The defense value of the player
+        """
+        return self._defense
+
+    @max_health.setter
+    def max_health(self, value: int) -> None:
+        self._max_health = value
+        if self._health > value: # Health never exceeds the maximum
+            self._health = value
+
+    @attack_power.setter
+    def attack_power(self, value: int) -> None:
+        self._attack_power = value
+
+    @defense.setter
+    def defense(self, value: int) -> None:
+        self._defense = value
+
+    def level_up(self, level: int, max_health: int, attack_power: int, defense: int) -> None:
+        """
+        Moves the player to a new level and raises their stats (called by progression.Progression).
+        Health goes up along with the maximum health, so a level-up never leaves the player more wounded.
+
+        Args:
+            level (int): The new level
+            max_health (int): Maximum health gained
+            attack_power (int): Attack power gained
+            defense (int): Defense gained
+        """
+        self.level = level
+        self._max_health += max_health
+        self._health += max_health
+        self._attack_power += attack_power
+        self._defense += defense
+
+        if self.sink.enabled:
+            self.sink.emit(LevelUp(self.name, level, self._max_health))
+
+    def add_to_inventory(self, new_item: str, quantity_of_item: int = 1) -> int:
         """
         Checks if a new item already exists within the player's inventory. 
         If yes, increase the item's max quantity.
@@ -125,13 +213,19 @@ class Player(Combatant):
         Args:
             new_item (str): New item that the player comes across
             quantity_of_item (int, optional): The number of times the item is added to the player's inventory after dropped from defeated enemy or picked up
-        """
-        if new_item in self._inventory: # Check if the new item already exists within the player's inventory. If yes, increase its quantity
-            self._inventory[new_item] += quantity_of_item
-        else:
-            self._inventory[new_item] = quantity_of_item # If new item doesn't exist in inventory, Add the new item and default its value to 1
 
-        print(f"{new_item} x{quantity_of_item} added to {self.name}'s inventory.\n")
+        Returns:
+            int: How many were actually added. Whatever doesn't fit under the stack limit is left behind (reported as
+                a LootOverflow)
+        """
+        added = self._inventory.add(new_item, quantity_of_item) # Increases the quantity of an existing item, or adds the new item
+
+        if self.sink.enabled:
+            if added:
+                self.sink.emit(ItemAdded(self.name, new_item, added))
+            if added < quantity_of_item:
+                self.sink.emit(LootOverflow(self.name, self.name, {new_item: quantity_of_item - added}))
+        return added
     
     def show_inventory(self) -> None:
         """
@@ -148,56 +242,76 @@ class Player(Combatant):
             print(f"(Empty Inventory)")
 
         else:
-            for all_items in self._inventory:
-                print(f"--> {all_items} x{self._inventory[all_items]}\n")
+            for item_name, quantity in self._inventory.view().items():
+                print(f"--> {item_name} x{quantity}\n")
         
 
-    def collect_loot(self, enemy: Combatant) -> None:
+    def collect_loot(self, enemy: Combatant, rng: Optional[random.Random] = None) -> Mapping:
         """
-        Collects loot dropped from a defeated enemy and adds it to the player's inventory.
+        Collects loot dropped from a defeated enemy and merges it into the player's inventory in one go.
 
         Args:
             enemy (Combatant): The enemy which drops loot.
+            rng (random.Random, optional): Random stream for the enemy's loot table, if it has one
+
+        Returns:
+            Mapping: The items that were collected, {item name: quantity} (empty if nothing was dropped).
+                Whatever doesn't fit under the stack limits is left behind (reported as a LootOverflow)
         """
-        dropped_loot = enemy.drop_loot() # Enemy's dropped loot
+        dropped_loot = enemy.drop_loot(rng) # Enemy's dropped loot
 
         if not dropped_loot:
-            print("No dropped loot to collect.")
-            return
+            if self.sink.enabled:
+                self.sink.emit(LootCollected(self.name, enemy.name, found_loot=False))
+            return {}
 
-        print(f"{self.name} collected loot from {enemy.name}.\n") # Loot collected output message
+        if self.sink.enabled:
+            self.sink.emit(LootCollected(self.name, enemy.name)) # Loot collected message
 
-        for dropped_item, quantity in dropped_loot.items():
-            self.add_to_inventory(dropped_item, quantity)
+        overflow = self._inventory.add_many(dropped_loot)
+        collected = dropped_loot
+        if overflow: # Only copy the drop when some of it didn't fit
+            name_of = self._inventory.registry.name_of
+            overflow = {name_of(item_id): quantity for item_id, quantity in overflow.items()}
+            collected = {item: quantity - overflow.get(item, 0) for item, quantity in dropped_loot.items()
+                         if quantity > overflow.get(item, 0)}
 
+        if self.sink.enabled:
+            for dropped_item, quantity in collected.items():
+                self.sink.emit(ItemAdded(self.name, dropped_item, quantity))
+            if overflow:
+                self.sink.emit(LootOverflow(self.name, enemy.name, overflow))
 
+        return collected
 
-# Using keyword argument during object creation for better readability
-player1 = Player(
-    name="Kramptj",
-    attack_name="Punch", 
-    attack_power=10, 
-    defense=10, 
-    inventory={ "Potion": 2 } # Every player gets 2 potions by default upon creation
-) 
 
-enemy1 = Player(
-    name="Bertha",
-    attack_name="Kick", 
-    attack_power=10, 
-    defense=10, 
-    inventory={ "Potion": 2 })
-
-player2 = Player(
-    name="Bob",
-    attack_name="Push",
-    attack_power=15,
-    defense=8,
-    inventory={} # Testing empty inventory output
-)
 
 if __name__ == "__main__":
 
+    # Demo combatants are only built when the module is run directly, importing it has no side effects
+    player1 = Player(
+        name="Kramptj",
+        attack_name="Punch", 
+        attack_power=10, 
+        defense=10, 
+        inventory={ "Potion": 2 } # Every player gets 2 potions by default upon creation
+    ) 
+
+    enemy1 = Player(
+        name="Bertha",
+        attack_name="Kick", 
+        attack_power=10, 
+        defense=10, 
+        inventory={ "Potion": 2 })
+
+    player2 = Player(
+        name="Bob",
+        attack_name="Push",
+        attack_power=15,
+        defense=8,
+        inventory={} # Testing empty inventory output
+    )
+
     player1.attacks(enemy1)
     enemy1.attacks(player1)
 
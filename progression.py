@@ -0,0 +1,207 @@
+import bisect
+import json
+import math
+import os
+from collections.abc import Mapping
+from typing import Optional
+
+from player import Player
+from content import create, template
+from events import ExperienceGained
+"""
+progression.py
+
+Experience, levels and stat growth, driven by data (data/progression.json).
+
+Every curve is turned into lookup tables when the progression is loaded, so nothing is computed per award:
+- thresholds[level]: total experience needed to reach a level, base * (level - 1) ^ exponent
+- gains[level]: what a player gains on reaching a level, the difference between two points of each stat's curve
+  (bonus = per_level * (level - 1) ^ exponent on top of the level 1 stats)
+- enemy_scales[level]: the multipliers of an enemy's stats at a level, 1 + rate * (level - 1)
+
+Awarding experience is one addition and one comparison with the next threshold. Levels are only walked when the
+player actually levels up, which happens at most 'max_level' times in a player's life. Scaling an enemy is one
+table lookup and a multiplication per stat.
+
+    progression = default_progression()
+    run_battle(hero, create("goblin"), progression=progression)                # XP after the loot is collected
+    goblin = progression.create_scaled("goblin", hero.level)                   # An enemy at the hero's level
+    progression.award(hero, 250)                                               # Or award XP directly
+"""
+
+PROGRESSION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "progression.json")
+
+PLAYER_STATS: tuple = ("max_health", "attack_power", "defense") # Stats that grow with the player's level
+ENEMY_STATS: tuple = ("health", "attack_power", "defense") # Stats scaled with an enemy's level (and max_health)
+
+
+def _curve(per_level: float, exponent: float, max_level: int) -> list:
+    """Bonus of a stat at every level (index 0 unused), per_level * (level - 1) ^ exponent"""
+    return [0] + [round(per_level * (level - 1) ** exponent) for level in range(1, max_level + 1)]
+
+
+class Progression:
+    """
+    Level thresholds, stat growth and enemy scaling, precomputed into tables.
+
+    Args:
+        config (Mapping): The "progression" section of a progression file:
+            max_level (int): The highest level
+            xp (dict): {"base", "exponent"} of the experience curve
+            xp_reward (dict): Experience for defeating an enemy, per point of its PLAYER_STATS
+            player (dict): {stat: {"per_level", "exponent"}} growth of the PLAYER_STATS
+            enemy (dict): {stat: rate} growth of the ENEMY_STATS, per level above 1
+
+    Raises:
+        ValueError: If the config is missing a curve or its curves go the wrong way
+    """
+
+    def __init__(self, config: Mapping):
+        """Builds every lookup table of the progression"""
+        try:
+            max_level = int(config["max_level"])
+            base, exponent = config["xp"]["base"], config["xp"]["exponent"]
+            player_curves = {stat: config["player"][stat] for stat in PLAYER_STATS}
+            enemy_rates = {stat: config["enemy"][stat] for stat in ENEMY_STATS}
+            rewards = config.get("xp_reward", {})
+        except KeyError as error:
+            raise ValueError(f"Progression config is missing {error}") from None
+        if max_level < 1:
+            raise ValueError("The highest level must be at least 1")
+        if base <= 0 or exponent <= 0:
+            raise ValueError("The experience curve must grow with the level")
+
+        self.max_level = max_level
+        # thresholds[level] for levels 1..max_level, then infinity so the highest level never levels up
+        self.thresholds: tuple = tuple([0] + [round(base * (level - 1) ** exponent)
+                                              for level in range(1, max_level + 1)] + [math.inf])
+        bonuses = [_curve(curve["per_level"], curve["exponent"], max_level) for curve in player_curves.values()]
+        self.bonuses: tuple = tuple(zip(*bonuses)) # By level, (max_health, attack_power, defense) above level 1
+        self.gains: tuple = ((0, 0, 0),) + tuple(
+            tuple(bonus[level] - bonus[level - 1] for bonus in bonuses) for level in range(1, max_level + 1))
+        self.enemy_scales: tuple = tuple((1.0, 1.0, 1.0) if level == 0 else
+                                         tuple(1 + rate * (level - 1) for rate in enemy_rates.values())
+                                         for level in range(max_level + 1))
+        self.rewards: tuple = tuple(rewards.get(stat, 0) for stat in PLAYER_STATS)
+
+    @classmethod
+    def from_file(cls, path: str = PROGRESSION_PATH) -> "Progression":
+        """
+        Loads the "progression" section of a JSON file.
+
+        Raises:
+            ValueError: If the file has no progression section (or it is invalid)
+        """
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        if "progression" not in data:
+            raise ValueError(f"{path} has no progression section")
+        return cls(data["progression"])
+
+    # ----- Levels -----
+
+    def level_for(self, xp: int) -> int:
+        """Returns the level a total of 'xp' experience reaches"""
+        return max(1, min(bisect.bisect_right(self.thresholds, xp) - 1, self.max_level))
+
+    def xp_to_next(self, player: Player) -> float:
+        """Returns the experience a player still needs for the next level (infinity at the highest level)"""
+        return self.thresholds[player.level + 1] - player.xp
+
+    def award(self, player: Player, amount: int) -> int:
+        """
+        Gives a player experience, levelling them up (and raising their stats) as it crosses thresholds.
+
+        Args:
+            player (Player): The player
+            amount (int): Experience gained
+
+        Returns:
+            int: Levels gained (0 most of the time)
+        """
+        if amount <= 0:
+            return 0
+        xp = player.xp = player.xp + amount
+        if player.sink.enabled:
+            player.sink.emit(ExperienceGained(player.name, amount, xp))
+        thresholds = self.thresholds
+        level = start = player.level
+        if xp < thresholds[level + 1]: # The common case, no level-up
+            return 0
+        gains = self.gains
+        while xp >= thresholds[level + 1]:
+            level += 1
+            player.level_up(level, *gains[level])
+        return level - start
+
+    def reward(self, enemy) -> int:
+        """Returns the experience for defeating an enemy, weighted from its maximum health, attack and defense"""
+        health_weight, attack_weight, defense_weight = self.rewards
+        return round(health_weight * enemy.max_health + attack_weight * enemy.attack_power
+                     + defense_weight * enemy.defense)
+
+    def award_kill(self, player: Player, enemy) -> int:
+        """
+        Gives a player the experience for defeating an enemy (engine.Battle calls it after the loot is collected).
+
+        Returns:
+            int: Levels gained
+        """
+        return self.award(player, self.reward(enemy))
+
+    def apply_level(self, player: Player, level: int) -> None:
+        """
+        Raises a player to a level, with the stats and the minimum experience of that level.
+
+        Raises:
+            ValueError: If the level is outside 1..max_level or below the player's level
+        """
+        if not player.level <= level <= self.max_level:
+            raise ValueError(f"Can't move a level {player.level} player to level {level}")
+        if level > player.level:
+            current, target = self.bonuses[player.level], self.bonuses[level]
+            player.level_up(level, *(after - before for before, after in zip(current, target)))
+        player.xp = max(player.xp, self.thresholds[level])
+
+    # ----- Enemies -----
+
+    def scale_enemy(self, stats: Mapping, level: int) -> dict:
+        """
+        Scales an enemy's stats to a level (levels above the highest are scaled as the highest).
+
+        Args:
+            stats (Mapping): The enemy's stats at level 1, ex: content.template("goblin")
+            level (int): The level to scale to
+
+        Returns:
+            dict: The scaled health, max_health, attack_power and defense, keyword arguments for content.create
+        """
+        health, attack_power, defense = self.enemy_scales[min(max(level, 1), self.max_level)]
+        return {"health": round(stats["health"] * health), "max_health": round(stats["max_health"] * health),
+                "attack_power": round(stats["attack_power"] * attack_power),
+                "defense": round(stats["defense"] * defense)}
+
+    def create_scaled(self, key: str, level: int, **overrides):
+        """
+        Builds an enemy archetype (see content.py) scaled to a level.
+
+        Args:
+            key (str): The enemy's archetype key
+            level (int): The level to scale to
+            **overrides: Keyword arguments for content.create, ex: sink=NULL_SINK
+
+        Returns:
+            Enemy: A fresh enemy
+        """
+        return create(key, **{**self.scale_enemy(template(key), level), **overrides})
+
+
+_default: Optional[Progression] = None
+
+
+def default_progression() -> Progression:
+    """Returns the progression of data/progression.json, loaded on first use and shared afterwards"""
+    global _default
+    if _default is None:
+        _default = Progression.from_file()
+    return _default
@@ -0,0 +1,350 @@
+import io
+import struct
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator, Optional, Union
+
+from player import Player
+from enemy import Enemy
+from combatant import DEFAULT_SPEED
+from damage import RULESETS
+from engine import ATTACK, DEFEND, FLEE, HEAL, SPECIAL, Battle, BattleResult
+from events import NULL_SINK
+"""
+replay.py
+
+Compact binary battle recordings and a fast, render-free replayer.
+
+A recording is an append-only byte stream:
+    header      magic, version, seed, turn cap, snapshot of the player and the enemy before the battle
+    actions     one byte per chosen action, written as the battle goes
+    end record  END marker, winner, turn count and final health of both sides
+
+Because actions are plain bytes appended to a buffer, recording costs next to nothing per turn, and a recording can
+be streamed to a file (or socket) while the battle is still running.
+Replaying rebuilds both combatants from the snapshots, re-runs the engine with the recorded actions and the recorded
+seed, and checks the end record to catch desyncs (a change in the rules that alters the outcome).
+"""
+
+MAGIC = b"RPGR"
+VERSION = 2
+END = 0xFF # Marks the end record
+
+ACTION_CODES: dict = {ATTACK: 0, HEAL: 1, DEFEND: 2, FLEE: 3, SPECIAL: 4}
+ACTIONS: dict = {code: action for action, code in ACTION_CODES.items()}
+WINNER_CODES: dict = {None: 0, "player": 1, "enemy": 2}
+WINNERS: dict = {code: winner for winner, code in WINNER_CODES.items()}
+
+_HEADER = struct.Struct("<4sBQI") # magic, version, seed, max_turns
+SEED_LIMIT = 1 << 64 # Recorded seeds are in [0, SEED_LIMIT) (engine.new_seed() draws 63 bits)
+_STATS = struct.Struct("<iiii") # health, max_health, attack_power, defense
+_END = struct.Struct("<BIii") # winner, turns, player health, enemy health
+_LENGTH = struct.Struct("<H")
+_QUANTITY = struct.Struct("<i")
+
+
+class ReplayError(Exception):
+    """Raised when a recording can't be read or doesn't replay to the recorded outcome"""
+
+
+@dataclass(slots=True)
+class Snapshot:
+    """
+    The state of a combatant before the battle.
+
+    Args:
+        name (str): The combatant's name
+        attack_name (str): The combatant's attack name
+        health (int): Health at the start of the battle
+        max_health (int): Maximum health
+        attack_power (int): Attack power
+        defense (int): Defense
+        inventory (dict): Inventory at the start of the battle
+        ruleset (str): Name of the combatant's damage ruleset (see damage.RULESETS)
+        element (str): The combatant's element
+        speed (int): The combatant's speed (not part of recordings, a 1-vs-1 battle doesn't use it)
+        level (int): The combatant's level, 1 for enemies (not part of recordings, see progression.py)
+        xp (int): The combatant's experience, 0 for enemies (not part of recordings)
+    """
+    name: str
+    attack_name: str
+    health: int
+    max_health: int
+    attack_power: int
+    defense: int
+    inventory: dict = field(default_factory=dict)
+    ruleset: str = "classic"
+    element: str = "none"
+    speed: int = DEFAULT_SPEED
+    level: int = 1
+    xp: int = 0
+
+    @classmethod
+    def of(cls, combatant) -> "Snapshot":
+        """
+        Returns:
+            Snapshot: The current state of a Player or Enemy
+        """
+        return cls(combatant.name, combatant.attack_name, combatant.health, combatant.max_health,
+                   combatant.attack_power, combatant.defense, dict(combatant.inventory),
+                   combatant.ruleset.name, combatant.element, combatant.speed, getattr(combatant, "level", 1),
+                   getattr(combatant, "xp", 0))
+
+
+@dataclass(slots=True)
+class Recording:
+    """
+    A fully read recording.
+
+    Args:
+        seed (int): Seed of the battle's random stream
+        max_turns (int): The battle's turn cap
+        player (Snapshot): The player before the battle
+        enemy (Snapshot): The enemy before the battle
+        actions (list): Every chosen action in order (player, enemy, player, enemy, ...)
+        result (BattleResult | None): The recorded outcome, None if the recording was cut short
+    """
+    seed: int
+    max_turns: int
+    player: Snapshot
+    enemy: Snapshot
+    actions: list
+    result: Optional[BattleResult]
+
+
+# ----- Writing -----
+
+def _pack_text(text: str) -> bytes:
+    encoded = text.encode("utf-8")
+    return _LENGTH.pack(len(encoded)) + encoded
+
+
+def _pack_snapshot(snapshot: Snapshot) -> bytes:
+    parts = [_pack_text(snapshot.name), _pack_text(snapshot.attack_name),
+             _STATS.pack(snapshot.health, snapshot.max_health, snapshot.attack_power, snapshot.defense),
+             _LENGTH.pack(len(snapshot.inventory))]
+    for item, quantity in snapshot.inventory.items():
+        parts.append(_pack_text(item))
+        parts.append(_QUANTITY.pack(quantity))
+    parts.append(_pack_text(snapshot.ruleset))
+    parts.append(_pack_text(snapshot.element))
+    return b"".join(parts)
+
+
+class ReplayRecorder:
+    """
+    Records a battle into a binary stream. Pass it to engine.Battle / engine.run_battle as 'recorder'.
+
+    Actions are appended to an in-memory buffer and written out every 'flush_every' bytes and at the end,
+    so the per-turn cost is a single bytearray append.
+
+    Args:
+        stream (file, optional): Binary stream the recording is written to. Defaults to an in-memory buffer
+        flush_every (int, optional): Buffered bytes before they are written to the stream
+    """
+
+    def __init__(self, stream: Optional[BinaryIO] = None, flush_every: int = 4096):
+        """Initializes the recorder"""
+        self.stream = stream if stream is not None else io.BytesIO()
+        self.flush_every = flush_every
+        self._buffer = bytearray()
+
+    def start(self, battle: Battle) -> None:
+        """
+        Writes the header: seed, turn cap and both combatants as they are before the first turn.
+
+        Raises:
+            ReplayError: If the battle was given its own random stream instead of a seed, or a seed outside
+                [0, SEED_LIMIT)
+        """
+        if battle.seed is None:
+            raise ReplayError("Only battles created from a seed can be recorded.")
+        if not 0 <= battle.seed < SEED_LIMIT:
+            raise ReplayError(f"Only seeds in [0, 2**64) can be recorded, got {battle.seed}.")
+
+        self._buffer += _HEADER.pack(MAGIC, VERSION, battle.seed, battle.max_turns)
+        self._buffer += _pack_snapshot(Snapshot.of(battle.player))
+        self._buffer += _pack_snapshot(Snapshot.of(battle.enemy))
+        self.flush()
+
+    def action(self, action: str) -> None:
+        """
+        Appends one chosen action.
+
+        Raises:
+            ValueError: If the action is not known to the engine (nothing is recorded)
+        """
+        code = ACTION_CODES.get(action)
+        if code is None:
+            raise ValueError(f"Unknown action: {action!r}")
+        self._buffer.append(code)
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def finish(self, result: BattleResult) -> None:
+        """Appends the end record and flushes everything to the stream"""
+        player_health, enemy_health = result.hp_per_turn[-1] if result.hp_per_turn else (0, 0)
+        self._buffer.append(END)
+        self._buffer += _END.pack(WINNER_CODES[result.winner], result.turns, player_health, enemy_health)
+        self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered bytes to the stream"""
+        if self._buffer:
+            self.stream.write(self._buffer)
+            self._buffer.clear()
+
+    def getvalue(self) -> bytes:
+        """
+        Returns:
+            bytes: The whole recording (only when recording to the default in-memory buffer)
+        """
+        self.flush()
+        return self.stream.getvalue()
+
+
+# ----- Reading -----
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ReplayError("The recording ended unexpectedly.")
+    return data
+
+
+def _read_text(stream: BinaryIO) -> str:
+    (length,) = _LENGTH.unpack(_read_exact(stream, _LENGTH.size))
+    return _read_exact(stream, length).decode("utf-8")
+
+
+def _read_snapshot(stream: BinaryIO) -> Snapshot:
+    name = _read_text(stream)
+    attack_name = _read_text(stream)
+    health, max_health, attack_power, defense = _STATS.unpack(_read_exact(stream, _STATS.size))
+    (item_count,) = _LENGTH.unpack(_read_exact(stream, _LENGTH.size))
+    inventory = {}
+    for _ in range(item_count):
+        item = _read_text(stream)
+        (inventory[item],) = _QUANTITY.unpack(_read_exact(stream, _QUANTITY.size))
+    ruleset = _read_text(stream)
+    element = _read_text(stream)
+    return Snapshot(name, attack_name, health, max_health, attack_power, defense, inventory, ruleset, element)
+
+
+def _as_stream(source: Union[bytes, BinaryIO]) -> BinaryIO:
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def read_header(stream: BinaryIO) -> tuple:
+    """
+    Reads the header of a recording.
+
+    Returns:
+        tuple: (seed, max_turns, player Snapshot, enemy Snapshot)
+
+    Raises:
+        ReplayError: If the stream isn't a recording this version can read
+    """
+    magic, version, seed, max_turns = _HEADER.unpack(_read_exact(stream, _HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ReplayError("Not a battle recording (or an unsupported version).")
+    return seed, max_turns, _read_snapshot(stream), _read_snapshot(stream)
+
+
+def iter_actions(stream: BinaryIO, ending: Optional[list] = None) -> Iterator[str]:
+    """
+    Yields the recorded actions one by one, reading the stream as it goes (so recordings can be streamed).
+
+    Args:
+        stream (file): A binary stream positioned right after the header
+        ending (list, optional): If given, the recorded BattleResult is appended to it once the end record is read
+
+    Yields:
+        str: Each recorded action
+    """
+    while True:
+        byte = stream.read(1)
+        if not byte: # Cut short, there is no end record
+            return
+        code = byte[0]
+        if code == END:
+            winner, turns, player_health, enemy_health = _END.unpack(_read_exact(stream, _END.size))
+            if ending is not None:
+                ending.append(BattleResult(WINNERS[winner], turns, [(player_health, enemy_health)] if turns else []))
+            return
+        if code not in ACTIONS:
+            raise ReplayError(f"Unknown action code: {code}")
+        yield ACTIONS[code]
+
+
+def load(source: Union[bytes, BinaryIO]) -> Recording:
+    """
+    Reads a whole recording.
+
+    Args:
+        source (bytes | file): The recording
+
+    Returns:
+        Recording: The decoded recording
+    """
+    stream = _as_stream(source)
+    seed, max_turns, player, enemy = read_header(stream)
+    ending: list = []
+    actions = list(iter_actions(stream, ending))
+    return Recording(seed, max_turns, player, enemy, actions, ending[0] if ending else None)
+
+
+def replay(source: Union[bytes, BinaryIO]) -> BattleResult:
+    """
+    Re-runs a recorded battle at full speed (no rendering) and checks it against the recorded outcome.
+
+    Args:
+        source (bytes | file): The recording
+
+    Returns:
+        BattleResult: The outcome of the replayed battle
+
+    Raises:
+        ReplayError: If the replay runs out of actions or ends differently from the recording (desync)
+    """
+    stream = _as_stream(source)
+    seed, max_turns, player_snapshot, enemy_snapshot = read_header(stream)
+    ending: list = []
+    actions = iter_actions(stream, ending)
+
+    for snapshot in (player_snapshot, enemy_snapshot):
+        if snapshot.ruleset not in RULESETS:
+            raise ReplayError(f"Unknown ruleset in recording: {snapshot.ruleset!r}")
+
+    player = Player(player_snapshot.name, player_snapshot.attack_name, player_snapshot.attack_power,
+                    player_snapshot.defense, dict(player_snapshot.inventory), sink=NULL_SINK,
+                    ruleset=RULESETS[player_snapshot.ruleset], element=player_snapshot.element)
+    player.max_health = player_snapshot.max_health # Leveled players have more than the starting 100
+    player.heal(player.max_health)
+    if player_snapshot.health < player.max_health: # A Player always starts at full health, so reapply missing health
+        player.take_damage(player.max_health - player_snapshot.health)
+    enemy = Enemy(enemy_snapshot.name, enemy_snapshot.health, enemy_snapshot.max_health, enemy_snapshot.attack_name,
+                  enemy_snapshot.attack_power, enemy_snapshot.defense, dict(enemy_snapshot.inventory), sink=NULL_SINK,
+                  ruleset=RULESETS[enemy_snapshot.ruleset], element=enemy_snapshot.element)
+
+    def next_action(*_) -> str:
+        try:
+            return next(actions)
+        except StopIteration:
+            raise ReplayError("The recording has fewer actions than the replayed battle needs (desync).") from None
+
+    fight = Battle(player, enemy, next_action, max_turns=max_turns, seed=seed)
+    while not fight.finished:
+        fight.play_turn(next_action())
+    result = fight.result()
+
+    for _ in actions: # Drain the stream so the end record is read
+        raise ReplayError("The recording has more actions than the replayed battle used (desync).")
+
+    if ending:
+        expected = ending[0]
+        final_health = result.hp_per_turn[-1] if result.hp_per_turn else (0, 0)
+        if (expected.winner, expected.turns) != (result.winner, result.turns) or \
+                (expected.hp_per_turn and expected.hp_per_turn[-1] != final_health):
+            raise ReplayError(f"Replay desync: recorded {expected.winner!r} after {expected.turns} turns, "
+                              f"replayed {result.winner!r} after {result.turns} turns.")
+    return result
@@ -0,0 +1,529 @@
+import os
+import struct
+import zlib
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Union
+
+from player import Player
+from enemy import Enemy
+from content import ENEMY, PLAYER
+from damage import RULESETS
+from events import NULL_SINK, EventSink
+from replay import Snapshot
+"""
+saves.py
+
+Persistent player and enemy state, stored as profiles (a key such as the player's name -> the combatant's state).
+
+A save directory holds an append-only binary log and an index:
+    profiles.log    file header, then one record per save: record type, profile key, kind and the saved fields
+    profiles.idx    for every profile, the offsets of the records that make up its current state
+
+The first save of a profile writes a FULL record with every field. Later saves (ex: after each battle) only append
+a DELTA record with the fields that changed, and only the inventory items whose quantity changed, so saving a profile
+costs a few dozen bytes instead of a rewrite. After MAX_CHAIN deltas the next save is written in full again, which
+caps how many records a load reads. Superseded records stay in the log as dead bytes until the log is compacted:
+automatically once they make up COMPACT_RATIO of it, or on demand with compact(), which rewrites one FULL record per
+profile.
+
+Loading is lazy: opening a store only reads the index (and scans records appended after it was last written),
+and load() reads just the records of the profile asked for.
+
+Logs written by an older VERSION are still read, and are rewritten in the current format (compacted) when opened.
+
+    with SaveStore("saves") as store:
+        store.save("kramptj", player)
+        player = store.restore("kramptj")
+"""
+
+MAGIC = b"RPGS"
+INDEX_MAGIC = b"RPGI"
+VERSION = 2 # 2: xp is a 64-bit number
+READABLE_VERSIONS = (1, VERSION) # Log versions a store can open
+LOG_NAME = "profiles.log"
+INDEX_NAME = "profiles.idx"
+
+FULL = 1 # Every field, replaces whatever the profile held
+DELTA = 2 # Changed fields only, applied on top of the records before it
+DELETE = 3 # The profile was deleted
+
+KIND_CODES: dict = {PLAYER: 0, ENEMY: 1}
+KINDS: dict = {code: kind for kind, code in KIND_CODES.items()}
+
+MAX_CHAIN = 16 # Deltas a profile piles up before its next save is written in full
+COMPACT_RATIO = 0.5 # The log is compacted once this fraction of it is dead records...
+COMPACT_MIN_BYTES = 64 * 1024 # ...and it is at least this big
+
+TEXT_FIELDS = ("name", "attack_name", "ruleset", "element")
+NUMBER_FIELDS = ("health", "max_health", "attack_power", "defense", "speed")
+PROGRESS_FIELDS = ("level", "xp") # Numbers too, added last so records written before them still read
+FIELDS = TEXT_FIELDS + NUMBER_FIELDS + ("inventory",) + PROGRESS_FIELDS # Order of the fields in a record
+ALL_FIELDS = (1 << len(FIELDS)) - 1
+_BASE_FIELDS = (1 << FIELDS.index("level")) - 1 # What every profile's first record holds at least
+_INVENTORY_BIT = 1 << FIELDS.index("inventory")
+
+_FILE_HEADER = struct.Struct("<4sH") # magic, version
+_RECORD = struct.Struct("<BHII") # record type, key length, body length, crc32 of the key and body
+_BODY = struct.Struct("<BH") # kind, mask of the fields that follow
+_INDEX_HEADER = struct.Struct("<4sHQI") # magic, version, log bytes the index covers, profile count
+_ENTRY = struct.Struct("<BH") # kind, records in the chain
+_SPAN = struct.Struct("<QI") # record offset, record size
+_LENGTH = struct.Struct("<H")
+_NUMBER = struct.Struct("<i")
+_XP = struct.Struct("<q") # Experience keeps adding up past the highest level, so it outgrows 32 bits
+
+
+class SaveError(Exception):
+    """Raised when a save file can't be read"""
+
+
+@dataclass(slots=True)
+class _Entry:
+    """Where a profile's current state lives in the log: its last FULL record and the DELTA records after it"""
+    kind: str
+    chain: list = field(default_factory=list) # [(offset, size)]
+
+
+# ----- Encoding -----
+
+def _pack_text(text: str) -> bytes:
+    encoded = text.encode("utf-8")
+    return _LENGTH.pack(len(encoded)) + encoded
+
+
+def _changed_fields(before: Snapshot, after: Snapshot) -> int:
+    """Mask of the fields that differ between two states"""
+    mask = 0
+    for bit, name in enumerate(FIELDS):
+        if getattr(before, name) != getattr(after, name):
+            mask |= 1 << bit
+    return mask
+
+
+def _pack_body(kind: str, mask: int, state: Snapshot, before: Optional[Snapshot] = None) -> bytes:
+    """
+    Encodes the fields in 'mask'. When 'before' is given, the inventory only lists the items whose quantity changed
+    (0 for removed items).
+    """
+    parts = [_BODY.pack(KIND_CODES[kind], mask)]
+    for bit, name in enumerate(FIELDS):
+        if not mask & (1 << bit):
+            continue
+        if name in TEXT_FIELDS:
+            parts.append(_pack_text(getattr(state, name)))
+        elif name == "xp":
+            parts.append(_XP.pack(state.xp))
+        elif name != "inventory":
+            parts.append(_NUMBER.pack(getattr(state, name)))
+        else:
+            items = state.inventory
+            if before is not None:
+                old = before.inventory
+                items = {item: quantity for item, quantity in items.items() if old.get(item) != quantity}
+                items.update((item, 0) for item in old if item not in state.inventory)
+            parts.append(_LENGTH.pack(len(items)))
+            for item, quantity in items.items():
+                parts.append(_pack_text(item))
+                parts.append(_NUMBER.pack(quantity))
+    return b"".join(parts)
+
+
+def _pack_record(record_type: int, key: str, body: bytes = b"") -> bytes:
+    encoded = key.encode("utf-8")
+    return _RECORD.pack(record_type, len(encoded), len(body), zlib.crc32(body, zlib.crc32(encoded))) + encoded + body
+
+
+def _apply_body(body: bytes, state: Optional[Snapshot], version: int = VERSION) -> tuple:
+    """
+    Applies an encoded FULL or DELTA body on top of 'state' (None for a FULL record).
+    'version' is the version of the log the body was read from.
+
+    Returns:
+        tuple: (kind, the updated Snapshot)
+    """
+    kind_code, mask = _BODY.unpack_from(body)
+    values = {}
+    position = _BODY.size
+    for bit, name in enumerate(FIELDS):
+        if not mask & (1 << bit):
+            continue
+        if name in NUMBER_FIELDS or name in PROGRESS_FIELDS:
+            number = _XP if name == "xp" and version >= 2 else _NUMBER
+            (values[name],) = number.unpack_from(body, position)
+            position += number.size
+        elif name in TEXT_FIELDS:
+            (length,) = _LENGTH.unpack_from(body, position)
+            position += _LENGTH.size
+            values[name] = body[position:position + length].decode("utf-8")
+            position += length
+        else:
+            (count,) = _LENGTH.unpack_from(body, position)
+            position += _LENGTH.size
+            items = {}
+            for _ in range(count):
+                (length,) = _LENGTH.unpack_from(body, position)
+                position += _LENGTH.size
+                item = body[position:position + length].decode("utf-8")
+                (items[item],) = _NUMBER.unpack_from(body, position + length)
+                position += length + _NUMBER.size
+            values[name] = items
+
+    if state is None:
+        if mask & _BASE_FIELDS != _BASE_FIELDS:
+            raise SaveError("A profile's first record doesn't hold every field.")
+        state = Snapshot(**values)
+    else:
+        changed_items = values.pop("inventory", None)
+        for name, value in values.items():
+            setattr(state, name, value)
+        if changed_items is not None:
+            for item, quantity in changed_items.items():
+                if quantity:
+                    state.inventory[item] = quantity
+                else:
+                    state.inventory.pop(item, None)
+    return KINDS[kind_code], state
+
+
+def _copy(state: Snapshot) -> Snapshot:
+    return Snapshot(state.name, state.attack_name, state.health, state.max_health, state.attack_power, state.defense,
+                    dict(state.inventory), state.ruleset, state.element, state.speed, state.level, state.xp)
+
+
+def build(kind: str, state: Snapshot, sink: EventSink = NULL_SINK) -> Union[Player, Enemy]:
+    """
+    Creates a fresh Player or Enemy from a saved state.
+
+    Args:
+        kind (str): content.PLAYER or content.ENEMY
+        state (Snapshot): The saved state
+        sink (EventSink, optional): Where the combatant's events are sent
+
+    Returns:
+        Player | Enemy: The combatant
+
+    Raises:
+        SaveError: If the state names a ruleset that doesn't exist
+    """
+    if state.ruleset not in RULESETS:
+        raise SaveError(f"Unknown ruleset in save: {state.ruleset!r}")
+    ruleset = RULESETS[state.ruleset]
+    if kind == PLAYER:
+        combatant = Player(state.name, state.attack_name, state.attack_power, state.defense, dict(state.inventory),
+                           sink=NULL_SINK, ruleset=ruleset, element=state.element, speed=state.speed)
+        combatant.level, combatant.xp = state.level, state.xp
+        combatant.max_health = state.max_health # Leveled players have more than the starting 100
+        combatant.heal(combatant.max_health)
+        if state.health < combatant.max_health: # A Player always starts at full health, so reapply missing health
+            combatant.take_damage(combatant.max_health - state.health)
+        combatant.sink = sink
+        return combatant
+    return Enemy(state.name, state.health, state.max_health, state.attack_name, state.attack_power, state.defense,
+                 dict(state.inventory), sink=sink, ruleset=ruleset, element=state.element, speed=state.speed)
+
+
+class SaveStore:
+    """
+    A directory of saved profiles (see the module docstring for the file layout).
+
+    Args:
+        directory (str): Where the log and the index are kept, created if missing
+        max_chain (int, optional): Deltas a profile piles up before its next save is written in full
+        compact_ratio (float, optional): Fraction of dead bytes that triggers an automatic compaction (0 disables it)
+        compact_min_bytes (int, optional): Logs smaller than this are never compacted automatically
+
+    Raises:
+        SaveError: If the directory holds a log this version can't read
+    """
+
+    def __init__(self, directory: str, max_chain: int = MAX_CHAIN, compact_ratio: float = COMPACT_RATIO,
+                 compact_min_bytes: int = COMPACT_MIN_BYTES):
+        """Opens the store, reading the index but no profile"""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.log_path = os.path.join(directory, LOG_NAME)
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        self.max_chain = max_chain
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.compactions = 0
+        self._entries: dict = {} # {key: _Entry}
+        self._states: dict = {} # Profiles loaded or saved since the store was opened {key: Snapshot}
+        self._live = 0 # Bytes of the records that make up the current states
+        self._size = 0 # Bytes of the log
+        self._log = None
+        self._open_log()
+
+    # ----- Files -----
+
+    def _open_log(self) -> None:
+        exists = os.path.exists(self.log_path)
+        self._log = open(self.log_path, "r+b" if exists else "w+b")
+        header = self._log.read(_FILE_HEADER.size)
+        if not header:
+            self._log.write(_FILE_HEADER.pack(MAGIC, VERSION))
+            self._size = _FILE_HEADER.size
+            self._version = VERSION
+        else:
+            magic, version = _FILE_HEADER.unpack(header) if len(header) == _FILE_HEADER.size else (None, None)
+            if magic != MAGIC or version not in READABLE_VERSIONS:
+                self._log.close()
+                raise SaveError(f"{self.log_path} isn't a save log (or has an unsupported version).")
+            self._size = self._log.seek(0, os.SEEK_END)
+            self._version = version
+        covered = self._read_index() if self._version == VERSION else 0
+        self._scan(covered)
+        if self._version != VERSION: # Older format, rewrite it before anything is appended
+            self.compact()
+
+    def _read_index(self) -> int:
+        """Loads the index, returns how many bytes of the log it covers (0 if it's missing or out of date)"""
+        try:
+            with open(self.index_path, "rb") as file:
+                data = file.read()
+            magic, version, covered, count = _INDEX_HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return 0
+        if magic != INDEX_MAGIC or version != VERSION or covered > self._size:
+            return 0 # Written for another log, rebuild it from the log itself
+
+        entries = {}
+        position = _INDEX_HEADER.size
+        try:
+            for _ in range(count):
+                (length,) = _LENGTH.unpack_from(data, position)
+                position += _LENGTH.size
+                key = data[position:position + length].decode("utf-8")
+                kind_code, records = _ENTRY.unpack_from(data, position + length)
+                position += length + _ENTRY.size
+                chain = [_SPAN.unpack_from(data, position + index * _SPAN.size) for index in range(records)]
+                position += records * _SPAN.size
+                entries[key] = _Entry(KINDS[kind_code], chain)
+        except (struct.error, KeyError, UnicodeDecodeError):
+            return 0
+        self._entries = entries
+        self._live = sum(size for entry in entries.values() for _, size in entry.chain)
+        return covered
+
+    def _scan(self, start: int) -> None:
+        """
+        Indexes the records from 'start' to the end of the log (everything when the index is missing).
+        A record cut short by a crash is dropped, along with anything after it.
+        """
+        if not start:
+            self._entries, self._live = {}, 0
+            start = _FILE_HEADER.size
+        log = self._log
+        log.seek(start)
+        offset = start
+        while offset < self._size:
+            header = log.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                break
+            record_type, key_length, body_length, checksum = _RECORD.unpack(header)
+            payload = log.read(key_length + body_length)
+            if len(payload) < key_length + body_length or zlib.crc32(payload) != checksum:
+                break
+            key = payload[:key_length].decode("utf-8")
+            kind = KINDS.get(payload[key_length]) if body_length else None
+            self._index(record_type, key, kind, offset, _RECORD.size + key_length + body_length)
+            offset += _RECORD.size + key_length + body_length
+        if offset < self._size: # Torn write at the end of the log
+            log.truncate(offset)
+            self._size = offset
+
+    def _index(self, record_type: int, key: str, kind: Optional[str], offset: int, size: int) -> None:
+        entry = self._entries.get(key)
+        if record_type == DELETE:
+            if entry is not None:
+                self._live -= sum(span[1] for span in entry.chain)
+                del self._entries[key]
+            return
+        if record_type == FULL or entry is None:
+            if entry is not None:
+                self._live -= sum(span[1] for span in entry.chain)
+            entry = self._entries[key] = _Entry(kind)
+        entry.chain.append((offset, size))
+        self._live += size
+
+    def _append(self, record_type: int, key: str, body: bytes = b"") -> int:
+        record = _pack_record(record_type, key, body)
+        self._log.seek(self._size)
+        self._log.write(record)
+        kind = KINDS[body[0]] if body else None
+        self._index(record_type, key, kind, self._size, len(record))
+        self._size += len(record)
+        return len(record)
+
+    def _read(self, entry: _Entry) -> Snapshot:
+        """Rebuilds a profile's state from its records"""
+        state = None
+        log = self._log
+        for offset, size in entry.chain:
+            log.seek(offset)
+            record = log.read(size)
+            _, key_length, _, checksum = _RECORD.unpack_from(record)
+            payload = record[_RECORD.size:]
+            if len(record) != size or zlib.crc32(payload) != checksum:
+                raise SaveError(f"Corrupted save record at offset {offset}.")
+            state = _apply_body(payload[key_length:], state, self._version)[1]
+        return state
+
+    def _state(self, key: str) -> Optional[Snapshot]:
+        state = self._states.get(key)
+        if state is None and key in self._entries:
+            state = self._states[key] = self._read(self._entries[key])
+        return state
+
+    # ----- Profiles -----
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def profiles(self) -> Iterator[str]:
+        """Yields the key of every saved profile"""
+        return iter(list(self._entries))
+
+    def kind(self, key: str) -> str:
+        """Returns content.PLAYER or content.ENEMY for a saved profile (KeyError if it doesn't exist)"""
+        return self._entries[key].kind
+
+    def save(self, key: str, combatant: Union[Player, Enemy]) -> int:
+        """
+        Saves a combatant's current state under 'key', as a delta of the previously saved state when there is one.
+
+        Args:
+            key (str): The profile's key
+            combatant (Player | Enemy): The combatant to save
+
+        Returns:
+            int: Bytes appended to the log (0 if nothing changed since the last save)
+        """
+        kind = PLAYER if isinstance(combatant, Player) else ENEMY
+        state = Snapshot.of(combatant)
+        before = self._state(key)
+        entry = self._entries.get(key)
+        if before is None or entry.kind != kind or len(entry.chain) > self.max_chain:
+            written = self._append(FULL, key, _pack_body(kind, ALL_FIELDS, state))
+        else:
+            mask = _changed_fields(before, state)
+            if not mask:
+                return 0
+            written = self._append(DELTA, key, _pack_body(kind, mask, state, before if mask & _INVENTORY_BIT else None))
+        self._states[key] = state
+        self._maybe_compact()
+        return written
+
+    def load(self, key: str) -> Snapshot:
+        """
+        Reads a profile's state, touching only that profile's records.
+
+        Args:
+            key (str): The profile's key
+
+        Returns:
+            Snapshot: A copy of the saved state
+
+        Raises:
+            KeyError: If there is no such profile
+        """
+        state = self._state(key)
+        if state is None:
+            raise KeyError(key)
+        return _copy(state)
+
+    def restore(self, key: str, sink: EventSink = NULL_SINK) -> Union[Player, Enemy]:
+        """
+        Loads a profile back into a fresh combatant.
+
+        Args:
+            key (str): The profile's key
+            sink (EventSink, optional): Where the combatant's events are sent
+
+        Returns:
+            Player | Enemy: The combatant as it was saved
+
+        Raises:
+            KeyError: If there is no such profile
+        """
+        return build(self.kind(key), self.load(key), sink)
+
+    def delete(self, key: str) -> None:
+        """Deletes a profile (KeyError if it doesn't exist)"""
+        if key not in self._entries:
+            raise KeyError(key)
+        self._append(DELETE, key)
+        self._states.pop(key, None)
+        self._maybe_compact()
+
+    # ----- Maintenance -----
+
+    @property
+    def log_bytes(self) -> int:
+        """Size of the log"""
+        return self._size
+
+    @property
+    def dead_bytes(self) -> int:
+        """Bytes of the log taken by superseded records"""
+        return self._size - _FILE_HEADER.size - self._live
+
+    def _maybe_compact(self) -> None:
+        if self.compact_ratio and self._size >= self.compact_min_bytes and \
+                self.dead_bytes >= self.compact_ratio * self._size:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrites the log with a single FULL record per profile, dropping every superseded record"""
+        temporary = self.log_path + ".tmp"
+        entries = {}
+        with open(temporary, "wb") as file:
+            file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+            offset = _FILE_HEADER.size
+            for key, entry in self._entries.items():
+                state = self._states.get(key) or self._read(entry) # Not cached, compaction shouldn't load everything
+                record = _pack_record(FULL, key, _pack_body(entry.kind, ALL_FIELDS, state))
+                file.write(record)
+                entries[key] = _Entry(entry.kind, [(offset, len(record))])
+                offset += len(record)
+            file.flush()
+            os.fsync(file.fileno())
+
+        self._log.close()
+        os.replace(temporary, self.log_path)
+        self._log = open(self.log_path, "r+b")
+        self._entries, self._size, self._live = entries, offset, offset - _FILE_HEADER.size
+        self._version = VERSION
+        self.compactions += 1
+        self._write_index()
+
+    def _write_index(self) -> None:
+        parts = [_INDEX_HEADER.pack(INDEX_MAGIC, VERSION, self._size, len(self._entries))]
+        for key, entry in self._entries.items():
+            parts.append(_pack_text(key))
+            parts.append(_ENTRY.pack(KIND_CODES[entry.kind], len(entry.chain)))
+            parts.extend(_SPAN.pack(offset, size) for offset, size in entry.chain)
+        temporary = self.index_path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(b"".join(parts))
+        os.replace(temporary, self.index_path)
+
+    def flush(self) -> None:
+        """Writes buffered records to disk and updates the index"""
+        self._log.flush()
+        self._write_index()
+
+    def close(self) -> None:
+        """Flushes and closes the store"""
+        if self._log is not None and not self._log.closed:
+            self.flush()
+            self._log.close()
+
+    def __enter__(self) -> "SaveStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
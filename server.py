@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from player import Player
+from enemy import Enemy
+from engine import ATTACK, HEAL, Battle, random_enemy_move
+from events import ConsoleSink
+from telemetry import Telemetry, TelemetrySink
+from ticks import TickResolver
+"""
+server.py
+
+Asyncio battle server. Hosts many concurrent interactive battles in one process, one session per TCP connection.
+
+The protocol is plain text lines (try it with: nc localhost 8888):
+- The server asks for the player's name
+- Every turn it sends the "Choose your next move" prompt and reads "1" (attack) or "2" (heal)
+- Everything that happens is sent back as the same text the console game prints
+- The connection is closed when the battle ends or when the client stays idle for too long
+
+Every session only awaits its own socket, so a slow client never blocks another one.
+With a tick interval, moves are not resolved as they arrive but collected and resolved together once per tick
+(see ticks.py), which keeps the cost per move down when many sessions are playing.
+The time spent resolving each turn is recorded per session and for the whole server.
+"""
+
+PROMPT = "Choose your next move:\n1. Attack\n2. Heal\n"
+MOVES: dict = {"1": ATTACK, "2": HEAL}
+
+
+@dataclass(slots=True)
+class LatencyStats:
+    """
+    Turn resolution latency (time from receiving a move to having sent its outcome), in seconds.
+
+    Args:
+        count (int): Number of turns measured
+        total (float): Sum of all latencies
+        worst (float): Highest latency seen
+    """
+    count: int = 0
+    total: float = 0.0
+    worst: float = 0.0
+
+    def add(self, latency: float) -> None:
+        """Records one latency sample"""
+        self.count += 1
+        self.total += latency
+        if latency > self.worst:
+            self.worst = latency
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+@dataclass(slots=True)
+class ServerMetrics:
+    """
+    Counters for the whole server.
+
+    Args:
+        active_sessions (int): Sessions currently connected
+        finished_sessions (int): Sessions that played their battle to the end
+        timed_out_sessions (int): Sessions closed because the client was idle
+        latency (LatencyStats): Turn latency over every session
+        sessions (dict): Turn latency of every connected session, keyed by session number
+    """
+    active_sessions: int = 0
+    finished_sessions: int = 0
+    timed_out_sessions: int = 0
+    latency: LatencyStats = field(default_factory=LatencyStats)
+    sessions: dict = field(default_factory=dict)
+
+
+class BattleServer:
+    """
+    Hosts one battle per TCP connection.
+
+    Args:
+        player_template (dict, optional): Player stats (without the name, which the client sends).
+            Defaults to simulate.DEFAULT_PLAYER
+        enemy_template (dict, optional): Enemy stats. Defaults to simulate.DEFAULT_ENEMY
+        idle_timeout (float, optional): Seconds a client may stay silent before its session is closed
+        telemetry (Telemetry, optional): Aggregates the events of every session's battle (see telemetry.py)
+        tick_interval (float, optional): Resolve the moves of every session together once per this many seconds
+            (see ticks.py), instead of each move as it arrives
+    """
+
+    def __init__(self, player_template: Optional[dict] = None, enemy_template: Optional[dict] = None,
+                 idle_timeout: float = 300.0, telemetry: Optional[Telemetry] = None,
+                 tick_interval: Optional[float] = None):
+        """Initializes the server (call start() to begin listening)"""
+        from simulate import DEFAULT_ENEMY, DEFAULT_PLAYER, build_combatant
+
+        self._build = build_combatant # Resolves ruleset names the same way the simulator does
+        self.player_template = player_template if player_template is not None else DEFAULT_PLAYER
+        self.enemy_template = enemy_template if enemy_template is not None else DEFAULT_ENEMY
+        self.idle_timeout = idle_timeout
+        self.telemetry = telemetry
+        self.tick_interval = tick_interval
+        self.ticks = TickResolver() if tick_interval is not None else None
+        self._ticker: Optional[asyncio.Task] = None
+        self.metrics = ServerMetrics()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._next_session = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8888) -> int:
+        """
+        Starts listening for connections.
+
+        Args:
+            host (str, optional): Interface to bind
+            port (int, optional): Port to bind, 0 picks a free one
+
+        Returns:
+            int: The port the server is listening on
+        """
+        self._server = await asyncio.start_server(self.handle_session, host, port)
+        if self.ticks is not None:
+            self._ticker = asyncio.create_task(self.ticks.run(self.tick_interval))
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stops accepting connections and waits for the listening socket to close"""
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8888) -> None:
+        """Starts the server and runs until cancelled"""
+        await self.start(host, port)
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _read_line(self, reader: asyncio.StreamReader) -> Optional[str]:
+        """Reads one line from the client, None if it disconnected"""
+        line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+        if not line:
+            return None
+        return line.decode("utf-8", errors="replace").strip()
+
+    async def handle_session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Runs one interactive battle over a connection.
+
+        Args:
+            reader (asyncio.StreamReader): The client's input
+            writer (asyncio.StreamWriter): The client's output
+        """
+        metrics = self.metrics
+        metrics.active_sessions += 1
+        session = self._next_session
+        self._next_session += 1
+        session_latency = metrics.sessions[session] = LatencyStats()
+        outbox: list = [] # Rendered lines waiting to be sent
+        sink = ConsoleSink(outbox.append)
+        if self.telemetry is not None:
+            sink = TelemetrySink(self.telemetry, sink)
+
+        def send() -> None:
+            writer.write(("\n".join(outbox) + "\n").encode("utf-8"))
+            outbox.clear()
+
+        try:
+            writer.write(b"Enter your name:\n")
+            await writer.drain()
+            name = await self._read_line(reader)
+            if not name:
+                return
+
+            player = self._build(Player, {**self.player_template, "name": name})
+            enemy = self._build(Enemy, self.enemy_template)
+            player.sink = enemy.sink = sink
+            fight = Battle(player, enemy, random_enemy_move, sink=sink)
+            if self.ticks is not None:
+                self.ticks.open(session, fight)
+
+            while not fight.finished:
+                outbox.append(PROMPT)
+                send()
+                await writer.drain()
+
+                choice = await self._read_line(reader)
+                if choice is None:
+                    return
+                if choice not in MOVES:
+                    outbox.append("Invalid input. Please enter 1 or 2.")
+                    continue
+
+                started = time.perf_counter()
+                if self.ticks is not None:
+                    await self.ticks.play(session, MOVES[choice]) # Resolved with every other session's move
+                else:
+                    fight.play_turn(MOVES[choice])
+                send()
+                await writer.drain()
+                latency = time.perf_counter() - started
+                session_latency.add(latency)
+                metrics.latency.add(latency)
+
+            metrics.finished_sessions += 1
+
+        except asyncio.TimeoutError:
+            metrics.timed_out_sessions += 1
+            writer.write(b"Session closed: idle for too long.\n")
+        except ConnectionError:
+            pass
+        finally:
+            metrics.active_sessions -= 1
+            if self.ticks is not None:
+                self.ticks.close(session)
+            del metrics.sessions[session]
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def main() -> None:
+    """Command line entry point: python server.py --port 8888"""
+    parser = argparse.ArgumentParser(description="Host interactive battles over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--idle-timeout", type=float, default=300.0, help="seconds before an idle session is closed")
+    parser.add_argument("--tick-interval", type=float, default=None,
+                        help="resolve every session's moves together once per this many seconds")
+    args = parser.parse_args()
+
+    server = BattleServer(idle_timeout=args.idle_timeout, tick_interval=args.tick_interval)
+    print(f"Battle server listening on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
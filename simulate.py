@@ -0,0 +1,271 @@
+import argparse
+import json
+import os
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from multiprocessing import Pool
+from typing import Optional, Sequence
+
+from player import Player
+from enemy import Enemy
+from damage import RULESETS
+from engine import resolve_policy, run_battle
+from events import NULL_SINK
+"""
+simulate.py
+
+Monte Carlo batch simulator. Runs many independent headless battles (see engine.py) across a process pool
+and aggregates the outcomes: win rate, turns-to-kill, remaining health and loot.
+
+Every battle gets its own deterministic seed derived from the base seed and the battle's index, so the same
+call always produces the same summary no matter how many workers are used.
+Each worker aggregates its own chunk of battles and only sends back a compact summary (counters, not results).
+"""
+
+HP_BUCKET = 10 # Width of the buckets in the remaining-health histograms
+CHUNKS_PER_WORKER = 4 # Work is split into a few chunks per worker to even out the load
+SEED_LIMIT = 1 << 32 # Base seeds and battle indexes are each packed into 32 bits of a battle's seed
+
+# The combatants from battle.py, used when no templates are given
+DEFAULT_PLAYER: dict = {
+    "name": "Kramptj",
+    "attack_name": "Punch",
+    "attack_power": 10,
+    "defense": 5,
+    "inventory": {"Potion": 2},
+}
+
+DEFAULT_ENEMY: dict = {
+    "name": "Goblin",
+    "health": 30,
+    "max_health": 30,
+    "attack_name": "Bite",
+    "attack_power": 6,
+    "defense": 3,
+    "inventory": {"Gold Coin": 1},
+}
+
+
+@dataclass(slots=True)
+class SimulationSummary:
+    """
+    Aggregated outcome of a batch of battles.
+
+    Args:
+        battles (int): Number of battles simulated
+        wins (int): Battles won by the player
+        losses (int): Battles won by the enemy
+        draws (int): Battles without a winner (the turn cap was reached or a side fled)
+        win_rate (float): wins / battles
+        mean_turns (float): Average number of turns per battle
+        turn_percentiles (dict): Turn count at the 50th, 90th and 99th percentile
+        player_hp_histogram (dict): Player health left after a win, bucketed by HP_BUCKET
+        enemy_hp_histogram (dict): Enemy health left after a loss, bucketed by HP_BUCKET
+        loot_totals (dict): Total quantity of every item collected over all battles
+        policy_cache (dict): Decision cache statistics of policies that have one (ex: enemy_ai.UtilityAI),
+            {"hits", "misses", "hit_rate"}. Empty if no policy caches its decisions
+    """
+    battles: int
+    wins: int
+    losses: int
+    draws: int
+    win_rate: float
+    mean_turns: float
+    turn_percentiles: dict = field(default_factory=dict)
+    player_hp_histogram: dict = field(default_factory=dict)
+    enemy_hp_histogram: dict = field(default_factory=dict)
+    loot_totals: dict = field(default_factory=dict)
+    policy_cache: dict = field(default_factory=dict)
+
+
+def battle_seed(seed: int, index: int) -> int:
+    """
+    Returns the seed of battle number 'index' in a batch started with 'seed'.
+
+    Args:
+        seed (int): The batch's base seed
+        index (int): The battle's position in the batch
+
+    Returns:
+        int: The battle's own seed, unique for every (seed, index) pair
+
+    Raises:
+        ValueError: If the seed or the index is outside [0, SEED_LIMIT)
+    """
+    if not 0 <= seed < SEED_LIMIT or not 0 <= index < SEED_LIMIT:
+        raise ValueError(f"Battle seeds need a seed and an index in [0, 2**32), got {seed} and {index}")
+    return (seed << 32) | index
+
+
+def build_combatant(cls: type, template: dict):
+    """
+    Creates a fresh, silent Player or Enemy from a template. The template's inventory is copied (loot changes it)
+    and a ruleset may be given by name, ex: {"ruleset": "standard"}.
+
+    Args:
+        cls (type): Player or Enemy
+        template (dict): Keyword arguments for the class
+
+    Returns:
+        Player | Enemy: The new combatant
+    """
+    kwargs = {**template, "inventory": dict(template["inventory"]), "sink": NULL_SINK}
+    if isinstance(kwargs.get("ruleset"), str):
+        kwargs["ruleset"] = RULESETS[kwargs["ruleset"]]
+    return cls(**kwargs)
+
+
+def _run_chunk(args: tuple) -> tuple:
+    """
+    Worker entry point. Runs the battles with index in [start, stop) and aggregates them locally.
+
+    Returns:
+        tuple: (wins, losses, draws, turn counts, player hp counts, enemy hp counts, loot counts, cache counts)
+    """
+    player_template, enemy_template, player_spec, enemy_spec, seed, start, stop = args
+    player_policy = resolve_policy(player_spec)
+    enemy_policy = resolve_policy(enemy_spec)
+
+    wins = losses = draws = 0
+    turn_counts: Counter = Counter()
+    player_hp: Counter = Counter()
+    enemy_hp: Counter = Counter()
+    loot: Counter = Counter()
+    cache: Counter = Counter()
+    cached_policies = [policy for policy in {id(p): p for p in (player_policy, enemy_policy)}.values()
+                       if hasattr(policy, "cache_info")]
+    for policy in cached_policies: # The policy may be shared between chunks, only count this chunk's lookups
+        stats = policy.cache_info()
+        cache.subtract({"hits": stats.hits, "misses": stats.misses})
+
+    for index in range(start, stop):
+        # Every battle gets fresh combatants
+        player = build_combatant(Player, player_template)
+        enemy = build_combatant(Enemy, enemy_template)
+
+        result = run_battle(player, enemy, player_policy, enemy_policy, seed=battle_seed(seed, index))
+
+        turn_counts[result.turns] += 1
+        if result.winner == "player":
+            wins += 1
+            player_hp[player.health // HP_BUCKET * HP_BUCKET] += 1
+            loot.update(result.loot)
+        elif result.winner == "enemy":
+            losses += 1
+            enemy_hp[enemy.health // HP_BUCKET * HP_BUCKET] += 1
+        else:
+            draws += 1
+
+    for policy in cached_policies:
+        stats = policy.cache_info()
+        cache.update({"hits": stats.hits, "misses": stats.misses})
+
+    return wins, losses, draws, turn_counts, player_hp, enemy_hp, loot, cache
+
+
+def _percentile(counts: Counter, total: int, percent: float) -> int:
+    """Returns the value at 'percent' (0-100) of a histogram of counts"""
+    rank = max(1, -(-total * percent // 100)) # Ceiling of total * percent / 100, at least the first value
+    running = 0
+    for value in sorted(counts):
+        running += counts[value]
+        if running >= rank:
+            return value
+    return 0
+
+
+def simulate(player_template: Optional[dict] = None, enemy_template: Optional[dict] = None, n: int = 1000,
+             policies: Sequence = ("attack", "random"), workers: Optional[int] = None,
+             seed: int = 0, first: int = 0) -> SimulationSummary:
+    """
+    Runs 'n' independent battles and aggregates their outcomes.
+
+    Args:
+        player_template (dict, optional): Keyword arguments for Player. Defaults to DEFAULT_PLAYER
+        enemy_template (dict, optional): Keyword arguments for Enemy. Defaults to DEFAULT_ENEMY
+        n (int, optional): Number of battles to run
+        policies (sequence, optional): (player policy, enemy policy), either names from engine.POLICIES or
+            picklable callables
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs, 1 runs in-process
+        seed (int, optional): Base seed, every battle derives its own seed from it
+        first (int, optional): Index of the first battle, so a batch can be extended with the battles that follow it
+
+    Returns:
+        SimulationSummary: The aggregated results
+
+    Raises:
+        ValueError: If the seed or the battle indexes are outside [0, SEED_LIMIT) (see battle_seed)
+    """
+    if not 0 <= seed < SEED_LIMIT:
+        raise ValueError(f"The base seed must be in [0, 2**32), got {seed}")
+    if first < 0 or first + n > SEED_LIMIT:
+        raise ValueError(f"Battle indexes must be in [0, 2**32), got {first} to {first + n}")
+    player_template = player_template if player_template is not None else DEFAULT_PLAYER
+    enemy_template = enemy_template if enemy_template is not None else DEFAULT_ENEMY
+    player_spec, enemy_spec = policies
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+
+    # Split the battle indexes into contiguous chunks
+    chunk_count = max(1, min(n, workers * CHUNKS_PER_WORKER))
+    bounds = [first + n * i // chunk_count for i in range(chunk_count + 1)]
+    chunks = [(player_template, enemy_template, player_spec, enemy_spec, seed, bounds[i], bounds[i + 1])
+              for i in range(chunk_count)]
+
+    if workers <= 1:
+        partials = [_run_chunk(chunk) for chunk in chunks]
+    else:
+        with Pool(workers) as pool:
+            partials = pool.map(_run_chunk, chunks)
+
+    wins = losses = draws = 0
+    turn_counts: Counter = Counter()
+    player_hp: Counter = Counter()
+    enemy_hp: Counter = Counter()
+    loot: Counter = Counter()
+    cache: Counter = Counter()
+
+    for part_wins, part_losses, part_draws, part_turns, part_player_hp, part_enemy_hp, part_loot, part_cache in partials:
+        wins += part_wins
+        losses += part_losses
+        draws += part_draws
+        turn_counts.update(part_turns)
+        player_hp.update(part_player_hp)
+        enemy_hp.update(part_enemy_hp)
+        loot.update(part_loot)
+        cache.update(part_cache)
+
+    lookups = cache["hits"] + cache["misses"]
+    return SimulationSummary(
+        battles=n,
+        wins=wins,
+        losses=losses,
+        draws=draws,
+        win_rate=wins / n if n else 0.0,
+        mean_turns=sum(turns * count for turns, count in turn_counts.items()) / n if n else 0.0,
+        turn_percentiles={percent: _percentile(turn_counts, n, percent) for percent in (50, 90, 99)},
+        player_hp_histogram=dict(sorted(player_hp.items())),
+        enemy_hp_histogram=dict(sorted(enemy_hp.items())),
+        loot_totals=dict(loot),
+        policy_cache={"hits": cache["hits"], "misses": cache["misses"], "hit_rate": cache["hits"] / lookups}
+        if lookups else {},
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Command line entry point: python simulate.py -n 10000 --workers 4"""
+    parser = argparse.ArgumentParser(description="Run a batch of headless battles and print aggregated results.")
+    parser.add_argument("-n", type=int, default=1000, help="number of battles")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--seed", type=int, default=0, help="base seed")
+    parser.add_argument("--player-policy", default="attack", help='player policy, ex: "attack" or "heal_below:40"')
+    parser.add_argument("--enemy-policy", default="random", help="enemy policy")
+    parser.add_argument("--player", type=json.loads, default=None, help="player template as JSON")
+    parser.add_argument("--enemy", type=json.loads, default=None, help="enemy template as JSON")
+    args = parser.parse_args(argv)
+
+    summary = simulate(args.player, args.enemy, args.n, (args.player_policy, args.enemy_policy), args.workers, args.seed)
+    print(json.dumps(asdict(summary), indent=2))
+
+
+if __name__ == "__main__":
+    main()
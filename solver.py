@@ -0,0 +1,322 @@
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from player import Player
+from enemy import Enemy
+from damage import NEUTRAL
+from engine import ATTACK, HEAL, HEAL_AMOUNT
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional, it only speeds up the common case
+    np = None
+"""
+solver.py
+
+Exact solver for one Player vs one Enemy: win probability, expected number of turns and the optimal attack/heal
+policy, computed by dynamic programming instead of simulation.
+
+The state of a battle is (player health, enemy health, potions left, whose half of the turn it is). Damage comes
+from the combatants' damage tables (damage.py), which are equally likely outcomes, so every transition has an
+exact probability. States are filled in an order where everything a state depends on is already known:
+potions ascending, then enemy health ascending, then player health ascending. The only cycles are rounds where
+both sides deal 0 damage, and those are solved in closed form.
+
+When NumPy is installed and the player's attacks always deal damage (the usual case), each enemy health row only
+depends on earlier rows, so whole rows are computed at once with array operations.
+
+Assumptions, matching engine.py:
+- the player acts first each turn, the enemy only attacks (random_enemy_move)
+- a heal restores HEAL_AMOUNT up to the player's maximum health and uses up one Potion
+- the turn cap is ignored (a battle where nobody can ever deal damage is a draw with infinite expected turns)
+
+    solution = solve(player, enemy)
+    solution.win_probability, solution.expected_turns
+    run_battle(player, enemy, solution.policy)
+"""
+
+POTION = "Potion"
+_TIE = 1e-12 # Win probabilities closer than this are considered equal (the shorter battle is preferred)
+
+
+@dataclass(slots=True)
+class Solution:
+    """
+    Exact outcome of a battle from its starting state.
+
+    Args:
+        win_probability (float): Chance that the player wins
+        expected_turns (float): Expected number of turns (inf if the battle can't end)
+        policy (OptimalPolicy): The policy that was solved for (the optimal one unless heal_below was given)
+    """
+    win_probability: float
+    expected_turns: float
+    policy: "OptimalPolicy"
+
+
+@dataclass(slots=True)
+class GridPoint:
+    """Solver result for one combination of stats of solve_grid()"""
+    player_attack: int
+    enemy_defense: int
+    enemy_health: int
+    win_probability: float
+    expected_turns: float
+
+
+class OptimalPolicy:
+    """
+    Player policy backed by the solver's decision table. Usable anywhere a Policy is (ex: run_battle).
+
+    Args:
+        heals (bytearray): 1 where healing is the best action, indexed by _index()
+        max_health (int): The player's maximum health
+        max_enemy_health (int): Highest enemy health covered by the table
+        potions (int): Most potions covered by the table
+    """
+
+    def __init__(self, heals: bytearray, max_health: int, max_enemy_health: int, potions: int):
+        """Initializes the policy from a solved decision table"""
+        self._heals = heals
+        self.max_health = max_health
+        self.max_enemy_health = max_enemy_health
+        self.potions = potions
+
+    def _index(self, player_health: int, enemy_health: int, potions: int) -> int:
+        return (potions * (self.max_enemy_health + 1) + enemy_health) * (self.max_health + 1) + player_health
+
+    def action(self, player_health: int, enemy_health: int, potions: int) -> str:
+        """
+        Returns the best action for a state (ATTACK or HEAL).
+
+        Raises:
+            ValueError: If the state is outside the solved table
+        """
+        if not (0 < player_health <= self.max_health and 0 < enemy_health <= self.max_enemy_health):
+            raise ValueError(f"State ({player_health}, {enemy_health}, {potions}) is outside the solved table")
+        potions = min(potions, self.potions)
+        return HEAL if self._heals[self._index(player_health, enemy_health, potions)] else ATTACK
+
+    def __call__(self, actor, opponent, rng) -> str:
+        return self.action(actor.health, opponent.health, actor.inventory.get(POTION, 0))
+
+
+def damage_distribution(attacker, defender) -> list:
+    """
+    Returns the exact damage distribution of one attack, from the attacker's damage table.
+
+    Returns:
+        list: (damage, probability) pairs
+    """
+    outcomes = attacker.ruleset.table(attacker.attack_power, defender.defense, getattr(attacker, "element", NEUTRAL),
+                                      getattr(defender, "element", NEUTRAL))
+    counts: dict = {}
+    for damage in outcomes:
+        counts[damage] = counts.get(damage, 0) + 1
+    return [(damage, count / len(outcomes)) for damage, count in sorted(counts.items())]
+
+
+def _solve_rows(player_hits: list, enemy_hits: list, max_health: int, max_enemy_health: int, potions: int,
+                heal_below: Optional[int]) -> tuple:
+    """NumPy version of _solve_tables for players that never deal 0 damage: one array operation per row"""
+    width = max_health + 1
+    blocked = dict(enemy_hits).get(0, 0.0)
+    enemy_hits = [(damage, chance) for damage, chance in enemy_hits if 0 < damage < width]
+    healed = np.minimum(np.arange(width) + HEAL_AMOUNT, max_health) # Player health after a heal
+    may_heal = np.arange(width) > 0
+    if heal_below is not None:
+        may_heal &= np.arange(width) <= heal_below
+    heals = np.zeros((potions + 1, max_enemy_health + 1, width), dtype=np.uint8)
+
+    previous_u = previous_tu = None
+    for potions_left in range(potions + 1):
+        win = np.zeros((max_enemy_health + 1, width))
+        turns = np.zeros((max_enemy_health + 1, width))
+        u = np.zeros((max_enemy_health + 1, width))
+        tu = np.zeros((max_enemy_health + 1, width))
+        for enemy_health in range(1, max_enemy_health + 1):
+            value = np.zeros(width)
+            expected = np.zeros(width)
+            for damage, chance in player_hits:
+                if enemy_health <= damage:
+                    value += chance
+                    expected += chance
+                else:
+                    value += chance * u[enemy_health - damage]
+                    expected += chance * tu[enemy_health - damage]
+
+            if potions_left:
+                heal_value = previous_u[enemy_health][healed]
+                heal_expected = previous_tu[enemy_health][healed]
+                if heal_below is not None:
+                    use_heal = may_heal
+                else:
+                    use_heal = may_heal & ((heal_value > value + _TIE) |
+                                           ((heal_value > value - _TIE) & (heal_expected < expected)))
+                value = np.where(use_heal, heal_value, value)
+                expected = np.where(use_heal, heal_expected, expected)
+                heals[potions_left, enemy_health] = use_heal
+
+            value[0] = expected[0] = 0.0 # No player health left, never reached
+            win[enemy_health] = value
+            turns[enemy_health] = expected
+            # The enemy's response: every non-lethal hit leads to a player-to-act state of the same row
+            response = blocked * value
+            response_turns = 1.0 + blocked * expected
+            for damage, chance in enemy_hits:
+                response[damage + 1:] += chance * value[1:width - damage]
+                response_turns[damage + 1:] += chance * expected[1:width - damage]
+            u[enemy_health] = response
+            tu[enemy_health] = response_turns
+        previous_u, previous_tu = u, tu
+    return win.ravel().tolist(), turns.ravel().tolist(), bytearray(heals.tobytes())
+
+
+def _solve_tables(player_hits: list, enemy_hits: list, max_health: int, max_enemy_health: int, potions: int,
+                  heal_below: Optional[int]) -> tuple:
+    """
+    Fills the DP tables for every state with enemy health up to 'max_enemy_health'.
+
+    Returns:
+        tuple: (win probability and expected turns of the player-to-act states with 'potions' potions, as flat
+        lists indexed by enemy_health * (max_health + 1) + player_health, and the heal decision table)
+    """
+    miss = dict(player_hits).get(0, 0.0) # Chance that the player's attack deals 0 damage
+    if np is not None and miss == 0:
+        return _solve_rows(player_hits, enemy_hits, max_health, max_enemy_health, potions, heal_below)
+
+    width = max_health + 1
+    size = (max_enemy_health + 1) * width
+    blocked = dict(enemy_hits).get(0, 0.0) # Chance that the enemy's attack deals 0 damage
+    loop = miss * blocked # Chance that a round of attacks changes nothing
+    player_hits = [(damage, chance) for damage, chance in player_hits if damage > 0]
+    enemy_hits = [(damage, chance) for damage, chance in enemy_hits if damage > 0]
+    heals = bytearray(size * (potions + 1))
+
+    previous_u = previous_tu = None # Enemy-to-act tables with one potion less
+    for potions_left in range(potions + 1):
+        win = [0.0] * size # Player to act
+        turns = [0.0] * size
+        u = [0.0] * size # Enemy to act (the player already acted this turn)
+        tu = [0.0] * size
+        for enemy_health in range(1, max_enemy_health + 1):
+            row = enemy_health * width
+            for player_health in range(1, width):
+                index = row + player_health
+
+                # The enemy's response from this state, without its 0 damage outcome (it loops back to this state)
+                u_rest = tu_rest = 0.0
+                for damage, chance in enemy_hits:
+                    if player_health > damage:
+                        u_rest += chance * win[index - damage]
+                        tu_rest += chance * turns[index - damage]
+
+                # Attack
+                v_rest = t_rest = 0.0
+                for damage, chance in player_hits:
+                    if enemy_health <= damage:
+                        v_rest += chance
+                        t_rest += chance
+                    else:
+                        target = index - damage * width
+                        v_rest += chance * u[target]
+                        t_rest += chance * tu[target]
+                if loop >= 1.0:
+                    value, expected = 0.0, math.inf # Nobody can ever deal damage
+                else:
+                    value = (v_rest + miss * u_rest) / (1.0 - loop)
+                    expected = (t_rest + miss * (1.0 + tu_rest)) / (1.0 - loop)
+
+                # Heal (uses a potion, so it only depends on the previous layer)
+                if potions_left:
+                    healed = row + min(player_health + HEAL_AMOUNT, max_health)
+                    heal_value, heal_expected = previous_u[healed], previous_tu[healed]
+                    if heal_below is not None:
+                        use_heal = player_health <= heal_below
+                    else:
+                        use_heal = heal_value > value + _TIE or (heal_value > value - _TIE and heal_expected < expected)
+                    if use_heal:
+                        value, expected = heal_value, heal_expected
+                        heals[potions_left * size + index] = 1
+
+                win[index] = value
+                turns[index] = expected
+                u[index] = u_rest + blocked * value
+                tu[index] = 1.0 + tu_rest + blocked * expected
+        previous_u, previous_tu = u, tu
+    return win, turns, heals
+
+
+def solve(player: Player, enemy: Enemy, potions: Optional[int] = None, heal_below: Optional[int] = None) -> Solution:
+    """
+    Solves a battle exactly from the combatants' current state.
+
+    Args:
+        player (Player): The player (health, attack power, defense, ruleset and element are used)
+        enemy (Enemy): The enemy
+        potions (int, optional): Potions available, defaults to the player's Potion count
+        heal_below (int, optional): Evaluate the HealBelow(heal_below) policy instead of finding the optimal one
+
+    Returns:
+        Solution: Win probability, expected turns and the policy
+    """
+    potions = potions if potions is not None else player.inventory.get(POTION, 0)
+    win, turns, heals = _solve_tables(damage_distribution(player, enemy), damage_distribution(enemy, player),
+                                      player.max_health, enemy.health, potions, heal_below)
+    index = enemy.health * (player.max_health + 1) + player.health
+    return Solution(win[index], turns[index], OptimalPolicy(heals, player.max_health, enemy.health, potions))
+
+
+def solve_grid(player_attack: Sequence[int], enemy_defense: Sequence[int], enemy_health: Sequence[int],
+               player_template: Optional[dict] = None, enemy_template: Optional[dict] = None,
+               heal_below: Optional[int] = None) -> list:
+    """
+    Solves every combination of player attack power, enemy defense and enemy health, like vectorized.grid().
+    One DP per (attack, defense) pair covers every enemy health at once, so the health axis is nearly free.
+
+    Args:
+        player_attack (sequence): Player attack_power values
+        enemy_defense (sequence): Enemy defense values
+        enemy_health (sequence): Enemy health values
+        player_template (dict, optional): Player stats, defaults to simulate.DEFAULT_PLAYER
+        enemy_template (dict, optional): Enemy stats, defaults to simulate.DEFAULT_ENEMY
+        heal_below (int, optional): Evaluate HealBelow(heal_below) instead of the optimal policy
+
+    Returns:
+        list: GridPoint for every combination, in row-major order (player_attack varies slowest)
+    """
+    from simulate import DEFAULT_ENEMY, DEFAULT_PLAYER, build_combatant
+
+    player = build_combatant(Player, player_template if player_template is not None else DEFAULT_PLAYER)
+    enemy = build_combatant(Enemy, enemy_template if enemy_template is not None else DEFAULT_ENEMY)
+    potions = player.inventory.get(POTION, 0)
+    highest = max(enemy_health)
+    width = player.max_health + 1
+
+    points = []
+    for attack in player_attack:
+        player.attack_power = attack
+        for defense in enemy_defense:
+            enemy.defense = defense
+            win, turns, _ = _solve_tables(damage_distribution(player, enemy), damage_distribution(enemy, player),
+                                          player.max_health, highest, potions, heal_below)
+            for health in enemy_health:
+                index = health * width + player.health
+                points.append(GridPoint(attack, defense, health, win[index], turns[index]))
+    return points
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    grid = solve_grid(range(1, 31), range(0, 10), range(10, 110, 10),
+                      enemy_template={"name": "Goblin", "health": 30, "max_health": 30, "attack_name": "Bite",
+                                      "attack_power": 6, "defense": 3, "inventory": {}, "ruleset": "standard"},
+                      player_template={"name": "Kramptj", "attack_name": "Punch", "attack_power": 10, "defense": 5,
+                                       "inventory": {"Potion": 2}, "ruleset": "standard"})
+    elapsed = time.perf_counter() - start
+    print(f"{len(grid)} exact solutions in {elapsed:.2f}s")
+    for point in grid[::97]:
+        print(point)
@@ -0,0 +1,278 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from events import NULL_SINK, EventSink, StatusApplied, StatusExpired
+"""
+status.py
+
+Status effects (poison, regeneration, stun, attack and defense buffs) scheduled on a hierarchical timer wheel.
+
+Statuses don't get scanned every turn. Each one is filed on the wheel under the next turn it needs attention (a
+poison tick, a buff wearing off), so advancing a turn only touches the statuses due that turn:
+- poison / regen: deal damage / heal 'amount' at the start of each of the next 'turns' turns, through the
+  combatant's own take_damage() / heal(), so defeat checks and health caps work as for any other damage or heal.
+  Ticks stop as soon as the combatant is defeated (regeneration never brings anyone back)
+- attack_up / defense_up: change the stat by 'amount' right away (negative amounts are debuffs) and change it back
+  when the status wears off, at the start of the turn after the last one it covers
+- stun: the combatant skips its next 'turns' actions (counted in actions rather than turns, so it doesn't depend on
+  who acts first within a turn)
+
+The wheel (TimerWheel) has levels of 2^bits slots each. Level 0 holds the statuses due within the current block of
+2^bits turns, one slot per turn, level 1 the ones due in the current block of 2^(2*bits) turns, one slot per
+2^bits turns, and so on; anything further away waits in an overflow list. When the turn enters a new slot of a
+higher level, that slot's statuses are re-filed into the lower levels (cascading), so each status is moved at most
+once per level.
+
+    statuses = StatusEffects()
+    statuses.apply(enemy, POISON, turns=3, amount=4)
+    statuses.advance(turn) # At the start of every turn (engine.Battle does it)
+"""
+
+POISON = "poison"
+REGEN = "regen"
+STUN = "stun"
+ATTACK_UP = "attack_up"
+DEFENSE_UP = "defense_up"
+STATUSES: tuple = (POISON, REGEN, STUN, ATTACK_UP, DEFENSE_UP)
+
+PERIODIC: dict = {POISON: "take_damage", REGEN: "heal"} # Statuses that tick every turn -> method applying the tick
+STATS: dict = {ATTACK_UP: "attack_power", DEFENSE_UP: "defense"} # Buffs -> the stat they change
+
+WHEEL_BITS = 6 # 64 slots per level
+WHEEL_LEVELS = 3 # Levels 0-2 cover 2^18 turns, further statuses wait in the overflow list
+
+
+class TimerWheel:
+    """
+    A hierarchical timing wheel of items keyed by turn number.
+
+    Args:
+        bits (int, optional): Each level has 2^bits slots
+        levels (int, optional): Number of levels
+        now (int, optional): The current turn
+    """
+
+    def __init__(self, bits: int = WHEEL_BITS, levels: int = WHEEL_LEVELS, now: int = 0):
+        """Initializes an empty wheel"""
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.now = now
+        self._levels: list = [None] * levels # Each level's slots, allocated when something is first filed there
+        self._overflow: list = []
+        self._pending = 0
+
+    def __len__(self) -> int:
+        """Number of scheduled items"""
+        return self._pending
+
+    def _file(self, turn: int, item) -> None:
+        """Puts an item in the lowest level whose current block contains its turn"""
+        bits, now = self.bits, self.now
+        for level, slots in enumerate(self._levels):
+            shift = bits * (level + 1)
+            if turn >> shift == now >> shift:
+                if slots is None:
+                    slots = self._levels[level] = [[] for _ in range(1 << bits)]
+                slots[(turn >> (bits * level)) & self.mask].append((turn, item))
+                return
+        self._overflow.append((turn, item))
+
+    def schedule(self, turn: int, item) -> None:
+        """
+        Schedules an item.
+
+        Args:
+            turn (int): The turn the item is due, after the current one
+            item: Anything, handed back by advance() on that turn
+
+        Raises:
+            ValueError: If the turn isn't in the future
+        """
+        if turn <= self.now:
+            raise ValueError(f"Turn {turn} isn't after the current turn {self.now}")
+        self._file(turn, item)
+        self._pending += 1
+
+    def advance(self) -> list:
+        """
+        Moves to the next turn.
+
+        Returns:
+            list: The items due that turn, in the order they were scheduled
+        """
+        now = self.now = self.now + 1
+        if not self._pending:
+            return []
+
+        bits = self.bits
+        if not now & ((1 << (bits * len(self._levels))) - 1): # Entered a new top-level block
+            overflow, self._overflow = self._overflow, []
+            for turn, item in overflow:
+                self._file(turn, item)
+        for level in range(len(self._levels) - 1, 0, -1): # Cascade the slots the turn just entered, top-down
+            slots = self._levels[level]
+            if slots is not None and not now & ((1 << (bits * level)) - 1):
+                index = (now >> (bits * level)) & self.mask
+                entries, slots[index] = slots[index], []
+                for turn, item in entries:
+                    self._file(turn, item)
+
+        slots = self._levels[0]
+        if slots is None:
+            return []
+        index = now & self.mask
+        due, slots[index] = slots[index], []
+        self._pending -= len(due)
+        return [item for _, item in due]
+
+
+@dataclass(slots=True, eq=False)
+class Status:
+    """
+    A status on a combatant.
+
+    Args:
+        kind (str): One of STATUSES
+        target: The combatant it affects
+        amount (int): Damage or healing per tick, or the stat change of a buff
+        ends (int): Turn it wears off (the last tick of poison/regen happens on the turn before)
+        active (bool): False once it has worn off or was cleared
+    """
+    kind: str
+    target: object
+    amount: int
+    ends: int
+    active: bool = True
+
+
+class StatusEffects:
+    """
+    The statuses of every combatant in a battle (or any number of battles sharing a turn counter).
+
+    Args:
+        sink (EventSink, optional): Receives StatusApplied / StatusExpired events. Defaults to discarding them
+        turn (int, optional): The current turn
+    """
+
+    def __init__(self, sink: EventSink = NULL_SINK, turn: int = 0):
+        """Initializes an empty set of statuses"""
+        self.sink = sink
+        self.wheel = TimerWheel(now=turn)
+        self.stuns: dict = {} # {id(combatant): actions left to skip}
+        self._on: dict = {} # {id(combatant): active Statuses (stuns aside)}
+
+    @property
+    def turn(self) -> int:
+        """The current turn"""
+        return self.wheel.now
+
+    @property
+    def pending(self) -> int:
+        """Number of statuses scheduled on the wheel"""
+        return len(self.wheel)
+
+    def apply(self, target, kind: str, turns: int, amount: int = 0) -> Optional[Status]:
+        """
+        Puts a status on a combatant. Statuses of the same kind stack (two poisons tick twice, stuns add up).
+
+        Args:
+            target (Player | Enemy): The combatant
+            kind (str): One of STATUSES
+            turns (int): How many turns it lasts (actions skipped for a stun)
+            amount (int, optional): Damage or healing per turn, or the stat change of a buff
+
+        Returns:
+            Status | None: The new status (None for a stun, which is only a counter)
+
+        Raises:
+            ValueError: If the kind is unknown or 'turns' isn't positive
+        """
+        if kind not in STATUSES:
+            raise ValueError(f"Unknown status: {kind!r} (expected one of {', '.join(STATUSES)})")
+        if turns < 1:
+            raise ValueError("A status has to last at least one turn")
+
+        if self.sink.enabled:
+            self.sink.emit(StatusApplied(target.name, kind, turns, amount))
+        if kind == STUN:
+            self.stuns[id(target)] = self.stuns.get(id(target), 0) + turns
+            return None
+
+        now = self.wheel.now
+        status = Status(kind, target, amount, now + turns + 1)
+        if kind in STATS:
+            stat = STATS[kind]
+            setattr(target, stat, getattr(target, stat) + amount)
+            self.wheel.schedule(status.ends, status)
+        else:
+            self.wheel.schedule(now + 1, status) # First tick
+        self._on.setdefault(id(target), []).append(status)
+        return status
+
+    def skips_action(self, combatant) -> bool:
+        """
+        Called when a combatant is about to act: True if it's stunned, in which case one skipped action is used up.
+        """
+        left = self.stuns.get(id(combatant))
+        if not left:
+            return False
+        if left == 1:
+            del self.stuns[id(combatant)]
+        else:
+            self.stuns[id(combatant)] = left - 1
+        return True
+
+    def effects_on(self, combatant) -> list:
+        """Returns the active statuses of a combatant (stuns aside, see 'stuns')"""
+        return list(self._on.get(id(combatant), ()))
+
+    def advance(self, turn: int) -> None:
+        """
+        Moves to 'turn' and applies everything due on the way: poison and regeneration ticks, buffs wearing off.
+
+        Args:
+            turn (int): The new current turn
+        """
+        wheel = self.wheel
+        while wheel.now < turn:
+            if not len(wheel): # Nothing scheduled, jump straight there
+                wheel.now = turn
+                return
+            for status in wheel.advance():
+                if status.active: # Otherwise it was cleared while it waited on the wheel
+                    self._tick(status)
+
+    def _tick(self, status: Status) -> None:
+        method = PERIODIC.get(status.kind)
+        if method is None: # A buff wearing off
+            self._expire(status)
+        elif status.target.is_defeated(): # Nothing to poison or regenerate anymore
+            self._expire(status)
+        else:
+            getattr(status.target, method)(status.amount)
+            if self.wheel.now + 1 < status.ends:
+                self.wheel.schedule(self.wheel.now + 1, status)
+            else:
+                self._expire(status)
+
+    def _expire(self, status: Status) -> None:
+        status.active = False
+        stat = STATS.get(status.kind)
+        if stat is not None:
+            setattr(status.target, stat, getattr(status.target, stat) - status.amount)
+        statuses = self._on.get(id(status.target))
+        if statuses is not None:
+            statuses.remove(status)
+            if not statuses:
+                del self._on[id(status.target)]
+        if self.sink.enabled:
+            self.sink.emit(StatusExpired(status.target.name, status.kind))
+
+    def clear(self, combatant) -> None:
+        """Removes every status from a combatant right away (buffs are taken back, nothing else ticks)"""
+        self.stuns.pop(id(combatant), None)
+        for status in self._on.pop(id(combatant), ()):
+            status.active = False
+            stat = STATS.get(status.kind)
+            if stat is not None:
+                setattr(combatant, stat, getattr(combatant, stat) - status.amount)
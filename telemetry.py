@@ -0,0 +1,329 @@
+import json
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+from events import (BattleEnded, CombatEvent, DamageDealt, EventSink, ItemAdded, ItemUsed, TurnEnded)
+"""
+telemetry.py
+
+Streaming battle telemetry: live aggregates of every battle in bounded memory, without keeping any event.
+
+Events flow through a pipeline of generators and sinks into a Telemetry aggregator, which keeps:
+- win rate per enemy (battles are grouped by the enemy's name)
+- damage per turn, dealt by each side, as quantiles from a streaming sketch (QuantileSketch)
+- items used (Potions and the rest, see effects.py)
+- loot inflow, the items collected from defeated enemies
+
+Aggregates are kept per window of 'window' battles (tumbling windows). Only the window being filled and the last
+complete one are kept apart, older ones are folded into the lifetime totals, so memory doesn't grow with the number
+of battles. A snapshot() reports the recent battles (last complete window plus the current one) and the lifetime.
+
+Each event costs one dict lookup on its type, and events the aggregates don't need cost nothing more. The damage of
+a turn is summed as it happens and only goes into the sketch once, when the turn ends.
+
+    telemetry = Telemetry(window=1000)
+    run_battle(player, enemy, sink=TelemetrySink(telemetry))                # Live, from a battle
+    run_battle(player, enemy, sink=TelemetrySink(telemetry, CONSOLE))       # ... and still printed
+    telemetry.feed(read_json_lines(open("battle.jsonl")))                   # From a JsonLinesSink file
+    telemetry.snapshot()["recent"]["win_rate"]                              # {"Goblin": 0.71}
+"""
+
+QUANTILES: tuple = (0.5, 0.9, 0.99) # Reported by snapshots
+
+EVENT_TYPES: dict = {event_type.__name__: event_type for event_type in CombatEvent.__args__} # For read_json_lines
+
+
+class QuantileSketch:
+    """
+    Streaming quantiles of non-negative values with a bounded relative error, in bounded memory (a DDSketch).
+
+    Values are counted in logarithmic buckets: bucket i holds the values in (gamma^(i-1), gamma^i], so any quantile
+    is known within 'relative_accuracy' of its true value. Sketches of the same accuracy merge exactly.
+
+    Args:
+        relative_accuracy (float, optional): Relative error of the quantiles, between 0 and 1
+        max_buckets (int, optional): Once there are more buckets, the lowest ones are folded together (only the
+            lowest quantiles lose accuracy then)
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        """Initializes an empty sketch"""
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._inverse_log_gamma = 1 / math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets: dict = {} # {bucket index: count}
+        self.zeros = 0 # Values of 0 (and below) have no logarithm, they are counted apart
+        self.count = 0
+        self.total = 0.0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Adds 'count' occurrences of a value"""
+        self.count += count
+        self.total += value * count
+        if value <= 0:
+            self.zeros += count
+            return
+        index = math.ceil(math.log(value) * self._inverse_log_gamma)
+        buckets = self.buckets
+        buckets[index] = buckets.get(index, 0) + count
+        if len(buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        lowest, second = sorted(self.buckets)[:2]
+        self.buckets[second] += self.buckets.pop(lowest)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Adds every value of another sketch to this one.
+
+        Raises:
+            ValueError: If the sketches don't have the same accuracy
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        self.count += other.count
+        self.total += other.total
+        self.zeros += other.zeros
+        buckets = self.buckets
+        for index, count in other.buckets.items():
+            buckets[index] = buckets.get(index, 0) + count
+        while len(buckets) > self.max_buckets:
+            self._collapse()
+
+    def copy(self) -> "QuantileSketch":
+        sketch = QuantileSketch(self.relative_accuracy, self.max_buckets)
+        sketch.merge(self)
+        return sketch
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Args:
+            q (float): The quantile, between 0 and 1
+
+        Returns:
+            float: The estimated value at that quantile (0.0 if the sketch is empty)
+        """
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return 0.0
+        seen = self.zeros
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1) # The middle of the bucket, in relative terms
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def summary(self) -> dict:
+        """{"count", "mean", "p50", "p90", "p99"}"""
+        summary = {"count": self.count, "mean": self.mean}
+        for q in QUANTILES:
+            summary[f"p{round(q * 100)}"] = self.quantile(q)
+        return summary
+
+
+@dataclass(slots=True)
+class Window:
+    """
+    Aggregates of a run of battles.
+
+    Args:
+        relative_accuracy (float): Relative error of the damage sketches
+        battles (int): Battles that ended
+        outcomes (dict): {enemy name: [battles, player wins]}
+        damage (dict): {side dealing the damage: QuantileSketch of its damage per turn}
+        items_used (Counter): Items used, by name
+        loot (Counter): Items collected as loot, by name
+    """
+    relative_accuracy: float = 0.01
+    battles: int = 0
+    outcomes: dict = field(default_factory=dict)
+    damage: dict = field(default_factory=dict)
+    items_used: Counter = field(default_factory=Counter)
+    loot: Counter = field(default_factory=Counter)
+
+    def __post_init__(self):
+        for side in ("player", "enemy"):
+            self.damage.setdefault(side, QuantileSketch(self.relative_accuracy))
+
+    def merge(self, other: "Window") -> None:
+        """Adds another window's aggregates to this one"""
+        self.battles += other.battles
+        for enemy, (battles, wins) in other.outcomes.items():
+            outcome = self.outcomes.setdefault(enemy, [0, 0])
+            outcome[0] += battles
+            outcome[1] += wins
+        for side, sketch in other.damage.items():
+            self.damage[side].merge(sketch)
+        self.items_used.update(other.items_used)
+        self.loot.update(other.loot)
+
+    def report(self) -> dict:
+        """The aggregates as plain data"""
+        return {
+            "battles": self.battles,
+            "win_rate": {enemy: wins / battles for enemy, (battles, wins) in sorted(self.outcomes.items())},
+            "battles_per_enemy": {enemy: battles for enemy, (battles, _) in sorted(self.outcomes.items())},
+            "damage_per_turn": {side: sketch.summary() for side, sketch in self.damage.items()},
+            "potions_used": self.items_used["Potion"],
+            "items_used": dict(self.items_used),
+            "loot": dict(self.loot),
+        }
+
+
+class Telemetry:
+    """
+    Rolling aggregates of a stream of combat events.
+
+    Args:
+        window (int, optional): Battles per window
+        relative_accuracy (float, optional): Relative error of the damage quantiles
+    """
+
+    def __init__(self, window: int = 1000, relative_accuracy: float = 0.01):
+        """Initializes empty aggregates"""
+        self.window = window
+        self.relative_accuracy = relative_accuracy
+        self.events = 0
+        self._lifetime = Window(relative_accuracy) # Every window before the previous one
+        self._previous: Optional[Window] = None
+        self._current = Window(relative_accuracy)
+        self._turn_damage: dict = {"player": 0, "enemy": 0} # Damage dealt by each side during the current turn
+        self._handlers: dict = {DamageDealt: self._damage_dealt, TurnEnded: self._turn_ended,
+                                BattleEnded: self._battle_ended, ItemUsed: self._item_used, ItemAdded: self._item_added}
+
+    # ----- Stages -----
+
+    def handle(self, event: CombatEvent) -> None:
+        """Aggregates one event"""
+        self.events += 1
+        handler = self._handlers.get(type(event))
+        if handler is not None:
+            handler(event)
+
+    def feed(self, events: Iterable[CombatEvent]) -> int:
+        """
+        Aggregates every event of a stream (the end of a pipeline).
+
+        Returns:
+            int: Number of events consumed
+        """
+        handlers = self._handlers
+        count = 0
+        for event in events:
+            handler = handlers.get(type(event))
+            if handler is not None:
+                handler(event)
+            count += 1
+        self.events += count
+        return count
+
+    def tap(self, events: Iterable[CombatEvent]) -> Iterator[CombatEvent]:
+        """Aggregates the events of a stream and passes them on (the middle of a pipeline)"""
+        handle = self.handle
+        for event in events:
+            handle(event)
+            yield event
+
+    # ----- Aggregation -----
+
+    def _damage_dealt(self, event: DamageDealt) -> None:
+        # 'side' is the side taking the damage, it was dealt by the other one
+        self._turn_damage["player" if event.side == "enemy" else "enemy"] += event.amount
+
+    def _turn_ended(self, event: TurnEnded) -> None:
+        turn_damage, damage = self._turn_damage, self._current.damage
+        damage["player"].add(turn_damage["player"])
+        damage["enemy"].add(turn_damage["enemy"])
+        turn_damage["player"] = turn_damage["enemy"] = 0
+
+    def _battle_ended(self, event: BattleEnded) -> None:
+        current = self._current
+        outcome = current.outcomes.get(event.enemy)
+        if outcome is None:
+            outcome = current.outcomes[event.enemy] = [0, 0]
+        outcome[0] += 1
+        if event.winner == "player":
+            outcome[1] += 1
+        current.battles += 1
+        if current.battles >= self.window:
+            if self._previous is not None:
+                self._lifetime.merge(self._previous)
+            self._previous, self._current = current, Window(self.relative_accuracy)
+
+    def _item_used(self, event: ItemUsed) -> None:
+        self._current.items_used[event.item] += 1
+
+    def _item_added(self, event: ItemAdded) -> None:
+        self._current.loot[event.item] += event.quantity
+
+    # ----- Export -----
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: {"events", "window", "recent": aggregates of the last complete window and the current one,
+                "lifetime": aggregates of every battle}
+        """
+        recent = Window(self.relative_accuracy)
+        if self._previous is not None:
+            recent.merge(self._previous)
+        recent.merge(self._current)
+        lifetime = Window(self.relative_accuracy)
+        lifetime.merge(self._lifetime)
+        lifetime.merge(recent)
+        return {"events": self.events, "window": self.window, "recent": recent.report(),
+                "lifetime": lifetime.report()}
+
+
+class TelemetrySink:
+    """
+    A sink that feeds events to a Telemetry, and optionally passes them on to another sink.
+
+    Args:
+        telemetry (Telemetry): Where the events are aggregated
+        forward (EventSink, optional): Also receives every event, ex: CONSOLE
+    """
+    enabled = True
+
+    def __init__(self, telemetry: Telemetry, forward: Optional[EventSink] = None):
+        """Initializes the sink"""
+        self.telemetry = telemetry
+        self.forward = forward if forward is not None and forward.enabled else None
+
+    def emit(self, event: CombatEvent) -> None:
+        self.telemetry.handle(event)
+        if self.forward is not None:
+            self.forward.emit(event)
+
+
+def read_json_lines(lines: Iterable[str]) -> Iterator[CombatEvent]:
+    """
+    Turns the lines written by a JsonLinesSink back into events (the start of a pipeline).
+
+    Args:
+        lines (iterable): JSON lines, ex: an open file
+
+    Yields:
+        CombatEvent: The events, in order (blank lines and unknown event types are skipped)
+    """
+    types = EVENT_TYPES
+    for line in lines:
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        event_type = types.get(data.pop("event", None))
+        if event_type is not None:
+            yield event_type(**data)
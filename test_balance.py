@@ -0,0 +1,57 @@
+import unittest
+from multiprocessing import Pool
+from balance import BalanceOptimizer, Target, wilson_interval
+
+class TestBalance(unittest.TestCase):
+
+    def setUp(self):
+        self.target = Target(win_rate=0.7, turns=(3, 8), tolerance=0.1)
+        self.optimizer = BalanceOptimizer(self.target, bounds={"attack_power": (8, 24), "defense": (2, 6),
+                                                               "health": (20, 60)},
+                                          workers=1, batch=100, max_battles=400, precision=0.05)
+
+    def test_wilson_interval(self):
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+        low, high = wilson_interval(50, 100)
+        self.assertAlmostEqual(low, 0.4038, places=3)
+        self.assertAlmostEqual(high, 0.5962, places=3)
+        low, high = wilson_interval(0, 10) # Never below 0, still says something about the rate
+        self.assertEqual(low, 0.0)
+        self.assertLess(high, 0.35)
+
+    # Repeated probes of a stat tuple are answered from the cache
+    def test_evaluations_are_cached(self):
+        first = self.optimizer.evaluate((12, 4, 40))
+        self.assertIs(self.optimizer.evaluate((12, 4, 40)), first)
+        self.assertEqual(self.optimizer.cache_hits, 1)
+
+    # A candidate that is confidently far off target isn't simulated any further
+    def test_hopeless_candidates_stop_early(self):
+        weak = self.optimizer.evaluate((1, 0, 10))
+        self.assertEqual(weak.battles, 100)
+        self.assertEqual(weak.win_rate, 1.0)
+
+    def test_optimize_finds_the_target(self):
+        result = self.optimizer.optimize(points=3, rounds=4)
+        self.assertAlmostEqual(result.best.win_rate, 0.7, delta=0.15)
+        scores = [evaluation.score for evaluation in result.history]
+        self.assertEqual(scores, sorted(scores, reverse=True)) # Each round keeps or improves the best
+        self.assertGreater(result.cache_hits, 0) # Finer grids revisit the best point
+        self.assertEqual(set(result.stats), {"attack_power", "defense", "health"})
+
+    # Candidates evaluated in worker processes get the same results as in-process ones
+    def test_parallel_evaluation_matches(self):
+        candidates = [(12, 4, 40), (20, 2, 30)]
+        parallel = BalanceOptimizer(self.target, workers=2, batch=100, max_battles=200)
+        with Pool(2) as pool:
+            in_pool = parallel.evaluate_many(candidates, pool)
+        serial = BalanceOptimizer(self.target, workers=1, batch=100, max_battles=200).evaluate_many(candidates)
+        self.assertEqual([(e.battles, e.wins, e.mean_turns) for e in in_pool],
+                         [(e.battles, e.wins, e.mean_turns) for e in serial])
+
+    def test_rejects_empty_bounds(self):
+        with self.assertRaises(ValueError):
+            BalanceOptimizer(self.target, bounds={"defense": (5, 1)})
+
+if __name__ == "__main__":
+    unittest.main()
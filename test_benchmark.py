@@ -0,0 +1,29 @@
+import unittest
+from benchmark import compare
+
+def results(**values):
+    """Builds a minimal result dict, the unit tells whether higher or lower is better"""
+    return {"metrics": {name: {"value": value, "unit": unit, "better": "higher" if unit == "battles/s" else "lower"}
+                        for name, (value, unit) in values.items()}}
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_slower_calls_are_regressions(self):
+        regressions = compare(results(call=(130.0, "ns/call")), results(call=(100.0, "ns/call")))
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("30% worse", regressions[0])
+
+    def test_lower_throughput_is_a_regression(self):
+        self.assertEqual(len(compare(results(speed=(80.0, "battles/s")), results(speed=(100.0, "battles/s")))), 1)
+
+    # Improvements and changes within the threshold are fine
+    def test_improvements_and_noise_pass(self):
+        current = results(call=(105.0, "ns/call"), speed=(200.0, "battles/s"))
+        baseline = results(call=(100.0, "ns/call"), speed=(100.0, "battles/s"))
+        self.assertEqual(compare(current, baseline), [])
+
+    def test_new_metrics_are_ignored(self):
+        self.assertEqual(compare(results(call=(100.0, "ns/call")), results()), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from catalog import CACHE_NAME, Catalog, CatalogError, compile_entries, open_catalog
+from content import ENEMY, PLAYER
+from enemy import Enemy
+from events import NULL_SINK
+
+def enemy_entry(key, health=30, **stats):
+    return {"key": key, "name": key.title(), "health": health, "max_health": health, "attack_name": "Bite",
+            "attack_power": 6, "defense": 3, **stats}
+
+class TestCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.write("enemies.json", {"enemies": [enemy_entry("goblin", inventory={"Gold Coin": 1}),
+                                                enemy_entry("troll", health=80, element="earth", ruleset="standard")]})
+        with open(os.path.join(self.source, "players.toml"), "w", encoding="utf-8") as file:
+            file.write('[[players]]\nkey = "hero"\nname = "Hero"\nattack_name = "Slash"\nattack_power = 12\n'
+                       'defense = 4\ninventory = { "Potion" = 2 }\n')
+
+    def write(self, name, data):
+        with open(os.path.join(self.source, name), "w", encoding="utf-8") as file:
+            json.dump(data, file)
+
+    def open(self) -> Catalog:
+        catalog = open_catalog(self.source)
+        self.addCleanup(catalog.close)
+        return catalog
+
+    def test_lookup_by_key_and_id(self):
+        catalog = self.open()
+        self.assertEqual(len(catalog), 3)
+        troll = catalog.row("troll")
+        self.assertEqual((troll.kind, troll.health, troll.element, troll.ruleset), (ENEMY, 80, "earth", "standard"))
+        self.assertEqual(catalog.row(troll.id), troll)
+        self.assertEqual(catalog.row("hero").kind, PLAYER)
+        self.assertIsNone(catalog.id_of("dragon"))
+        with self.assertRaises(KeyError):
+            catalog.row("dragon")
+
+    def test_create_enemy_from_row(self):
+        goblin = self.open().create("goblin", sink=NULL_SINK)
+        self.assertIsInstance(goblin, Enemy)
+        self.assertEqual((goblin.health, goblin.attack_name), (30, "BITE"))
+        self.assertEqual(goblin.inventory, {"Gold Coin": 1})
+
+    # The compiled file is reused until a source file changes
+    def test_rebuilt_only_when_sources_change(self):
+        self.open()
+        cache = os.path.join(self.source, CACHE_NAME)
+        built = os.stat(cache).st_mtime_ns
+        self.open()
+        self.assertEqual(os.stat(cache).st_mtime_ns, built)
+
+        self.write("more.json", {"enemies": [enemy_entry("rat", health=5)]})
+        catalog = self.open()
+        self.assertEqual(catalog.row("rat").health, 5)
+
+    def test_duplicate_keys_are_rejected(self):
+        self.write("more.json", {"enemies": [enemy_entry("goblin")]})
+        with self.assertRaises(CatalogError):
+            open_catalog(self.source)
+
+    # Loot tables survive the compiled catalog, down to the created enemy
+    def test_loot_table_round_trip(self):
+        self.write("more.json", {"enemies": [enemy_entry("imp", loot_table="goblin")]})
+        catalog = self.open()
+        self.assertEqual(catalog.stats("imp")[1]["loot_table"], "goblin")
+        self.assertNotIn("loot_table", catalog.stats("goblin")[1])
+        self.assertEqual(catalog.create("imp", sink=NULL_SINK).loot_table.name, "goblin")
+
+    # Fields the catalog can't hold are rejected instead of dropped
+    def test_unknown_fields_are_rejected(self):
+        self.write("more.json", {"enemies": [enemy_entry("imp", loot="goblin")]})
+        with self.assertRaises(CatalogError):
+            open_catalog(self.source)
+
+    def test_thousands_of_archetypes(self):
+        catalog = Catalog(compile_entries([(ENEMY, enemy_entry(f"enemy_{index}", health=index + 1))
+                                           for index in range(5000)]))
+        for index in range(0, 5000, 7):
+            self.assertEqual(catalog.row(f"enemy_{index}").health, index + 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from player import Player
+from events import NULL_SINK
+from compact import CombatantPool, SlottedEnemy, SlottedPlayer
+from effects import use_item
+from engine import ATTACK, DEFEND, DEFEND_BONUS, SPECIAL, Battle, always_attack, run_battle
+from enemy_ai import UtilityAI
+from replay import ReplayRecorder, replay
+
+class TestCompact(unittest.TestCase):
+
+    def setUp(self):
+        self.enemy = SlottedEnemy("TestGoblin", 50, 50, "Slash", 10, 5, {"Gold Coin": 1}, sink=NULL_SINK)
+        self.player = SlottedPlayer("TestPlayer", "Punch", 10, 5, {"Potion": 2}, sink=NULL_SINK)
+
+    # Slotted variants have no per-instance __dict__
+    def test_slotted_variants_have_no_dict(self):
+        self.assertFalse(hasattr(self.enemy, "__dict__"))
+        self.assertFalse(hasattr(self.player, "__dict__"))
+
+    # ... but otherwise behave exactly like Player and Enemy
+    def test_slotted_variants_fight_and_loot(self):
+        self.player.attacks(self.enemy)
+        self.assertEqual(self.enemy.health, 40)
+
+        self.enemy.take_damage(100)
+        self.assertEqual(self.player.collect_loot(self.enemy), {"Gold Coin": 1})
+        self.assertEqual(self.player.inventory["Gold Coin"], 1)
+
+    # Pool handles work with the regular classes through the Combatant protocol
+    def test_pool_handle_fights_player(self):
+        pool = CombatantPool()
+        goblin = pool.add("Goblin", 30, 30, "Bite", 6, 3, {"Gold Coin": 2})
+        player = Player("TestPlayer", "Punch", 10, 5, {}, sink=NULL_SINK)
+
+        goblin.attacks(player)
+        self.assertEqual(player.health, 94)
+
+        for _ in range(3):
+            player.attacks(goblin)
+        self.assertTrue(goblin.is_defeated())
+        self.assertEqual(pool.health[goblin.index], 0)
+
+        player.collect_loot(goblin)
+        self.assertEqual(player.inventory["Gold Coin"], 2)
+        self.assertEqual(goblin.inventory, {})
+
+    # Every entry gets its own inventory, using an item doesn't touch the template or other entries
+    def test_pool_inventories_are_copied(self):
+        pool = CombatantPool()
+        template = {"Potion": 2}
+        first, second = pool.add("A", 10, 10, "Bite", 1, 1, template), pool.add("B", 10, 10, "Bite", 1, 1, template)
+        first.take_damage(5)
+        use_item(first, "Potion")
+        self.assertEqual(first.inventory, {"Potion": 1})
+        self.assertEqual(second.inventory, {"Potion": 2})
+        self.assertEqual(template, {"Potion": 2})
+
+    # The engine's defend and special actions change the stats of pooled entries in place
+    def test_pool_handles_defend(self):
+        pool = CombatantPool()
+        goblin = pool.add("Goblin", 30, 30, "Bite", 6, 3)
+        player = Player("TestPlayer", "Punch", 10, 5, {}, sink=NULL_SINK)
+        fight = Battle(player, goblin, enemy_policy=lambda actor, opponent, rng: DEFEND, seed=1)
+        fight.play_turn(ATTACK)
+        self.assertEqual(pool.defense[goblin.index], 3 + DEFEND_BONUS)
+
+        orc = pool.add("Orc", 30, 30, "Club", 6, 3)
+        fight = Battle(player, orc, enemy_policy=lambda actor, opponent, rng: SPECIAL, seed=1)
+        fight.play_turn(DEFEND)
+        self.assertEqual(pool.attack_power[orc.index], 6) # Raised for the special attack, then restored
+
+    # Two pooled entries fight a whole battle, with the utility AI and a recorder, and the inventory is read-only
+    def test_pooled_battle(self):
+        pool = CombatantPool()
+        hero = pool.add("Hero", 60, 60, "Punch", 9, 3, {"Potion": 1})
+        goblin = pool.add("Goblin", 40, 40, "Bite", 7, 2, {"Potion": 2, "Gold Coin": 3})
+        recorder = ReplayRecorder()
+        result = run_battle(hero, goblin, always_attack, UtilityAI(), seed=1, recorder=recorder)
+        self.assertEqual(replay(recorder.getvalue()).hp_per_turn, result.hp_per_turn)
+        self.assertEqual((hero.ruleset, hero.speed), (pool.ruleset, pool.speed))
+        with self.assertRaises(TypeError):
+            hero.inventory["Potion"] = 99
+
+    def test_released_slots_are_reused(self):
+        pool = CombatantPool()
+        first = pool.add("A", 10, 10, "Bite", 1, 1)
+        pool.add("B", 10, 10, "Bite", 1, 1)
+        pool.release(first)
+        self.assertEqual(len(pool), 1)
+
+        reused = pool.add("C", 20, 20, "Claw", 2, 2)
+        self.assertEqual(reused.index, first.index)
+        self.assertEqual(reused.name, "C")
+        self.assertEqual(reused.health, 20)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import enemy
+import player
+from benchmark import import_seconds
+from content import ENEMY, PLAYER, ContentRegistry, create
+from events import NULL_SINK
+
+class TestContent(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = ContentRegistry()
+        self.registry.register("rat", ENEMY, name="Rat", health=10, max_health=10, attack_name="Nibble",
+                               attack_power=2, defense=0, inventory={"Gold Coin": 1})
+        self.registry.register("hero", PLAYER, name="Hero", attack_name="Slash", attack_power=12, defense=4)
+
+    # Importing the game modules must not build any combatants
+    def test_imports_have_no_side_effects(self):
+        for name in ("player1", "enemy1", "player2"):
+            self.assertFalse(hasattr(player, name))
+        for name in ("goblin", "testPlayer"):
+            self.assertFalse(hasattr(enemy, name))
+
+    def test_templates_are_built_on_first_access(self):
+        self.assertEqual(self.registry.built, 0)
+        self.assertEqual(self.registry.template("rat")["health"], 10)
+        self.assertEqual(self.registry.built, 1)
+
+    def test_create_returns_independent_combatants(self):
+        first = self.registry.create("rat", sink=NULL_SINK)
+        second = self.registry.create("rat", sink=NULL_SINK)
+        first.take_damage(5)
+        first.drop_loot()
+        self.assertEqual(second.health, 10)
+        self.assertEqual(second.inventory, {"Gold Coin": 1})
+
+    def test_overrides_and_kinds(self):
+        hero = self.registry.create("hero", sink=NULL_SINK, attack_power=20)
+        self.assertIsInstance(hero, player.Player)
+        self.assertEqual(hero.attack_power, 20)
+        self.assertEqual(hero.inventory, {})
+
+    def test_invalid_archetypes(self):
+        self.registry.register("broken", ENEMY, name="Broken")
+        with self.assertRaises(ValueError):
+            self.registry.template("broken")
+        with self.assertRaises(KeyError):
+            self.registry.template("missing")
+
+    def test_builtin_archetypes(self):
+        goblin = create("goblin", sink=NULL_SINK)
+        self.assertIsInstance(goblin, enemy.Enemy)
+        self.assertEqual((goblin.health, goblin.attack_name), (30, "BITE"))
+
+    # A cold start builds no archetype, even with a large content catalog (the probe fails if it does).
+    # How long it takes is tracked by benchmark.bench_startup
+    def test_import_builds_nothing(self):
+        for catalog in (0, 10_000):
+            self.assertGreater(import_seconds(catalog), 0)
+
+if __name__ == "__main__":
+    unittest.main()
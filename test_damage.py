@@ -0,0 +1,72 @@
+import unittest
+from player import Player
+from enemy import Enemy
+from engine import HealBelow, run_battle
+from events import NULL_SINK
+from damage import CLASSIC, STANDARD, TABLE_SIZE, Ruleset
+from replay import ReplayRecorder, replay
+
+class TestDamage(unittest.TestCase):
+
+    def setUp(self):
+        self.player = Player("TestPlayer", "Punch", 10, 5, {}, sink=NULL_SINK, ruleset=STANDARD)
+        self.enemy = Enemy("TestGoblin", 100, 100, "Bite", 6, 3, {}, sink=NULL_SINK, ruleset=STANDARD)
+
+    # The classic rules ignore defense, like the game always has
+    def test_classic_damage_is_attack_power(self):
+        self.assertEqual(CLASSIC.table(10, 50), (10,))
+
+    def test_defense_is_subtracted_with_minimum_damage(self):
+        rules = Ruleset("flat", mitigation="subtract")
+        self.assertEqual(rules.table(10, 3), (7,))
+        self.assertEqual(rules.table(10, 30), (1,))
+
+    # 10% crits and +/-10% variance are baked into the table
+    def test_standard_table_has_crits_and_variance(self):
+        outcomes = STANDARD.table(20, 0)
+        self.assertEqual(len(outcomes), TABLE_SIZE)
+        self.assertEqual(min(outcomes), 18)
+        self.assertTrue(36 <= max(outcomes) <= 44) # A crit doubles a roll between 18 and 22
+        self.assertEqual(sum(1 for damage in outcomes if damage > 22), round(0.1 * TABLE_SIZE))
+
+    def test_elemental_multiplier(self):
+        rules = Ruleset("elements", element_chart={("fire", "ice"): 1.5})
+        self.assertEqual(rules.table(10, 0, "fire", "ice"), (15,))
+        self.assertEqual(rules.table(10, 0, "fire", "fire"), (10,))
+
+    # Changing a stat switches to the table built for the new stats
+    def test_stat_change_uses_new_table(self):
+        rules = Ruleset("flat", mitigation="subtract")
+        self.player.ruleset = rules
+        self.player.attacks(self.enemy)
+        self.assertEqual(self.enemy.health, 93)
+
+        self.player.attack_power = 20
+        self.player.attacks(self.enemy)
+        self.assertEqual(self.enemy.health, 76)
+
+    # The table cache keeps the most recently used stats and never grows past its size
+    def test_table_cache_is_bounded(self):
+        rules = Ruleset("bounded", mitigation="subtract", variance=0.1, cache_size=4)
+        for attack_power in range(1, 2001):
+            rules.table(attack_power, 3)
+        self.assertEqual(rules.cached_tables, 4)
+        recent = rules.table(1999, 3)
+        rules.table(5000, 3)
+        self.assertIs(rules.table(1999, 3), recent) # Still cached, the least recent one was evicted instead
+        self.assertEqual(rules.table(10, 3), Ruleset("fresh", mitigation="subtract", variance=0.1).table(10, 3))
+
+    def test_same_seed_rolls_same_damage(self):
+        first = run_battle(self.player, self.enemy, seed=5)
+        player = Player("TestPlayer", "Punch", 10, 5, {}, sink=NULL_SINK, ruleset=STANDARD)
+        enemy = Enemy("TestGoblin", 100, 100, "Bite", 6, 3, {}, sink=NULL_SINK, ruleset=STANDARD)
+        self.assertEqual(run_battle(player, enemy, seed=5).hp_per_turn, first.hp_per_turn)
+
+    # Random damage still replays exactly, even though replays don't run the policies
+    def test_random_damage_replays(self):
+        recorder = ReplayRecorder()
+        result = run_battle(self.player, self.enemy, HealBelow(50), seed=11, recorder=recorder)
+        self.assertEqual(replay(recorder.getvalue()).hp_per_turn, result.hp_per_turn)
+
+if __name__ == "__main__":
+    unittest.main()
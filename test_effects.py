@@ -0,0 +1,69 @@
+import unittest
+from player import Player
+from enemy import Enemy
+from events import NULL_SINK, BufferedSink, ItemUnavailable, ItemUsed
+from effects import BUFF, DAMAGE, EFFECTS, HEAL, POTION_HEAL, EffectTable, use_item
+from engine import HEAL as HEAL_ACTION, run_battle
+from compact import CombatantPool
+
+class TestEffects(unittest.TestCase):
+
+    def setUp(self):
+        self.player = Player("TestPlayer", "Punch", 10, 5, {"Potion": 1, "Bomb": 1, "Whetstone": 1}, sink=NULL_SINK)
+        self.enemy = Enemy("TestGoblin", 30, 30, "Bite", 6, 3, {"Gold Coin": 1}, sink=NULL_SINK)
+
+    def test_potion_heals_and_is_used_up(self):
+        self.player.take_damage(30)
+        self.assertTrue(use_item(self.player, "Potion"))
+        self.assertEqual(self.player.health, 70 + POTION_HEAL)
+        self.assertNotIn("Potion", self.player.inventory)
+
+    # Without stock nothing happens, and nothing is taken
+    def test_out_of_stock(self):
+        sink = BufferedSink()
+        self.player.sink = sink
+        use_item(self.player, "Potion")
+        self.player.take_damage(50)
+        self.assertFalse(use_item(self.player, "Potion"))
+        self.assertEqual(self.player.health, 50)
+        self.assertEqual([type(event) for event in sink.events if isinstance(event, (ItemUsed, ItemUnavailable))],
+                         [ItemUsed, ItemUnavailable])
+
+    def test_buff_and_damage(self):
+        use_item(self.player, "Whetstone")
+        self.assertEqual(self.player.attack_power, 12)
+        use_item(self.player, "Bomb", self.enemy)
+        self.assertEqual(self.enemy.health, 15)
+
+    def test_invalid_uses(self):
+        with self.assertRaises(ValueError):
+            use_item(self.player, "Gold Coin") # No effect
+        with self.assertRaises(ValueError):
+            use_item(self.player, "Bomb") # Needs a target
+        self.assertEqual(self.player.inventory["Bomb"], 1)
+        with self.assertRaises(ValueError):
+            EffectTable().register("Potion", "teleport", 1)
+
+    def test_table_dispatch_by_id(self):
+        table = EffectTable()
+        effect = table.register("Megapotion", HEAL, 50)
+        self.assertIs(table.effect(table.registry.id_of("Megapotion")), effect)
+        self.assertIsNone(table.effect("Gold Coin"))
+        self.assertEqual({EFFECTS.effect(name).kind for name in ("Whetstone", "Bomb")}, {BUFF, DAMAGE})
+
+    def test_pooled_combatants(self):
+        pool = CombatantPool()
+        goblin = pool.add("Goblin", 10, 30, "Bite", 6, 3, {"Potion": 1})
+        self.assertTrue(use_item(goblin, "Potion"))
+        self.assertEqual((goblin.health, goblin.inventory), (20, {}))
+        self.assertFalse(use_item(goblin, "Potion"))
+
+    # The heal action of the engine is limited by the Potions carried
+    def test_heals_are_limited(self):
+        self.player.take_damage(20)
+        result = run_battle(self.player, self.enemy, lambda *_: HEAL_ACTION, max_turns=5)
+        self.assertEqual(result.turns, 5)
+        self.assertEqual(self.player.health, 80 - 5 * 6 + POTION_HEAL)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import random
+import unittest
+from player import Player
+from enemy import Enemy
+from encounter import PACK, PARTY, Encounter, IndexedHeap, InitiativeScheduler, run_encounter
+from events import NULL_SINK, BufferedSink, CombatantDefeated, EncounterEnded
+
+def new_party(count=2):
+    return [Player(f"Hero{index}", "Punch", 10, 5, {"Potion": 1}, sink=NULL_SINK) for index in range(count)]
+
+def new_pack(count=3, health=30):
+    return [Enemy(f"Goblin{index}", health, health, "Bite", 4, 3, {"Gold Coin": 1}, sink=NULL_SINK)
+            for index in range(count)]
+
+class TestEncounter(unittest.TestCase):
+
+    def test_indexed_heap_matches_sorting(self):
+        rng = random.Random(3)
+        heap = IndexedHeap()
+        priorities = {}
+        for key in range(200):
+            priorities[key] = (rng.random(), key)
+            heap.push(key, priorities[key])
+        for key in range(0, 200, 3): # Re-prioritize and remove keys anywhere in the heap
+            priorities[key] = (rng.random(), key)
+            heap.push(key, priorities[key])
+        for key in range(1, 200, 5):
+            heap.remove(key)
+            del priorities[key]
+        popped = [heap.pop()[1] for _ in range(len(heap))]
+        self.assertEqual(popped, sorted(priorities, key=priorities.get))
+
+    # Speed 20 acts twice as often as speed 10
+    def test_faster_combatants_act_more_often(self):
+        scheduler = InitiativeScheduler()
+        scheduler.add(0, speed=10)
+        scheduler.add(1, speed=20)
+        turns = [scheduler.next() for _ in range(30)]
+        self.assertEqual(turns.count(1), 2 * turns.count(0))
+
+    def test_party_defeats_pack(self):
+        result = run_encounter(new_party(), new_pack(), seed=1)
+        self.assertEqual(result.winner, PARTY)
+        self.assertEqual(len(result.defeated), 3)
+        self.assertEqual(result.survivors[PACK], [])
+        self.assertEqual(len(result.loot), 3) # Every goblin was looted by the hero who defeated it
+
+    def test_same_seed_same_outcome(self):
+        first = run_encounter(new_party(), new_pack(), seed=7)
+        second = run_encounter(new_party(), new_pack(), seed=7)
+        self.assertEqual(first, second)
+
+    # Defeated combatants never act again and can't be targeted
+    def test_defeated_combatants_are_removed(self):
+        encounter = Encounter(new_party(3), new_pack(2, health=10), seed=2)
+        fallen = set()
+        while not encounter.finished:
+            record = encounter.step()
+            self.assertNotIn(record.actor, fallen)
+            self.assertNotIn(record.target, fallen)
+            fallen = {encounter.combatants[uid].name for uid in encounter.defeated}
+        self.assertEqual(len(encounter.scheduler), 3)
+        self.assertEqual(len(encounter.targets[PACK]), 0)
+
+    def test_lowest_health_targeting_focuses_the_weakest(self):
+        pack = new_pack(2)
+        pack[1].take_damage(15)
+        party = new_party(1)
+        party[0].speed = 20 # Acts first
+        record = Encounter(party, pack, seed=4, targeting="lowest_health").step()
+        self.assertEqual((record.side, record.target), (PARTY, "Goblin1"))
+
+    def test_events(self):
+        sink = BufferedSink()
+        run_encounter(new_party(), new_pack(), seed=1, sink=sink)
+        self.assertEqual(sum(isinstance(event, CombatantDefeated) for event in sink.events), 3)
+        self.assertIsInstance(sink.events[-1], EncounterEnded)
+
+    def test_raid(self):
+        result = run_encounter(new_party(200), new_pack(300), seed=5)
+        self.assertIn(result.winner, (PARTY, PACK))
+        self.assertEqual(len(result.defeated) + sum(map(len, result.survivors.values())), 500)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import random
+import unittest
+from player import Player
+from enemy import Enemy
+from events import NULL_SINK
+from damage import STANDARD
+from engine import ATTACK, DEFEND, FLEE, HEAL, SPECIAL, Battle, HealBelow, resolve_policy, run_battle
+from enemy_ai import UtilityAI
+from replay import ReplayRecorder, replay
+
+class TestEnemyAI(unittest.TestCase):
+
+    def setUp(self):
+        self.player = Player("TestPlayer", "Punch", 10, 5, {"Potion": 2}, sink=NULL_SINK)
+        self.enemy = Enemy("TestGoblin", 30, 30, "Bite", 6, 3, {"Gold Coin": 1}, sink=NULL_SINK)
+
+    def actions(self, ai: UtilityAI) -> tuple:
+        return ai.score(self.enemy, self.player, self.enemy.health, self.player.health)[0]
+
+    # Repeated states are served from the cache
+    def test_cache_hits_on_repeated_states(self):
+        ai = UtilityAI()
+        rng = random.Random(1)
+        for _ in range(10):
+            ai(self.enemy, self.player, rng)
+        stats = ai.cache_info()
+        self.assertEqual((stats.hits, stats.misses), (9, 1))
+        self.assertAlmostEqual(stats.hit_rate, 0.9)
+
+    def test_least_recently_used_state_is_evicted(self):
+        ai = UtilityAI(cache_size=2)
+        rng = random.Random(1)
+        for damage in (0, 10, 10):
+            self.enemy.take_damage(damage)
+            ai(self.enemy, self.player, rng)
+        self.assertEqual(ai.cache_info().evictions, 1)
+        self.assertEqual(ai.cache_info().size, 2)
+
+    # Defense doesn't reduce damage under CLASSIC, so defending is never worth it there
+    def test_defend_only_when_defense_matters(self):
+        self.enemy.take_damage(20)
+        self.assertNotIn(DEFEND, self.actions(UtilityAI()))
+        self.enemy.ruleset = self.player.ruleset = STANDARD
+        self.assertIn(DEFEND, self.actions(UtilityAI()))
+
+    def test_flee_when_about_to_lose(self):
+        self.assertEqual(self.actions(UtilityAI()), (ATTACK, SPECIAL))
+        self.enemy.take_damage(25)
+        self.assertIn(FLEE, self.actions(UtilityAI()))
+
+    def test_heal_when_it_outweighs_damage_taken(self):
+        self.player.attack_power = 4
+        self.enemy.take_damage(22)
+        self.assertNotIn(HEAL, self.actions(UtilityAI())) # No Potion to heal with
+        self.enemy = Enemy("TestGoblin", 8, 30, "Bite", 6, 3, {"Potion": 1}, sink=NULL_SINK)
+        self.assertIn(HEAL, self.actions(UtilityAI()))
+
+    def test_resolved_by_name(self):
+        self.assertIsInstance(resolve_policy("utility"), UtilityAI)
+
+class TestEnemyActions(unittest.TestCase):
+
+    def setUp(self):
+        self.player = Player("TestPlayer", "Punch", 10, 5, {"Potion": 2}, sink=NULL_SINK, ruleset=STANDARD)
+        self.enemy = Enemy("TestGoblin", 30, 30, "Bite", 6, 3, {"Gold Coin": 1}, sink=NULL_SINK, ruleset=STANDARD)
+
+    # Defend lasts until the enemy acts again
+    def test_defend_is_temporary(self):
+        moves = iter([DEFEND, ATTACK])
+        fight = Battle(self.player, self.enemy, lambda *_: next(moves), seed=1)
+        fight.play_turn(HEAL)
+        self.assertEqual(self.enemy.defense, 8)
+        fight.play_turn(HEAL)
+        self.assertEqual(self.enemy.defense, 3)
+
+    def test_successful_flee_ends_the_battle(self):
+        result = run_battle(self.player, self.enemy, enemy_policy=lambda *_: FLEE, seed=3)
+        self.assertEqual((result.winner, result.fled), (None, "enemy"))
+        self.assertEqual(result.loot, {})
+
+    def test_special_restores_attack_power(self):
+        run_battle(self.player, self.enemy, HealBelow(90), enemy_policy=lambda *_: SPECIAL, seed=2, max_turns=5)
+        self.assertEqual(self.enemy.attack_power, 6)
+
+    def test_ai_battles_replay(self):
+        recorder = ReplayRecorder()
+        enemy = Enemy("TestGoblin", 60, 60, "Bite", 14, 3, {}, sink=NULL_SINK, ruleset=STANDARD)
+        result = run_battle(self.player, enemy, HealBelow(30), UtilityAI(), seed=8, recorder=recorder)
+        self.assertEqual(replay(recorder.getvalue()).hp_per_turn, result.hp_per_turn)
+
+if __name__ == "__main__":
+    unittest.main()
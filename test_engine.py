@@ -0,0 +1,67 @@
+import io
+import random
+import unittest
+from contextlib import redirect_stdout
+from player import Player
+from enemy import Enemy
+from events import NULL_SINK
+from engine import ATTACK, HEAL, Battle, always_attack, HealBelow, run_battle
+
+class TestEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.player = Player(
+            name="TestPlayer",
+            attack_name="Punch",
+            attack_power=10,
+            defense=5,
+            inventory={"Potion": 2},
+            sink=NULL_SINK
+        )
+        self.enemy = Enemy(
+            name="TestGoblin",
+            health=30,
+            max_health=30,
+            attack_name="Bite",
+            attack_power=6,
+            defense=3,
+            inventory={"Gold Coin": 1},
+            sink=NULL_SINK
+        )
+
+    # Player needs 3 hits on a 30 HP enemy, enemy gets 2 hits in between
+    def test_player_wins_with_structured_result(self):
+        result = run_battle(self.player, self.enemy, always_attack, rng=random.Random(1))
+
+        self.assertEqual(result.winner, "player")
+        self.assertEqual(result.turns, 3)
+        self.assertEqual(result.hp_per_turn, [(94, 20), (88, 10), (88, 0)])
+        self.assertEqual(result.loot, {"Gold Coin": 1})
+        self.assertEqual(self.player.inventory["Gold Coin"], 1)
+
+    # Headless battles must not write anything to stdout
+    def test_headless_battle_does_no_output(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            run_battle(self.player, self.enemy, HealBelow(90), rng=random.Random(1))
+        self.assertEqual(output.getvalue(), "")
+
+    # Two combatants that can't beat each other stop at the turn cap without a winner
+    def test_turn_cap_ends_battle_without_winner(self):
+        result = run_battle(self.player, self.enemy, lambda actor, opponent, rng: HEAL, max_turns=5)
+        self.assertIsNone(result.winner)
+        self.assertEqual(result.turns, 5)
+
+    def test_play_turn_after_finish_raises(self):
+        fight = Battle(self.player, self.enemy, max_turns=1)
+        fight.play_turn(ATTACK)
+        with self.assertRaises(RuntimeError):
+            fight.play_turn(ATTACK)
+
+    def test_unknown_action_raises(self):
+        fight = Battle(self.player, self.enemy)
+        with self.assertRaises(ValueError):
+            fight.play_turn("dance")
+
+if __name__ == "__main__":
+    unittest.main()
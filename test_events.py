@@ -0,0 +1,82 @@
+import io
+import json
+import unittest
+from player import Player
+from enemy import Enemy
+from events import (BufferedSink, ConsoleSink, DamageDealt, Healed, ItemAdded, JsonLinesSink, LootDropped,
+                    NullSink)
+
+class TestEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.sink = BufferedSink()
+        self.player = Player(
+            name="TestPlayer",
+            attack_name="Punch",
+            attack_power=10,
+            defense=5,
+            inventory={"Potion": 2},
+            sink=self.sink
+        )
+        self.enemy = Enemy(
+            name="TestGoblin",
+            health=10,
+            max_health=10,
+            attack_name="Bite",
+            attack_power=6,
+            defense=3,
+            inventory={"Gold Coin": 1},
+            sink=self.sink
+        )
+
+    # Defeating an enemy should produce typed events in order
+    def test_buffered_sink_collects_typed_events(self):
+        self.player.attacks(self.enemy)
+        self.player.collect_loot(self.enemy)
+
+        event_types = [type(event) for event in self.sink.events]
+        self.assertIn(DamageDealt, event_types)
+        self.assertIn(LootDropped, event_types)
+        self.assertEqual(self.sink.events[-1], ItemAdded("TestPlayer", "Gold Coin", 1))
+
+    def test_heal_event_reports_new_health(self):
+        self.player.take_damage(30)
+        self.player.heal(10)
+        self.assertEqual(self.sink.events[-1], Healed("TestPlayer", 10, 80))
+
+    # The console renderer keeps the text the game has always printed
+    def test_console_sink_keeps_original_text(self):
+        lines = []
+        self.player.sink = ConsoleSink(lines.append)
+        self.player.take_damage(20)
+        self.assertEqual(lines, ["--- TestPlayer TOOK DAMAGE! ---\nTestPlayer's health is now: 80\n"])
+
+    # A disabled sink must never be handed an event
+    def test_null_sink_receives_nothing(self):
+        class CountingNullSink(NullSink):
+            received = 0
+            def emit(self, event):
+                self.received += 1
+
+        null_sink = CountingNullSink()
+        self.player.sink = null_sink
+        self.player.take_damage(5)
+        self.player.heal(5)
+        self.assertEqual(null_sink.received, 0)
+
+    # Events are only written once a full batch is buffered
+    def test_json_lines_sink_writes_in_batches(self):
+        output = io.StringIO()
+        json_sink = JsonLinesSink(output, batch_size=2)
+        self.player.sink = json_sink
+
+        self.player.take_damage(5)
+        self.assertEqual(output.getvalue(), "")
+
+        self.player.take_damage(5)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[1]), {"event": "DamageDealt", "side": "player", "target": "TestPlayer", "amount": 5, "health": 90})
+
+if __name__ == "__main__":
+    unittest.main()
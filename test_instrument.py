@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+import instrument
+from player import Player
+from enemy import Enemy
+from events import NULL_SINK
+from engine import Battle, run_battle
+from instrument import OPERATION, PHASE, instrumented
+
+class TestInstrument(unittest.TestCase):
+
+    def setUp(self):
+        self.player = Player("TestPlayer", "Punch", 10, 5, {"Potion": 2}, sink=NULL_SINK)
+        self.enemy = Enemy("TestGoblin", 30, 30, "Bite", 6, 3, {"Gold Coin": 1}, sink=NULL_SINK)
+
+    # Turned off, the original methods run untouched
+    def test_disable_restores_the_originals(self):
+        originals = (Player.attacks, Enemy.take_damage, Battle._apply)
+        with instrumented():
+            self.assertIsNot(Player.attacks, originals[0])
+            self.assertTrue(instrument.enabled())
+        self.assertEqual((Player.attacks, Enemy.take_damage, Battle._apply), originals)
+        self.assertFalse(instrument.enabled())
+
+    def test_counts_operations_and_phases(self):
+        with instrumented() as stats:
+            result = run_battle(self.player, self.enemy, seed=1)
+        operations, phases = stats.timings[OPERATION], stats.timings[PHASE]
+        self.assertEqual(result.winner, "player")
+        self.assertEqual(operations["Player.attacks"].calls, 3) # Classic rules: 3 hits kill a 30 HP goblin
+        self.assertEqual(operations["Enemy.take_damage"].calls, 3)
+        self.assertEqual(operations["Enemy.drop_loot"].calls, 1)
+        self.assertEqual(phases["turn"].calls, result.turns)
+        self.assertEqual(phases["player_action"].calls, 3)
+        self.assertEqual(phases["enemy_action"].calls, 2)
+        self.assertEqual(phases["loot"].calls, 1)
+        for timing in (*operations.values(), *phases.values()):
+            self.assertEqual(sum(timing.histogram), timing.calls)
+            self.assertLessEqual(timing.self_ns, timing.total_ns)
+            self.assertLessEqual(timing.quantile(0.5), timing.max_ns)
+
+    # Self times of the folded stacks add up to the time spent in the outermost calls
+    def test_folded_stacks(self):
+        with instrumented() as stats:
+            run_battle(self.player, self.enemy, seed=1)
+        lines = list(stats.folded())
+        self.assertIn("turn;player_action;Player.attacks;Enemy.take_damage", [line.rsplit(" ", 1)[0] for line in lines])
+        self.assertIn("turn;loot;Enemy.drop_loot", [line.rsplit(" ", 1)[0] for line in lines])
+        self.assertEqual(sum(int(line.rsplit(" ", 1)[1]) for line in lines), stats.timings[PHASE]["turn"].total_ns)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "battle.folded")
+            stats.write_folded(path)
+            with open(path, encoding="utf-8") as file:
+                self.assertEqual(file.read().splitlines(), lines)
+
+    def test_report(self):
+        with instrumented() as stats:
+            run_battle(self.player, self.enemy, seed=1)
+        report = stats.report()
+        for name in ("Phases", "Operations", "player_action", "Enemy.take_damage"):
+            self.assertIn(name, report)
+        stats.reset()
+        self.assertEqual(stats.report(), "Nothing was recorded.")
+
+    def test_cannot_enable_twice(self):
+        with instrumented():
+            with self.assertRaises(RuntimeError):
+                instrument.enable()
+
+if __name__ == "__main__":
+    unittest.main()
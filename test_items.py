@@ -0,0 +1,103 @@
+import unittest
+from player import Player
+from enemy import Enemy
+from events import NULL_SINK, BufferedSink, ItemAdded, LootOverflow
+from items import GOLD_COIN, POTION, REGISTRY, Inventory, ItemRegistry
+from loot import Drop, LootTable
+
+class TestItems(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory({"Potion": 2, "Gold Coin": 10})
+
+    # Names are interned into the same ID every time
+    def test_registry_interns_names(self):
+        registry = ItemRegistry()
+        sword = registry.id_of("Sword")
+        self.assertEqual(registry.id_of("Sword"), sword)
+        self.assertEqual(registry.name_of(sword), "Sword")
+        self.assertEqual(len(registry), 1)
+
+    def test_inventory_is_keyed_by_id(self):
+        self.assertEqual(self.inventory.counts, {POTION: 2, GOLD_COIN: 10})
+        self.assertEqual(self.inventory.count("Potion"), 2)
+
+    # Adding past the stack limit only adds what fits
+    def test_add_respects_stack_limit(self):
+        added = self.inventory.add("Potion", 500)
+        self.assertEqual(added, REGISTRY.info(POTION).stack_limit - 2)
+        self.assertEqual(self.inventory.count(POTION), REGISTRY.info(POTION).stack_limit)
+
+    # remove_many either removes everything or nothing
+    def test_remove_many_is_all_or_nothing(self):
+        with self.assertRaises(ValueError):
+            self.inventory.remove_many({"Potion": 1, "Gold Coin": 11})
+        self.assertEqual(self.inventory.count("Potion"), 2)
+
+        self.inventory.remove_many({"Potion": 2, "Gold Coin": 5})
+        self.assertEqual(dict(self.inventory.view()), {"Gold Coin": 5})
+
+    # Removing nothing or a negative amount is an error, not a no-op or an addition
+    def test_remove_rejects_bad_quantities(self):
+        for item, quantity in (("Sword", 0), ("Potion", 0), ("Potion", -200)):
+            with self.assertRaises(ValueError):
+                self.inventory.remove(item, quantity)
+        with self.assertRaises(ValueError):
+            self.inventory.remove_many({"Potion": 1, "Gold Coin": -5})
+        self.assertEqual(self.inventory.counts, {POTION: 2, GOLD_COIN: 10})
+
+    # Views are live and read-only, not copies
+    def test_view_is_live_and_read_only(self):
+        view = self.inventory.view()
+        self.inventory.add("Gold Coin", 5)
+        self.assertEqual(view["Gold Coin"], 15)
+        self.assertNotIn("Sword", view)
+        with self.assertRaises(TypeError):
+            view["Potion"] = 50
+
+    def test_total_weight_and_value(self):
+        self.assertAlmostEqual(self.inventory.total_weight(), 2 * 0.5 + 10 * 0.01)
+        self.assertEqual(self.inventory.total_value(), 2 * 25 + 10)
+
+    # Collecting loot merges the whole drop into the player's inventory
+    def test_collect_loot_merges_drop(self):
+        player = Player("TestPlayer", "Punch", 10, 5, {"Potion": 2}, sink=NULL_SINK)
+        enemy = Enemy("TestGoblin", 10, 10, "Bite", 5, 2, {"Gold Coin": 3, "Potion": 1}, sink=NULL_SINK)
+        enemy.take_damage(10)
+
+        collected = player.collect_loot(enemy)
+        self.assertEqual(collected, {"Gold Coin": 3, "Potion": 1})
+        self.assertEqual(player.inventory, {"Potion": 3, "Gold Coin": 3})
+        self.assertEqual(enemy.inventory, {})
+
+    # Loot past a stack limit is left behind and only what was added is reported
+    def test_collect_loot_past_the_stack_limit(self):
+        sink = BufferedSink()
+        player = Player("TestPlayer", "Punch", 10, 5, {"Potion": 99}, sink=sink)
+        enemy = Enemy("TestGoblin", 10, 10, "Bite", 5, 2, {"Gold Coin": 3, "Potion": 3}, sink=NULL_SINK)
+        enemy.take_damage(10)
+
+        collected = player.collect_loot(enemy)
+        self.assertEqual(collected, {"Gold Coin": 3})
+        self.assertEqual(player.inventory, {"Potion": 99, "Gold Coin": 3})
+        self.assertEqual([event for event in sink.events if isinstance(event, ItemAdded)],
+                         [ItemAdded("TestPlayer", "Gold Coin", 3)])
+        self.assertIn(LootOverflow("TestPlayer", "TestGoblin", {"Potion": 3}), sink.events)
+
+    # Picking up past a stack limit reports what was added and what was left behind
+    def test_add_to_inventory_past_the_stack_limit(self):
+        sink = BufferedSink()
+        player = Player("TestPlayer", "Punch", 10, 5, {}, sink=sink)
+        self.assertEqual(player.add_to_inventory("Potion", 104), 99)
+        self.assertEqual(sink.events, [ItemAdded("TestPlayer", "Potion", 99),
+                                       LootOverflow("TestPlayer", "TestPlayer", {"Potion": 5})])
+
+    # A loot table roll on top of a full stack still reaches the collector in full
+    def test_loot_table_roll_past_the_stack_limit(self):
+        table = LootTable("test_potions", [Drop("Potion", quantity=5)])
+        enemy = Enemy("TestGoblin", 10, 10, "Bite", 5, 2, {"Potion": 97}, sink=NULL_SINK, loot_table=table)
+        enemy.take_damage(10)
+        self.assertEqual(dict(enemy.drop_loot()), {"Potion": 102})
+
+if __name__ == "__main__":
+    unittest.main()
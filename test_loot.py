@@ -0,0 +1,107 @@
+import random
+import unittest
+from collections import Counter
+from unittest import mock
+import loot
+from content import ENEMY, ContentRegistry
+from enemy import Enemy
+from engine import always_attack, run_battle
+from events import NULL_SINK
+from loot import AliasTable, Drop, LootTable
+from player import Player
+
+class TestLoot(unittest.TestCase):
+
+    def setUp(self):
+        self.gems = LootTable("test_gems", [Drop("Ruby", weight=3), Drop("Diamond", weight=1)])
+        self.table = LootTable("test_goblin", [
+            Drop("Gold Coin", weight=6, quantity=(1, 3)),
+            Drop(table=self.gems, weight=2),
+            Drop(None, weight=2),
+        ], guaranteed={"Goblin Ear": 1})
+
+    # Every outcome keeps its share of the columns, whatever order Vose's algorithm pairs them in
+    def test_alias_table_is_exact(self):
+        weights = [5, 1, 0, 10, 4]
+        alias = AliasTable(weights)
+        share = [0.0] * len(weights)
+        for column, (probability, other) in enumerate(zip(alias.probability, alias.alias)):
+            share[column] += probability / len(weights)
+            share[other] += (1 - probability) / len(weights)
+        for weight, chance in zip(weights, share):
+            self.assertAlmostEqual(chance, weight / sum(weights))
+
+    def test_alias_table_rejects_bad_weights(self):
+        for weights in ([], [0, 0], [3, -1]):
+            with self.assertRaises(ValueError):
+                AliasTable(weights)
+
+    def test_sampling_follows_the_weights(self):
+        rng = random.Random(1)
+        alias = AliasTable([1, 3])
+        picks = Counter(alias.sample(rng) for _ in range(20000))
+        self.assertAlmostEqual(picks[1] / 20000, 0.75, delta=0.02)
+
+    def test_roll(self):
+        rng = random.Random(7)
+        seen: Counter = Counter()
+        for _ in range(500):
+            dropped = self.table.roll(rng)
+            self.assertEqual(dropped["Goblin Ear"], 1)
+            self.assertLessEqual(dropped["Gold Coin"], 3)
+            seen.update(dropped.keys())
+        self.assertTrue({"Gold Coin", "Ruby", "Diamond"} <= set(seen))
+        self.assertLess(seen["Gold Coin"], 500) # Some kills drop nothing but the ear
+
+    def test_rarity_weights(self):
+        table = LootTable("tiers", [Drop("Junk"), Drop("Relic", rarity="legendary")])
+        self.assertEqual(table.chances()[1], loot.RARITIES["legendary"] / (loot.RARITIES["common"] + 1))
+        with self.assertRaises(ValueError):
+            LootTable("bad", [Drop("Relic", rarity="mythic")])
+        with self.assertRaises(ValueError):
+            LootTable("bad", [Drop("Relic", quantity=(3, 1))])
+        with self.assertRaises(ValueError):
+            LootTable("bad", [Drop("Relic")], rolls=-1)
+
+    # Batch sampling (NumPy or not) matches the expected totals of rolling every kill
+    def test_sample_counts(self):
+        kills = 200000
+        expected = {"Goblin Ear": kills, "Gold Coin": kills * 0.6 * 2, "Ruby": kills * 0.2 * 0.75,
+                    "Diamond": kills * 0.2 * 0.25}
+        counts = self.table.sample_counts(kills, seed=3)
+        self.assertEqual(self.table.sample_counts(kills, seed=3), counts)
+        for item, total in expected.items():
+            self.assertAlmostEqual(counts[item] / total, 1, delta=0.03)
+        with mock.patch.object(loot, "np", None):
+            fallback = self.table.sample_counts(20000, seed=3)
+        self.assertAlmostEqual(fallback["Gold Coin"] / (20000 * 0.6 * 2), 1, delta=0.05)
+
+    # An enemy's table is rolled once, on top of its inventory, with the battle's random stream
+    def test_enemy_drops_its_table(self):
+        enemy = Enemy("Goblin", 1, 1, "Bite", 1, 0, {"Potion": 1}, sink=NULL_SINK, loot_table=self.table)
+        enemy.take_damage(1)
+        dropped = enemy.drop_loot(random.Random(0))
+        self.assertEqual((dropped["Potion"], dropped["Goblin Ear"]), (1, 1))
+        self.assertEqual(dict(enemy.drop_loot(random.Random(0))), {})
+
+        outcomes = []
+        for _ in range(2):
+            player = Player("Hero", "Slash", 50, 5, {}, sink=NULL_SINK)
+            goblin = Enemy("Goblin", 10, 10, "Bite", 1, 0, {}, sink=NULL_SINK, loot_table=self.table)
+            run_battle(player, goblin, always_attack, seed=11)
+            outcomes.append(dict(player.inventory))
+        self.assertEqual(outcomes[0], outcomes[1])
+        self.assertEqual(outcomes[0]["Goblin Ear"], 1)
+
+    def test_archetypes_name_tables(self):
+        registry = ContentRegistry()
+        registry.register("goblin", ENEMY, name="Goblin", health=5, max_health=5, attack_name="Bite",
+                          attack_power=1, defense=0, loot_table="goblin")
+        self.assertIs(registry.create("goblin", sink=NULL_SINK).loot_table, loot.GOBLIN)
+        registry.register("ghost", ENEMY, name="Ghost", health=5, max_health=5, attack_name="Boo",
+                          attack_power=1, defense=0, loot_table="ectoplasm")
+        with self.assertRaises(ValueError):
+            registry.template("ghost")
+
+if __name__ == "__main__":
+    unittest.main()
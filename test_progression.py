@@ -0,0 +1,126 @@
+import tempfile
+import unittest
+import saves
+from content import template
+from engine import HealBelow, run_battle
+from enemy import Enemy
+from events import NULL_SINK, BufferedSink, ExperienceGained, LevelUp
+from player import Player
+from progression import Progression, default_progression
+from replay import ReplayRecorder, Snapshot, replay
+from world import World
+
+CONFIG = {
+    "max_level": 5,
+    "xp": {"base": 100, "exponent": 2},
+    "xp_reward": {"max_health": 1, "attack_power": 2, "defense": 0},
+    "player": {"max_health": {"per_level": 10, "exponent": 1}, "attack_power": {"per_level": 2, "exponent": 1},
+               "defense": {"per_level": 3, "exponent": 0.5}},
+    "enemy": {"health": 0.5, "attack_power": 0.25, "defense": 0},
+}
+
+class TestProgression(unittest.TestCase):
+
+    def setUp(self):
+        self.progression = Progression(CONFIG)
+        self.player = Player("TestPlayer", "Punch", 10, 5, {}, sink=NULL_SINK)
+
+    def test_tables(self):
+        self.assertEqual(self.progression.thresholds[1:], (0, 100, 400, 900, 1600, float("inf")))
+        self.assertEqual(self.progression.gains[2], (10, 2, 3))
+        self.assertEqual(self.progression.gains[3], (10, 2, 1)) # round(3 * 2 ** 0.5) - 3
+        self.assertEqual(self.progression.bonuses[5], (40, 8, 6))
+        self.assertEqual(self.progression.enemy_scales[3], (2.0, 1.5, 1.0))
+        self.assertEqual([self.progression.level_for(xp) for xp in (0, 99, 100, 899, 10 ** 6)], [1, 1, 2, 3, 5])
+
+    def test_award(self):
+        self.player.take_damage(30)
+        self.assertEqual(self.progression.award(self.player, 99), 0)
+        self.assertEqual((self.player.level, self.player.xp, self.player.max_health), (1, 99, 100))
+        # Several levels at once, health rises along with the maximum
+        self.assertEqual(self.progression.award(self.player, 301), 2)
+        self.assertEqual((self.player.level, self.player.max_health, self.player.health), (3, 120, 90))
+        self.assertEqual((self.player.attack_power, self.player.defense), (14, 9))
+        self.assertEqual(self.progression.xp_to_next(self.player), 500)
+
+    # Experience keeps adding up past the highest level, the stats don't
+    def test_highest_level(self):
+        self.assertEqual(self.progression.award(self.player, 10 ** 9), 4)
+        self.assertEqual(self.progression.award(self.player, 10 ** 9), 0)
+        self.assertEqual((self.player.level, self.player.max_health), (5, 140))
+
+    def test_apply_level(self):
+        self.progression.apply_level(self.player, 4)
+        self.assertEqual((self.player.level, self.player.xp, self.player.max_health), (4, 900, 130))
+        with self.assertRaises(ValueError):
+            self.progression.apply_level(self.player, 2)
+
+    # Winning a battle awards the enemy's experience after the loot, losing awards nothing
+    def test_battle_awards_experience(self):
+        sink = BufferedSink()
+        self.player.sink = sink
+        enemy = Enemy("TestGoblin", 20, 60, "Bite", 1, 0, {"Gold Coin": 1}, sink=NULL_SINK)
+        result = run_battle(self.player, enemy, seed=1, progression=self.progression)
+        self.assertEqual(result.winner, "player")
+        gained = [event for event in sink.events if isinstance(event, (ExperienceGained, LevelUp))]
+        self.assertEqual(gained, [ExperienceGained("TestPlayer", 62, 62)])
+        self.assertEqual(self.player.inventory["Gold Coin"], 1)
+
+        strong = Enemy("TestDragon", 500, 500, "Fire", 99, 0, {}, sink=NULL_SINK)
+        run_battle(self.player, strong, seed=1, progression=self.progression)
+        self.assertEqual(self.player.xp, 62)
+
+    def test_scale_enemy(self):
+        stats = {"health": 40, "max_health": 50, "attack_power": 8, "defense": 3}
+        self.assertEqual(self.progression.scale_enemy(stats, 3),
+                         {"health": 80, "max_health": 100, "attack_power": 12, "defense": 3})
+        self.assertEqual(self.progression.scale_enemy(stats, 99), self.progression.scale_enemy(stats, 5))
+        goblin = self.progression.create_scaled("goblin", 3, sink=NULL_SINK)
+        self.assertEqual(goblin.max_health, template("goblin")["max_health"] * 2)
+
+    # A world with a progression scales keyed enemies to the player who runs into them
+    def test_world_scales_enemies(self):
+        fought = []
+        world = World(width=10, height=10, seed=1, progression=self.progression,
+                      fight=lambda player, enemy, policy: fought.append(enemy))
+        self.progression.apply_level(self.player, 3)
+        world.spawn("goblin", 5, 5)
+        world.add_player(self.player, 5, 6)
+        world.tick()
+        self.assertEqual(fought[0].max_health, template("goblin")["max_health"] * 2)
+
+    def test_rejects_bad_configs(self):
+        with self.assertRaises(ValueError):
+            Progression({key: value for key, value in CONFIG.items() if key != "enemy"})
+        with self.assertRaises(ValueError):
+            Progression({**CONFIG, "max_level": 0})
+
+    def test_default_progression_is_shared(self):
+        self.assertIs(default_progression(), default_progression())
+
+    # Levels survive saving, and records written before levels existed still load as level 1
+    def test_saves_keep_levels(self):
+        self.progression.apply_level(self.player, 3)
+        self.player.take_damage(50)
+        with tempfile.TemporaryDirectory() as path:
+            with saves.SaveStore(path) as store:
+                store.save("hero", self.player)
+            with saves.SaveStore(path) as store:
+                hero = store.restore("hero")
+        self.assertEqual((hero.level, hero.xp, hero.max_health, hero.health), (3, 400, 120, 70))
+
+        old = saves._BASE_FIELDS
+        _, state = saves._apply_body(saves._pack_body("player", old, Snapshot.of(self.player)), None)
+        self.assertEqual((state.level, state.xp), (1, 0))
+
+    # A leveled player's maximum health is part of the recording
+    def test_replay_of_leveled_player(self):
+        self.progression.apply_level(self.player, 5)
+        self.player.take_damage(25)
+        enemy = Enemy("TestOgre", 80, 80, "Club", 9, 3, {}, sink=NULL_SINK)
+        recorder = ReplayRecorder()
+        result = run_battle(self.player, enemy, HealBelow(40), seed=7, recorder=recorder)
+        self.assertEqual(replay(recorder.getvalue()).hp_per_turn, result.hp_per_turn)
+
+if __name__ == "__main__":
+    unittest.main()
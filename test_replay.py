@@ -0,0 +1,76 @@
+import io
+import unittest
+from player import Player
+from enemy import Enemy
+from effects import EFFECTS, HEAL as HEAL_EFFECT, POTION_HEAL
+from engine import HealBelow, run_battle
+from events import NULL_SINK
+from replay import ReplayError, ReplayRecorder, load, replay
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.player = Player("TestPlayer", "Punch", 10, 5, {"Potion": 2}, sink=NULL_SINK)
+        self.enemy = Enemy("TestOgre", 80, 80, "Club", 9, 3, {"Gold Coin": 3}, sink=NULL_SINK)
+
+    def record(self, seed=42):
+        recorder = ReplayRecorder()
+        result = run_battle(self.player, self.enemy, HealBelow(40), seed=seed, recorder=recorder)
+        return result, recorder.getvalue()
+
+    # A recording replays to exactly the same outcome
+    def test_replay_reproduces_battle(self):
+        result, data = self.record()
+        replayed = replay(data)
+
+        self.assertEqual(replayed.winner, result.winner)
+        self.assertEqual(replayed.turns, result.turns)
+        self.assertEqual(replayed.hp_per_turn, result.hp_per_turn)
+        self.assertEqual(replayed.loot, {"Gold Coin": 3})
+
+    # Header, snapshots and actions are all stored
+    def test_load_reads_recording(self):
+        result, data = self.record(seed=7)
+        recording = load(data)
+
+        self.assertEqual(recording.seed, 7)
+        self.assertEqual(recording.player.inventory, {"Potion": 2})
+        self.assertEqual(recording.enemy.attack_name, "CLUB")
+        self.assertEqual(len(recording.actions), 2 * result.turns - (result.winner == "player"))
+        self.assertEqual(recording.result.winner, result.winner)
+
+    # Recordings are streamed to the target file as the battle goes
+    def test_recording_streams_to_file(self):
+        stream = io.BytesIO()
+        run_battle(self.player, self.enemy, HealBelow(40), seed=3, recorder=ReplayRecorder(stream, flush_every=1))
+        self.assertEqual(replay(stream.getvalue()).winner, "player")
+
+    # A change in the rules is detected as a desync
+    def test_rule_change_is_reported_as_desync(self):
+        _, data = self.record()
+        EFFECTS.register("Potion", HEAL_EFFECT, 30)
+        try:
+            with self.assertRaises(ReplayError):
+                replay(data)
+        finally:
+            EFFECTS.register("Potion", HEAL_EFFECT, POTION_HEAL)
+
+    def test_battle_with_own_rng_cannot_be_recorded(self):
+        import random
+        with self.assertRaises(ReplayError):
+            run_battle(self.player, self.enemy, rng=random.Random(1), recorder=ReplayRecorder())
+
+    # Seeds that don't fit the header are rejected with a ReplayError, not a struct.error
+    def test_out_of_range_seed_cannot_be_recorded(self):
+        for seed in (-1, 2 ** 64):
+            with self.assertRaises(ReplayError):
+                run_battle(self.player, self.enemy, seed=seed, recorder=ReplayRecorder())
+
+    # Recording doesn't change how an unknown action is reported
+    def test_unknown_action_while_recording(self):
+        with self.assertRaisesRegex(ValueError, "Unknown action"):
+            run_battle(self.player, self.enemy, lambda actor, opponent, rng: "dance", seed=1,
+                       recorder=ReplayRecorder())
+
+if __name__ == "__main__":
+    unittest.main()
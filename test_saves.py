@@ -0,0 +1,158 @@
+import os
+import tempfile
+import unittest
+from player import Player
+from enemy import Enemy
+from content import PLAYER
+from events import NULL_SINK
+from replay import Snapshot
+from saves import ALL_FIELDS, FIELDS, FULL, LOG_NAME, MAGIC, SaveError, SaveStore, _BODY, _FILE_HEADER, _NUMBER, \
+    _pack_body, _pack_record
+
+class TestSaves(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = self.directory.name
+
+    def new_player(self, name="TestPlayer"):
+        return Player(name, "Punch", 10, 5, {"Potion": 2}, sink=NULL_SINK)
+
+    def test_round_trip(self):
+        player = self.new_player()
+        player.take_damage(35)
+        enemy = Enemy("TestGoblin", 20, 30, "Bite", 6, 3, {"Gold Coin": 1}, sink=NULL_SINK, speed=14)
+        with SaveStore(self.path) as store:
+            store.save("hero", player)
+            store.save("goblin", enemy)
+        with SaveStore(self.path) as store:
+            hero, goblin = store.restore("hero"), store.restore("goblin")
+        self.assertIsInstance(hero, Player)
+        self.assertEqual((hero.health, dict(hero.inventory), hero.attack_name), (65, {"Potion": 2}, "PUNCH"))
+        self.assertIsInstance(goblin, Enemy)
+        self.assertEqual((goblin.health, goblin.max_health, goblin.speed), (20, 30, 14))
+
+    # After the first full save, only the changes are appended
+    def test_later_saves_are_deltas(self):
+        player = self.new_player()
+        with SaveStore(self.path) as store:
+            full = store.save("hero", player)
+            self.assertEqual(store.save("hero", player), 0) # Nothing changed
+            player.take_damage(10)
+            player.inventory.source.remove("Potion")
+            player.inventory.source.add("Gold Coin", 3)
+            delta = store.save("hero", player)
+            self.assertLess(delta, full)
+        with SaveStore(self.path) as store:
+            self.assertEqual(store.load("hero").inventory, {"Potion": 1, "Gold Coin": 3})
+            self.assertEqual(store.load("hero").health, 90)
+
+    def test_removed_items_stay_removed(self):
+        player = self.new_player()
+        with SaveStore(self.path) as store:
+            store.save("hero", player)
+            player.inventory.source.remove("Potion", 2)
+            store.save("hero", player)
+        with SaveStore(self.path) as store:
+            self.assertEqual(store.load("hero").inventory, {})
+
+    # Loading one profile only reads that profile's records
+    def test_lazy_loading(self):
+        with SaveStore(self.path) as store:
+            for index in range(50):
+                store.save(f"hero{index}", self.new_player(f"Hero{index}"))
+        with SaveStore(self.path) as store:
+            self.assertEqual(len(store), 50)
+            self.assertEqual(store._states, {})
+            self.assertEqual(store.load("hero7").name, "Hero7")
+            self.assertEqual(list(store._states), ["hero7"])
+
+    def test_compaction_keeps_the_latest_states(self):
+        player = self.new_player()
+        with SaveStore(self.path, compact_min_bytes=0) as store:
+            for _ in range(30):
+                player.take_damage(1)
+                store.save("hero", player)
+                store.save("other", self.new_player("Other"))
+            self.assertGreater(store.compactions, 0)
+            self.assertLess(store.dead_bytes, store.log_bytes * store.compact_ratio)
+        with SaveStore(self.path) as store:
+            self.assertEqual(store.load("hero").health, 70)
+            self.assertEqual(store.load("other").health, 100)
+
+    def test_long_delta_chains_are_rewritten_in_full(self):
+        player = self.new_player()
+        with SaveStore(self.path, max_chain=4, compact_ratio=0) as store:
+            for _ in range(12):
+                player.take_damage(1)
+                store.save("hero", player)
+                self.assertLessEqual(len(store._entries["hero"].chain), 5)
+            self.assertEqual(store.load("hero").health, 88)
+
+    # Records written after the index (ex: a crash before close) are found by scanning the end of the log
+    def test_recovers_without_the_index(self):
+        player = self.new_player()
+        store = SaveStore(self.path)
+        store.save("hero", player)
+        store.flush()
+        player.take_damage(25)
+        store.save("hero", player)
+        store._log.flush() # No index update
+        with SaveStore(self.path) as reopened:
+            self.assertEqual(reopened.load("hero").health, 75)
+        store._log.close()
+
+    def test_torn_record_is_dropped(self):
+        with SaveStore(self.path) as store:
+            store.save("hero", self.new_player())
+        with open(os.path.join(self.path, LOG_NAME), "ab") as file:
+            file.write(b"\x02\x04\x00") # Half a record header
+        with SaveStore(self.path) as store:
+            self.assertEqual(store.load("hero").health, 100)
+            store.save("hero", self.new_player())
+            self.assertEqual(store.dead_bytes, 0)
+
+    def test_delete(self):
+        with SaveStore(self.path) as store:
+            store.save("hero", self.new_player())
+            store.delete("hero")
+        with SaveStore(self.path) as store:
+            self.assertNotIn("hero", store)
+            with self.assertRaises(KeyError):
+                store.load("hero")
+
+    # Experience outgrows 32 bits
+    def test_large_xp(self):
+        player = self.new_player()
+        player.xp = 2 ** 31 + 5
+        with SaveStore(self.path) as store:
+            store.save("hero", player)
+            player.xp += 2 ** 40
+            store.save("hero", player)
+        with SaveStore(self.path) as store:
+            self.assertEqual(store.load("hero").xp, 2 ** 40 + 2 ** 31 + 5)
+
+    # A version 1 log (32-bit xp) still reads, and is rewritten in the current format when opened
+    def test_upgrades_version_1_logs(self):
+        player = self.new_player()
+        player.xp = 400
+        xp_bit = 1 << FIELDS.index("xp")
+        body = _pack_body(PLAYER, ALL_FIELDS & ~xp_bit, Snapshot.of(player))
+        body = _BODY.pack(0, ALL_FIELDS) + body[_BODY.size:] + _NUMBER.pack(400)
+        with open(os.path.join(self.path, LOG_NAME), "wb") as file:
+            file.write(_FILE_HEADER.pack(MAGIC, 1) + _pack_record(FULL, "hero", body))
+        with SaveStore(self.path) as store:
+            self.assertEqual(store.compactions, 1)
+            self.assertEqual((store.load("hero").xp, store.load("hero").health), (400, 100))
+        with SaveStore(self.path) as store:
+            self.assertEqual((store.compactions, store.load("hero").xp), (0, 400))
+
+    def test_rejects_other_files(self):
+        with open(os.path.join(self.path, LOG_NAME), "wb") as file:
+            file.write(b"not a save log")
+        with self.assertRaises(SaveError):
+            SaveStore(self.path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+from balance import BALANCE_ENEMY, BALANCE_PLAYER
+from server import BattleServer
+from telemetry import Telemetry
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = BattleServer(idle_timeout=0.5)
+        self.port = await self.server.start(port=0)
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+
+    async def play(self, name, moves):
+        """Connects a client, sends its name and moves and returns everything the server said"""
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(f"{name}\n".encode())
+        for move in moves:
+            writer.write(f"{move}\n".encode())
+        await writer.drain()
+        output = await reader.read()
+        writer.close()
+        return output.decode()
+
+    # The default player beats the default Goblin in 3 attacks
+    async def test_session_plays_full_battle(self):
+        output = await self.play("Kramptj", ["1", "1", "1"])
+
+        self.assertIn("Enter your name:", output)
+        self.assertIn("Kramptj used PUNCH on Goblin", output)
+        self.assertIn("--- VICTORY! ---", output)
+        self.assertEqual(self.server.metrics.finished_sessions, 1)
+        self.assertEqual(self.server.metrics.latency.count, 3)
+
+    async def test_invalid_move_is_rejected(self):
+        output = await self.play("Kramptj", ["9", "1", "1", "1"])
+        self.assertIn("Invalid input. Please enter 1 or 2.", output)
+        self.assertIn("--- VICTORY! ---", output)
+
+    # Many sessions run side by side, and an idle one doesn't hold up the others
+    async def test_concurrent_sessions_do_not_block_each_other(self):
+        idle_reader, idle_writer = await asyncio.open_connection("127.0.0.1", self.port)
+
+        outputs = await asyncio.gather(*(self.play(f"Player{i}", ["1", "1", "1"]) for i in range(50)))
+        self.assertTrue(all("--- VICTORY! ---" in output for output in outputs))
+        self.assertEqual(self.server.metrics.finished_sessions, 50)
+
+        # The idle client is eventually disconnected
+        idle_output = await idle_reader.read()
+        self.assertIn("idle for too long", idle_output.decode())
+        self.assertEqual(self.server.metrics.timed_out_sessions, 1)
+        idle_writer.close()
+
+    # Templates are built like the simulator's, ruleset names and all
+    async def test_templates_with_rulesets(self):
+        await self.server.stop()
+        self.server = BattleServer(BALANCE_PLAYER, BALANCE_ENEMY, idle_timeout=0.5)
+        self.port = await self.server.start(port=0)
+        output = await self.play("Kramptj", ["1"] * 20)
+        self.assertIn("Kramptj used PUNCH on", output)
+        self.assertRegex(output, "VICTORY|GAME OVER")
+        self.assertEqual(self.server.metrics.finished_sessions, 1)
+
+    # With telemetry, every session's battle is aggregated and still shown to the client
+    async def test_telemetry_sees_every_session(self):
+        self.server.telemetry = Telemetry()
+        outputs = await asyncio.gather(*(self.play(f"Player{i}", ["1", "1", "1"]) for i in range(3)))
+        self.assertTrue(all("--- VICTORY! ---" in output for output in outputs))
+        recent = self.server.telemetry.snapshot()["recent"]
+        self.assertEqual(recent["win_rate"], {"Goblin": 1.0})
+        self.assertEqual(recent["loot"], {"Gold Coin": 3})
+
+    # In tick mode the moves of all sessions are resolved together, the clients see the same game
+    async def test_tick_mode(self):
+        await self.server.stop()
+        self.server = BattleServer(idle_timeout=0.5, tick_interval=0.01)
+        self.port = await self.server.start(port=0)
+        batches = []
+        self.server.ticks.broadcast = lambda deltas: batches.append(len(deltas))
+        outputs = await asyncio.gather(*(self.play(f"Player{i}", ["1", "1", "1"]) for i in range(20)))
+        self.assertTrue(all("--- VICTORY! ---" in output for output in outputs))
+        self.assertEqual(self.server.metrics.finished_sessions, 20)
+        self.assertEqual(sum(batches), 3 * 20)
+        self.assertGreater(max(batches), 1) # Moves of different sessions shared ticks
+        self.assertEqual(len(self.server.ticks), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from simulate import DEFAULT_ENEMY, DEFAULT_PLAYER, SEED_LIMIT, battle_seed, simulate
+
+class TestSimulate(unittest.TestCase):
+
+    # Default Kramptj always beats the default Goblin in 3 turns
+    def test_default_matchup_summary(self):
+        summary = simulate(n=50, workers=1)
+
+        self.assertEqual(summary.battles, 50)
+        self.assertEqual(summary.win_rate, 1.0)
+        self.assertEqual(summary.mean_turns, 3)
+        self.assertEqual(summary.turn_percentiles, {50: 3, 90: 3, 99: 3})
+        self.assertEqual(summary.player_hp_histogram, {80: 50}) # 88 HP left every time
+        self.assertEqual(summary.loot_totals, {"Gold Coin": 50})
+
+    def test_templates_are_not_mutated(self):
+        simulate(n=5, workers=1)
+        self.assertEqual(DEFAULT_PLAYER["inventory"], {"Potion": 2})
+        self.assertEqual(DEFAULT_ENEMY["inventory"], {"Gold Coin": 1})
+
+    # Splitting the work over processes must not change the results
+    def test_worker_count_does_not_change_results(self):
+        strong_enemy = dict(DEFAULT_ENEMY, health=200, max_health=200, attack_power=12)
+        in_process = simulate(enemy_template=strong_enemy, n=40, policies=("heal_below:30", "random"), workers=1, seed=7)
+        pooled = simulate(enemy_template=strong_enemy, n=40, policies=("heal_below:30", "random"), workers=2, seed=7)
+        self.assertEqual(in_process, pooled)
+
+    # Every (seed, index) pair gets its own battle seed, pairs that can't are rejected
+    def test_battle_seeds(self):
+        self.assertNotEqual(battle_seed(1, 0), battle_seed(0, 1))
+        for seed, index in ((-1, 0), (SEED_LIMIT, 0), (0, SEED_LIMIT)):
+            with self.assertRaises(ValueError):
+                battle_seed(seed, index)
+        for seed, first in ((-1, 0), (SEED_LIMIT, 0), (0, SEED_LIMIT - 5)):
+            with self.assertRaises(ValueError):
+                simulate(n=10, workers=1, seed=seed, first=first)
+
+if __name__ == "__main__":
+    unittest.main()
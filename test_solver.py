@@ -0,0 +1,78 @@
+import unittest
+import solver
+from player import Player
+from enemy import Enemy
+from events import NULL_SINK
+from damage import STANDARD
+from engine import run_battle
+from simulate import DEFAULT_ENEMY, DEFAULT_PLAYER, simulate
+from solver import solve, solve_grid
+
+STANDARD_PLAYER = dict(DEFAULT_PLAYER, ruleset="standard")
+STANDARD_ENEMY = dict(DEFAULT_ENEMY, ruleset="standard", health=90, max_health=90, attack_power=14)
+
+class TestSolver(unittest.TestCase):
+
+    def new_combatants(self):
+        player = Player("TestPlayer", "Punch", 10, 5, {"Potion": 2}, sink=NULL_SINK, ruleset=STANDARD)
+        enemy = Enemy("TestGoblin", 90, 90, "Bite", 14, 3, {}, sink=NULL_SINK, ruleset=STANDARD)
+        return player, enemy
+
+    # The classic rules are deterministic: 3 hits kill a 30 HP goblin, the player can't lose
+    def test_deterministic_battle(self):
+        player = Player("TestPlayer", "Punch", 10, 5, {}, sink=NULL_SINK)
+        enemy = Enemy("TestGoblin", 30, 30, "Bite", 6, 3, {}, sink=NULL_SINK)
+        solution = solve(player, enemy)
+        self.assertEqual(solution.win_probability, 1.0)
+        self.assertAlmostEqual(solution.expected_turns, 3.0)
+
+    # Ground truth for the simulator: attack-only battles with random damage
+    def test_matches_simulation(self):
+        player, enemy = self.new_combatants()
+        solution = solve(player, enemy, potions=0)
+        summary = simulate(STANDARD_PLAYER, STANDARD_ENEMY, n=4000, policies=("attack", "random"), workers=1, seed=3)
+        self.assertAlmostEqual(summary.win_rate, solution.win_probability, delta=0.03)
+        self.assertAlmostEqual(summary.mean_turns, solution.expected_turns, delta=0.3)
+
+    # Heals use up Potions in the engine too, so the model matches simulated heal_below battles
+    def test_heals_match_simulation(self):
+        player, enemy = self.new_combatants()
+        solution = solve(player, enemy, heal_below=40)
+        summary = simulate(STANDARD_PLAYER, STANDARD_ENEMY, n=4000, policies=("heal_below:40", "random"), workers=1, seed=3)
+        self.assertAlmostEqual(summary.win_rate, solution.win_probability, delta=0.03)
+        self.assertAlmostEqual(summary.mean_turns, solution.expected_turns, delta=0.3)
+
+    def test_optimal_policy_beats_fixed_policies(self):
+        player, enemy = self.new_combatants()
+        best = solve(player, enemy).win_probability
+        self.assertGreater(best, solve(player, enemy, potions=0).win_probability)
+        for threshold in (10, 30, 50, 70):
+            self.assertGreaterEqual(best + 1e-12, solve(player, enemy, heal_below=threshold).win_probability)
+
+    def test_policy_drives_the_engine(self):
+        player, enemy = self.new_combatants()
+        solution = solve(player, enemy)
+        self.assertIn(run_battle(player, enemy, solution.policy, seed=4).winner, ("player", "enemy"))
+
+    def test_pure_python_matches_numpy(self):
+        if solver.np is None:
+            self.skipTest("NumPy isn't installed")
+        player, enemy = self.new_combatants()
+        fast = solve(player, enemy)
+        numpy, solver.np = solver.np, None
+        try:
+            slow = solve(player, enemy)
+        finally:
+            solver.np = numpy
+        self.assertAlmostEqual(fast.win_probability, slow.win_probability)
+        self.assertAlmostEqual(fast.expected_turns, slow.expected_turns)
+
+    def test_grid_matches_single_solves(self):
+        grid = solve_grid([8, 12], [3], [40, 90], STANDARD_PLAYER, STANDARD_ENEMY)
+        self.assertEqual([(point.player_attack, point.enemy_health) for point in grid], [(8, 40), (8, 90), (12, 40), (12, 90)])
+        player, enemy = self.new_combatants()
+        player.attack_power = 12
+        self.assertAlmostEqual(grid[3].win_probability, solve(player, enemy).win_probability)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import random
+import unittest
+from player import Player
+from enemy import Enemy
+from events import NULL_SINK, BufferedSink, Stunned
+from effects import use_item
+from engine import Battle, run_battle
+from status import ATTACK_UP, DEFENSE_UP, POISON, REGEN, STUN, StatusEffects, TimerWheel
+
+class TestTimerWheel(unittest.TestCase):
+
+    # Tiny levels so items cascade through every level and the overflow list
+    def test_items_come_out_on_their_turn(self):
+        rng = random.Random(5)
+        wheel = TimerWheel(bits=2, levels=2)
+        expected = {}
+        for item in range(300):
+            turn = rng.randint(1, 200)
+            wheel.schedule(turn, item)
+            expected.setdefault(turn, []).append(item)
+        for turn in range(1, 201):
+            self.assertEqual(wheel.advance(), expected.get(turn, []))
+        self.assertEqual(len(wheel), 0)
+
+    def test_schedule_during_play(self):
+        wheel = TimerWheel()
+        wheel.schedule(70_000, "far")
+        wheel.schedule(3, "near")
+        seen = {}
+        while len(wheel):
+            for item in wheel.advance():
+                seen[item] = wheel.now
+        self.assertEqual(seen, {"near": 3, "far": 70_000})
+
+    def test_past_turns_are_rejected(self):
+        with self.assertRaises(ValueError):
+            TimerWheel(now=5).schedule(5, "late")
+
+class TestStatusEffects(unittest.TestCase):
+
+    def setUp(self):
+        self.player = Player("TestPlayer", "Punch", 10, 5, {"Venom Flask": 1, "Flashbang": 1}, sink=NULL_SINK)
+        self.enemy = Enemy("TestGoblin", 30, 30, "Bite", 6, 3, {"Gold Coin": 1}, sink=NULL_SINK)
+        self.statuses = StatusEffects()
+
+    def test_poison_ticks_then_wears_off(self):
+        self.statuses.apply(self.enemy, POISON, turns=3, amount=4)
+        healths = []
+        for turn in range(1, 6):
+            self.statuses.advance(turn)
+            healths.append(self.enemy.health)
+        self.assertEqual(healths, [26, 22, 18, 18, 18])
+        self.assertEqual(self.statuses.effects_on(self.enemy), [])
+
+    def test_regeneration_is_capped_and_never_revives(self):
+        self.player.take_damage(5)
+        self.statuses.apply(self.player, REGEN, turns=3, amount=4)
+        self.statuses.advance(2)
+        self.assertEqual(self.player.health, 100)
+        self.enemy.take_damage(30)
+        self.statuses.apply(self.enemy, REGEN, turns=3, amount=4)
+        self.statuses.advance(3)
+        self.assertTrue(self.enemy.is_defeated())
+
+    def test_buffs_are_taken_back(self):
+        self.statuses.apply(self.enemy, ATTACK_UP, turns=2, amount=4)
+        self.statuses.apply(self.enemy, DEFENSE_UP, turns=5, amount=-2)
+        self.assertEqual((self.enemy.attack_power, self.enemy.defense), (10, 1))
+        self.statuses.advance(3)
+        self.assertEqual(self.enemy.attack_power, 6)
+        self.statuses.clear(self.enemy)
+        self.assertEqual(self.enemy.defense, 3)
+        self.statuses.advance(10) # The cleared buff is skipped when it comes up
+        self.assertEqual(self.enemy.defense, 3)
+
+    def test_poison_can_win_the_battle(self):
+        fight = Battle(self.player, self.enemy, seed=1)
+        use_item(self.player, "Venom Flask", self.enemy, statuses=fight.statuses)
+        self.enemy.take_damage(26)
+        fight.play_turn("defend")
+        self.assertEqual(fight.winner, "player")
+        self.assertEqual(fight.loot, {"Gold Coin": 1})
+
+    # When poison knocks out both sides at once, the enemy wins and nothing goes to the defeated player
+    def test_poison_knocking_out_both_sides(self):
+        fight = Battle(self.player, self.enemy, seed=1)
+        fight.statuses.apply(self.player, POISON, turns=1, amount=10)
+        fight.statuses.apply(self.enemy, POISON, turns=1, amount=10)
+        self.player.take_damage(95)
+        self.enemy.take_damage(25)
+        record = fight.play_turn("attack")
+        self.assertEqual(fight.winner, "enemy")
+        self.assertTrue(fight.finished)
+        self.assertEqual((record.player_health, record.enemy_health, record.enemy_action), (0, 0, None))
+        self.assertEqual(fight.loot, {})
+        self.assertEqual(dict(self.player.inventory), {"Venom Flask": 1, "Flashbang": 1})
+
+    def test_stun_skips_actions(self):
+        sink = BufferedSink()
+        fight = Battle(self.player, self.enemy, sink=sink, seed=1)
+        use_item(self.player, "Flashbang", self.enemy, statuses=fight.statuses)
+        record = fight.play_turn("attack")
+        self.assertIsNone(record.enemy_action)
+        self.assertEqual(self.player.health, 100)
+        self.assertIn(Stunned("TestGoblin"), sink.events)
+        self.assertEqual(fight.play_turn("attack").enemy_action, "attack")
+
+    # Nothing outlasts the battle
+    def test_battle_end_clears_statuses(self):
+        statuses = StatusEffects()
+        statuses.apply(self.player, ATTACK_UP, turns=50, amount=5)
+        statuses.apply(self.player, STUN, turns=1)
+        result = run_battle(self.player, self.enemy, seed=2, statuses=statuses)
+        self.assertEqual(result.turns, 3) # 15 damage per hit, one hit skipped by the stun
+        self.assertEqual(self.player.attack_power, 10)
+        self.assertEqual(statuses.stuns, {})
+
+if __name__ == "__main__":
+    unittest.main()
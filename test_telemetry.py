@@ -0,0 +1,87 @@
+import io
+import random
+import unittest
+from events import BattleEnded, BufferedSink, DamageDealt, ItemAdded, ItemUsed, JsonLinesSink, TurnEnded
+from engine import HealBelow, run_battle
+from player import Player
+from enemy import Enemy
+from telemetry import QuantileSketch, Telemetry, TelemetrySink, read_json_lines
+
+def turn(number, player_damage, enemy_damage):
+    """Events of one turn: the player deals 'player_damage', the enemy 'enemy_damage'"""
+    return [DamageDealt("enemy", "Goblin", player_damage, 10), DamageDealt("player", "Hero", enemy_damage, 90),
+            TurnEnded(number, "Hero", 90, "Goblin", 10)]
+
+class TestTelemetry(unittest.TestCase):
+
+    def test_sketch_quantiles_are_within_the_relative_error(self):
+        rng = random.Random(5)
+        values = sorted(rng.expovariate(0.05) for _ in range(20000)) + [0] * 1000
+        values.sort()
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q), exact, delta=exact * 0.011 + 1e-9)
+        self.assertEqual(sketch.quantile(0.01), 0.0) # The zeros are counted apart
+
+    def test_sketch_memory_is_bounded_and_merges(self):
+        sketch, other = QuantileSketch(max_buckets=64), QuantileSketch(max_buckets=64)
+        for value in range(1, 100000, 7):
+            sketch.add(value)
+            other.add(value)
+        self.assertLessEqual(len(sketch.buckets), 64)
+        median = sketch.quantile(0.5)
+        sketch.merge(other)
+        self.assertEqual(len(sketch), 2 * len(other))
+        self.assertAlmostEqual(sketch.quantile(0.5), median, delta=median * 0.02)
+        with self.assertRaises(ValueError):
+            sketch.merge(QuantileSketch(relative_accuracy=0.05))
+
+    def test_aggregates(self):
+        telemetry = Telemetry(window=10)
+        events = turn(1, 10, 6) + turn(2, 12, 0) + [ItemUsed("Hero", "Potion", 1), ItemAdded("Hero", "Gold Coin", 2),
+                                                    BattleEnded("player", "Hero", "Goblin", 2),
+                                                    BattleEnded("enemy", "Hero", "Orc", 5)]
+        self.assertEqual(telemetry.feed(iter(events)), len(events))
+        recent = telemetry.snapshot()["recent"]
+        self.assertEqual(recent["win_rate"], {"Goblin": 1.0, "Orc": 0.0})
+        self.assertEqual((recent["potions_used"], recent["loot"]), (1, {"Gold Coin": 2}))
+        self.assertEqual(recent["damage_per_turn"]["player"]["count"], 2)
+        self.assertAlmostEqual(recent["damage_per_turn"]["player"]["mean"], 11)
+        self.assertEqual(recent["damage_per_turn"]["enemy"]["p50"], 0.0)
+
+    # Windows roll over: 'recent' covers the last complete window and the current one, 'lifetime' everything
+    def test_windows(self):
+        telemetry = Telemetry(window=2)
+        for index in range(7):
+            telemetry.handle(BattleEnded("player" if index < 4 else "enemy", "Hero", "Goblin", 3))
+        snapshot = telemetry.snapshot()
+        self.assertEqual(snapshot["recent"]["battles"], 3)
+        self.assertEqual(snapshot["recent"]["win_rate"]["Goblin"], 0.0)
+        self.assertEqual(snapshot["lifetime"]["battles"], 7)
+        self.assertAlmostEqual(snapshot["lifetime"]["win_rate"]["Goblin"], 4 / 7)
+
+    # Live through a sink (forwarding to another one) and from a JSON lines file, with the same result
+    def test_sources(self):
+        live, buffer, file = Telemetry(), BufferedSink(), io.StringIO()
+        with JsonLinesSink(file) as json_sink:
+            for seed in range(20):
+                sink = TelemetrySink(live, buffer)
+                player = Player("Hero", "Punch", 10, 5, {"Potion": 2}, sink=sink)
+                enemy = Enemy("Goblin", 30, 30, "Bite", 6, 3, {"Gold Coin": 1}, sink=sink)
+                run_battle(player, enemy, HealBelow(95), seed=seed, sink=sink)
+            for event in buffer.events:
+                json_sink.emit(event)
+            json_sink.flush()
+            file.seek(0)
+            replayed = Telemetry()
+            events = list(replayed.tap(read_json_lines(file)))
+        self.assertEqual(len(events), len(buffer.events))
+        self.assertEqual(live.snapshot(), replayed.snapshot())
+        self.assertEqual(live.snapshot()["recent"]["battles"], 20)
+        self.assertGreater(live.snapshot()["recent"]["potions_used"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
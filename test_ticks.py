@@ -0,0 +1,125 @@
+import asyncio
+import unittest
+from engine import ATTACK, HEAL, Battle, run_battle
+from events import NULL_SINK
+from player import Player
+from enemy import Enemy
+from ticks import TickResolver
+
+def new_battle(seed):
+    player = Player("Hero", "Punch", 10, 5, {"Potion": 2}, sink=NULL_SINK)
+    enemy = Enemy("Goblin", 30, 30, "Bite", 6, 3, {"Gold Coin": 1}, sink=NULL_SINK)
+    return Battle(player, enemy, seed=seed)
+
+class TestTicks(unittest.TestCase):
+
+    def setUp(self):
+        self.broadcasts = []
+        self.ticks = TickResolver(broadcast=self.broadcasts.append)
+        for session in range(3):
+            self.ticks.open(session, new_battle(seed=session))
+
+    # Moves wait for the end of the tick and come back as one broadcast, in order of session id
+    def test_moves_are_resolved_together(self):
+        self.ticks.submit(2, ATTACK)
+        self.ticks.submit(0, ATTACK)
+        self.assertEqual(self.ticks.battles[0].turn, 0)
+        deltas = self.ticks.resolve()
+        self.assertEqual([delta.session for delta in deltas], [0, 2])
+        self.assertEqual(self.broadcasts, [deltas])
+        self.assertEqual((deltas[0].tick, deltas[0].turn, deltas[0].enemy_health), (1, 1, 20))
+        self.assertEqual(self.ticks.battles[1].turn, 0) # No move, nothing happened
+        self.assertEqual(self.ticks.resolve(), [])
+        self.assertEqual(len(self.broadcasts), 1) # Empty ticks aren't broadcast
+
+    def test_last_move_of_a_tick_wins(self):
+        self.ticks.submit(0, HEAL)
+        self.ticks.submit(0, ATTACK)
+        self.assertEqual(self.ticks.pending, 1)
+        self.assertEqual(self.ticks.resolve()[0].player_action, ATTACK)
+
+    # The outcome doesn't depend on the order the moves arrived in, and matches one-at-a-time battles
+    def test_reproducible(self):
+        other = TickResolver()
+        for session in (2, 1, 0):
+            other.open(session, new_battle(seed=session))
+        history, other_history = [], []
+        while any(not battle.finished for battle in self.ticks.battles.values()):
+            for session in (0, 1, 2):
+                if not self.ticks.battles[session].finished:
+                    self.ticks.submit(session, ATTACK)
+            for session in (2, 1, 0):
+                if not other.battles[session].finished:
+                    other.submit(session, ATTACK)
+            history += self.ticks.resolve()
+            other_history += other.resolve()
+        self.assertEqual(history, other_history)
+        single = new_battle(seed=1)
+        result = run_battle(single.player, single.enemy, seed=1)
+        self.assertEqual(self.ticks.battles[1].result().hp_per_turn, result.hp_per_turn)
+
+    def test_rejected_moves(self):
+        with self.assertRaises(ValueError):
+            self.ticks.submit(0, "dance")
+        with self.assertRaises(KeyError):
+            self.ticks.submit(9, ATTACK)
+        with self.assertRaises(KeyError):
+            self.ticks.open(0, new_battle(seed=0))
+        self.ticks.submit(1, ATTACK)
+        self.ticks.close(1)
+        self.assertEqual((self.ticks.pending, len(self.ticks)), (0, 2))
+
+    # Clients await their move's outcome while the resolver ticks on its own
+    def test_run(self):
+        async def play():
+            runner = asyncio.create_task(self.ticks.run(interval=0.01))
+            try:
+                return await asyncio.gather(self.ticks.play(0, ATTACK), self.ticks.play(1, ATTACK))
+            finally:
+                runner.cancel()
+
+        first, second = asyncio.run(play())
+        self.assertEqual((first.session, second.session), (0, 1))
+        self.assertEqual(first.tick, second.tick)
+
+    # A move that raises only fails its own session, the other moves of the tick are still played and delivered
+    def test_failed_move(self):
+        def broken_policy(actor, opponent, rng):
+            raise RuntimeError("policy failed")
+
+        self.ticks.battles[1].enemy_policy = broken_policy
+
+        async def play():
+            runner = asyncio.create_task(self.ticks.run(interval=0.01))
+            try:
+                moves = (self.ticks.play(session, ATTACK) for session in range(3))
+                return await asyncio.wait_for(asyncio.gather(*moves, return_exceptions=True), timeout=1)
+            finally:
+                runner.cancel()
+
+        first, failed, third = asyncio.run(play())
+        self.assertIsInstance(failed, RuntimeError)
+        self.assertEqual([(delta.session, delta.turn) for delta in (first, third)], [(0, 1), (2, 1)])
+        self.assertIs(self.ticks.last_error, failed)
+        self.assertEqual([delta.session for delta in self.broadcasts[0]], [0, 2])
+
+    # A broadcast that raises doesn't keep the resolved moves from their sessions
+    def test_failed_broadcast(self):
+        def broken_broadcast(deltas):
+            raise ConnectionError("broadcast failed")
+
+        self.ticks.broadcast = broken_broadcast
+
+        async def play():
+            runner = asyncio.create_task(self.ticks.run(interval=0.01))
+            try:
+                return await asyncio.wait_for(self.ticks.play(0, ATTACK), timeout=1)
+            finally:
+                runner.cancel()
+
+        self.assertEqual(asyncio.run(play()).turn, 1)
+        self.assertIsInstance(self.ticks.last_error, ConnectionError)
+        self.assertEqual(self.ticks.failures, {})
+
+if __name__ == "__main__":
+    unittest.main()
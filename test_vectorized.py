@@ -0,0 +1,48 @@
+import random
+import unittest
+from player import Player
+from enemy import Enemy
+from engine import run_battle, resolve_policy
+from events import NULL_SINK
+
+try:
+    import numpy as np
+    from vectorized import ENEMY_WON, PLAYER_WON, DRAW, BattleBatch, grid
+except ImportError:
+    np = None
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestVectorized(unittest.TestCase):
+
+    # Every battle in the batch must match the scalar engine exactly
+    def check_matches_engine(self, player_policy):
+        attacks, defenses, healths = [1, 6, 10, 25], [0, 3], [5, 30, 120]
+        result = grid(attacks, defenses, healths, player_policy=player_policy).run(max_turns=200)
+
+        index = 0
+        for attack_power in attacks:
+            for defense in defenses:
+                for health in healths:
+                    player = Player("P", "Punch", attack_power, 5, {"Potion": 2}, sink=NULL_SINK)
+                    enemy = Enemy("E", health, health, "Bite", 6, defense, {}, sink=NULL_SINK)
+                    expected = run_battle(player, enemy, resolve_policy(player_policy), rng=random.Random(index), max_turns=200)
+
+                    winner = {"player": PLAYER_WON, "enemy": ENEMY_WON, None: DRAW}[expected.winner]
+                    self.assertEqual(result.winner[index], winner)
+                    self.assertEqual(result.turns[index], expected.turns)
+                    self.assertEqual(result.player_health[index], player.health)
+                    self.assertEqual(result.enemy_health[index], enemy.health)
+                    index += 1
+
+    def test_matches_engine_always_attack(self):
+        self.check_matches_engine("attack")
+
+    def test_matches_engine_heal_below(self):
+        self.check_matches_engine("heal_below:40")
+
+    def test_unsupported_policy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            BattleBatch(100, 100, 10, 5, 2, 30, 30, 6, 3, player_policy=lambda actor, opponent, rng: "attack")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import random
+import unittest
+from enemy import Enemy
+from events import NULL_SINK
+from player import Player
+from world import SpatialGrid, World
+
+class TestWorld(unittest.TestCase):
+
+    def setUp(self):
+        self.world = World(width=100, height=100, seed=3)
+        self.hero = Player("Hero", "Punch", 10, 5, {"Potion": 2}, sink=NULL_SINK)
+
+    def test_grid_queries_match_a_scan(self):
+        rng = random.Random(1)
+        grid = SpatialGrid(cell_size=5)
+        points = {uid: (rng.uniform(-50, 50), rng.uniform(-50, 50)) for uid in range(2000)}
+        for uid, (x, y) in points.items():
+            grid.insert(uid, x, y)
+        for uid in range(0, 2000, 3): # Move a third of them, some across cells
+            x, y = points[uid]
+            points[uid] = (x + rng.uniform(-4, 4), y + rng.uniform(-4, 4))
+            grid.move(uid, *points[uid])
+        for uid in range(0, 2000, 10):
+            grid.remove(uid)
+            del points[uid]
+
+        for _ in range(50):
+            x, y, radius = rng.uniform(-60, 60), rng.uniform(-60, 60), rng.uniform(0, 12)
+            expected = {uid for uid, (px, py) in points.items() if (px - x) ** 2 + (py - y) ** 2 <= radius ** 2}
+            self.assertEqual({uid for _, uid in grid.query(x, y, radius)}, expected)
+        self.assertEqual(len(grid), len(points))
+        with self.assertRaises(KeyError):
+            grid.insert(1, 0, 0)
+
+    def test_empty_cells_are_dropped(self):
+        grid = SpatialGrid()
+        grid.insert("a", 1, 1)
+        grid.move("a", 90, 90)
+        grid.remove("a")
+        self.assertEqual(grid._cells, {})
+
+    # A player in reach of enemies fights the nearest one, and the defeated enemy leaves the map
+    def test_proximity_triggers_a_battle(self):
+        near = self.world.spawn(Enemy("Rat", 5, 5, "Nibble", 1, 0, {"Gold Coin": 2}, sink=NULL_SINK), 12, 10)
+        far = self.world.spawn("goblin", 80, 80)
+        hero = self.world.add_player(self.hero, 50, 50)
+        self.assertEqual(self.world.tick(), []) # Nobody in reach
+
+        self.world.move(hero, 10, 10)
+        self.assertEqual(self.world.nearby(10, 10, 5), [near])
+        encounters = self.world.tick()
+        self.assertEqual([(e.player, e.enemy, e.enemy_name, e.result.winner) for e in encounters],
+                         [(hero, near, "Rat", "player")])
+        self.assertNotIn(near, self.world.enemies)
+        self.assertEqual(self.hero.inventory["Gold Coin"], 2)
+        self.assertEqual(self.world.enemy(far), "goblin") # Not built until someone fights it
+
+    def test_keyed_enemies_respawn(self):
+        world = World(width=100, height=100, respawn_ticks=3, seed=3)
+        goblin = world.spawn("goblin", 10, 10)
+        hero = world.add_player(self.hero, 10, 11)
+        self.assertEqual(world.tick()[0].enemy_name, "Goblin")
+        self.assertEqual(len(world), 0)
+        world.move(hero, 90, 90)
+        world.tick()
+        world.tick()
+        self.assertEqual(len(world), 0)
+        world.tick()
+        (respawned,) = world.enemies._positions
+        self.assertNotEqual(respawned, goblin)
+        self.assertEqual((world.enemy(respawned), world.enemies.position(respawned)), ("goblin", (10, 10)))
+
+    def test_defeated_players_leave(self):
+        self.world.spawn(Enemy("Dragon", 500, 500, "Fire", 200, 0, {}, sink=NULL_SINK), 10, 10)
+        hero = self.world.add_player(self.hero, 10, 10)
+        self.assertEqual(self.world.tick()[0].result.winner, "enemy")
+        self.assertNotIn(hero, self.world.players)
+
+    def test_rejects_positions_outside_the_map(self):
+        with self.assertRaises(ValueError):
+            self.world.spawn("goblin", 100, 5)
+        with self.assertRaises(ValueError):
+            World(respawn_ticks=0)
+
+    # 100k enemies: the player only ever fights the ones it walks past
+    def test_large_world(self):
+        world = World(width=10_000, height=10_000, seed=1)
+        world.populate(100_000, ("goblin",), seed=2)
+        self.assertEqual(len(world), 100_000)
+        hero = world.add_player(self.hero, 5000, 5000)
+        fights = 0
+        for step in range(200):
+            world.move(hero, 5000 + step * 0.5, 5000)
+            fights += len(world.tick())
+        self.assertEqual(fights, 100_000 - len(world))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional
+
+from engine import ACTIONS, Battle
+"""
+ticks.py
+
+Tick-based resolution of many battles at once, for servers hosting lots of concurrent sessions.
+
+Instead of resolving each move the moment it arrives, moves are collected over a tick window and resolved together
+at the end of the tick, in one pass over the battles that have a pending move. Everything that changed is handed
+to a single broadcast call per tick, as one Delta per battle, rather than one send per action.
+
+Outcomes are reproducible: every battle has its own random streams (engine.Battle), pending moves are resolved in
+order of session id (never in order of arrival), and a session that sends several moves within one tick plays the
+last one. The same seeds and the same moves per tick always give the same deltas.
+
+    ticks = TickResolver(broadcast=send_to_clients)
+    ticks.open(session, Battle(player, enemy, seed=seed))
+    ticks.submit(session, ATTACK) # Any number of sessions during the tick...
+    ticks.resolve()               # ... resolved together at the end of it
+
+    asyncio.create_task(ticks.run(interval=0.1)) # Or let it tick on its own, clients await ticks.play(session, move)
+"""
+
+DEFAULT_TICK_INTERVAL = 0.1 # Seconds per tick
+
+
+@dataclass(frozen=True, slots=True)
+class Delta:
+    """
+    What one tick changed in a battle.
+
+    Args:
+        tick (int): The tick that resolved it
+        session: The session's id
+        turn (int): The battle's turn number
+        player_action (str): The player's action
+        enemy_action (str | None): The enemy's action (None if it didn't act)
+        player_health (int): The player's health after the turn
+        enemy_health (int): The enemy's health after the turn
+        finished (bool): The battle is over
+        winner (str | None): "player", "enemy" or None
+    """
+    tick: int
+    session: Hashable
+    turn: int
+    player_action: str
+    enemy_action: Optional[str]
+    player_health: int
+    enemy_health: int
+    finished: bool
+    winner: Optional[str]
+
+
+class TickResolver:
+    """
+    Collects the moves of many battles and resolves them once per tick.
+
+    Args:
+        broadcast (callable, optional): Called with the list of Deltas of every tick that resolved something
+    """
+
+    def __init__(self, broadcast: Optional[Callable[[list], None]] = None):
+        """Initializes a resolver with no battles"""
+        self.broadcast = broadcast
+        self.tick = 0
+        self.battles: dict = {} # {session: Battle}
+        self.last_duration = 0.0 # Seconds the last resolve() took
+        self.failures: dict = {} # {session: error} of the moves that raised during the last resolve()
+        self.last_error: Optional[Exception] = None # The latest error of a move or of the broadcast
+        self._pending: dict = {} # {session: action} for the current tick
+        self._waiting: dict = {} # {session: Future} of the sessions awaiting their move's outcome (see play())
+
+    def __len__(self) -> int:
+        """Number of open battles"""
+        return len(self.battles)
+
+    @property
+    def pending(self) -> int:
+        """Moves waiting for the end of the tick"""
+        return len(self._pending)
+
+    def open(self, session: Hashable, battle: Battle) -> None:
+        """
+        Adds a battle. Session ids must be comparable with each other, they decide the order of resolution.
+
+        Raises:
+            KeyError: If the session already has a battle
+        """
+        if session in self.battles:
+            raise KeyError(f"Session {session!r} already has a battle")
+        self.battles[session] = battle
+
+    def close(self, session: Hashable) -> None:
+        """Removes a battle, dropping its pending move (and cancelling whoever awaits it)"""
+        self.battles.pop(session, None)
+        self._pending.pop(session, None)
+        future = self._waiting.pop(session, None)
+        if future is not None and not future.done():
+            future.cancel()
+
+    def submit(self, session: Hashable, action: str) -> None:
+        """
+        Queues a move for the end of the tick, replacing the session's earlier move of the same tick.
+
+        Raises:
+            KeyError: If the session has no battle
+            ValueError: If the action is not known to the engine
+            RuntimeError: If the battle is already finished
+        """
+        battle = self.battles[session]
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action: {action!r}")
+        if battle.finished:
+            raise RuntimeError("The battle is already finished.")
+        self._pending[session] = action
+
+    def resolve(self) -> list:
+        """
+        Ends the tick: plays the pending moves, in order of session id, and broadcasts what changed.
+
+        Every battle is resolved on its own: a move that raises only fails its own session (whoever awaits it, see
+        play(), gets the error, and it is kept in 'failures'), the other moves of the tick are still played. If the
+        broadcast raises, the sessions awaiting their moves still get their Deltas. Errors are kept in 'last_error'.
+
+        Returns:
+            list: The Deltas of the moves that were played, in order of session id
+        """
+        self.tick += 1
+        self.failures = {}
+        if not self._pending:
+            return []
+        started = time.perf_counter()
+        pending, self._pending = self._pending, {}
+        battles, tick, deltas, failures = self.battles, self.tick, [], self.failures
+        for session in sorted(pending):
+            battle = battles[session]
+            try:
+                record = battle.play_turn(pending[session])
+            except Exception as error:
+                failures[session] = self.last_error = error
+                continue
+            deltas.append(Delta(tick, session, record.turn, record.player_action, record.enemy_action,
+                                record.player_health, record.enemy_health, battle.finished, battle.winner))
+
+        if self.broadcast is not None and deltas:
+            try:
+                self.broadcast(deltas)
+            except Exception as error:
+                self.last_error = error
+
+        waiting = self._waiting
+        if waiting:
+            for delta in deltas:
+                future = waiting.pop(delta.session, None)
+                if future is not None and not future.done():
+                    future.set_result(delta)
+            for session, error in failures.items():
+                future = waiting.pop(session, None)
+                if future is not None and not future.done():
+                    future.set_exception(error)
+        self.last_duration = time.perf_counter() - started
+        return deltas
+
+    async def play(self, session: Hashable, action: str) -> Delta:
+        """
+        Submits a move and waits for the tick that resolves it (needs run() going).
+
+        Returns:
+            Delta: The move's outcome
+        """
+        self.submit(session, action)
+        future = self._waiting.get(session)
+        if future is None or future.done():
+            future = self._waiting[session] = asyncio.get_running_loop().create_future()
+        return await future
+
+    async def run(self, interval: float = DEFAULT_TICK_INTERVAL) -> None:
+        """
+        Resolves a tick every 'interval' seconds until cancelled. Ticks are scheduled on a fixed clock, so a slow
+        tick shortens the wait before the next one instead of delaying every tick after it.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            deadline += interval
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            self.resolve()
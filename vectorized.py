@@ -0,0 +1,206 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from engine import ATTACK, ENEMY_MOVES, HEAL_AMOUNT, MAX_TURNS, HealBelow, always_attack, resolve_policy
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional, only this module needs it
+    np = None
+"""
+vectorized.py
+
+Vectorized battle resolver. Holds K independent Player vs Enemy battles as NumPy arrays and advances all of them
+in lockstep, one turn at a time, with a mask for the battles that are already over.
+
+It follows exactly the same rules as engine.py with the CLASSIC damage ruleset (damage.py), so every battle ends
+with the same winner, turn count and health as the scalar engine would give for the same combatants and policies.
+Supported policies:
+- Player: "attack" (always_attack) or "heal_below:N" (HealBelow)
+- Enemy: "random" (random_enemy_move) while the enemy only has the "attack" move
+
+Requires NumPy (pip install numpy).
+"""
+
+# Winner codes used in VectorResult.winner
+DRAW = 0
+PLAYER_WON = 1
+ENEMY_WON = -1
+
+
+def _require_numpy() -> None:
+    """Raises an ImportError with a helpful message when NumPy isn't installed"""
+    if np is None:
+        raise ImportError("vectorized.py needs NumPy, install it with: pip install numpy")
+
+
+@dataclass(slots=True)
+class VectorResult:
+    """
+    Outcome of every battle in a batch (one entry per battle).
+
+    Args:
+        winner (ndarray): PLAYER_WON, ENEMY_WON or DRAW
+        turns (ndarray): Number of turns played
+        player_health (ndarray): Player health at the end of the battle
+        enemy_health (ndarray): Enemy health at the end of the battle
+    """
+    winner: "np.ndarray"
+    turns: "np.ndarray"
+    player_health: "np.ndarray"
+    enemy_health: "np.ndarray"
+
+
+class BattleBatch:
+    """
+    K concurrent battles stored as parallel arrays.
+
+    Every argument is a scalar or an array of length K (scalars are broadcast to every battle).
+
+    Args:
+        player_health (int | array): Player starting health
+        player_max_health (int | array): Player maximum health
+        player_attack (int | array): Player attack power
+        player_defense (int | array): Player defense
+        potions (int | array): Potions in the player's inventory
+        enemy_health (int | array): Enemy starting health
+        enemy_max_health (int | array): Enemy maximum health
+        enemy_attack (int | array): Enemy attack power
+        enemy_defense (int | array): Enemy defense
+        player_policy (str | Policy, optional): "attack" or "heal_below:N" (or the matching policy object)
+        enemy_policy (str | Policy, optional): "random"
+    """
+
+    def __init__(self, player_health, player_max_health, player_attack, player_defense, potions,
+                 enemy_health, enemy_max_health, enemy_attack, enemy_defense,
+                 player_policy="attack", enemy_policy="random"):
+        """Initializes the batch arrays and checks that the policies can be vectorized"""
+        _require_numpy()
+
+        columns = np.broadcast_arrays(*(np.asarray(value, dtype=np.int32) for value in (
+            player_health, player_max_health, player_attack, player_defense, potions,
+            enemy_health, enemy_max_health, enemy_attack, enemy_defense)))
+        (self.player_health, self.player_max_health, self.player_attack, self.player_defense, self.potions,
+         self.enemy_health, self.enemy_max_health, self.enemy_attack, self.enemy_defense) = (
+            np.array(column).ravel() for column in columns) # Copies, so the caller's arrays are never changed
+
+        self.size = self.player_health.size
+        self.heal_threshold = self._heal_threshold(player_policy)
+        self._check_enemy_policy(enemy_policy)
+
+        self.turn = 0
+        self.active = np.ones(self.size, dtype=bool) # Battles that are still being fought
+        self.winner = np.full(self.size, DRAW, dtype=np.int8)
+        self.turns = np.zeros(self.size, dtype=np.int32)
+
+    @staticmethod
+    def _heal_threshold(player_policy) -> int:
+        """Turns the player policy into a healing threshold (-1 means never heal)"""
+        policy = resolve_policy(player_policy)
+        if policy is always_attack:
+            return -1
+        if isinstance(policy, HealBelow):
+            return policy.threshold
+        raise ValueError(f"Player policy {player_policy!r} can't be vectorized")
+
+    @staticmethod
+    def _check_enemy_policy(enemy_policy) -> None:
+        """Only the random enemy policy over an attack-only move list is supported"""
+        if resolve_policy(enemy_policy) is not resolve_policy("random") or set(ENEMY_MOVES) != {ATTACK}:
+            raise ValueError(f"Enemy policy {enemy_policy!r} can't be vectorized")
+
+    @property
+    def finished(self) -> bool:
+        """True once every battle in the batch is over"""
+        return not self.active.any()
+
+    def step(self) -> None:
+        """
+        Plays one turn of every battle that is still active, following the same order as engine.Battle.play_turn:
+        the player acts, then the enemy acts if it is still alive.
+        """
+        self.turn += 1
+        active = self.active
+
+        # Player's action: heal (using up a Potion) at or below the threshold, attack otherwise
+        heals = active & (self.player_health <= self.heal_threshold) & (self.potions > 0)
+        attacks = active & ~heals
+        self.potions -= heals
+        self.player_health = np.where(heals, np.minimum(self.player_health + HEAL_AMOUNT, self.player_max_health), self.player_health)
+        self.enemy_health = np.where(attacks, np.maximum(self.enemy_health - self.player_attack, 0), self.enemy_health)
+
+        won = active & (self.enemy_health <= 0)
+
+        # Enemy's action (only for battles where the enemy survived)
+        enemy_turn = active & ~won
+        self.player_health = np.where(enemy_turn, np.maximum(self.player_health - self.enemy_attack, 0), self.player_health)
+        lost = enemy_turn & (self.player_health <= 0)
+
+        self.winner[won] = PLAYER_WON
+        self.winner[lost] = ENEMY_WON
+        self.turns[active] = self.turn
+        self.active = enemy_turn & ~lost
+
+    def run(self, max_turns: int = MAX_TURNS) -> VectorResult:
+        """
+        Plays turns until every battle is over or 'max_turns' is reached (the remaining battles are draws).
+
+        Args:
+            max_turns (int, optional): Turn cap, same meaning as in engine.run_battle
+
+        Returns:
+            VectorResult: The outcome of every battle
+        """
+        while not self.finished and self.turn < max_turns:
+            self.step()
+        return VectorResult(self.winner, self.turns, self.player_health, self.enemy_health)
+
+
+def grid(player_attack: Sequence[int], enemy_defense: Sequence[int], enemy_health: Sequence[int],
+         player_template: Optional[dict] = None, enemy_template: Optional[dict] = None, **batch_kwargs) -> BattleBatch:
+    """
+    Builds a batch covering every combination of player attack power, enemy defense and enemy health.
+    Every other stat comes from the templates (same format as simulate.DEFAULT_PLAYER / DEFAULT_ENEMY).
+
+    Args:
+        player_attack (sequence): Player attack_power values to sweep
+        enemy_defense (sequence): Enemy defense values to sweep
+        enemy_health (sequence): Enemy health values to sweep (also used as max_health)
+        player_template (dict, optional): Player stats, defaults to simulate.DEFAULT_PLAYER
+        enemy_template (dict, optional): Enemy stats, defaults to simulate.DEFAULT_ENEMY
+        **batch_kwargs: Passed on to BattleBatch (ex: player_policy)
+
+    Returns:
+        BattleBatch: A batch with len(player_attack) * len(enemy_defense) * len(enemy_health) battles,
+        in row-major order (player_attack varies slowest)
+    """
+    _require_numpy()
+    from simulate import DEFAULT_ENEMY, DEFAULT_PLAYER
+
+    player_template = player_template if player_template is not None else DEFAULT_PLAYER
+    enemy_template = enemy_template if enemy_template is not None else DEFAULT_ENEMY
+    attack, defense, health = np.meshgrid(player_attack, enemy_defense, enemy_health, indexing="ij")
+
+    return BattleBatch(
+        player_health=100,
+        player_max_health=100,
+        player_attack=attack,
+        player_defense=player_template["defense"],
+        potions=player_template["inventory"].get("Potion", 0),
+        enemy_health=health,
+        enemy_max_health=health,
+        enemy_attack=enemy_template["attack_power"],
+        enemy_defense=defense,
+        **batch_kwargs,
+    )
+
+
+if __name__ == "__main__":
+    import time
+
+    batch = grid(range(1, 101), range(0, 100), range(10, 110, 1), player_policy="heal_below:30")
+    start = time.perf_counter()
+    result = batch.run()
+    elapsed = time.perf_counter() - start
+    print(f"{batch.size} battles in {elapsed:.3f}s ({batch.size / elapsed * 60:,.0f} battles/minute)")
+    print(f"Player win rate: {(result.winner == PLAYER_WON).mean():.3f}")
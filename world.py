@@ -0,0 +1,349 @@
+import random
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional, Sequence, Union
+
+from player import Player
+from enemy import Enemy
+from content import create
+from engine import BattleResult, Policy, always_attack, new_seed, random_enemy_move, run_battle
+from events import NULL_SINK, EventSink
+from status import TimerWheel
+"""
+world.py
+
+The overworld: enemies spread over a 2D map, players walking around it, and a battle whenever a player comes
+within reach of an enemy.
+
+Enemies are kept in a uniform grid (SpatialGrid): the map is cut into square cells and every cell knows the
+enemies standing in it. Finding the enemies around a point only looks at the few cells its radius covers, so the
+cost depends on how crowded the neighbourhood is, not on how many enemies the world holds. Spawning, despawning
+and moving an enemy are O(1) updates of its cell.
+
+Each tick:
+- enemies due to respawn come back (despawns are scheduled on a timer wheel, see status.TimerWheel)
+- every player looks for the nearest enemy within 'aggro_radius' and fights it (engine.run_battle by default).
+  A defeated enemy despawns, a defeated player leaves the world
+
+An enemy can be spawned as an Enemy or as an archetype key (see content.py). Keyed enemies are only built when a
+fight starts, so a world of 100k idle enemies costs a grid entry each, and they can respawn after 'respawn_ticks'.
+With a progression (see progression.py), keyed enemies are built at the level of the player who runs into them and
+victories earn experience.
+
+    world = World(aggro_radius=3)
+    world.populate(100_000, ("goblin",), seed=1)
+    hero = world.add_player(create("kramptj"), 50, 50, HealBelow(30))
+    world.move(hero, 51, 49)
+    for encounter in world.tick():
+        print(encounter.enemy_name, encounter.result.winner)
+"""
+
+DEFAULT_WIDTH = 10_000.0
+DEFAULT_HEIGHT = 10_000.0
+DEFAULT_CELL_SIZE = 8.0 # Cells a bit larger than the aggro radius keep queries down to a few cells
+DEFAULT_AGGRO_RADIUS = 3.0
+
+
+class SpatialGrid:
+    """
+    A uniform grid of points, for radius queries in time proportional to the points nearby.
+
+    Args:
+        cell_size (float, optional): Side of a cell
+    """
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        """Initializes an empty grid"""
+        self.cell_size = cell_size
+        self._cells: dict = {} # {(cell x, cell y): {uid: (x, y)}}
+        self._positions: dict = {} # {uid: (x, y)}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, uid) -> bool:
+        return uid in self._positions
+
+    def _cell(self, x: float, y: float) -> tuple:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def position(self, uid) -> tuple:
+        """Returns the (x, y) of a point"""
+        return self._positions[uid]
+
+    def insert(self, uid, x: float, y: float) -> None:
+        """
+        Adds a point.
+
+        Raises:
+            KeyError: If the uid is already in the grid
+        """
+        if uid in self._positions:
+            raise KeyError(f"{uid!r} is already in the grid")
+        self._positions[uid] = (x, y)
+        cell = self._cell(x, y)
+        members = self._cells.get(cell)
+        if members is None:
+            members = self._cells[cell] = {}
+        members[uid] = (x, y)
+
+    def remove(self, uid) -> None:
+        """Removes a point (KeyError if it isn't in the grid)"""
+        x, y = self._positions.pop(uid)
+        cell = self._cell(x, y)
+        members = self._cells[cell]
+        del members[uid]
+        if not members:
+            del self._cells[cell] # Empty cells are dropped, memory follows the number of points
+
+    def move(self, uid, x: float, y: float) -> None:
+        """Moves a point, only touching the cells when it crosses into another one"""
+        old_x, old_y = self._positions[uid]
+        old_cell, cell = self._cell(old_x, old_y), self._cell(x, y)
+        self._positions[uid] = (x, y)
+        if cell == old_cell:
+            self._cells[cell][uid] = (x, y)
+            return
+        members = self._cells[old_cell]
+        del members[uid]
+        if not members:
+            del self._cells[old_cell]
+        members = self._cells.get(cell)
+        if members is None:
+            members = self._cells[cell] = {}
+        members[uid] = (x, y)
+
+    def query(self, x: float, y: float, radius: float) -> Iterator[tuple]:
+        """
+        Finds the points within 'radius' of (x, y), only looking at the cells the radius covers.
+
+        Yields:
+            tuple: (squared distance, uid) of every point in range, in no particular order
+        """
+        size, cells, limit = self.cell_size, self._cells, radius * radius
+        low_x, high_x = int((x - radius) // size), int((x + radius) // size)
+        low_y, high_y = int((y - radius) // size), int((y + radius) // size)
+        for cell_x in range(low_x, high_x + 1):
+            for cell_y in range(low_y, high_y + 1):
+                members = cells.get((cell_x, cell_y))
+                if members:
+                    for uid, (point_x, point_y) in members.items():
+                        distance = (point_x - x) ** 2 + (point_y - y) ** 2
+                        if distance <= limit:
+                            yield distance, uid
+
+    def nearest(self, x: float, y: float, radius: float):
+        """Returns the uid of the nearest point within 'radius' of (x, y), None if there is none"""
+        best = min(self.query(x, y, radius), default=None)
+        return best[1] if best is not None else None
+
+
+@dataclass(slots=True)
+class WorldEncounter:
+    """
+    A battle the world started.
+
+    Args:
+        tick (int): The tick it happened on
+        player (int): The player's uid
+        enemy (int): The enemy's uid
+        enemy_name (str): The enemy's name
+        result (BattleResult): How it went
+    """
+    tick: int
+    player: int
+    enemy: int
+    enemy_name: str
+    result: BattleResult
+
+
+class World:
+    """
+    A map of enemies and players where proximity starts battles.
+
+    Args:
+        width (float, optional): The map spans x in [0, width)
+        height (float, optional): The map spans y in [0, height)
+        cell_size (float, optional): Side of a spatial grid cell
+        aggro_radius (float, optional): How close a player has to come to an enemy to start a battle
+        respawn_ticks (int, optional): Ticks before an enemy spawned by archetype key comes back after being
+            defeated, None for never
+        enemy_policy (callable, optional): Policy of the enemies in battle
+        sink (EventSink, optional): Where the battles' events go (and the sink of enemies built from a key)
+        seed (int, optional): Seed of the world's random stream (spawn positions and battle seeds)
+        fight (callable, optional): fight(player, enemy, player_policy) -> BattleResult, runs a battle.
+            Defaults to a headless engine.run_battle. For interactive fights:
+            fight=lambda player, enemy, policy: battle.battle(player, enemy)
+        progression (Progression, optional): Scales keyed enemies to the player's level and awards experience
+            (the default fight only)
+
+    Raises:
+        ValueError: If 'respawn_ticks' isn't positive
+    """
+
+    def __init__(self, width: float = DEFAULT_WIDTH, height: float = DEFAULT_HEIGHT,
+                 cell_size: float = DEFAULT_CELL_SIZE, aggro_radius: float = DEFAULT_AGGRO_RADIUS,
+                 respawn_ticks: Optional[int] = None, enemy_policy: Policy = random_enemy_move,
+                 sink: EventSink = NULL_SINK, seed: Optional[int] = None, fight: Optional[Callable] = None,
+                 progression=None):
+        """Initializes an empty world"""
+        if respawn_ticks is not None and respawn_ticks < 1:
+            raise ValueError("Enemies respawn at least one tick after being defeated")
+        self.width = width
+        self.height = height
+        self.aggro_radius = aggro_radius
+        self.respawn_ticks = respawn_ticks
+        self.enemy_policy = enemy_policy
+        self.sink = sink
+        self.rng = random.Random(seed if seed is not None else new_seed())
+        self.fight = fight if fight is not None else self._run_battle
+        self.progression = progression
+        self.enemies = SpatialGrid(cell_size)
+        self.players: dict = {} # {uid: [player, x, y, policy]}
+        self.tick_count = 0
+        self._spawned: dict = {} # {uid: Enemy or archetype key}
+        self._respawns = TimerWheel() # Archetype spawns waiting to come back, (key, x, y) by tick
+        self._next_uid = 0
+
+    def __len__(self) -> int:
+        """Number of enemies on the map"""
+        return len(self.enemies)
+
+    def _uid(self) -> int:
+        self._next_uid += 1
+        return self._next_uid
+
+    def _check(self, x: float, y: float) -> None:
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError(f"({x}, {y}) is outside the map")
+
+    # ----- Spawning -----
+
+    def spawn(self, enemy: Union[Enemy, str], x: float, y: float) -> int:
+        """
+        Puts an enemy on the map.
+
+        Args:
+            enemy (Enemy | str): The enemy, or the archetype key it's built from when a fight starts
+            x (float): Position on the map
+            y (float): Position on the map
+
+        Returns:
+            int: The enemy's uid
+
+        Raises:
+            ValueError: If the position is outside the map
+        """
+        self._check(x, y)
+        uid = self._uid()
+        self._spawned[uid] = enemy
+        self.enemies.insert(uid, x, y)
+        return uid
+
+    def populate(self, count: int, archetypes: Sequence[str], seed: Optional[int] = None) -> list:
+        """
+        Spawns 'count' enemies at random positions, picking their archetypes at random.
+
+        Args:
+            count (int): Number of enemies
+            archetypes (sequence): Archetype keys to pick from
+            seed (int, optional): Seed of the positions, defaults to the world's random stream
+
+        Returns:
+            list: The uids of the new enemies
+        """
+        rng = random.Random(seed) if seed is not None else self.rng
+        width, height, spawn = self.width, self.height, self.spawn
+        return [spawn(rng.choice(archetypes), rng.random() * width, rng.random() * height) for _ in range(count)]
+
+    def despawn(self, uid: int) -> None:
+        """Takes an enemy off the map (KeyError if it isn't there)"""
+        self.enemies.remove(uid)
+        del self._spawned[uid]
+
+    def enemy(self, uid: int) -> Union[Enemy, str]:
+        """Returns a spawned enemy, or its archetype key if it hasn't been built yet"""
+        return self._spawned[uid]
+
+    # ----- Players -----
+
+    def add_player(self, player: Player, x: float, y: float, policy: Policy = always_attack) -> int:
+        """
+        Puts a player on the map.
+
+        Args:
+            player (Player): The player
+            x (float): Position on the map
+            y (float): Position on the map
+            policy (callable, optional): The player's policy in battle
+
+        Returns:
+            int: The player's uid
+        """
+        self._check(x, y)
+        uid = self._uid()
+        self.players[uid] = [player, x, y, policy]
+        return uid
+
+    def remove_player(self, uid: int) -> None:
+        """Takes a player off the map"""
+        del self.players[uid]
+
+    def move(self, uid: int, x: float, y: float) -> None:
+        """
+        Moves a player or an enemy.
+
+        Raises:
+            KeyError: If nothing has this uid
+            ValueError: If the position is outside the map
+        """
+        self._check(x, y)
+        entry = self.players.get(uid)
+        if entry is not None:
+            entry[1], entry[2] = x, y
+        else:
+            self.enemies.move(uid, x, y)
+
+    def nearby(self, x: float, y: float, radius: float) -> list:
+        """Returns the uids of the enemies within 'radius' of (x, y), nearest first"""
+        return [uid for _, uid in sorted(self.enemies.query(x, y, radius))]
+
+    # ----- Ticks -----
+
+    def _run_battle(self, player: Player, enemy: Enemy, policy: Policy) -> BattleResult:
+        return run_battle(player, enemy, policy, self.enemy_policy, sink=self.sink, seed=self.rng.getrandbits(63),
+                          progression=self.progression)
+
+    def tick(self) -> list:
+        """
+        Advances the world by one tick: respawns what is due, then every player fights the nearest enemy in reach.
+
+        Returns:
+            list: The WorldEncounters of this tick
+        """
+        self.tick_count += 1
+        for key, x, y in self._respawns.advance():
+            self.spawn(key, x, y)
+
+        encounters = []
+        for player_uid, (player, x, y, policy) in list(self.players.items()):
+            enemy_uid = self.enemies.nearest(x, y, self.aggro_radius)
+            if enemy_uid is None:
+                continue
+            enemy = self._spawned[enemy_uid]
+            key = enemy if isinstance(enemy, str) else None
+            if key is not None:
+                if self.progression is not None:
+                    enemy = self.progression.create_scaled(key, player.level, sink=self.sink)
+                else:
+                    enemy = create(key, sink=self.sink)
+                self._spawned[enemy_uid] = enemy
+            result = self.fight(player, enemy, policy)
+            encounters.append(WorldEncounter(self.tick_count, player_uid, enemy_uid, enemy.name, result))
+            if enemy.is_defeated():
+                enemy_x, enemy_y = self.enemies.position(enemy_uid)
+                self.despawn(enemy_uid)
+                if key is not None and self.respawn_ticks is not None:
+                    self._respawns.schedule(self.tick_count + self.respawn_ticks, (key, enemy_x, enemy_y))
+            if player.is_defeated():
+                self.remove_player(player_uid)
+        return encounters